@@ -0,0 +1,33 @@
+"""Add rolling summary to conversations
+
+Revision ID: b3f1c2d4e5a6
+Revises: 7437667c17d8
+Create Date: 2026-10-17 10:12:41.512093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3f1c2d4e5a6'
+down_revision: Union[str, Sequence[str], None] = '7437667c17d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('conversations', sa.Column('summary', sa.Text(), nullable=True))
+    op.add_column(
+        'conversations',
+        sa.Column('summarized_count', sa.Integer(), server_default='0', nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('conversations', 'summarized_count')
+    op.drop_column('conversations', 'summary')
@@ -0,0 +1,51 @@
+"""Add indexes for conversation and message listings
+
+Revision ID: c5d7e9f1a2b3
+Revises: b3f1c2d4e5a6
+Create Date: 2026-10-17 16:40:05.218734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d7e9f1a2b3'
+down_revision: Union[str, Sequence[str], None] = 'b3f1c2d4e5a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY no bloquea las escrituras mientras se construye el índice, pero no
+    # puede ejecutarse dentro de una transacción.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_messages_conversation_id_timestamp',
+            'messages',
+            ['conversation_id', 'timestamp'],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            'ix_conversations_updated_at_id',
+            'conversations',
+            ['updated_at', 'id'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_conversations_updated_at_id',
+            table_name='conversations',
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            'ix_messages_conversation_id_timestamp',
+            table_name='messages',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,113 @@
+"""
+Benchmark de los lotes de preguntas: una pregunta tras otra frente a `RAGService.aanswer_batch`.
+
+Simula un trabajo de evaluación o de pregeneración de respuestas frecuentes con
+`--questions` preguntas distintas y los sustitutos deterministas de `tests/fakes.py`
+(latencias configurables de embedding, búsqueda y generación), y compara:
+
+- **secuencial:** `aanswer_question` para cada pregunta, como haría un cliente que llama a
+  `/chat/ask` una vez por pregunta: un embedding y una búsqueda por pregunta.
+- **lote:** `aanswer_batch`, que calcula todos los embeddings con una sola llamada, lanza
+  las búsquedas a la vez y genera con `--concurrency` llamadas simultáneas al LLM.
+
+Informa del tiempo total, de las preguntas por segundo y de las llamadas a cada servicio.
+
+No requiere credenciales ni red.
+
+Uso:
+    python benchmarks/bench_batch.py --questions 200 --concurrency 8
+    python benchmarks/bench_batch.py --embed-ms 150 --generate-ms 0 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Añadir el directorio raíz del proyecto al principio del path: `tests.fakes` no debe
+# resolverse a otro paquete `tests` instalado en el entorno
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from tests.fakes import FakeLatencies, build_fake_rag_service
+
+TEMPLATES = [
+    "¿Qué se sabe de {} en Colombia?",
+    "¿Cuál es la importancia de {} para Colombia?",
+    "Explica brevemente {} en Colombia",
+    "¿Cómo ha cambiado {} en Colombia?",
+]
+TOPICS = [
+    "la capital", "la independencia", "la economía", "los ríos", "las cordilleras",
+    "la población", "la literatura", "el café", "la música", "la biodiversidad",
+    "el clima", "la constitución", "las regiones", "el petróleo", "la educación",
+]
+
+
+def build_questions(count):
+    """Preguntas distintas a partir de las plantillas y los temas, numeradas si se repiten."""
+    base = [template.format(topic) for template in TEMPLATES for topic in TOPICS]
+    return [
+        base[i % len(base)] + ("" if i < len(base) else f" (parte {i // len(base) + 1})")
+        for i in range(count)
+    ]
+
+
+def counters(service):
+    return {
+        "embedding_calls": service.vector_store.embeddings.calls,
+        "searches": service.vector_store.searches,
+        "llm_calls": service.llm.calls,
+    }
+
+
+async def run_sequential(questions, latencies):
+    service = build_fake_rag_service(latencies)
+    start = time.perf_counter()
+    for question in questions:
+        await service.aanswer_question(question, [])
+    return time.perf_counter() - start, counters(service)
+
+
+async def run_batch(questions, latencies, concurrency):
+    service = build_fake_rag_service(latencies)
+    start = time.perf_counter()
+    results = await service.aanswer_batch(questions, concurrency=concurrency)
+    elapsed = time.perf_counter() - start
+    assert not any(isinstance(result, Exception) for result in results)
+    return elapsed, counters(service)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--questions", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8, help="Generaciones simultáneas del lote.")
+    parser.add_argument("--embed-ms", type=float, default=60.0)
+    parser.add_argument("--search-ms", type=float, default=40.0)
+    parser.add_argument("--generate-ms", type=float, default=200.0)
+    parser.add_argument("--skip-sequential", action="store_true", help="Medir solo el lote.")
+    args = parser.parse_args()
+
+    latencies = FakeLatencies(
+        embed=args.embed_ms / 1000, search=args.search_ms / 1000, generate=args.generate_ms / 1000
+    )
+    questions = build_questions(args.questions)
+
+    runs = []
+    if not args.skip_sequential:
+        runs.append(("secuencial", asyncio.run(run_sequential(questions, latencies))))
+    runs.append(
+        (f"lote (x{args.concurrency})", asyncio.run(run_batch(questions, latencies, args.concurrency)))
+    )
+
+    print(f"{len(questions)} preguntas")
+    print(f"  {'modo':<14} {'total':>9} {'preg/s':>8} {'embeddings':>11} {'búsquedas':>10} {'LLM':>6}")
+    for name, (elapsed, calls) in runs:
+        print(
+            f"  {name:<14} {elapsed:>8.2f}s {len(questions) / elapsed:>8.1f} "
+            f"{calls['embedding_calls']:>11} {calls['searches']:>10} {calls['llm_calls']:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Benchmark por etapas del endpoint /chat/ask con sustitutos deterministas.
+
+Ejecuta `ask_question` de extremo a extremo (resolución de la conversación, memoria,
+servicio RAG y guardado de los mensajes) contra una base de datos SQLite local y el LLM,
+los embeddings y el almacén de vectores falsos de `tests/fakes.py`, con latencias
+configurables. Simula `--sessions` conversaciones concurrentes de `--turns` turnos e
+informa de la latencia de cada etapa (historial, reformulación, recuperación, prompt,
+generación y guardado), de la latencia total y del rendimiento en peticiones por segundo.
+
+Los resultados se guardan en JSON (`--output`) junto con el commit actual, de modo que se
+pueden comparar entre commits (`--compare resultados_anteriores.json`).
+
+No requiere credenciales ni red.
+
+Uso:
+    python benchmarks/bench_chat_pipeline.py --sessions 20 --turns 4 --output bench.json
+    python benchmarks/bench_chat_pipeline.py --generate-ms 0 --rephrase-ms 0 --compare bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+# Añadir el directorio raíz del proyecto al principio del path: `tests.fakes` no debe
+# resolverse a otro paquete `tests` instalado en el entorno
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# `src.api.database` crea su motor al importarse: se apunta a SQLite si no hay otra base.
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.api.endpoints.chat import ChatRequest, ask_question
+from src.models.sql import Base
+from src.services.conversation_memory import ConversationMemory
+from src.services.conversation_service import ConversationService
+from tests.fakes import (
+    FIRST_QUESTIONS,
+    FOLLOW_UP_QUESTIONS,
+    FakeChatModel,
+    FakeLatencies,
+    build_fake_rag_service,
+)
+from src.services.stage_timer import STAGES, start_timings
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def summarize(samples_ms):
+    return {
+        "count": len(samples_ms),
+        "mean_ms": statistics.mean(samples_ms),
+        "p50_ms": percentile(samples_ms, 50),
+        "p95_ms": percentile(samples_ms, 95),
+        "p99_ms": percentile(samples_ms, 99),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_session(session_factory, service, memory, args, rng, records):
+    conversation_id = None
+    for turn in range(args.turns):
+        question = rng.choice(FIRST_QUESTIONS if turn == 0 else FOLLOW_UP_QUESTIONS)
+        timings = start_timings()
+        start = time.perf_counter()
+        async with session_factory() as db:
+            response = await ask_question(
+                ChatRequest(question=question, conversation_id=conversation_id),
+                db=db,
+                rag_service=service,
+                conv_service=ConversationService(),
+                memory=memory,
+                writer=None,
+                admission=None,
+            )
+        total = time.perf_counter() - start
+        conversation_id = response.conversation_id
+        records.append({"total": total, "follow_up": turn > 0, **timings.as_dict()})
+
+
+async def run(args):
+    db_path = args.db or os.path.join(tempfile.mkdtemp(), "bench.sqlite3")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    latencies = FakeLatencies(
+        rephrase=args.rephrase_ms / 1000,
+        embed=args.embed_ms / 1000,
+        search=args.search_ms / 1000,
+        generate=args.generate_ms / 1000,
+    )
+    service = build_fake_rag_service(latencies, speculative_retrieval=not args.no_speculation)
+    memory = ConversationMemory(
+        llm=FakeChatModel(latency=latencies.rephrase),
+        session_factory=session_factory,
+        recent_turns=args.recent_turns,
+    )
+
+    records = []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            run_session(session_factory, service, memory, args, random.Random(seed), records)
+            for seed in range(args.sessions)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    await memory.aclose()
+    await engine.dispose()
+    return records, elapsed
+
+
+def build_report(args, records, elapsed):
+    totals = [r["total"] * 1000 for r in records]
+    stages = {}
+    for name in STAGES:
+        samples = [r[name] * 1000 for r in records if name in r]
+        if samples:
+            stages[name] = summarize(samples)
+            stages[name]["share_of_total"] = sum(samples) / sum(totals)
+    return {
+        "benchmark": "chat_pipeline",
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "requests": len(records),
+        "elapsed_seconds": elapsed,
+        "throughput_rps": len(records) / elapsed,
+        "total": summarize(totals),
+        "follow_up_total": summarize([r["total"] * 1000 for r in records if r["follow_up"]] or [0.0]),
+        "stages": stages,
+    }
+
+
+def print_report(report, baseline=None):
+    print(
+        f"{report['requests']} peticiones en {report['elapsed_seconds']:.2f} s "
+        f"({report['throughput_rps']:.1f} peticiones/s), commit {report['commit'] or '?'}"
+    )
+    header = f"  {'etapa':<12} {'n':>5} {'media':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'% total':>8}"
+    if baseline:
+        header += f" {'Δp50':>9}"
+    print(header)
+    rows = list(report["stages"].items()) + [("total", report["total"])]
+    for name, stats in rows:
+        line = (
+            f"  {name:<12} {stats['count']:>5} {stats['mean_ms']:>7.1f}ms {stats['p50_ms']:>7.1f}ms "
+            f"{stats['p95_ms']:>7.1f}ms {stats['p99_ms']:>7.1f}ms "
+            f"{stats.get('share_of_total', 1.0):>7.0%}"
+        )
+        if baseline:
+            previous = baseline["stages"].get(name) if name != "total" else baseline["total"]
+            if previous:
+                line += f" {stats['p50_ms'] - previous['p50_ms']:>+7.1f}ms"
+        print(line)
+    if baseline:
+        delta = report["throughput_rps"] / baseline["throughput_rps"] - 1
+        print(f"  rendimiento frente a {baseline.get('commit') or 'la referencia'}: {delta:+.1%}")
+    print("  (las etapas de recuperación y reformulación pueden solaparse)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=20, help="Conversaciones concurrentes.")
+    parser.add_argument("--turns", type=int, default=4, help="Turnos por conversación.")
+    parser.add_argument("--rephrase-ms", type=float, default=300)
+    parser.add_argument("--embed-ms", type=float, default=80)
+    parser.add_argument("--search-ms", type=float, default=40)
+    parser.add_argument("--generate-ms", type=float, default=700)
+    parser.add_argument("--recent-turns", type=int, default=4)
+    parser.add_argument("--no-speculation", action="store_true")
+    parser.add_argument("--db", default=None, help="Fichero SQLite (por defecto, uno temporal).")
+    parser.add_argument("--output", default=None, help="Fichero JSON donde guardar los resultados.")
+    parser.add_argument("--compare", default=None, help="Resultados anteriores con los que comparar.")
+    args = parser.parse_args()
+
+    records, elapsed = asyncio.run(run(args))
+    report = build_report(args, records, elapsed)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Resultados guardados en '{args.output}'.")
+
+
+if __name__ == "__main__":
+    main()
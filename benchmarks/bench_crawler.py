@@ -0,0 +1,80 @@
+"""
+Benchmark del crawler de Wikipedia: descarga secuencial frente a concurrente.
+
+Descarga y extrae el texto de los artículos de la lista de semillas sin red, sirviéndolos
+desde un directorio de HTML grabado con una latencia simulada por petición, y compara
+el rendimiento (páginas por segundo) con distintos niveles de concurrencia.
+
+Por defecto graba en un directorio temporal la página de ejemplo de los tests bajo el
+nombre de cada semilla. También se puede pasar un directorio con páginas reales, p. ej.:
+    curl -o fixtures/Bogotá.html https://es.wikipedia.org/wiki/Bogot%C3%A1
+
+Uso:
+    python benchmarks/bench_crawler.py --latency 0.15 --concurrency 1 4 8 16
+    python benchmarks/bench_crawler.py --fixtures fixtures/
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Añadir el directorio raíz del proyecto al path para importaciones
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx
+
+from src.rag.crawler import DEFAULT_SEEDS, FixtureTransport, WikipediaCrawler, fixture_name, seed_urls
+from src.rag.html_extractor import extract_article_text
+
+FIXTURE = os.path.join(
+    os.path.dirname(__file__), "..", "tests", "rag", "fixtures", "wikipedia_colombia.html"
+)
+
+
+async def crawl(fixtures_dir: str, concurrency: int, latency: float, rate: float):
+    client = httpx.AsyncClient(transport=FixtureTransport(fixtures_dir, latency=latency))
+    crawler = WikipediaCrawler(
+        DEFAULT_SEEDS, max_concurrency=concurrency, requests_per_second=rate, client=client
+    )
+    pages = chars = 0
+    start = time.perf_counter()
+    async with client:
+        async for page in crawler.crawl():
+            if page.ok:
+                text = await asyncio.to_thread(extract_article_text, page.html)
+                pages += 1
+                chars += len(text)
+    return pages, chars, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fixtures", default=None, help="Directorio de HTML grabado.")
+    parser.add_argument("--latency", type=float, default=0.15, help="Latencia por petición (s).")
+    parser.add_argument("--rate", type=float, default=0, help="Peticiones/s por host (0 = sin límite).")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    fixtures_dir = args.fixtures
+    if fixtures_dir is None:
+        fixtures_dir = tempfile.mkdtemp()
+        for url in seed_urls(DEFAULT_SEEDS):
+            shutil.copy(FIXTURE, os.path.join(fixtures_dir, fixture_name(url)))
+
+    print(f"{len(DEFAULT_SEEDS)} artículos, latencia simulada {args.latency * 1000:.0f} ms")
+    for concurrency in args.concurrency:
+        pages, chars, elapsed = asyncio.run(
+            crawl(fixtures_dir, concurrency, args.latency, args.rate)
+        )
+        print(
+            f"  concurrencia={concurrency:<3} {pages} páginas en {elapsed:6.2f} s  "
+            f"({pages / elapsed:6.1f} páginas/s, {chars} caracteres)"
+        )
+
+
+if __name__ == "__main__":
+    main()
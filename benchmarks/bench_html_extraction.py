@@ -0,0 +1,95 @@
+"""
+Benchmark de la extracción del texto de Wikipedia: BeautifulSoup frente a una pasada.
+
+Compara el tiempo de parseo y el pico de memoria de `extract_article_text_bs4` (árbol
+completo con BeautifulSoup y `find_parent` por párrafo) y de `extract_article_text`
+(parser por eventos en una única pasada) sobre páginas de Wikipedia guardadas, y
+comprueba que ambas producen el mismo texto.
+
+Por defecto usa la página de ejemplo de los tests, replicando su artículo `--scale`
+veces para alcanzar el tamaño de un artículo real (la página de Colombia ronda 1,5 MB).
+También se pueden pasar páginas reales guardadas, p. ej.:
+    curl -o colombia.html https://es.wikipedia.org/wiki/Colombia
+
+Uso:
+    python benchmarks/bench_html_extraction.py --scale 150 --repeat 5
+    python benchmarks/bench_html_extraction.py --html colombia.html bogota.html
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+# Añadir el directorio raíz del proyecto al path para importaciones
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.html_extractor import extract_article_text, extract_article_text_bs4
+
+FIXTURE = os.path.join(
+    os.path.dirname(__file__), "..", "tests", "rag", "fixtures", "wikipedia_colombia.html"
+)
+ARTICLE_START = '<div class="mw-content-ltr mw-parser-output" lang="es" dir="ltr">'
+ARTICLE_END = "<!--\nNewPP limit report"
+
+EXTRACTORS = {
+    "beautifulsoup": extract_article_text_bs4,
+    "una pasada": extract_article_text,
+}
+
+
+def scaled_fixture(scale: int) -> str:
+    """Replica el cuerpo del artículo de la página de ejemplo `scale` veces."""
+    with open(FIXTURE, encoding="utf-8") as f:
+        html = f.read()
+    start = html.index(ARTICLE_START) + len(ARTICLE_START)
+    end = html.index(ARTICLE_END)
+    return html[:start] + html[start:end] * scale + html[end:]
+
+
+def measure(extractor, html: str, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = extractor(html)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    extractor(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return text, timings, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--html", nargs="*", default=None, help="Páginas HTML guardadas.")
+    parser.add_argument("--scale", type=int, default=150)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = []
+    if args.html:
+        for path in args.html:
+            with open(path, encoding="utf-8") as f:
+                pages.append((os.path.basename(path), f.read()))
+    else:
+        pages.append((f"ejemplo x{args.scale}", scaled_fixture(args.scale)))
+
+    for name, html in pages:
+        print(f"{name}: {len(html) / 2**20:.2f} MB de HTML")
+        texts = []
+        for label, extractor in EXTRACTORS.items():
+            text, timings, peak_mb = measure(extractor, html, args.repeat)
+            texts.append(text)
+            print(
+                f"  {label:<14} mediana={statistics.median(timings):8.1f} ms  "
+                f"mín={min(timings):8.1f} ms  pico de memoria={peak_mb:7.1f} MB"
+            )
+        print(f"  mismo texto: {'sí' if texts[0] == texts[1] else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark de latencia de búsqueda del índice vectorial local (NumPy).
+
+Construye un `LocalVectorIndex` con vectores aleatorios del tamaño indicado y mide el
+tiempo de cada búsqueda top-k por vector. Opcionalmente (`--pinecone`) mide también la
+misma búsqueda contra el índice de Pinecone configurado, lo que requiere credenciales
+reales (PINECONE_API_KEY, PINECONE_INDEX_NAME).
+
+Uso:
+    python benchmarks/bench_local_index.py --sizes 500 5000 50000 --queries 1000
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+# Añadir el directorio raíz del proyecto al path para importaciones
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.rag.local_vector_index import LocalVectorIndex
+
+
+def _summary(label: str, samples_us: list[float]) -> None:
+    samples_us = sorted(samples_us)
+    p99 = samples_us[min(len(samples_us) - 1, int(len(samples_us) * 0.99))]
+    print(
+        f"{label:<30} p50={statistics.median(samples_us):10.1f} µs  "
+        f"p99={p99:10.1f} µs  media={statistics.mean(samples_us):10.1f} µs"
+    )
+
+
+def bench_local(size: int, dimensions: int, queries: np.ndarray, top_k: int) -> None:
+    rng = np.random.default_rng(size)
+    index = LocalVectorIndex(embedding=None, dimensions=dimensions)
+    index.add_embeddings(
+        [f"chunk {i}" for i in range(size)],
+        rng.standard_normal((size, dimensions)).astype(np.float32),
+        [{"section": "bench"} for _ in range(size)],
+    )
+
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        index.similarity_search_by_vector_with_score(query, k=top_k)
+        samples.append((time.perf_counter() - start) * 1e6)
+    _summary(f"local n={size}", samples)
+
+
+def bench_pinecone(dimensions: int, queries: np.ndarray, top_k: int) -> None:
+    from src.rag.vector_store import VectorStore
+
+    store = VectorStore(dimensions=dimensions, backend="pinecone")
+    store.warmup()
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        store.store.similarity_search_by_vector_with_score(query.tolist(), k=top_k)
+        samples.append((time.perf_counter() - start) * 1e6)
+    _summary("pinecone", samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 5000, 50000])
+    parser.add_argument("--dimensions", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--pinecone", action="store_true", help="Medir también Pinecone.")
+    args = parser.parse_args()
+
+    queries = np.random.default_rng(0).standard_normal((args.queries, args.dimensions))
+    queries = queries.astype(np.float32)
+
+    for size in args.sizes:
+        bench_local(size, args.dimensions, queries, args.top_k)
+    if args.pinecone:
+        bench_pinecone(args.dimensions, queries[: min(100, args.queries)], args.top_k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Benchmark de la paginación de conversaciones y mensajes: cursor (keyset) frente a OFFSET.
+
+Llena una base de datos con `--conversations` conversaciones y `--messages` mensajes, de
+los que `--long-conversation` pertenecen a una sola conversación, y mide cuánto tarda en
+obtenerse una página de `--page-size` filas a distintas profundidades (`--depths`, en
+páginas) con los dos métodos:
+
+- **cursor:** `ConversationService.get_conversations_page` y `get_messages_page`, que
+  continúan desde la última fila de la página anterior con un `WHERE` sobre el índice.
+- **offset:** la misma consulta con `OFFSET profundidad * page_size`, que tiene que
+  recorrer y descartar todas las filas anteriores.
+
+Con los índices de la migración `c5d7e9f1a2b3`, el coste de una página por cursor es
+constante sea cual sea su profundidad, mientras que con OFFSET crece linealmente.
+`--no-indexes` elimina esos índices para ver su efecto.
+
+Por defecto usa un fichero SQLite temporal; `--database-url` permite usar PostgreSQL
+(las tablas se vacían y se vuelven a crear). Con `--db fichero --reuse` se reutiliza una
+base ya llena por una ejecución anterior.
+
+No requiere credenciales ni red.
+
+Uso:
+    python benchmarks/bench_pagination.py --messages 2000000 --long-conversation 500000
+    python benchmarks/bench_pagination.py --db pag.sqlite3 --reuse --depths 0,100,1000
+    python benchmarks/bench_pagination.py --database-url postgresql+asyncpg://u:p@localhost/db
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+# Añadir el directorio raíz del proyecto al path para importaciones
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.models.sql import Base, Conversation, Message
+from src.services.conversation_service import CHRONOLOGICAL_ORDER, ConversationService
+from src.services.pagination import encode_cursor
+
+INDEXES = {
+    "ix_conversations_updated_at_id": "conversations",
+    "ix_messages_conversation_id_timestamp": "messages",
+}
+CONVERSATION_ORDER = (Conversation.updated_at.desc(), Conversation.id.desc())
+BASE_TIME = datetime(2025, 1, 1)
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+async def insert_chunked(engine, table, rows, chunk_size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            async with engine.begin() as conn:
+                await conn.execute(insert(table), chunk)
+            chunk = []
+    if chunk:
+        async with engine.begin() as conn:
+            await conn.execute(insert(table), chunk)
+
+
+async def seed(engine, args):
+    """Crea las tablas y las llena; devuelve el ID de la conversación larga."""
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    conversation_ids = [uuid.uuid4() for _ in range(args.conversations)]
+    long_id = conversation_ids[0]
+    # Varias conversaciones comparten `updated_at` para que el desempate por ID cuente.
+    await insert_chunked(
+        engine,
+        Conversation.__table__,
+        (
+            {
+                "id": conversation_id,
+                "name": f"Conversación {i}",
+                "created_at": BASE_TIME,
+                "updated_at": BASE_TIME + timedelta(seconds=i // 3),
+            }
+            for i, conversation_id in enumerate(conversation_ids)
+        ),
+        args.chunk_size,
+    )
+
+    def messages():
+        # La conversación larga y, repartido entre las demás, el resto de mensajes. Cada
+        # turno son dos mensajes con la misma fecha, como los guarda la API.
+        for i in range(args.long_conversation):
+            yield long_id, i
+        others = conversation_ids[1:] or [long_id]
+        for i in range(max(0, args.messages - args.long_conversation)):
+            yield others[(i // 2) % len(others)], i
+
+    await insert_chunked(
+        engine,
+        Message.__table__,
+        (
+            {
+                "id": uuid.uuid4(),
+                "conversation_id": conversation_id,
+                "content": f"Mensaje {i}",
+                "is_user": i % 2 == 0,
+                "timestamp": BASE_TIME + timedelta(seconds=i // 2),
+                "sources": None,
+            }
+            for conversation_id, i in messages()
+        ),
+        args.chunk_size,
+    )
+    return long_id
+
+
+async def find_long_conversation(session_factory):
+    async with session_factory() as db:
+        result = await db.execute(
+            select(Message.conversation_id)
+            .group_by(Message.conversation_id)
+            .order_by(func.count().desc())
+            .limit(1)
+        )
+        return result.scalar_one()
+
+
+async def drop_indexes(engine):
+    async with engine.begin() as conn:
+        for name in INDEXES:
+            await conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+async def row_before(db, query, offset):
+    """
+    Devuelve la última fila de la página anterior a `offset`, de la que sale el cursor
+    (None en la primera página), o False si la página no existe.
+    """
+    if not offset:
+        return None
+    rows = (await db.execute(query.offset(offset - 1).limit(2))).scalars().all()
+    return rows[0] if len(rows) == 2 else False
+
+
+async def timed(session_factory, query, repeats):
+    samples = []
+    for _ in range(repeats):
+        async with session_factory() as db:
+            start = time.perf_counter()
+            await query(db)
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def measure_conversations(session_factory, service, args, depth):
+    offset = depth * args.page_size
+    async with session_factory() as db:
+        before = await row_before(db, select(Conversation).order_by(*CONVERSATION_ORDER), offset)
+    if before is False:
+        return None
+    cursor = encode_cursor(before.updated_at, before.id) if before else None
+
+    async def keyset(db):
+        page = await service.get_conversations_page(db, limit=args.page_size, cursor=cursor)
+        assert page.items
+
+    async def with_offset(db):
+        result = await db.execute(
+            select(Conversation).order_by(*CONVERSATION_ORDER).offset(offset).limit(args.page_size)
+        )
+        assert result.scalars().all()
+
+    return await timed(session_factory, keyset, args.repeats), await timed(
+        session_factory, with_offset, args.repeats
+    )
+
+
+async def measure_messages(session_factory, service, args, conversation_id, depth):
+    offset = depth * args.page_size
+    query = select(Message).where(Message.conversation_id == conversation_id).order_by(*CHRONOLOGICAL_ORDER)
+    async with session_factory() as db:
+        before = await row_before(db, query, offset)
+    if before is False:
+        return None
+    cursor = encode_cursor(before.timestamp, before.id, is_user=before.is_user) if before else None
+
+    async def keyset(db):
+        page = await service.get_messages_page(db, conversation_id, limit=args.page_size, cursor=cursor)
+        assert page.items
+
+    async def with_offset(db):
+        result = await db.execute(query.offset(offset).limit(args.page_size))
+        assert result.scalars().all()
+
+    return await timed(session_factory, keyset, args.repeats), await timed(
+        session_factory, with_offset, args.repeats
+    )
+
+
+async def run(args):
+    if args.database_url:
+        url = args.database_url
+    else:
+        db_path = args.db or os.path.join(tempfile.mkdtemp(), "bench_pagination.sqlite3")
+        url = f"sqlite+aiosqlite:///{db_path}"
+    engine = create_async_engine(url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    try:
+        if args.reuse:
+            long_id = await find_long_conversation(session_factory)
+        else:
+            start = time.perf_counter()
+            long_id = await seed(engine, args)
+            print(
+                f"Base de datos llena en {time.perf_counter() - start:.1f} s: "
+                f"{args.conversations} conversaciones, {args.messages} mensajes"
+            )
+        if args.no_indexes:
+            await drop_indexes(engine)
+
+        service = ConversationService()
+        results = {"conversations": {}, "messages": {}}
+        for depth in args.depths:
+            samples = await measure_conversations(session_factory, service, args, depth)
+            if samples:
+                results["conversations"][depth] = samples
+            samples = await measure_messages(session_factory, service, args, long_id, depth)
+            if samples:
+                results["messages"][depth] = samples
+        return results
+    finally:
+        await engine.dispose()
+
+
+def build_report(args, results):
+    report = {
+        "benchmark": "pagination",
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "listings": {},
+    }
+    for listing, by_depth in results.items():
+        report["listings"][listing] = [
+            {
+                "depth_pages": depth,
+                "keyset_p50_ms": statistics.median(keyset),
+                "keyset_p95_ms": percentile(keyset, 95),
+                "offset_p50_ms": statistics.median(offset),
+                "offset_p95_ms": percentile(offset, 95),
+            }
+            for depth, (keyset, offset) in by_depth.items()
+        ]
+    return report
+
+
+def print_report(report):
+    labels = {
+        "conversations": "GET /conversations/",
+        "messages": "GET /conversations/{id}/messages (conversación larga)",
+    }
+    for listing, rows in report["listings"].items():
+        print(f"{labels[listing]}, {report['config']['page_size']} filas por página")
+        print(f"  {'página':>8} {'cursor p50':>11} {'cursor p95':>11} {'offset p50':>11} {'offset p95':>11}")
+        for row in rows:
+            print(
+                f"  {row['depth_pages']:>8} {row['keyset_p50_ms']:>9.2f}ms {row['keyset_p95_ms']:>9.2f}ms "
+                f"{row['offset_p50_ms']:>9.2f}ms {row['offset_p95_ms']:>9.2f}ms"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--conversations", type=int, default=20000)
+    parser.add_argument("--messages", type=int, default=1000000, help="Mensajes en total.")
+    parser.add_argument(
+        "--long-conversation", type=int, default=200000, help="Mensajes de la conversación más larga."
+    )
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument(
+        "--depths",
+        type=lambda value: [int(depth) for depth in value.split(",")],
+        default=[0, 10, 100, 1000, 3000],
+        help="Páginas a medir, separadas por comas (se omiten las que no existen).",
+    )
+    parser.add_argument("--repeats", type=int, default=20, help="Mediciones por página.")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Filas por INSERT al llenar la base.")
+    parser.add_argument("--no-indexes", action="store_true", help="Eliminar los índices de listado.")
+    parser.add_argument("--db", default=None, help="Fichero SQLite (por defecto, uno temporal).")
+    parser.add_argument("--database-url", default=None, help="URL de SQLAlchemy de otra base de datos.")
+    parser.add_argument("--reuse", action="store_true", help="No volver a llenar la base de datos.")
+    parser.add_argument("--output", default=None, help="Fichero JSON donde guardar los resultados.")
+    args = parser.parse_args()
+
+    report = build_report(args, asyncio.run(run(args)))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark del coste de preparación del servicio RAG por petición.
+
+Compara el esquema anterior, en el que cada petición a /chat/ask construía un
+`RAGService` nuevo (clientes de OpenAI, conexión con Pinecone y modelos de chat),
+con el motor compartido (`RAGEngine`) que se construye una vez en el lifespan y que
+cada petición solo obtiene mediante la dependencia `get_rag_service`.
+
+Requiere las credenciales reales (OPENAI_API_KEY, PINECONE_API_KEY, PINECONE_INDEX_NAME),
+ya que el coste medido es precisamente el de abrir esas conexiones.
+
+Uso:
+    python benchmarks/bench_rag_setup.py --iterations 10 --with-query
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+# Añadir el directorio raíz del proyecto al path para importaciones
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.api.dependencies import get_rag_service
+from src.config import load_settings
+from src.services.rag_engine import RAGEngine
+from src.services.rag_service import RAGService
+
+QUERY = "¿Cuál es la capital de Colombia?"
+
+
+def _summary(label: str, samples_ms: list[float]) -> None:
+    print(
+        f"{label:<38} media={statistics.mean(samples_ms):9.2f} ms  "
+        f"p50={statistics.median(samples_ms):9.2f} ms  max={max(samples_ms):9.2f} ms"
+    )
+
+
+def bench_per_request(iterations: int, with_query: bool) -> list[float]:
+    """Construye un RAGService nuevo por 'petición', como hacía `Depends(RAGService)`."""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        service = RAGService()
+        if with_query:
+            service.vector_store.similarity_search_with_score(QUERY, top_k=5)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def bench_shared(iterations: int, with_query: bool) -> tuple[float, list[float]]:
+    """Construye y calienta el motor una vez y luego solo resuelve la dependencia."""
+    start = time.perf_counter()
+    engine = RAGEngine(load_settings())
+    await engine.warmup()
+    startup_ms = (time.perf_counter() - start) * 1000
+
+    request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(rag_engine=engine)))
+    samples = []
+    try:
+        for _ in range(iterations):
+            start = time.perf_counter()
+            service = get_rag_service(request)
+            if with_query:
+                await asyncio.to_thread(
+                    service.vector_store.similarity_search_with_score, QUERY, 5
+                )
+            samples.append((time.perf_counter() - start) * 1000)
+    finally:
+        await engine.aclose()
+    return startup_ms, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument(
+        "--with-query",
+        action="store_true",
+        help="Incluye una búsqueda de similitud tras la preparación (mide también la reutilización de conexiones).",
+    )
+    args = parser.parse_args()
+
+    print("--- BENCHMARK DE PREPARACIÓN DEL SERVICIO RAG ---")
+    before = bench_per_request(args.iterations, args.with_query)
+    startup_ms, after = asyncio.run(bench_shared(args.iterations, args.with_query))
+
+    _summary("Antes (RAGService por petición)", before)
+    print(f"{'Después (arranque único del motor)':<38} {startup_ms:9.2f} ms")
+    _summary("Después (motor compartido)", after)
+
+
+if __name__ == "__main__":
+    main()
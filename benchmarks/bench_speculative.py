@@ -0,0 +1,155 @@
+"""
+Benchmark de la recuperación especulativa en conversaciones de varios turnos.
+
+Simula conversaciones con sustitutos del LLM y del almacén de vectores con latencias
+configurables (reformulación, embedding, búsqueda y generación) y compara la latencia
+extremo a extremo de cada turno con y sin recuperación especulativa. Una fracción de las
+preguntas de seguimiento (`--self-contained`) ya es autocontenida, así que la
+reformulación la devuelve igual y la recuperación especulativa se aprovecha.
+
+No requiere credenciales: no se llama a ningún servicio externo.
+
+Uso:
+    python benchmarks/bench_speculative.py --conversations 20 --turns 5 --self-contained 0.6
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+# Añadir el directorio raíz del proyecto al path para importaciones
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from src.services.rag_service import RAGService
+
+SELF_CONTAINED = [
+    "¿Cuál es la capital de Colombia?",
+    "¿Cuántos habitantes tiene Colombia?",
+    "¿Qué idiomas se hablan en Colombia?",
+    "¿Cuál es la moneda de Colombia?",
+]
+FOLLOW_UPS = ["¿Y su población?", "¿Y eso cuándo fue?", "¿Por qué?", "Cuéntame más"]
+
+
+class LatencyChatModel(BaseChatModel):
+    """LLM falso con latencia fija. Como reformulador, devuelve la pregunta autocontenida."""
+
+    latency: float
+    answer: str = "Respuesta de prueba."
+    rephraser: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "latency-fake-chat-model"
+
+    def _respond(self, messages) -> str:
+        if not self.rephraser:
+            return self.answer
+        question = messages[-1].content.split("Pregunta de seguimiento: ")[-1]
+        question = question.split("\n")[0]
+        # Las preguntas ya autocontenidas se devuelven tal cual; el resto se reescribe.
+        if question in SELF_CONTAINED:
+            return question
+        return f"{question} (sobre Colombia, en el contexto de la conversación)"
+
+    def _result(self, messages) -> ChatResult:
+        message = AIMessage(content=self._respond(messages))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return self._result(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._result(messages)
+
+
+class LatencyVectorStore:
+    """Almacén de vectores falso con latencias fijas de embedding y búsqueda."""
+
+    def __init__(self, embed_latency: float, search_latency: float):
+        self.embed_latency = embed_latency
+        self.search_latency = search_latency
+        self.results = [(Document(page_content="Colombia...", metadata={"source": "wiki"}), 0.8)]
+
+    async def aembed_query(self, query):
+        await asyncio.sleep(self.embed_latency)
+        return [float(len(query)), 1.0]
+
+    async def asimilarity_search_by_vector_with_score(self, embedding, top_k=5, **params):
+        await asyncio.sleep(self.search_latency)
+        return self.results
+
+
+def make_service(args, speculative: bool) -> RAGService:
+    return RAGService(
+        vector_store=LatencyVectorStore(args.embed_ms / 1000, args.search_ms / 1000),
+        llm=LatencyChatModel(latency=args.generate_ms / 1000),
+        rephrase_llm=LatencyChatModel(latency=args.rephrase_ms / 1000, rephraser=True),
+        speculative_retrieval=speculative,
+    )
+
+
+async def run_conversation(service: RAGService, args, rng: random.Random, samples: list):
+    history = []
+    for turn in range(args.turns):
+        if turn == 0 or rng.random() < args.self_contained:
+            question = rng.choice(SELF_CONTAINED)
+        else:
+            question = rng.choice(FOLLOW_UPS)
+        start = time.perf_counter()
+        response = await service.aanswer_question(question, history)
+        if turn > 0:
+            samples.append((time.perf_counter() - start) * 1000)
+        history += [
+            SimpleNamespace(content=question, is_user=True),
+            SimpleNamespace(content=response["answer"], is_user=False),
+        ]
+
+
+async def run(args, speculative: bool):
+    service = make_service(args, speculative)
+    samples: list = []
+    await asyncio.gather(
+        *(
+            run_conversation(service, args, random.Random(seed), samples)
+            for seed in range(args.conversations)
+        )
+    )
+    return samples, service.stats()["speculation"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--conversations", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--self-contained", type=float, default=0.6)
+    parser.add_argument("--rephrase-ms", type=float, default=600)
+    parser.add_argument("--embed-ms", type=float, default=150)
+    parser.add_argument("--search-ms", type=float, default=60)
+    parser.add_argument("--generate-ms", type=float, default=800)
+    args = parser.parse_args()
+
+    for speculative in (False, True):
+        samples, stats = asyncio.run(run(args, speculative))
+        label = "especulativa" if speculative else "secuencial"
+        print(
+            f"{label:<13} turnos de seguimiento={len(samples):4d}  "
+            f"media={statistics.mean(samples):8.1f} ms  p50={statistics.median(samples):8.1f} ms  "
+            f"aprovechada={stats['hit_rate']:.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+"""
+Prueba de carga de la API con conversaciones de varios turnos.
+
+Las sesiones llegan según un proceso de Poisson (`--rate` sesiones por segundo durante
+`--duration` segundos, carga abierta: una sesión lenta no frena la llegada de las
+siguientes). Cada sesión hace lo mismo que la interfaz de Streamlit:
+
+1. lista las conversaciones (`GET /api/v1/conversations/`),
+2. crea una conversación (`POST /api/v1/conversations/`),
+3. hace `--turns` preguntas a `/api/v1/chat/ask`, con un historial que crece en cada
+   turno y un tiempo de reflexión aleatorio entre ellas (`--think-ms`),
+4. lista los mensajes de la conversación (`GET /api/v1/conversations/{id}/messages`).
+
+Informa de las peticiones por segundo, de la latencia (p50/p95/p99) y los errores de cada
+operación y, a partir de la cabecera `Server-Timing`, del desglose por etapas de /chat/ask.
+Las peticiones rechazadas por el control de admisión (429) se cuentan aparte, con su
+propia latencia, y no entran en las latencias de la operación.
+
+Por defecto la API se ejecuta en el propio proceso (`httpx.ASGITransport`) con el LLM,
+los embeddings y el almacén de vectores falsos de `tests/fakes.py` y una base de
+datos SQLite temporal, así que no requiere credenciales ni red. Con `--database-url` se usa
+otra base (p. ej. PostgreSQL) y con `--url` se ataca una API ya desplegada (un contenedor).
+
+Uso:
+    python benchmarks/load_test.py --rate 5 --duration 30 --turns 4
+    python benchmarks/load_test.py --rate 20 --generate-ms 0 --output carga.json
+    python benchmarks/load_test.py --rate 30 --max-concurrency 16 --max-queue 16
+    python benchmarks/load_test.py --url http://localhost:8000 --rate 2 --duration 60
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+# Añadir el directorio raíz del proyecto al principio del path: `tests.fakes` no debe
+# resolverse a otro paquete `tests` instalado en el entorno
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# `src.api.database` crea su motor al importarse: se apunta a SQLite si no hay otra base.
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+import httpx
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.api.database import get_db
+from src.api.main import app
+from src.models.sql import Base
+from src.services.admission import AdmissionController
+from src.services.conversation_memory import ConversationMemory
+from tests.fakes import (
+    FIRST_QUESTIONS,
+    FOLLOW_UP_QUESTIONS,
+    FakeChatModel,
+    FakeLatencies,
+    build_fake_rag_service,
+)
+from src.services.message_writer import MessageWriteBehind
+from src.services.semantic_cache import SemanticCache
+from src.services.stage_timer import STAGES
+
+OPERATIONS = ("list_conversations", "create_conversation", "ask", "list_messages")
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def summarize(samples_ms):
+    return {
+        "count": len(samples_ms),
+        "mean_ms": statistics.mean(samples_ms),
+        "p50_ms": percentile(samples_ms, 50),
+        "p95_ms": percentile(samples_ms, 95),
+        "p99_ms": percentile(samples_ms, 99),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_server_timing(header):
+    """Convierte `history;dur=4.1, total;dur=842.0` en {"history": 4.1, "total": 842.0}."""
+    stages = {}
+    for entry in header.split(","):
+        name, _, params = entry.strip().partition(";")
+        if params.startswith("dur="):
+            stages[name] = float(params[4:])
+    return stages
+
+
+class LoadStats:
+    """Latencias y errores de cada operación, y estado de las sesiones en curso."""
+
+    def __init__(self):
+        self.latencies_ms = defaultdict(list)
+        self.errors = defaultdict(int)
+        # Peticiones rechazadas con 429 y su latencia.
+        self.rejected_ms = defaultdict(list)
+        self.server_stages_ms = defaultdict(list)
+        self.sessions_started = 0
+        self.sessions_completed = 0
+        self.active_sessions = 0
+        self.peak_sessions = 0
+
+
+async def timed_request(client, stats, operation, method, url, **kwargs):
+    start = time.perf_counter()
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError as e:
+        stats.errors[operation] += 1
+        print(f"Error en {operation}: {e!r}")
+        return None
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if response.status_code == 429:
+        stats.rejected_ms[operation].append(elapsed_ms)
+        return None
+    stats.latencies_ms[operation].append(elapsed_ms)
+    if response.status_code >= 400:
+        stats.errors[operation] += 1
+        return None
+    if operation == "ask" and "server-timing" in response.headers:
+        for name, duration in parse_server_timing(response.headers["server-timing"]).items():
+            stats.server_stages_ms[name].append(duration)
+    return response
+
+
+async def run_session(client, stats, args, rng):
+    stats.sessions_started += 1
+    stats.active_sessions += 1
+    stats.peak_sessions = max(stats.peak_sessions, stats.active_sessions)
+    try:
+        await timed_request(client, stats, "list_conversations", "GET", "/api/v1/conversations/")
+        response = await timed_request(
+            client,
+            stats,
+            "create_conversation",
+            "POST",
+            "/api/v1/conversations/",
+            json={"name": f"Prueba de carga {stats.sessions_started}"},
+        )
+        if response is None:
+            return
+        conversation_id = response.json()["id"]
+
+        for turn in range(args.turns):
+            if turn > 0 and args.think_ms > 0:
+                await asyncio.sleep(rng.expovariate(1000 / args.think_ms))
+            question = rng.choice(FIRST_QUESTIONS if turn == 0 else FOLLOW_UP_QUESTIONS)
+            response = await timed_request(
+                client,
+                stats,
+                "ask",
+                "POST",
+                "/api/v1/chat/ask",
+                json={"question": question, "conversation_id": conversation_id},
+            )
+            if response is None:
+                return
+
+        await timed_request(
+            client, stats, "list_messages", "GET", f"/api/v1/conversations/{conversation_id}/messages"
+        )
+        stats.sessions_completed += 1
+    finally:
+        stats.active_sessions -= 1
+
+
+async def generate_load(client, args):
+    """Lanza sesiones con llegadas de Poisson y espera a que terminen todas."""
+    stats = LoadStats()
+    rng = random.Random(args.seed)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    next_arrival = start
+    sessions = []
+    while True:
+        next_arrival += rng.expovariate(args.rate)
+        if next_arrival - start > args.duration:
+            break
+        await asyncio.sleep(max(0.0, next_arrival - loop.time()))
+        session_rng = random.Random(rng.random())
+        sessions.append(asyncio.create_task(run_session(client, stats, args, session_rng)))
+    await asyncio.gather(*sessions)
+    return stats, loop.time() - start
+
+
+def install_fakes(args, session_factory):
+    """Sustituye en la aplicación el motor RAG y la base de datos por los del benchmark."""
+    latencies = FakeLatencies(
+        rephrase=args.rephrase_ms / 1000,
+        embed=args.embed_ms / 1000,
+        search=args.search_ms / 1000,
+        generate=args.generate_ms / 1000,
+    )
+    service = build_fake_rag_service(
+        latencies, semantic_cache=SemanticCache() if args.semantic_cache else None
+    )
+    writer = MessageWriteBehind(session_factory) if args.write_behind else None
+    if writer is not None:
+        writer.start()
+    memory = ConversationMemory(
+        llm=FakeChatModel(latency=latencies.rephrase),
+        session_factory=session_factory,
+        recent_turns=args.recent_turns,
+        writer=writer,
+    )
+
+    async def override_db():
+        async with session_factory() as db:
+            yield db
+
+    # El lifespan de la aplicación (que construye el motor con OpenAI y Pinecone) no se
+    # ejecuta con ASGITransport: el estado se prepara aquí.
+    app.state.rag_engine = SimpleNamespace(
+        service=service, semantic_cache=service.semantic_cache, embeddings=None
+    )
+    app.state.conversation_memory = memory
+    app.state.message_writer = writer
+    app.state.admission_controller = (
+        AdmissionController(
+            max_concurrency=args.max_concurrency,
+            max_queue=args.max_queue,
+            max_wait=args.max_wait_ms / 1000,
+        )
+        if args.max_concurrency
+        else None
+    )
+    app.dependency_overrides[get_db] = override_db
+    return memory, writer
+
+
+async def run(args):
+    timeout = httpx.Timeout(args.timeout)
+    limits = httpx.Limits(max_connections=args.max_connections)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=timeout, limits=limits) as client:
+            return await generate_load(client, args)
+
+    database_url = args.database_url or (
+        f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'load.sqlite3')}"
+    )
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    memory, writer = install_fakes(args, async_sessionmaker(engine, expire_on_commit=False))
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://loadtest", timeout=timeout
+        ) as client:
+            return await generate_load(client, args)
+    finally:
+        if writer is not None:
+            await writer.aclose()
+        await memory.aclose()
+        await engine.dispose()
+
+
+def build_report(args, stats, elapsed):
+    requests = sum(len(samples) for samples in stats.latencies_ms.values())
+    return {
+        "benchmark": "load_test",
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "target": args.url or "in-process",
+        "elapsed_seconds": elapsed,
+        "requests": requests,
+        "errors": sum(stats.errors.values()),
+        "rejected": {
+            name: summarize(samples) for name, samples in stats.rejected_ms.items() if samples
+        },
+        "throughput_rps": requests / elapsed,
+        "sessions": {
+            "started": stats.sessions_started,
+            "completed": stats.sessions_completed,
+            "peak_concurrent": stats.peak_sessions,
+        },
+        "operations": {
+            name: {**summarize(stats.latencies_ms[name]), "errors": stats.errors[name]}
+            for name in OPERATIONS
+            if stats.latencies_ms[name]
+        },
+        "ask_server_stages": {
+            name: summarize(stats.server_stages_ms[name])
+            for name in (*STAGES, "total")
+            if stats.server_stages_ms[name]
+        },
+    }
+
+
+def print_report(report):
+    sessions = report["sessions"]
+    print(
+        f"{report['requests']} peticiones en {report['elapsed_seconds']:.1f} s "
+        f"({report['throughput_rps']:.1f} peticiones/s) contra {report['target']}, "
+        f"commit {report['commit'] or '?'}"
+    )
+    print(
+        f"Sesiones: {sessions['completed']}/{sessions['started']} completadas, "
+        f"máximo {sessions['peak_concurrent']} simultáneas; {report['errors']} errores"
+    )
+    for name, stats in report["rejected"].items():
+        print(
+            f"Rechazadas con 429 en {name}: {stats['count']} "
+            f"(latencia p50 {stats['p50_ms']:.1f}ms, p99 {stats['p99_ms']:.1f}ms)"
+        )
+    header = f"  {'operación':<20} {'n':>6} {'errores':>8} {'media':>9} {'p50':>9} {'p95':>9} {'p99':>9}"
+    print(header)
+    for name, stats in report["operations"].items():
+        print(
+            f"  {name:<20} {stats['count']:>6} {stats['errors']:>8} {stats['mean_ms']:>7.1f}ms "
+            f"{stats['p50_ms']:>7.1f}ms {stats['p95_ms']:>7.1f}ms {stats['p99_ms']:>7.1f}ms"
+        )
+    if report["ask_server_stages"]:
+        print("Etapas de /chat/ask en el servidor (Server-Timing):")
+        for name, stats in report["ask_server_stages"].items():
+            print(
+                f"  {name:<20} {stats['count']:>6} {'':>8} {stats['mean_ms']:>7.1f}ms "
+                f"{stats['p50_ms']:>7.1f}ms {stats['p95_ms']:>7.1f}ms {stats['p99_ms']:>7.1f}ms"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rate", type=float, default=5.0, help="Sesiones nuevas por segundo (media).")
+    parser.add_argument("--duration", type=float, default=30.0, help="Segundos durante los que llegan sesiones.")
+    parser.add_argument("--turns", type=int, default=4, help="Preguntas por sesión.")
+    parser.add_argument("--think-ms", type=float, default=500, help="Pausa media entre preguntas.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Timeout de cada petición, en segundos.")
+    parser.add_argument("--max-connections", type=int, default=1000, help="Conexiones HTTP simultáneas (con --url).")
+    parser.add_argument("--url", default=None, help="URL de una API desplegada (por defecto, en el propio proceso).")
+    parser.add_argument("--database-url", default=None, help="Base de datos de la API en proceso (por defecto, SQLite temporal).")
+    parser.add_argument("--rephrase-ms", type=float, default=300)
+    parser.add_argument("--embed-ms", type=float, default=80)
+    parser.add_argument("--search-ms", type=float, default=40)
+    parser.add_argument("--generate-ms", type=float, default=700)
+    parser.add_argument("--recent-turns", type=int, default=4)
+    parser.add_argument("--semantic-cache", action="store_true", help="Activa la caché semántica en la API en proceso.")
+    parser.add_argument("--write-behind", action="store_true", help="Guarda los mensajes con la cola write-behind en la API en proceso.")
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=0,
+        help="Activa en la API en proceso el control de admisión con este límite (0: sin control).",
+    )
+    parser.add_argument("--max-queue", type=int, default=64, help="Plazas de la cola de admisión.")
+    parser.add_argument("--max-wait-ms", type=float, default=5000, help="Espera máxima en la cola de admisión.")
+    parser.add_argument("--output", default=None, help="Fichero JSON donde guardar los resultados.")
+    args = parser.parse_args()
+
+    stats, elapsed = asyncio.run(run(args))
+    report = build_report(args, stats, elapsed)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Resultados guardados en '{args.output}'.")
+
+
+if __name__ == "__main__":
+    main()
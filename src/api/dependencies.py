@@ -0,0 +1,77 @@
+from typing import Optional
+
+from fastapi import HTTPException, Request, status
+
+from src.services.admission import AdmissionController
+from src.services.conversation_memory import ConversationMemory
+from src.services.message_writer import MessageWriteBehind
+from src.services.rag_service import RAGService
+
+
+# --- Dependencia del Servicio RAG Compartido ---
+def get_rag_service(request: Request) -> RAGService:
+    """
+    Dependencia de FastAPI que devuelve el servicio RAG compartido del proceso.
+
+    El servicio se construye una sola vez en el lifespan de la aplicación
+    (ver `src/api/main.py`), por lo que obtenerlo aquí no crea clientes ni conexiones.
+
+    Args:
+        request (Request): La petición en curso, usada para acceder al estado de la app.
+
+    Returns:
+        RAGService: El servicio RAG compartido.
+
+    Raises:
+        HTTPException: 503 si el motor RAG no está inicializado (el lifespan no se ha
+            ejecutado o falló al arrancar).
+    """
+    rag_engine = getattr(request.app.state, "rag_engine", None)
+    if rag_engine is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="El servicio RAG no está inicializado.",
+        )
+    return rag_engine.service
+
+
+# --- Dependencia de la Memoria de Conversaciones ---
+def get_conversation_memory(request: Request) -> ConversationMemory:
+    """
+    Dependencia de FastAPI que devuelve la memoria de conversaciones del proceso.
+
+    Args:
+        request (Request): La petición en curso, usada para acceder al estado de la app.
+
+    Returns:
+        ConversationMemory: La memoria de conversaciones compartida.
+    """
+    return request.app.state.conversation_memory
+
+
+# --- Dependencia de la Cola de Guardado Diferido ---
+def get_message_writer(request: Request) -> Optional[MessageWriteBehind]:
+    """
+    Dependencia de FastAPI que devuelve la cola de guardado diferido de mensajes.
+
+    Args:
+        request (Request): La petición en curso, usada para acceder al estado de la app.
+
+    Returns:
+        Optional[MessageWriteBehind]: La cola, o None si el modo write-behind está desactivado.
+    """
+    return getattr(request.app.state, "message_writer", None)
+
+
+# --- Dependencia del Control de Admisión ---
+def get_admission_controller(request: Request) -> Optional[AdmissionController]:
+    """
+    Dependencia de FastAPI que devuelve el control de admisión de las peticiones de chat.
+
+    Args:
+        request (Request): La petición en curso, usada para acceder al estado de la app.
+
+    Returns:
+        Optional[AdmissionController]: El control de admisión, o None si está desactivado.
+    """
+    return getattr(request.app.state, "admission_controller", None)
@@ -0,0 +1,82 @@
+import secrets
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Header, HTTPException, Request, status
+
+from src.config import get_settings
+
+router = APIRouter()
+
+
+# --- Endpoints de la Caché Semántica ---
+# Permiten consultar los contadores de la caché de respuestas y, tras re-ingestar el
+# contenido del índice (ver `src/rag/init.py`), recargar los índices en memoria y vaciar
+# la caché. Cada worker de la API mantiene su propia caché y sus propios índices: la
+# invalidación solo llega al worker que atiende la petición, así que con varios workers
+# hay que reiniciar la API después de una ingesta.
+
+
+def _require_admin_token(token: Optional[str]) -> None:
+    """Comprueba la cabecera `X-Admin-Token` contra `ADMIN_TOKEN`."""
+    expected = get_settings().admin_token
+    if not expected:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Endpoint desactivado: configura ADMIN_TOKEN para habilitarlo.",
+        )
+    if not token or not secrets.compare_digest(token, expected):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token de administración no válido.",
+        )
+
+
+def _get_rag_engine(request: Request):
+    """Devuelve el motor RAG del proceso, o un 503 si no está inicializado."""
+    rag_engine = getattr(request.app.state, "rag_engine", None)
+    if rag_engine is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="El servicio RAG no está inicializado.",
+        )
+    return rag_engine
+
+
+def _get_semantic_cache(request: Request):
+    cache = _get_rag_engine(request).semantic_cache
+    if cache is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="La caché semántica está desactivada.",
+        )
+    return cache
+
+
+@router.get(
+    "/stats",
+    summary="Estadísticas de la caché semántica",
+    description="Devuelve los aciertos, fallos, tasa de acierto, tamaño y desalojos de la caché de respuestas.",
+    response_description="Los contadores de la caché.",
+)
+async def get_cache_stats(request: Request) -> Dict[str, Any]:
+    """Devuelve los contadores de la caché semántica."""
+    return _get_semantic_cache(request).stats()
+
+
+@router.delete(
+    "/",
+    status_code=status.HTTP_204_NO_CONTENT,
+    summary="Recargar los índices e invalidar la caché semántica",
+    description=(
+        "Recarga desde disco el índice léxico y el índice vectorial local, y vacía la caché de "
+        "respuestas. Debe llamarse tras re-ingestar el índice para no servir respuestas obsoletas. "
+        "Requiere la cabecera `X-Admin-Token` y solo afecta al worker que atiende la petición."
+    ),
+    response_description="Operación exitosa, sin contenido de respuesta.",
+)
+async def invalidate_cache(
+    request: Request, x_admin_token: Optional[str] = Header(None)
+):
+    """Recarga los índices en memoria y vacía la caché semántica."""
+    _require_admin_token(x_admin_token)
+    await _get_rag_engine(request).reload_indexes()
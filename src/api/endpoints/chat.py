@@ -1,26 +1,46 @@
-from typing import List, Optional
+import json
+from contextlib import aclosing
+from typing import Annotated, Any, AsyncIterator, Dict, List, Optional, Tuple, Union
 from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import BaseModel, Field
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field, StringConstraints
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.services.admission import AdmissionController, AdmissionPermit, AdmissionRejected
 from src.services.rag_service import RAGService
+from src.services.conversation_memory import ConversationMemory
 from src.services.conversation_service import ConversationService
-from src.models.schemas import ConversationCreate, MessageCreate
-from src.api.database import get_db
+from src.services.message_writer import MessageWriteBehind
+from src.services.stage_timer import stage
+from src.models.schemas import ConversationCreate
+from src.models.sql import Message
+from src.api.database import AsyncSessionLocal, get_db
+from src.config import get_settings
+from src.api.dependencies import (
+    get_admission_controller,
+    get_conversation_memory,
+    get_message_writer,
+    get_rag_service,
+)
 
 router = APIRouter()
 
 
 # --- Esquemas de Datos (Pydantic) ---
 
+# Restricciones de cada pregunta, iguales en `/ask` y en cada elemento de `/ask/batch`.
+QUESTION_MIN_LENGTH = 3
+BatchQuestion = Annotated[str, StringConstraints(min_length=QUESTION_MIN_LENGTH)]
+
 
 class ChatRequest(BaseModel):
     """Define el cuerpo de la solicitud para el endpoint de chat."""
 
     question: str = Field(
         ...,
-        min_length=3,
+        min_length=QUESTION_MIN_LENGTH,
         description="Pregunta del usuario sobre Colombia.",
         example="¿Cuál es la capital de Colombia?",
     )
@@ -44,11 +64,22 @@ class ChatResponse(BaseModel):
         description="Lista de URLs o identificadores de las fuentes de información utilizadas.",
         example=["https://es.wikipedia.org/wiki/Colombia"],
     )
-    confidence: float = Field(
+    confidence: Optional[float] = Field(
         ...,
-        description="Puntuación de confianza promedio de la búsqueda semántica (0 a 1).",
+        description=(
+            "Puntuación de confianza promedio de la búsqueda semántica (0 a 1). Es null si la "
+            "respuesta se recuperó solo con el índice léxico (ver `lexical_confidence`)."
+        ),
         example=0.92,
     )
+    lexical_confidence: Optional[float] = Field(
+        None,
+        description=(
+            "Confianza heurística de la coincidencia léxica BM25 (0 a 1), solo cuando la respuesta "
+            "se recuperó únicamente con el índice léxico. No es comparable con `confidence`."
+        ),
+        example=None,
+    )
     conversation_id: UUID = Field(
         ...,
         description="ID de la conversación, para ser usado en preguntas de seguimiento.",
@@ -56,6 +87,217 @@ class ChatResponse(BaseModel):
     )
 
 
+class BatchChatRequest(BaseModel):
+    """Define el cuerpo de la solicitud del endpoint de lotes de preguntas."""
+
+    questions: List[BatchQuestion] = Field(
+        ...,
+        min_length=1,
+        description="Preguntas independientes (sin historial) sobre Colombia.",
+        example=["¿Cuál es la capital de Colombia?", "¿Qué es el Festival de la Leyenda Vallenata?"],
+    )
+    persist: bool = Field(
+        False,
+        description="Si es True, cada pregunta y su respuesta se guardan en una conversación nueva.",
+    )
+    stream: bool = Field(
+        False,
+        description="Si es True, la respuesta es NDJSON: una línea por pregunta en cuanto se responde.",
+    )
+
+
+class BatchChatResult(BaseModel):
+    """Resultado de una pregunta de un lote."""
+
+    index: int = Field(..., description="Posición de la pregunta en el lote.", example=0)
+    question: str = Field(..., example="¿Cuál es la capital de Colombia?")
+    answer: Optional[str] = Field(None, example="La capital de Colombia es Bogotá.")
+    sources: List[str] = Field(default_factory=list, example=["https://es.wikipedia.org/wiki/Colombia"])
+    confidence: Optional[float] = Field(None, example=0.92)
+    lexical_confidence: Optional[float] = Field(None, example=None)
+    conversation_id: Optional[UUID] = Field(
+        None, description="Conversación donde se guardó el turno (solo con `persist`)."
+    )
+    error: Optional[str] = Field(None, description="Motivo por el que no se respondió la pregunta.")
+
+
+class BatchChatResponse(BaseModel):
+    """Define el cuerpo de la respuesta del endpoint de lotes (sin `stream`)."""
+
+    results: List[BatchChatResult] = Field(..., description="Un resultado por pregunta, en el mismo orden.")
+
+
+# Respuesta documentada de los endpoints de chat cuando el servicio está saturado.
+SATURATED_RESPONSE = {
+    429: {
+        "description": "Servicio saturado: se debe reintentar tras los segundos de la cabecera `Retry-After`."
+    }
+}
+
+
+# --- Funciones Auxiliares ---
+
+
+async def _admit(admission: Optional[AdmissionController]) -> Optional[AdmissionPermit]:
+    """
+    Obtiene una plaza del control de admisión antes de empezar el turno.
+
+    Se pide antes de crear la conversación, de modo que una petición rechazada no deja
+    nada a medias.
+
+    Returns:
+        Optional[AdmissionPermit]: La plaza, o None si el control de admisión está desactivado.
+
+    Raises:
+        HTTPException: 429 con `Retry-After` si el servicio está saturado.
+    """
+    if admission is None:
+        return None
+    try:
+        return await admission.acquire()
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="El servicio está saturado. Inténtalo de nuevo en unos segundos.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
+def _release(permit: Optional[AdmissionPermit]) -> None:
+    if permit is not None:
+        permit.release()
+
+
+async def _resolve_conversation(
+    request: ChatRequest,
+    db: AsyncSession,
+    conv_service: ConversationService,
+    memory: ConversationMemory,
+) -> Tuple[UUID, List[Message]]:
+    """
+    Valida la pregunta y obtiene la conversación asociada junto con su historial.
+
+    Si la solicitud no trae `conversation_id`, se crea una nueva conversación. El
+    historial está acotado: el resumen de los turnos antiguos y los últimos turnos.
+
+    Returns:
+        Tuple[UUID, List[Message]]: El ID de la conversación y su historial de mensajes.
+    """
+    if not request.question or not request.question.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La pregunta no puede estar vacía.",
+        )
+
+    conversation_id = request.conversation_id
+    history = []
+
+    if conversation_id:
+        # Si existe un ID, se busca la conversación y se carga su historial acotado.
+        conversation = await conv_service.get_conversation(
+            db, conversation_id, with_messages=False
+        )
+        if not conversation:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Conversación con ID {conversation_id} no encontrada.",
+            )
+        history = await memory.load_history(db, conversation)
+    else:
+        # Si no hay ID, se crea una nueva conversación.
+        # El nombre de la conversación se genera a partir de los primeros 50 caracteres de la pregunta.
+        new_convo = await conv_service.create_conversation(
+            db, ConversationCreate(name=request.question[:50])
+        )
+        conversation_id = new_convo.id
+
+    # Se cierra la transacción de lectura para devolver la conexión al pool: no se retiene
+    # mientras el LLM genera la respuesta.
+    await db.commit()
+    return conversation_id, history
+
+
+async def _save_exchange(
+    db: Optional[AsyncSession],
+    conv_service: ConversationService,
+    writer: Optional[MessageWriteBehind],
+    conversation_id: UUID,
+    question: str,
+    answer: str,
+    sources: List[str],
+) -> None:
+    """
+    Guarda la pregunta del usuario y la respuesta de la IA en una única transacción, o
+    las encola para guardarlas en segundo plano si el modo write-behind está activo.
+    """
+    if writer is not None:
+        await writer.enqueue_exchange(conversation_id, question, answer, sources)
+        return
+    await conv_service.save_exchange(db, conversation_id, question, answer, sources)
+
+
+async def _batch_results(
+    questions: List[str],
+    persist: bool,
+    db: AsyncSession,
+    rag_service: RAGService,
+    conv_service: ConversationService,
+    writer: Optional[MessageWriteBehind],
+    permit: Optional[AdmissionPermit],
+) -> AsyncIterator[BatchChatResult]:
+    """
+    Responde un lote con `RAGService.aiter_batch` y entrega cada resultado en cuanto está
+    listo, después de guardarlo si se pidió. Libera la plaza de admisión al terminar.
+    """
+    try:
+        async with aclosing(rag_service.aiter_batch(questions)) as batch:
+            async for index, response in batch:
+                yield await _batch_result(
+                    index, questions[index], response, persist, db, conv_service, writer
+                )
+    finally:
+        _release(permit)
+
+
+async def _batch_result(
+    index: int,
+    question: str,
+    response: Union[Dict[str, Any], Exception],
+    persist: bool,
+    db: AsyncSession,
+    conv_service: ConversationService,
+    writer: Optional[MessageWriteBehind],
+) -> BatchChatResult:
+    """Construye el resultado de una pregunta del lote y, con `persist`, guarda el turno."""
+    if isinstance(response, Exception):
+        return BatchChatResult(index=index, question=question, error="Error al generar la respuesta.")
+
+    conversation_id = None
+    if persist:
+        with stage("persistence"):
+            conversation = await conv_service.create_conversation(
+                db, ConversationCreate(name=question[:50])
+            )
+            conversation_id = conversation.id
+            await _save_exchange(
+                db, conv_service, writer, conversation_id, question, response["answer"], response["sources"]
+            )
+    return BatchChatResult(
+        index=index,
+        question=question,
+        answer=response["answer"],
+        sources=response["sources"],
+        confidence=response["confidence"],
+        lexical_confidence=response.get("lexical_confidence"),
+        conversation_id=conversation_id,
+    )
+
+
+def _format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Serializa un evento en el formato de Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
 # --- Endpoint Principal de Chat ---
 
 
@@ -69,12 +311,16 @@ class ChatResponse(BaseModel):
     - Si se proporciona un `conversation_id`, se recupera el historial para dar una respuesta contextual.
     """,
     response_description="La respuesta del asistente, junto con las fuentes, la confianza y el ID de la conversación.",
+    responses=SATURATED_RESPONSE,
 )
 async def ask_question(
     request: ChatRequest,
     db: AsyncSession = Depends(get_db),
-    rag_service: RAGService = Depends(),
+    rag_service: RAGService = Depends(get_rag_service),
     conv_service: ConversationService = Depends(),
+    memory: ConversationMemory = Depends(get_conversation_memory),
+    writer: Optional[MessageWriteBehind] = Depends(get_message_writer),
+    admission: Optional[AdmissionController] = Depends(get_admission_controller),
 ):
     """
     Gestiona una solicitud de chat, orquestando la lógica de conversación y RAG.
@@ -82,61 +328,255 @@ async def ask_question(
     Args:
         request (ChatRequest): La solicitud del usuario con la pregunta y el ID de conversación opcional.
         db (AsyncSession): Dependencia para la sesión de base de datos.
-        rag_service (RAGService): Dependencia para el servicio RAG.
+        rag_service (RAGService): Servicio RAG compartido, construido en el arranque de la app.
         conv_service (ConversationService): Dependencia para el servicio de conversaciones.
+        memory (ConversationMemory): Memoria acotada de las conversaciones.
+        writer (MessageWriteBehind, optional): Cola de guardado diferido de mensajes.
+        admission (AdmissionController, optional): Control de admisión de las peticiones.
 
     Returns:
         ChatResponse: La respuesta completa para el cliente.
     """
-    if not request.question or not request.question.strip():
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="La pregunta no puede estar vacía.",
-        )
-
-    conversation_id = request.conversation_id
-    history = []
-
-    if conversation_id:
-        # Si existe un ID, se busca la conversación y se carga su historial.
-        conversation = await conv_service.get_conversation(db, conversation_id)
-        if not conversation:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Conversación con ID {conversation_id} no encontrada.",
+    # La plaza se ocupa mientras se prepara y genera la respuesta, no durante el guardado.
+    permit = await _admit(admission)
+    try:
+        with stage("history"):
+            conversation_id, history = await _resolve_conversation(
+                request, db, conv_service, memory
             )
-        history = await conv_service.get_messages(db, conversation_id)
-    else:
-        # Si no hay ID, se crea una nueva conversación.
-        # El nombre de la conversación se genera a partir de los primeros 50 caracteres de la pregunta.
-        new_convo = await conv_service.create_conversation(
-            db, ConversationCreate(name=request.question[:50])
-        )
-        conversation_id = new_convo.id
 
-    # Se obtiene la respuesta del servicio RAG, pasándole la pregunta y el historial.
-    rag_response = rag_service.answer_question(request.question, history)
+        # Se obtiene la respuesta del servicio RAG, pasándole la pregunta y el historial.
+        # Se usa la versión asíncrona para no bloquear el event loop durante las llamadas al LLM.
+        rag_response = await rag_service.aanswer_question(request.question, history)
+    finally:
+        _release(permit)
 
     # Se guardan tanto la pregunta del usuario como la respuesta de la IA en la base de datos.
-    await conv_service.create_message(
-        db,
-        conversation_id,
-        MessageCreate(content=request.question, is_user=True),
-    )
-    await conv_service.create_message(
-        db,
-        conversation_id,
-        MessageCreate(
-            content=rag_response["answer"],
-            is_user=False,
-            sources=rag_response["sources"],
-        ),
-    )
+    with stage("persistence"):
+        await _save_exchange(
+            db,
+            conv_service,
+            writer,
+            conversation_id,
+            request.question,
+            rag_response["answer"],
+            rag_response["sources"],
+        )
+    # El resumen de los turnos antiguos se actualiza en segundo plano.
+    memory.schedule_update(conversation_id)
 
     # Se construye y devuelve la respuesta final al cliente.
     return ChatResponse(
         answer=rag_response["answer"],
         sources=rag_response["sources"],
         confidence=rag_response["confidence"],
+        lexical_confidence=rag_response.get("lexical_confidence"),
         conversation_id=conversation_id,
     )
+
+
+# --- Estadísticas del Pipeline RAG ---
+
+
+@router.get(
+    "/stats",
+    summary="Estadísticas del pipeline RAG",
+    description="Devuelve los contadores del servicio RAG de este worker, como el uso de la recuperación especulativa.",
+    response_description="Los contadores del servicio RAG.",
+)
+async def get_rag_stats(
+    rag_service: RAGService = Depends(get_rag_service),
+) -> Dict[str, Any]:
+    """Devuelve los contadores del servicio RAG."""
+    return rag_service.stats()
+
+
+# --- Endpoint de Chat en Streaming (SSE) ---
+
+
+@router.post(
+    "/ask/stream",
+    response_class=StreamingResponse,
+    summary="Chatear con el asistente de Colombia en streaming",
+    description="""
+    Variante de `/ask` que envía la respuesta token a token como Server-Sent Events (`text/event-stream`).
+    - `metadata`: primer evento, con `conversation_id`, `sources`, `confidence` y `lexical_confidence`.
+    - `token`: un evento por cada fragmento generado, con el campo `content`.
+    - `done`: evento final, enviado una vez guardado el mensaje del asistente, con la respuesta completa.
+    - `error`: se envía si el pipeline falla a mitad del stream.
+    """,
+    response_description="Un flujo de eventos SSE con la respuesta del asistente.",
+    responses=SATURATED_RESPONSE,
+)
+async def ask_question_stream(
+    request: ChatRequest,
+    db: AsyncSession = Depends(get_db),
+    rag_service: RAGService = Depends(get_rag_service),
+    conv_service: ConversationService = Depends(),
+    memory: ConversationMemory = Depends(get_conversation_memory),
+    writer: Optional[MessageWriteBehind] = Depends(get_message_writer),
+    admission: Optional[AdmissionController] = Depends(get_admission_controller),
+):
+    """
+    Gestiona una solicitud de chat devolviendo la respuesta de forma incremental.
+
+    Args:
+        request (ChatRequest): La solicitud del usuario con la pregunta y el ID de conversación opcional.
+        db (AsyncSession): Dependencia para la sesión de base de datos.
+        rag_service (RAGService): Servicio RAG compartido, construido en el arranque de la app.
+        conv_service (ConversationService): Dependencia para el servicio de conversaciones.
+        memory (ConversationMemory): Memoria acotada de las conversaciones.
+        writer (MessageWriteBehind, optional): Cola de guardado diferido de mensajes.
+        admission (AdmissionController, optional): Control de admisión de las peticiones.
+
+    Returns:
+        StreamingResponse: El flujo de eventos SSE.
+    """
+    # La admisión se resuelve antes de empezar el stream, para poder responder con un 429.
+    permit = await _admit(admission)
+    try:
+        with stage("history"):
+            conversation_id, history = await _resolve_conversation(
+                request, db, conv_service, memory
+            )
+    except BaseException:
+        _release(permit)
+        raise
+
+    async def event_stream():
+        answer_parts = []
+        sources: List[str] = []
+        try:
+            try:
+                async for event, payload in rag_service.astream_answer(
+                    request.question, history
+                ):
+                    if event == "metadata":
+                        sources = payload["sources"]
+                        yield _format_sse(
+                            "metadata", {"conversation_id": str(conversation_id), **payload}
+                        )
+                    else:
+                        answer_parts.append(payload)
+                        yield _format_sse("token", {"content": payload})
+            finally:
+                _release(permit)
+
+            answer = "".join(answer_parts).strip()
+
+            # La sesión de la dependencia se cierra al enviar la respuesta, por lo que el
+            # guardado al final del stream usa una sesión propia.
+            with stage("persistence"):
+                if writer is not None:
+                    await _save_exchange(
+                        None, conv_service, writer, conversation_id, request.question, answer, sources
+                    )
+                else:
+                    async with AsyncSessionLocal() as session:
+                        await _save_exchange(
+                            session, conv_service, None, conversation_id, request.question, answer, sources
+                        )
+            memory.schedule_update(conversation_id)
+
+            yield _format_sse(
+                "done", {"conversation_id": str(conversation_id), "answer": answer}
+            )
+        except Exception as e:
+            print(f"Error durante el streaming de la respuesta: {e}")
+            yield _format_sse("error", {"detail": "Error al generar la respuesta."})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Por si el stream no llega a empezar (p. ej. el cliente se desconecta antes).
+        background=BackgroundTask(_release, permit),
+    )
+
+
+# --- Endpoint de Lotes de Preguntas ---
+
+
+@router.post(
+    "/ask/batch",
+    response_model=BatchChatResponse,
+    summary="Responder un lote de preguntas",
+    description="""
+    Responde muchas preguntas independientes en una sola petición, pensado para evaluaciones y
+    para pregenerar respuestas frecuentes. Los embeddings de todas las preguntas se calculan con
+    una sola llamada, las recuperaciones se hacen a la vez y la generación se limita a
+    `BATCH_CONCURRENCY` llamadas simultáneas al LLM.
+    - Sin `stream`, devuelve todos los resultados en el orden de las preguntas.
+    - Con `stream`, devuelve NDJSON (`application/x-ndjson`): una línea por pregunta, con su `index`, en cuanto se responde.
+    - Con `persist`, cada turno se guarda en una conversación nueva.
+    - Una pregunta que falla lleva el campo `error` y no interrumpe el resto del lote.
+    """,
+    response_description="Los resultados del lote.",
+    responses=SATURATED_RESPONSE,
+)
+async def ask_batch(
+    request: BatchChatRequest,
+    db: AsyncSession = Depends(get_db),
+    rag_service: RAGService = Depends(get_rag_service),
+    conv_service: ConversationService = Depends(),
+    writer: Optional[MessageWriteBehind] = Depends(get_message_writer),
+    admission: Optional[AdmissionController] = Depends(get_admission_controller),
+):
+    """
+    Gestiona una solicitud de lote de preguntas.
+
+    El lote ocupa una sola plaza del control de admisión mientras se responde; su propio
+    paralelismo está acotado por `BATCH_CONCURRENCY`.
+
+    Args:
+        request (BatchChatRequest): Las preguntas y las opciones del lote.
+        db (AsyncSession): Dependencia de la sesión de base de datos.
+        rag_service (RAGService): Dependencia del servicio RAG.
+        conv_service (ConversationService): Dependencia para el servicio de conversaciones.
+        writer (MessageWriteBehind, optional): Cola de guardado diferido de mensajes.
+        admission (AdmissionController, optional): Control de admisión de las peticiones.
+
+    Returns:
+        BatchChatResponse | StreamingResponse: Los resultados en orden, o el flujo NDJSON.
+    """
+    questions = [question.strip() for question in request.questions]
+    if not all(questions):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Las preguntas no pueden estar vacías.",
+        )
+    max_questions = get_settings().batch_max_questions
+    if len(questions) > max_questions:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Un lote admite como máximo {max_questions} preguntas.",
+        )
+
+    permit = await _admit(admission)
+
+    if not request.stream:
+        async with aclosing(
+            _batch_results(questions, request.persist, db, rag_service, conv_service, writer, permit)
+        ) as batch:
+            results = [result async for result in batch]
+        return BatchChatResponse(results=sorted(results, key=lambda result: result.index))
+
+    async def ndjson_stream():
+        try:
+            # Como en `/ask/stream`, el guardado durante el stream usa una sesión propia.
+            async with AsyncSessionLocal() as session, aclosing(
+                _batch_results(questions, request.persist, session, rag_service, conv_service, writer, permit)
+            ) as batch:
+                async for result in batch:
+                    yield result.model_dump_json() + "\n"
+        except Exception as e:
+            print(f"Error durante el streaming del lote: {e}")
+            yield json.dumps({"error": "Error al procesar el lote."}) + "\n"
+
+    return StreamingResponse(
+        ndjson_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Por si el stream no llega a empezar (p. ej. el cliente se desconecta antes).
+        background=BackgroundTask(_release, permit),
+    )
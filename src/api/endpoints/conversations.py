@@ -1,17 +1,23 @@
+from typing import Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.services.conversation_service import ConversationService
+from src.services.message_writer import MessageWriteBehind, merge_pending
 from src.models.schemas import (
     ConversationCreate,
     Conversation as ConversationSchema,
     Message as MessageSchema,
 )
 from src.api.database import get_db
+from src.api.dependencies import get_message_writer
 
 router = APIRouter()
 
+# Cabecera con el cursor de la página siguiente; no se envía en la última página.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
 
 # --- Endpoints para Gestión de Conversaciones ---
 # Estos endpoints proporcionan una interfaz CRUD para gestionar las conversaciones
@@ -40,16 +46,29 @@ async def create_conversation(
 @router.get(
     "/",
     response_model=list[ConversationSchema],
-    summary="Listar todas las conversaciones",
-    description="Recupera una lista de todas las conversaciones existentes, ordenadas por la más reciente.",
-    response_description="Una lista de conversaciones.",
+    summary="Listar las conversaciones",
+    description=(
+        "Recupera una página de conversaciones, ordenadas por la más reciente. Si hay más, "
+        f"la cabecera `{NEXT_CURSOR_HEADER}` trae el cursor para pedir la siguiente."
+    ),
+    response_description="Una página de conversaciones.",
+    responses={400: {"description": "Cursor no válido."}},
 )
 async def get_conversations(
+    response: Response,
+    limit: int = Query(50, ge=1, le=200, description="Conversaciones por página."),
+    cursor: Optional[str] = Query(None, description="Cursor de la página anterior."),
     db: AsyncSession = Depends(get_db),
     service: ConversationService = Depends(),
 ):
-    """Obtiene todas las conversaciones de la base de datos."""
-    return await service.get_conversations(db)
+    """Obtiene una página de conversaciones de la base de datos."""
+    try:
+        page = await service.get_conversations_page(db, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return page.items
 
 
 @router.get(
@@ -85,8 +104,12 @@ async def delete_conversation(
     conversation_id: UUID,
     db: AsyncSession = Depends(get_db),
     service: ConversationService = Depends(),
+    writer: Optional[MessageWriteBehind] = Depends(get_message_writer),
 ):
     """Elimina una conversación de la base de datos."""
+    if writer is not None:
+        # Los turnos aún en cola de la conversación ya no deben guardarse.
+        writer.discard(conversation_id)
     await service.delete_conversation(db, conversation_id)
     # No se devuelve contenido en una respuesta 204
     return {}
@@ -95,21 +118,41 @@ async def delete_conversation(
 @router.get(
     "/{conversation_id}/messages",
     response_model=list[MessageSchema],
-    summary="Obtener todos los mensajes de una conversación",
-    description="Recupera el historial completo de mensajes de una conversación específica, ordenados por fecha.",
-    response_description="Una lista de los mensajes de la conversación.",
-    responses={404: {"description": "Conversación no encontrada."}},
+    summary="Obtener los mensajes de una conversación",
+    description=(
+        "Recupera una página del historial de una conversación, ordenado por fecha. Si hay "
+        f"más mensajes, la cabecera `{NEXT_CURSOR_HEADER}` trae el cursor de la siguiente."
+    ),
+    response_description="Una página de los mensajes de la conversación.",
+    responses={
+        400: {"description": "Cursor no válido."},
+        404: {"description": "Conversación no encontrada."},
+    },
 )
 async def get_messages(
     conversation_id: UUID,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500, description="Mensajes por página."),
+    cursor: Optional[str] = Query(None, description="Cursor de la página anterior."),
     db: AsyncSession = Depends(get_db),
     service: ConversationService = Depends(),
+    writer: Optional[MessageWriteBehind] = Depends(get_message_writer),
 ):
     """Obtiene los mensajes de una conversación para mostrar el historial."""
-    # Primero, verificar que la conversación existe
-    conversation = await service.get_conversation(db, conversation_id)
+    # Primero, verificar que la conversación existe (sin cargar sus mensajes dos veces)
+    conversation = await service.get_conversation(db, conversation_id, with_messages=False)
     if not conversation:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Conversación no encontrada."
         )
-    return await service.get_messages(db, conversation_id)
+    # Con el guardado diferido, los mensajes que aún están en la cola son los más
+    # recientes: se añaden a la última página.
+    pending = writer.pending(conversation_id) if writer is not None else []
+    try:
+        page = await service.get_messages_page(db, conversation_id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+        return page.items
+    return merge_pending(page.items, pending)
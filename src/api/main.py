@@ -1,9 +1,66 @@
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
 from scalar_fastapi import get_scalar_api_reference
 
-from src.api.endpoints import chat, conversations
-from src.api.database import init_db
+from src.api.endpoints import cache, chat, conversations
+from src.api.database import AsyncSessionLocal, engine, init_db
+from src.api.metrics import APIMetrics
+from src.config import get_settings
+from src.services.admission import AdmissionController
+from src.services.conversation_memory import ConversationMemory
+from src.services.message_writer import MessageWriteBehind
+from src.services.rag_engine import RAGEngine
+
+
+# --- Ciclo de Vida de la Aplicación ---
+# Al arrancar se inicializa la base de datos y se construye el motor RAG una única vez:
+# los clientes HTTP, el índice de Pinecone y los modelos quedan compartidos por todas
+# las peticiones. También se crea la memoria de conversaciones, que resume en segundo
+# plano los turnos antiguos con el modelo de reformulación y, si `MESSAGE_WRITE_BEHIND`
+# está activo, la cola que guarda los mensajes por lotes, y el control de admisión que
+# limita las preguntas que llaman al LLM a la vez. Al apagar se vacía la cola, se
+# esperan los resúmenes pendientes y se cierran los pools de conexiones.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_db()
+    settings = get_settings()
+    app.state.rag_engine = RAGEngine(settings)
+    app.state.admission_controller = (
+        AdmissionController(
+            max_concurrency=settings.admission_max_concurrency,
+            max_queue=settings.admission_max_queue,
+            max_wait=settings.admission_max_wait_ms / 1000,
+        )
+        if settings.admission_control
+        else None
+    )
+    app.state.message_writer = (
+        MessageWriteBehind(
+            session_factory=AsyncSessionLocal,
+            max_queue_size=settings.message_queue_size,
+            batch_size=settings.message_batch_size,
+            flush_interval=settings.message_flush_interval_ms / 1000,
+        )
+        if settings.message_write_behind
+        else None
+    )
+    if app.state.message_writer is not None:
+        app.state.message_writer.start()
+    app.state.conversation_memory = ConversationMemory(
+        llm=app.state.rag_engine.rephrase_llm,
+        session_factory=AsyncSessionLocal,
+        recent_turns=settings.memory_recent_turns,
+        writer=app.state.message_writer,
+    )
+    await app.state.rag_engine.warmup()
+    yield
+    if app.state.message_writer is not None:
+        await app.state.message_writer.aclose()
+    await app.state.conversation_memory.aclose()
+    await app.state.rag_engine.aclose()
+
 
 # --- Creación de la Aplicación FastAPI ---
 # Se define la aplicación principal de FastAPI con un título y versión.
@@ -21,12 +78,9 @@ app = FastAPI(
     - **Gestión de conversaciones:** Lista, obtén y elimina conversaciones.
     - **Documentación interactiva:** Explora los endpoints con Scalar.
     """,
+    lifespan=lifespan,
 )
 
-@app.on_event("startup")
-async def on_startup():
-    await init_db()
-
 # --- Inclusión de Routers ---
 # Se registran los routers de los diferentes módulos de la API.
 # Cada router agrupa un conjunto de endpoints relacionados bajo un prefijo común.
@@ -34,6 +88,15 @@ app.include_router(chat.router, prefix="/api/v1/chat", tags=["Chat"])
 app.include_router(
     conversations.router, prefix="/api/v1/conversations", tags=["Conversations"]
 )
+app.include_router(cache.router, prefix="/api/v1/cache", tags=["Cache"])
+
+# --- Métricas ---
+# `/metrics` publica en formato Prometheus la latencia de cada etapa de un turno de chat,
+# el uso de tokens, las tasas de acierto de las cachés, las peticiones en curso y el pool
+# de conexiones. Cada respuesta incluye además la cabecera `Server-Timing` con su desglose
+# por etapas. Cada worker publica sus propias métricas.
+metrics = APIMetrics()
+metrics.instrument(app, db_engine=engine)
 
 
 # --- Endpoint de Documentación Scalar ---
@@ -0,0 +1,272 @@
+import time
+from typing import Any, Callable, Iterator, Optional
+
+from fastapi import FastAPI, Request, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+from src.services.stage_timer import StageTimings, start_timings
+
+# Límites de los histogramas de latencia, en segundos: desde una consulta a la caché
+# hasta una generación larga del LLM.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def format_server_timing(timings: StageTimings, total_seconds: float) -> str:
+    """
+    Construye la cabecera `Server-Timing` con el desglose por etapas de una petición.
+
+    Args:
+        timings (StageTimings): Etapas registradas durante la petición.
+        total_seconds (float): Duración total de la petición en el servidor.
+
+    Returns:
+        str: Por ejemplo `history;dur=4.1, retrieval;dur=121.3, total;dur=842.0` (en ms).
+    """
+    entries = [
+        f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.as_dict().items()
+    ]
+    entries.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class ServiceStatsCollector(Collector):
+    """
+    Exporta, en el momento de cada lectura de `/metrics`, los contadores que ya mantienen
+    los servicios del proceso: uso de tokens del LLM, aciertos de las cachés, preguntas en
+    curso, recuperación especulativa, peticiones agrupadas, control de admisión, cola de
+    guardado diferido y estado del pool de conexiones de SQLAlchemy.
+
+    No duplica ningún contador: lee `stats()` de cada componente, por lo que los valores
+    coinciden con los de `/api/v1/cache/stats`.
+    """
+
+    def __init__(self, app: FastAPI, db_engine: Optional[Any] = None):
+        """
+        Args:
+            app (FastAPI): Aplicación cuyo estado contiene el motor RAG (tras el lifespan).
+            db_engine (AsyncEngine, optional): Motor de base de datos cuyo pool se inspecciona.
+        """
+        self.app = app
+        self.db_engine = db_engine
+
+    def collect(self) -> Iterator[Any]:
+        rag_engine = getattr(self.app.state, "rag_engine", None)
+        if rag_engine is not None:
+            yield from self._collect_rag(rag_engine)
+        admission = getattr(self.app.state, "admission_controller", None)
+        if admission is not None:
+            yield from self._collect_admission(admission.stats())
+        message_writer = getattr(self.app.state, "message_writer", None)
+        if message_writer is not None:
+            yield from self._collect_message_writer(message_writer.stats())
+        if self.db_engine is not None:
+            yield from self._collect_pool(self.db_engine.sync_engine.pool)
+
+    def _collect_rag(self, rag_engine: Any) -> Iterator[Any]:
+        stats = rag_engine.service.stats()
+
+        tokens = CounterMetricFamily(
+            "rag_llm_tokens", "Tokens consumidos por los modelos de lenguaje.", labels=["model", "kind"]
+        )
+        for role, counts in stats["tokens"].items():
+            for kind, value in counts.items():
+                tokens.add_metric([role, kind], value)
+        yield tokens
+
+        yield GaugeMetricFamily(
+            "rag_requests_in_flight", "Preguntas que el servicio RAG está respondiendo.", value=stats["in_flight"]
+        )
+
+        speculation = stats["speculation"]
+        yield CounterMetricFamily(
+            "rag_speculation_hits", "Recuperaciones especulativas aprovechadas.", value=speculation["hits"]
+        )
+        yield CounterMetricFamily(
+            "rag_speculation_misses", "Recuperaciones especulativas descartadas.", value=speculation["misses"]
+        )
+
+        coalesced = CounterMetricFamily(
+            "rag_coalesced_requests",
+            "Peticiones que se unieron a una llamada idéntica en curso en lugar de repetirla.",
+            labels=["stage"],
+        )
+        executions = CounterMetricFamily(
+            "rag_singleflight_executions",
+            "Llamadas realmente ejecutadas por cada etapa agrupable.",
+            labels=["stage"],
+        )
+        for stage_name, flights in stats["coalescing"].items():
+            coalesced.add_metric([stage_name], flights["coalesced"])
+            executions.add_metric([stage_name], flights["executions"])
+        yield coalesced
+        yield executions
+
+        semantic_cache = getattr(rag_engine, "semantic_cache", None)
+        if semantic_cache is not None:
+            cache_stats = semantic_cache.stats()
+            yield from self._cache_metrics("semantic_cache", "la caché semántica de respuestas", cache_stats)
+            yield GaugeMetricFamily(
+                "semantic_cache_entries", "Respuestas guardadas en la caché semántica.", value=cache_stats["size"]
+            )
+
+        embeddings = getattr(rag_engine, "embeddings", None)
+        if hasattr(embeddings, "stats"):
+            cache_stats = embeddings.stats()
+            cache_stats["hits"] = cache_stats["memory_hits"] + cache_stats["disk_hits"]
+            yield from self._cache_metrics("embedding_cache", "la caché de embeddings", cache_stats)
+
+    @staticmethod
+    def _cache_metrics(prefix: str, description: str, stats: dict) -> Iterator[Any]:
+        lookups = stats["hits"] + stats["misses"]
+        yield CounterMetricFamily(f"{prefix}_hits", f"Aciertos de {description}.", value=stats["hits"])
+        yield CounterMetricFamily(f"{prefix}_misses", f"Fallos de {description}.", value=stats["misses"])
+        yield GaugeMetricFamily(
+            f"{prefix}_hit_ratio",
+            f"Tasa de acierto de {description} desde el arranque.",
+            value=stats["hits"] / lookups if lookups else 0.0,
+        )
+
+    @staticmethod
+    def _collect_admission(stats: dict) -> Iterator[Any]:
+        yield GaugeMetricFamily(
+            "admission_active", "Peticiones de chat con plaza en el control de admisión.", value=stats["active"]
+        )
+        yield GaugeMetricFamily(
+            "admission_queue_depth", "Peticiones de chat esperando una plaza.", value=stats["queued"]
+        )
+        yield GaugeMetricFamily(
+            "admission_max_concurrency", "Límite de peticiones de chat simultáneas.", value=stats["max_concurrency"]
+        )
+        yield CounterMetricFamily(
+            "admission_admitted", "Peticiones de chat admitidas.", value=stats["admitted"]
+        )
+        rejected = CounterMetricFamily(
+            "admission_rejected", "Peticiones de chat rechazadas con 429.", labels=["reason"]
+        )
+        for reason, value in stats["rejected"].items():
+            rejected.add_metric([reason], value)
+        yield rejected
+        yield CounterMetricFamily(
+            "admission_wait_seconds", "Tiempo total de espera en la cola de admisión.", value=stats["wait_seconds_total"]
+        )
+
+    @staticmethod
+    def _collect_message_writer(stats: dict) -> Iterator[Any]:
+        yield GaugeMetricFamily(
+            "message_queue_exchanges", "Turnos en la cola de guardado diferido.", value=stats["queued_exchanges"]
+        )
+        yield GaugeMetricFamily(
+            "message_queue_pending", "Mensajes aún no guardados.", value=stats["pending_messages"]
+        )
+        yield CounterMetricFamily(
+            "message_queue_flushed", "Mensajes guardados por la cola.", value=stats["flushed_messages"]
+        )
+        yield CounterMetricFamily(
+            "message_queue_batches", "Lotes escritos por la cola.", value=stats["batches"]
+        )
+        yield CounterMetricFamily(
+            "message_queue_failed", "Mensajes descartados por errores al guardarlos.", value=stats["failed_messages"]
+        )
+
+    @staticmethod
+    def _collect_pool(pool: Any) -> Iterator[Any]:
+        # Solo los pools con tamaño fijo (QueuePool) exponen estos contadores.
+        for name, description in (
+            ("size", "Tamaño configurado del pool de conexiones."),
+            ("checkedout", "Conexiones prestadas a sesiones en curso."),
+            ("checkedin", "Conexiones libres en el pool."),
+            ("overflow", "Conexiones por encima del tamaño del pool (negativo: huecos sin abrir)."),
+        ):
+            method: Optional[Callable[[], int]] = getattr(pool, name, None)
+            if method is not None:
+                yield GaugeMetricFamily(f"db_pool_{name}", description, value=method())
+
+
+class APIMetrics:
+    """
+    Métricas Prometheus de la API.
+
+    - `chat_stage_duration_seconds{stage}`: latencia de cada etapa de un turno de chat
+      (historial y guardado en `ConversationService`; reformulación, recuperación, prompt y
+      generación en `RAGService`), alimentada por `src/services/stage_timer.py`.
+    - `http_request_duration_seconds{method,route,status}` y `http_requests_in_flight`.
+    - Los contadores de los servicios (`ServiceStatsCollector`).
+
+    Cada instancia usa su propio registro, así que se pueden crear varias (p. ej. en tests).
+    """
+
+    def __init__(self, registry: Optional[CollectorRegistry] = None):
+        self.registry = registry or CollectorRegistry()
+        self.stage_seconds = Histogram(
+            "chat_stage_duration_seconds",
+            "Duración de cada etapa de un turno de chat.",
+            ["stage"],
+            buckets=LATENCY_BUCKETS,
+            registry=self.registry,
+        )
+        self.request_seconds = Histogram(
+            "http_request_duration_seconds",
+            "Duración de las peticiones HTTP hasta que se envían las cabeceras.",
+            ["method", "route", "status"],
+            buckets=LATENCY_BUCKETS,
+            registry=self.registry,
+        )
+        self.in_flight = Gauge(
+            "http_requests_in_flight", "Peticiones HTTP en curso.", registry=self.registry
+        )
+
+    def observe_stage(self, name: str, seconds: float) -> None:
+        self.stage_seconds.labels(name).observe(seconds)
+
+    def instrument(self, app: FastAPI, db_engine: Optional[Any] = None) -> None:
+        """
+        Instala las métricas en la aplicación: añade el middleware que mide cada petición
+        y sus etapas de chat y la cabecera `Server-Timing`, registra el colector de los
+        servicios y publica el endpoint `/metrics`.
+
+        Args:
+            app (FastAPI): La aplicación.
+            db_engine (AsyncEngine, optional): Motor de base de datos cuyo pool se exporta.
+        """
+        self.registry.register(ServiceStatsCollector(app, db_engine))
+        app.middleware("http")(self.middleware)
+        app.add_api_route("/metrics", self.metrics_endpoint, include_in_schema=False)
+
+    async def middleware(self, request: Request, call_next) -> Response:
+        """
+        Mide cada petición y devuelve el desglose por etapas en la cabecera `Server-Timing`.
+
+        En las respuestas en streaming, la cabecera y la duración cubren hasta el envío de
+        las cabeceras (p. ej. la recuperación), no la generación completa.
+        """
+        if request.url.path == "/metrics":
+            return await call_next(request)
+
+        # El histograma de etapas se alimenta desde el registro de la propia petición, así
+        # que cada instancia solo observa las peticiones de su aplicación.
+        timings = start_timings(observers=[self.observe_stage])
+        self.in_flight.inc()
+        start = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            self.in_flight.dec()
+        elapsed = time.perf_counter() - start
+
+        # Se agrupa por la plantilla de la ruta (`/conversations/{conversation_id}`), no por la URL.
+        route = getattr(request.scope.get("route"), "path", "sin_ruta")
+        self.request_seconds.labels(request.method, route, response.status_code).observe(elapsed)
+        response.headers["Server-Timing"] = format_server_timing(timings, elapsed)
+        return response
+
+    async def metrics_endpoint(self) -> Response:
+        """Devuelve las métricas en el formato de texto de Prometheus."""
+        return Response(generate_latest(self.registry), media_type=CONTENT_TYPE_LATEST)
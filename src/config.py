@@ -0,0 +1,213 @@
+import os
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _get_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _get_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+def _get_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Configuración de la aplicación leída desde variables de entorno.
+
+    Centraliza los parámetros de ajuste (tamaños de pool, modelos, etc.) para que
+    los componentes compartidos del proceso se construyan de forma consistente.
+    """
+
+    openai_api_key: Optional[str]
+    pinecone_api_key: Optional[str]
+    pinecone_index_name: Optional[str]
+    # Token de los endpoints de administración (`X-Admin-Token`); sin él, están desactivados.
+    admin_token: Optional[str]
+
+    # --- Modelos ---
+    chat_model: str
+    rephrase_model: str
+    embedding_model: str
+    embedding_dimensions: int
+
+    # --- Backend del índice vectorial ---
+    vector_backend: str
+    local_index_path: str
+    local_index_type: str
+    ivf_nlist: int
+    ivf_nprobe: int
+    ivf_min_size: int
+
+    # --- Caché de embeddings de consultas ---
+    embedding_cache_max_entries: int
+    embedding_cache_path: Optional[str]
+
+    # --- Pools de conexiones HTTP (OpenAI) ---
+    http_max_connections: int
+    http_max_keepalive_connections: int
+    http_keepalive_expiry: float
+    http_timeout: float
+
+    # --- Pool de conexiones de Pinecone ---
+    pinecone_pool_threads: int
+    pinecone_connection_pool_maxsize: int
+
+    # --- Pool de hilos para las llamadas síncronas restantes ---
+    rag_thread_pool_size: int
+
+    # --- Calentamiento al arranque ---
+    rag_warmup: bool
+    rag_warmup_connections: int
+
+    # --- Caché semántica de respuestas ---
+    semantic_cache_enabled: bool
+    semantic_cache_max_entries: int
+    semantic_cache_ttl_seconds: float
+    semantic_cache_threshold: float
+
+    # --- Búsqueda híbrida (BM25 + vectorial) ---
+    hybrid_search_enabled: bool
+    lexical_index_path: str
+    lexical_fast_path_threshold: float
+    rrf_k: int
+
+    # --- Memoria de conversaciones ---
+    memory_recent_turns: int
+
+    # --- Guardado diferido de mensajes (write-behind) ---
+    message_write_behind: bool
+    message_queue_size: int
+    message_batch_size: int
+    message_flush_interval_ms: float
+
+    # --- Recuperación especulativa ---
+    speculative_retrieval: bool
+    speculation_similarity_threshold: float
+
+    # --- Agrupación de peticiones idénticas en curso (single-flight) ---
+    request_coalescing: bool
+
+    # --- Control de admisión de las peticiones de chat ---
+    admission_control: bool
+    admission_max_concurrency: int
+    admission_max_queue: int
+    admission_max_wait_ms: float
+
+    # --- Lotes de preguntas (/chat/ask/batch) ---
+    batch_max_questions: int
+    batch_concurrency: int
+
+    # --- Ensamblado del contexto ---
+    context_token_budget: int
+    # `tiktoken` (tokenizador exacto del modelo de chat) o `approx` (~4 caracteres por token).
+    token_counter: str
+    # Directorio con el vocabulario de tiktoken ya descargado (despliegues sin red).
+    tiktoken_cache_dir: Optional[str]
+
+    # --- Ingesta ---
+    ingest_batch_size: int
+    ingest_concurrency: int
+    ingest_upsert_batch_size: int
+    ingest_max_retries: int
+    ingest_manifest_path: str
+    page_cache_dir: str
+
+    # --- Crawler de Wikipedia ---
+    crawl_concurrency: int
+    crawl_rate_per_host: float
+
+
+def load_settings() -> Settings:
+    """
+    Construye un objeto Settings a partir del entorno actual.
+
+    Returns:
+        Settings: La configuración resultante.
+    """
+    return Settings(
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        pinecone_api_key=os.getenv("PINECONE_API_KEY"),
+        pinecone_index_name=os.getenv("PINECONE_INDEX_NAME"),
+        admin_token=os.getenv("ADMIN_TOKEN") or None,
+        chat_model=os.getenv("RAG_CHAT_MODEL", "gpt-4o"),
+        rephrase_model=os.getenv("RAG_REPHRASE_MODEL", "gpt-4o-mini"),
+        embedding_model=os.getenv("RAG_EMBEDDING_MODEL", "text-embedding-3-small"),
+        embedding_dimensions=_get_int("RAG_EMBEDDING_DIMENSIONS", 512),
+        vector_backend=os.getenv("VECTOR_BACKEND", "pinecone").strip().lower(),
+        local_index_path=os.getenv("LOCAL_INDEX_PATH", "data/vector_index"),
+        local_index_type=os.getenv("LOCAL_INDEX_TYPE", "flat").strip().lower(),
+        ivf_nlist=_get_int("IVF_NLIST", 0),
+        ivf_nprobe=_get_int("IVF_NPROBE", 8),
+        ivf_min_size=_get_int("IVF_MIN_SIZE", 10000),
+        embedding_cache_max_entries=_get_int("EMBEDDING_CACHE_MAX_ENTRIES", 10000),
+        embedding_cache_path=os.getenv("EMBEDDING_CACHE_PATH") or None,
+        http_max_connections=_get_int("HTTP_MAX_CONNECTIONS", 100),
+        http_max_keepalive_connections=_get_int("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20),
+        http_keepalive_expiry=_get_float("HTTP_KEEPALIVE_EXPIRY", 30.0),
+        http_timeout=_get_float("HTTP_TIMEOUT", 60.0),
+        pinecone_pool_threads=_get_int("PINECONE_POOL_THREADS", 4),
+        pinecone_connection_pool_maxsize=_get_int("PINECONE_CONNECTION_POOL_MAXSIZE", 20),
+        rag_thread_pool_size=_get_int("RAG_THREAD_POOL_SIZE", 16),
+        rag_warmup=_get_bool("RAG_WARMUP", True),
+        rag_warmup_connections=_get_int("RAG_WARMUP_CONNECTIONS", 4),
+        semantic_cache_enabled=_get_bool("SEMANTIC_CACHE_ENABLED", True),
+        semantic_cache_max_entries=_get_int("SEMANTIC_CACHE_MAX_ENTRIES", 1000),
+        semantic_cache_ttl_seconds=_get_float("SEMANTIC_CACHE_TTL_SECONDS", 3600.0),
+        semantic_cache_threshold=_get_float("SEMANTIC_CACHE_THRESHOLD", 0.95),
+        hybrid_search_enabled=_get_bool("HYBRID_SEARCH_ENABLED", True),
+        lexical_index_path=os.getenv("LEXICAL_INDEX_PATH", "data/lexical_index"),
+        lexical_fast_path_threshold=_get_float("LEXICAL_FAST_PATH_THRESHOLD", 0.6),
+        rrf_k=_get_int("RRF_K", 60),
+        memory_recent_turns=_get_int("MEMORY_RECENT_TURNS", 4),
+        message_write_behind=_get_bool("MESSAGE_WRITE_BEHIND", False),
+        message_queue_size=_get_int("MESSAGE_QUEUE_SIZE", 1000),
+        message_batch_size=_get_int("MESSAGE_BATCH_SIZE", 200),
+        message_flush_interval_ms=_get_float("MESSAGE_FLUSH_INTERVAL_MS", 10.0),
+        speculative_retrieval=_get_bool("SPECULATIVE_RETRIEVAL", True),
+        speculation_similarity_threshold=_get_float("SPECULATION_SIMILARITY_THRESHOLD", 0.9),
+        request_coalescing=_get_bool("REQUEST_COALESCING", True),
+        admission_control=_get_bool("ADMISSION_CONTROL", True),
+        admission_max_concurrency=_get_int("ADMISSION_MAX_CONCURRENCY", 32),
+        admission_max_queue=_get_int("ADMISSION_MAX_QUEUE", 64),
+        admission_max_wait_ms=_get_float("ADMISSION_MAX_WAIT_MS", 5000.0),
+        batch_max_questions=_get_int("BATCH_MAX_QUESTIONS", 500),
+        batch_concurrency=_get_int("BATCH_CONCURRENCY", 8),
+        context_token_budget=_get_int("CONTEXT_TOKEN_BUDGET", 2000),
+        token_counter=os.getenv("TOKEN_COUNTER", "tiktoken").strip().lower(),
+        tiktoken_cache_dir=os.getenv("TIKTOKEN_CACHE_DIR") or None,
+        ingest_batch_size=_get_int("INGEST_BATCH_SIZE", 100),
+        ingest_concurrency=_get_int("INGEST_CONCURRENCY", 4),
+        ingest_upsert_batch_size=_get_int("INGEST_UPSERT_BATCH_SIZE", 100),
+        ingest_max_retries=_get_int("INGEST_MAX_RETRIES", 6),
+        ingest_manifest_path=os.getenv("INGEST_MANIFEST_PATH", "data/ingest_manifest.json"),
+        page_cache_dir=os.getenv("PAGE_CACHE_DIR", "data/page_cache"),
+        crawl_concurrency=_get_int("CRAWL_CONCURRENCY", 8),
+        crawl_rate_per_host=_get_float("CRAWL_RATE_PER_HOST", 5.0),
+    )
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """
+    Devuelve la configuración del proceso (se lee una sola vez y se reutiliza).
+
+    Returns:
+        Settings: La configuración de la aplicación.
+    """
+    return load_settings()
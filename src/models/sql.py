@@ -1,12 +1,16 @@
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import List, Optional
 
 from sqlalchemy import (
     Boolean,
     DateTime,
     ForeignKey,
+    Index,
+    Integer,
+    JSON,
     String,
+    Text,
     func,
 )
 from sqlalchemy.dialects.postgresql import JSONB, UUID
@@ -18,18 +22,41 @@ class Base(AsyncAttrs, DeclarativeBase):
     pass
 
 
+def utcnow() -> datetime:
+    """
+    Devuelve la fecha actual en UTC, sin zona horaria, como se guardan los mensajes.
+
+    Es el único reloj de las fechas de mensajes y conversaciones: lo usan tanto el
+    guardado síncrono como el diferido, que fecha los mensajes al encolarlos, antes de
+    llegar a la base de datos. Así `Conversation.updated_at` coincide con la fecha de su
+    último mensaje.
+
+    Returns:
+        datetime: La fecha actual en UTC.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class Conversation(Base):
     __tablename__ = "conversations"
+    # Listado de conversaciones por actividad reciente, paginado por (updated_at, id).
+    __table_args__ = (Index("ix_conversations_updated_at_id", "updated_at", "id"),)
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
     )
     name: Mapped[str] = mapped_column(String, index=True)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime, default=func.now(), server_default=func.now()
+        DateTime, default=utcnow, server_default=func.now()
     )
     updated_at: Mapped[datetime] = mapped_column(
-        DateTime, default=func.now(), onupdate=func.now(), server_default=func.now()
+        DateTime, default=utcnow, onupdate=utcnow, server_default=func.now()
+    )
+    # Resumen acumulado de los mensajes más antiguos (ver `ConversationMemory`) y número
+    # de mensajes, en orden cronológico, que ya están incluidos en él.
+    summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    summarized_count: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0"
     )
 
     messages: Mapped[List["Message"]] = relationship(
@@ -39,6 +66,10 @@ class Conversation(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+    # Historial de una conversación en orden cronológico (ventana reciente y paginación).
+    __table_args__ = (
+        Index("ix_messages_conversation_id_timestamp", "conversation_id", "timestamp"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
@@ -49,9 +80,12 @@ class Message(Base):
     content: Mapped[str] = mapped_column(String)
     is_user: Mapped[bool] = mapped_column(Boolean)
     timestamp: Mapped[datetime] = mapped_column(
-        DateTime, default=func.now(), server_default=func.now()
+        DateTime, default=utcnow, server_default=func.now()
+    )
+    # JSONB en PostgreSQL; JSON genérico en otras bases (p. ej. SQLite en los benchmarks).
+    sources: Mapped[Optional[List[str]]] = mapped_column(
+        JSON().with_variant(JSONB, "postgresql"), nullable=True
     )
-    sources: Mapped[Optional[List[str]]] = mapped_column(JSONB, nullable=True)
 
     conversation: Mapped["Conversation"] = relationship(
         "Conversation", back_populates="messages"
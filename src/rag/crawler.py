@@ -0,0 +1,355 @@
+import asyncio
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+from urllib.parse import unquote, urlsplit
+
+import httpx
+from langchain_core.documents import Document
+
+from src.rag.html_extractor import extract_article_text
+from src.rag.ingestion import IngestionEngine, IngestionReport
+from src.rag.manifest import IngestionManifest
+from src.rag.text_processor import TextProcessor
+
+USER_AGENT = "ColombiaGPT-crawler/1.0 (ingesta del sistema RAG; python-httpx)"
+WIKI_BASE_URL = "https://es.wikipedia.org/wiki/"
+
+# Artículos de partida del crawler: el país, sus departamentos, ciudades e historia.
+DEFAULT_SEEDS = [
+    "Colombia",
+    "Historia_de_Colombia",
+    "Geografía_de_Colombia",
+    "Economía_de_Colombia",
+    "Cultura_de_Colombia",
+    "Demografía_de_Colombia",
+    "Política_de_Colombia",
+    "Organización_territorial_de_Colombia",
+    "Departamentos_de_Colombia",
+    "Antioquia",
+    "Atlántico_(Colombia)",
+    "Bolívar_(Colombia)",
+    "Boyacá",
+    "Cundinamarca",
+    "Santander_(Colombia)",
+    "Valle_del_Cauca",
+    "Bogotá",
+    "Medellín",
+    "Cali",
+    "Barranquilla",
+    "Cartagena_de_Indias",
+    "Independencia_de_Colombia",
+    "Gran_Colombia",
+    "Simón_Bolívar",
+    "Constitución_de_Colombia_de_1991",
+]
+
+
+def seed_urls(seeds: Sequence[str]) -> List[str]:
+    """Convierte títulos de artículos (o URLs completas) en URLs de Wikipedia en español."""
+    return [seed if "://" in seed else WIKI_BASE_URL + seed for seed in seeds]
+
+
+def fixture_name(url: str) -> str:
+    """Nombre del fichero de un artículo en un directorio de fixtures (`Bogotá.html`)."""
+    title = unquote(urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1])
+    return f"{title.replace('/', '_')}.html"
+
+
+class FixtureTransport(httpx.AsyncBaseTransport):
+    """
+    Transporte de httpx que sirve las páginas desde un directorio de HTML grabado, para
+    ejecutar el crawler sin red (tests y benchmarks). Las páginas ausentes devuelven 404.
+    """
+
+    def __init__(self, directory: str, latency: float = 0.0):
+        """
+        Args:
+            directory (str): Directorio con un fichero `<título>.html` por artículo.
+            latency (float): Latencia simulada de cada respuesta, en segundos.
+        """
+        self.directory = directory
+        self.latency = latency
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        path = os.path.join(self.directory, fixture_name(str(request.url)))
+        if not os.path.exists(path):
+            return httpx.Response(404, request=request)
+        with open(path, "rb") as f:
+            content = f.read()
+        return httpx.Response(
+            200,
+            headers={"Content-Type": "text/html; charset=UTF-8"},
+            content=content,
+            request=request,
+        )
+
+
+class HostRateLimiter:
+    """Limita las peticiones por host a `requests_per_second`, repartiéndolas en el tiempo."""
+
+    def __init__(self, requests_per_second: float):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+
+    async def acquire(self, host: str) -> None:
+        if not self.interval:
+            return
+        now = time.monotonic()
+        # Se reserva el turno antes de esperar, así que no hace falta un lock en el event loop.
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+@dataclass
+class CrawledPage:
+    """Una página descargada por el crawler."""
+
+    url: str
+    html: Optional[str]
+    status: int = 0
+    elapsed_seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.html is not None
+
+
+class WikipediaCrawler:
+    """
+    Descarga varios artículos de Wikipedia de forma concurrente.
+
+    Todas las peticiones comparten un único `httpx.AsyncClient` con pool de conexiones
+    (keep-alive), hay como máximo `max_concurrency` descargas en vuelo y un límite de
+    peticiones por segundo por host. Las páginas se entregan a medida que llegan (ver
+    `crawl`), de modo que se pueden procesar mientras se descargan las demás.
+
+    Con `fixtures_dir`, las páginas se leen de un directorio de HTML grabado en lugar
+    de la red.
+    """
+
+    def __init__(
+        self,
+        seeds: Sequence[str],
+        max_concurrency: int = 8,
+        requests_per_second: float = 5.0,
+        fixtures_dir: Optional[str] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        timeout: float = 15.0,
+        max_retries: int = 2,
+    ):
+        """
+        Inicializa el crawler.
+
+        Args:
+            seeds (Sequence[str]): Títulos de artículos o URLs a descargar.
+            max_concurrency (int): Descargas simultáneas.
+            requests_per_second (float): Peticiones por segundo por host (0 = sin límite).
+            fixtures_dir (str, optional): Directorio de HTML grabado (modo sin red).
+            client (httpx.AsyncClient, optional): Cliente HTTP a reutilizar.
+            timeout (float): Timeout de cada petición, en segundos.
+            max_retries (int): Reintentos ante 429 y errores 5xx o de red.
+        """
+        self.urls = list(dict.fromkeys(seed_urls(seeds)))
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate_limiter = HostRateLimiter(requests_per_second)
+        self.max_retries = max_retries
+        self._owns_client = client is None
+        if client is None:
+            transport = FixtureTransport(fixtures_dir) if fixtures_dir else None
+            client = httpx.AsyncClient(
+                transport=transport,
+                headers={"User-Agent": USER_AGENT},
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+                timeout=httpx.Timeout(timeout),
+                follow_redirects=True,
+            )
+        self.client = client
+
+    async def fetch(self, url: str) -> CrawledPage:
+        """Descarga una página respetando el límite por host y reintentando los errores transitorios."""
+        host = urlsplit(url).netloc
+        start = time.perf_counter()
+        page = CrawledPage(url=url, html=None)
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire(host)
+            try:
+                response = await self.client.get(url)
+            except httpx.HTTPError as e:
+                page.error = str(e) or type(e).__name__
+            else:
+                page.status = response.status_code
+                if response.is_success:
+                    page.html, page.error = response.text, None
+                    break
+                page.error = f"HTTP {response.status_code}"
+                if response.status_code != 429 and response.status_code < 500:
+                    break
+            if attempt < self.max_retries:
+                await asyncio.sleep(2**attempt * random.uniform(0.5, 1.0))
+        page.elapsed_seconds = time.perf_counter() - start
+        return page
+
+    async def crawl(self) -> AsyncIterator[CrawledPage]:
+        """
+        Descarga todas las páginas y las entrega en orden de llegada.
+
+        Yields:
+            CrawledPage: Cada página descargada (o fallida, con `error`).
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def bounded_fetch(url: str) -> CrawledPage:
+            async with semaphore:
+                return await self.fetch(url)
+
+        tasks = [asyncio.create_task(bounded_fetch(url)) for url in self.urls]
+        try:
+            for next_page in asyncio.as_completed(tasks):
+                yield await next_page
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def aclose(self) -> None:
+        if self._owns_client:
+            await self.client.aclose()
+
+
+@dataclass
+class CrawlSummary:
+    """Resultado de `crawl_and_ingest`."""
+
+    pages: int = 0
+    failed: List[str] = field(default_factory=list)
+    chunks: int = 0
+    added: int = 0
+    changed: int = 0
+    removed: int = 0
+    unchanged: int = 0
+    report: IngestionReport = field(default_factory=IngestionReport)
+    documents: List[Document] = field(default_factory=list)
+    elapsed_seconds: float = 0.0
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.pages} páginas ({len(self.failed)} fallidas), {self.chunks} chunks en "
+            f"{self.elapsed_seconds:.1f} s ({self.pages_per_second:.1f} páginas/s): {self.added} nuevos, {self.changed} modificados, "
+            f"{self.removed} eliminados, {self.unchanged} sin cambios"
+        )
+
+
+async def crawl_and_ingest(
+    crawler: WikipediaCrawler,
+    engine: IngestionEngine,
+    manifest: IngestionManifest,
+    processor: Optional[TextProcessor] = None,
+) -> CrawlSummary:
+    """
+    Descarga las páginas del crawler y pasa cada una por extracción, chunking e indexado
+    en cuanto llega, mientras continúan las demás descargas.
+
+    Cada página se sincroniza con el índice de forma incremental y solo para su propia
+    fuente (ver `IngestionEngine.aingest_incremental`). Al final se borran del índice
+    los artículos que ya no están en la lista de semillas; los de páginas cuya descarga,
+    extracción o indexado falló se conservan y la página se anota en `failed`. El índice
+    y el manifiesto se guardan siempre, también si el crawl se interrumpe.
+
+    Args:
+        crawler (WikipediaCrawler): El crawler con las páginas a descargar.
+        engine (IngestionEngine): Motor de ingesta hacia el índice vectorial.
+        manifest (IngestionManifest): Manifiesto de lo ya indexado.
+        processor (TextProcessor, optional): Divisor de texto en chunks.
+
+    Returns:
+        CrawlSummary: Páginas, chunks y cambios aplicados, y todos los chunks actuales.
+    """
+    processor = processor or TextProcessor(chunk_size=1500, chunk_overlap=200)
+    summary = CrawlSummary()
+    start = time.perf_counter()
+    # Cada página reparte sus lotes de embeddings con el semáforo del motor; se acota
+    # también el número de páginas que se indexan a la vez.
+    semaphore = asyncio.Semaphore(engine.max_concurrency)
+
+    async def ingest_page(page: CrawledPage) -> None:
+        async with semaphore:
+            await sync_page(page)
+
+    async def sync_page(page: CrawledPage) -> None:
+        try:
+            text = await asyncio.to_thread(extract_article_text, page.html)
+        except ValueError as e:
+            print(f"Aviso: no se pudo extraer '{page.url}': {e}")
+            summary.failed.append(page.url)
+            return
+        if text is None:
+            # Sin texto no se sincroniza: una lista vacía de chunks borraría del índice
+            # los vectores que la página ya tuviera.
+            print(f"Aviso: '{page.url}' no contiene texto de artículo")
+            summary.failed.append(page.url)
+            return
+        documents = processor.chunk_text_by_section(text, page.url)
+        try:
+            diff, report = await engine.aingest_incremental(
+                documents, manifest, sources={page.url}, persist=False
+            )
+        except Exception as e:
+            print(f"Error al indexar '{page.url}': {e}")
+            summary.failed.append(page.url)
+            return
+        summary.documents.extend(documents)
+        summary.chunks += len(documents)
+        summary.added += len(diff.added)
+        summary.changed += len(diff.changed)
+        summary.removed += len(diff.removed)
+        summary.unchanged += diff.unchanged
+        summary.report.chunks += report.chunks
+        summary.report.batches += report.batches
+        summary.report.retries += report.retries
+        summary.report.embed_seconds += report.embed_seconds
+        summary.report.upsert_seconds += report.upsert_seconds
+        print(f"  {page.url}: {len(documents)} chunks ({diff})")
+
+    ingestions = []
+    try:
+        async for page in crawler.crawl():
+            summary.pages += 1
+            if not page.ok:
+                print(f"Aviso: no se pudo descargar '{page.url}': {page.error}")
+                summary.failed.append(page.url)
+                continue
+            ingestions.append(asyncio.create_task(ingest_page(page)))
+        await asyncio.gather(*ingestions)
+
+        # Artículos indexados en ejecuciones anteriores que ya no forman parte del crawl.
+        dropped = set(manifest.sources()) - set(crawler.urls)
+        if dropped:
+            diff, _ = await engine.aingest_incremental(
+                [], manifest, sources=dropped, persist=False
+            )
+            summary.removed += len(diff.removed)
+    finally:
+        # Lo ya sincronizado se guarda aunque el crawl se interrumpa, para que índice y
+        # manifiesto no se desalineen.
+        for task in ingestions:
+            task.cancel()
+        await asyncio.gather(*ingestions, return_exceptions=True)
+        engine.vector_store.persist()
+        manifest.save()
+    summary.elapsed_seconds = time.perf_counter() - start
+    summary.report.elapsed_seconds = summary.elapsed_seconds
+    return summary
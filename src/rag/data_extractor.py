@@ -1,7 +1,23 @@
 import requests
-from bs4 import BeautifulSoup
+from dataclasses import dataclass
 from typing import Optional
-import re
+
+from src.rag.html_extractor import extract_article_text
+from src.rag.manifest import content_hash
+from src.rag.page_cache import PageCache
+
+
+@dataclass
+class FetchedPage:
+    """HTML de un artículo, descargado o leído de la caché de páginas."""
+
+    url: str
+    html: str
+    content_hash: str
+    # El servidor confirmó con un 304 que la copia guardada sigue vigente.
+    not_modified: bool = False
+    # La página se leyó de la caché sin ninguna petición de red.
+    from_cache: bool = False
 
 
 class DataExtractor:
@@ -10,51 +26,101 @@ class DataExtractor:
 
     Esta clase se encarga de realizar la solicitud HTTP, parsear el HTML
     y extraer el contenido relevante del artículo, como párrafos y encabezados,
-    eliminando elementos no deseados (infoboxes, navboxes, etc.).
+    eliminando elementos no deseados (infoboxes, navboxes, etc.). El HTML se procesa
+    en una única pasada con `extract_article_text`, sin construir el árbol del documento.
+
+    Con una `PageCache`, el HTML descargado se guarda en disco junto con sus cabeceras
+    `ETag`/`Last-Modified` y las siguientes descargas son condicionales: si el servidor
+    responde 304, se reutiliza la copia guardada. Con `cache_only`, la página se lee
+    solo de la caché, sin red, para repetir una ingesta de forma determinista.
     """
 
     WIKI_URL = "https://es.wikipedia.org/wiki/Colombia"
 
-    def fetch_content(self) -> Optional[str]:
+    def __init__(self, cache: Optional[PageCache] = None, cache_only: bool = False):
         """
-        Obtiene el contenido principal de la página de Wikipedia.
+        Args:
+            cache (PageCache, optional): Caché de páginas descargadas.
+            cache_only (bool): Si es True, no se hace ninguna petición de red.
+        """
+        if cache_only and cache is None:
+            raise ValueError("El modo solo caché requiere una caché de páginas.")
+        self.cache = cache
+        self.cache_only = cache_only
+
+    def _cached_page(self, not_modified: bool = False) -> Optional[FetchedPage]:
+        entry = self.cache.touch(self.WIKI_URL) if not_modified else self.cache.get(self.WIKI_URL)
+        if entry is None:
+            return None
+        return FetchedPage(
+            self.WIKI_URL,
+            self.cache.read(entry),
+            entry.content_hash,
+            not_modified=not_modified,
+            from_cache=not not_modified,
+        )
+
+    def fetch_page(self) -> Optional[FetchedPage]:
+        """
+        Obtiene el HTML de la página de Wikipedia, revalidando la copia en caché si la hay.
 
         Returns:
-            Optional[str]: Una cadena con el texto limpio del artículo, o None si ocurre un error.
+            Optional[FetchedPage]: El HTML y su hash, o None si ocurre un error.
         """
+        if self.cache_only:
+            page = self._cached_page()
+            if page is None:
+                print(f"Error: '{self.WIKI_URL}' no está en la caché de páginas.")
+            return page
+
         try:
             headers = {
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
             }
+            if self.cache is not None:
+                headers.update(self.cache.conditional_headers(self.WIKI_URL))
             response = requests.get(self.WIKI_URL, timeout=15, headers=headers)
+            if response.status_code == 304 and self.cache is not None:
+                page = self._cached_page(not_modified=True)
+                if page is not None:
+                    return page
             response.raise_for_status()
 
-            soup = BeautifulSoup(response.text, "html.parser")
-
-            all_divs = soup.find_all("div", class_="mw-parser-output")
-            if not all_divs:
-                raise ValueError("No se encontró ningún div con la clase 'mw-parser-output'.")
-            content_div = max(all_divs, key=lambda div: len(str(div)))
-
-            text_elements = []
-            for elem in content_div.find_all(["p", "h2", "h3", "h4"]):
-                if elem.find_parent(["table", "div"], class_=["infobox", "navbox", "thumb"]):
-                    continue
-
-                text = elem.get_text(separator=" ", strip=True)
-                if text:
-                    if elem.name.startswith("h"):
-                        clean_title = text.replace("[editar]", "").strip()
-                        if clean_title:
-                            text_elements.append(f"\n\n== {clean_title} ==\n")
-                    else:
-                        text_elements.append(text)
-
-            return "\n".join(text_elements) if text_elements else None
+            html = response.text
+            if self.cache is not None:
+                self.cache.put(
+                    self.WIKI_URL,
+                    html,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                )
+            return FetchedPage(self.WIKI_URL, html, content_hash(html))
 
         except requests.RequestException as e:
             print(f"Error al realizar la solicitud HTTP: {e}")
             return None
+
+    def extract(self, page: FetchedPage) -> Optional[str]:
+        """
+        Extrae el texto limpio del artículo a partir de su HTML.
+
+        Returns:
+            Optional[str]: El texto del artículo, o None si ocurre un error.
+        """
+        try:
+            return extract_article_text(page.html)
         except Exception as e:
             print(f"Error inesperado durante la extracción: {e}")
             return None
+
+    def fetch_content(self) -> Optional[str]:
+        """
+        Obtiene el contenido principal de la página de Wikipedia.
+
+        Returns:
+            Optional[str]: Una cadena con el texto limpio del artículo, o None si ocurre un error.
+        """
+        page = self.fetch_page()
+        if page is None:
+            return None
+        return self.extract(page)
@@ -0,0 +1,255 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.config import get_settings
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normaliza un texto antes de calcular su clave de caché.
+
+    Aplica la forma Unicode NFC (para que "á" compuesta y descompuesta coincidan),
+    colapsa los espacios en blanco y elimina los extremos. No cambia mayúsculas ni
+    acentos, ya que el modelo de embeddings sí los distingue.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class SQLiteEmbeddingStore:
+    """
+    Almacén persistente de embeddings en un fichero SQLite.
+
+    Guarda cada vector como bytes float32 bajo su clave, de modo que las consultas
+    frecuentes sobreviven a los reinicios del proceso.
+    """
+
+    def __init__(self, path: str):
+        """
+        Abre (o crea) la base de datos de embeddings.
+
+        Args:
+            path (str): Ruta del fichero SQLite.
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Devuelve los vectores almacenados para las claves dadas (las ausentes se omiten)."""
+        rows = []
+        # Se consulta por lotes para no superar el límite de parámetros de SQLite.
+        for start in range(0, len(keys), 500):
+            batch = keys[start : start + 500]
+            placeholders = ",".join("?" for _ in batch)
+            with self._lock:
+                rows.extend(
+                    self._conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                        batch,
+                    ).fetchall()
+                )
+        return {key: np.frombuffer(blob, dtype=np.float32).tolist() for key, blob in rows}
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        """Guarda (o reemplaza) los vectores dados."""
+        if not items:
+            return
+        rows = [
+            (key, np.asarray(vector, dtype=np.float32).tobytes())
+            for key, vector in items.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Envoltorio de un modelo de embeddings que memoriza los vectores calculados.
+
+    Combina una caché LRU acotada en memoria con un almacén persistente opcional
+    (`SQLiteEmbeddingStore`). La clave de cada vector se deriva del texto normalizado,
+    del modelo y de las dimensiones, así que los vectores cacheados siguen siendo válidos
+    mientras no cambie la configuración del modelo.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model: str,
+        dimensions: int,
+        max_entries: int = 10000,
+        store: Optional[SQLiteEmbeddingStore] = None,
+    ):
+        """
+        Inicializa la caché de embeddings.
+
+        Args:
+            embeddings (Embeddings): El modelo de embeddings real.
+            model (str): Nombre del modelo (forma parte de la clave).
+            dimensions (int): Dimensión de los vectores (forma parte de la clave).
+            max_entries (int): Número máximo de vectores en memoria.
+            store (SQLiteEmbeddingStore, optional): Almacén persistente de segundo nivel.
+        """
+        self.embeddings = embeddings
+        self.model = model
+        self.dimensions = dimensions
+        self.max_entries = max_entries
+        self.store = store
+
+        self._lru: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_settings(
+        cls, embeddings: Embeddings, model: str, dimensions: int
+    ) -> "CachedEmbeddings":
+        """
+        Construye la caché con el tamaño y la ruta de persistencia de la configuración
+        (`EMBEDDING_CACHE_MAX_ENTRIES` y `EMBEDDING_CACHE_PATH`).
+        """
+        settings = get_settings()
+        store = (
+            SQLiteEmbeddingStore(settings.embedding_cache_path)
+            if settings.embedding_cache_path
+            else None
+        )
+        return cls(
+            embeddings,
+            model=model,
+            dimensions=dimensions,
+            max_entries=settings.embedding_cache_max_entries,
+            store=store,
+        )
+
+    def _key(self, text: str) -> str:
+        raw = f"{self.model}:{self.dimensions}:{normalize_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def _lookup(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """Busca las claves en memoria y, para las que falten, en el almacén persistente."""
+        found: Dict[str, List[float]] = {}
+        pending = []
+        with self._lock:
+            for key in keys:
+                if key in found:
+                    continue
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    found[key] = self._lru[key]
+                    self.memory_hits += 1
+                else:
+                    pending.append(key)
+
+        if pending and self.store is not None:
+            from_disk = self.store.get_many(pending)
+            with self._lock:
+                for key, vector in from_disk.items():
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+            found.update(from_disk)
+        return found
+
+    def _save(self, computed: Dict[str, List[float]]) -> None:
+        with self._lock:
+            for key, vector in computed.items():
+                self._remember(key, vector)
+            self.misses += len(computed)
+        if self.store is not None:
+            self.store.put_many(computed)
+
+    def _missing(self, texts: List[str], keys: List[str], found: Dict[str, List[float]]):
+        """Devuelve los textos (sin duplicados) cuyo vector hay que calcular, con sus claves."""
+        missing = {}
+        for text, key in zip(texts, keys):
+            if key not in found and key not in missing:
+                missing[key] = text
+        return list(missing.keys()), list(missing.values())
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Devuelve los embeddings de una lista de textos, calculando en una sola llamada
+        al modelo únicamente los que no estén en caché.
+        """
+        keys = [self._key(text) for text in texts]
+        found = self._lookup(keys)
+        missing_keys, missing_texts = self._missing(texts, keys, found)
+        if missing_texts:
+            computed = dict(zip(missing_keys, self.embeddings.embed_documents(missing_texts)))
+            self._save(computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Devuelve el embedding de una consulta, usando la caché si es posible."""
+        key = self._key(text)
+        found = self._lookup([key])
+        if key not in found:
+            found[key] = self.embeddings.embed_query(text)
+            self._save({key: found[key]})
+        return found[key]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Versión asíncrona de `embed_documents`."""
+        keys = [self._key(text) for text in texts]
+        found = self._lookup(keys)
+        missing_keys, missing_texts = self._missing(texts, keys, found)
+        if missing_texts:
+            vectors = await self.embeddings.aembed_documents(missing_texts)
+            computed = dict(zip(missing_keys, vectors))
+            self._save(computed)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Versión asíncrona de `embed_query`."""
+        key = self._key(text)
+        found = self._lookup([key])
+        if key not in found:
+            found[key] = await self.embeddings.aembed_query(text)
+            self._save({key: found[key]})
+        return found[key]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Devuelve los contadores de la caché.
+
+        Returns:
+            Dict[str, int]: Aciertos en memoria, aciertos en disco, fallos y tamaño en memoria.
+        """
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "size": len(self._lru),
+        }
@@ -2,6 +2,8 @@ import os
 from langchain_openai import OpenAIEmbeddings
 from typing import List
 
+from src.rag.embedding_cache import CachedEmbeddings
+
 
 class EmbeddingService:
     """
@@ -9,6 +11,9 @@ class EmbeddingService:
 
     Esta clase se configura para usar el modelo 'text-embedding-3-small' con una
     dimensión de 512, optimizado para compatibilidad con Pinecone (así se creó el índice)
+
+    Los vectores calculados se memorizan con `CachedEmbeddings`, por lo que un mismo
+    texto no vuelve a enviarse a la API de OpenAI.
     """
 
     def __init__(
@@ -29,8 +34,12 @@ class EmbeddingService:
         if not self.api_key:
             raise ValueError("No se encontró la API key de OpenAI")
 
-        self.embedder = OpenAIEmbeddings(
-            openai_api_key=self.api_key, model=model, dimensions=dimensions
+        self.embedder = CachedEmbeddings.from_settings(
+            OpenAIEmbeddings(
+                openai_api_key=self.api_key, model=model, dimensions=dimensions
+            ),
+            model=model,
+            dimensions=dimensions,
         )
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
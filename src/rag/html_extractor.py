@@ -0,0 +1,312 @@
+import re
+from html.entities import html5
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+
+from bs4 import BeautifulSoup
+
+CONTENT_CLASS = "mw-parser-output"
+# Contenedores cuyo texto no forma parte del artículo (fichas, cajas de navegación, imágenes).
+EXCLUDED_TAGS = frozenset({"table", "div"})
+EXCLUDED_CLASSES = frozenset({"infobox", "navbox", "thumb"})
+TEXT_TAGS = frozenset({"p", "h2", "h3", "h4"})
+
+# Etiquetas vacías y etiquetas cuyo texto no es contenido, según el árbol de BeautifulSoup
+# con `html.parser` (ver `extract_article_text_bs4`).
+VOID_TAGS = frozenset(
+    {
+        "area", "base", "basefont", "bgsound", "br", "col", "command", "embed", "frame",
+        "hr", "image", "img", "input", "isindex", "keygen", "link", "menuitem", "meta",
+        "nextid", "param", "source", "spacer", "track", "wbr",
+    }
+)
+NON_TEXT_TAGS = frozenset({"rt", "rp", "style", "script", "template"})
+
+_CLASS_TOKENS = re.compile(r"\S+")
+
+# Entidades HTML5 por nombre sin ";" (html.parser entrega el nombre sin el punto y coma).
+_ENTITIES: Dict[str, str] = {}
+for _name, _character in sorted(html5.items()):
+    _ENTITIES.setdefault(_name.rstrip(";"), _character)
+
+
+def _format_element(name: str, text: str) -> Optional[str]:
+    """Da formato al texto de un párrafo o encabezado; None si no aporta texto."""
+    if not text:
+        return None
+    if name.startswith("h"):
+        clean_title = text.replace("[editar]", "").strip()
+        return f"\n\n== {clean_title} ==\n" if clean_title else None
+    return text
+
+
+class _OpenElement:
+    __slots__ = ("name", "excluded", "non_text", "candidate", "target")
+
+    def __init__(self, name, excluded=False, non_text=False, candidate=None, target=None):
+        self.name = name
+        self.excluded = excluded
+        self.non_text = non_text
+        self.candidate = candidate
+        self.target = target
+
+
+class _Candidate:
+    """Un div `mw-parser-output` con los párrafos y encabezados que contiene."""
+
+    __slots__ = ("start", "end", "elements")
+
+    def __init__(self, start: int):
+        self.start = start
+        self.end: Optional[int] = None
+        self.elements: List[Optional[str]] = []
+
+
+class _Target:
+    """Un párrafo o encabezado abierto, con los fragmentos de texto que contiene."""
+
+    __slots__ = ("name", "candidate", "slot", "strings")
+
+    def __init__(self, name: str, candidate: _Candidate):
+        self.name = name
+        self.candidate = candidate
+        self.slot = len(candidate.elements)
+        self.strings: List[str] = []
+        candidate.elements.append(None)
+
+
+class ArticleTextParser(HTMLParser):
+    """
+    Extrae el texto de un artículo de Wikipedia en una única pasada sobre el HTML.
+
+    Produce el mismo texto que `extract_article_text_bs4`, pero sin construir el árbol
+    del documento: el parser emite eventos (apertura y cierre de etiquetas, texto) y se
+    mantiene solo la pila de elementos abiertos, con un contador de contenedores
+    excluidos abiertos (fichas, navboxes, imágenes) en lugar de recorrer los ancestros
+    de cada párrafo. El texto de cada párrafo o encabezado se acumula mientras está
+    abierto.
+
+    Como en la implementación con BeautifulSoup, se usa el div `mw-parser-output` más
+    grande, pero medido por la longitud de su HTML en el documento original en lugar de
+    volver a serializarlo. En una página de Wikipedia el div del artículo es órdenes de
+    magnitud mayor que los demás (p. ej. el aviso del sitio), así que eligen el mismo.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self._stack: List[_OpenElement] = []
+        self._excluded_depth = 0
+        self._non_text_depth = 0
+        self._open_candidate: Optional[_Candidate] = None
+        self._open_targets: List[_Target] = []
+        self._candidates: List[_Candidate] = []
+        self._data: List[str] = []
+        self._closed_void: List[str] = []
+        self._line_starts = [0]
+        self._fed = 0
+
+    # --- Posición en el documento ---
+
+    def feed(self, data: str) -> None:
+        self._line_starts.extend(self._fed + m.end() for m in re.finditer("\n", data))
+        self._fed += len(data)
+        super().feed(data)
+
+    def _offset(self) -> int:
+        line, column = self.getpos()
+        return self._line_starts[line - 1] + column
+
+    # --- Texto ---
+
+    def _flush(self, cdata: bool = False) -> None:
+        """
+        Cierra el fragmento de texto en curso (equivale a un `NavigableString` de bs4). El
+        texto dentro de <style>, <script>, etc. se descarta, salvo las secciones CDATA.
+        """
+        if not self._data:
+            return
+        data = "".join(self._data)
+        self._data = []
+        if not self._open_targets or (self._non_text_depth and not cdata):
+            return
+        data = data.strip()
+        if data:
+            for target in self._open_targets:
+                target.strings.append(data)
+
+    def handle_data(self, data: str) -> None:
+        if self._open_targets:
+            self._data.append(data)
+
+    def handle_charref(self, name: str) -> None:
+        if name[:1] in ("x", "X"):
+            codepoint = int(name[1:], 16)
+        else:
+            codepoint = int(name)
+        data = None
+        # Las referencias < 256 se interpretan como windows-1252 (p. ej. &#147;), como en bs4.
+        if codepoint < 256:
+            try:
+                data = bytes([codepoint]).decode("windows-1252")
+            except UnicodeDecodeError:
+                pass
+        if not data:
+            try:
+                data = chr(codepoint)
+            except (ValueError, OverflowError):
+                pass
+        self.handle_data(data or "\N{REPLACEMENT CHARACTER}")
+
+    def handle_entityref(self, name: str) -> None:
+        self.handle_data(_ENTITIES.get(name, f"&{name}"))
+
+    def handle_comment(self, data: str) -> None:
+        self._flush()
+
+    def handle_decl(self, data: str) -> None:
+        self._flush()
+
+    def handle_pi(self, data: str) -> None:
+        self._flush()
+
+    def unknown_decl(self, data: str) -> None:
+        self._flush()
+        # Las secciones CDATA sí cuentan como texto, incluso dentro de <style> o <script>.
+        if data.upper().startswith("CDATA[") and self._open_targets:
+            self._data.append(data[len("CDATA[") :])
+            self._flush(cdata=True)
+
+    # --- Etiquetas ---
+
+    def handle_startendtag(self, tag: str, attrs) -> None:
+        self._start(tag, attrs, handle_void=False)
+        self.handle_endtag(tag)
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        self._start(tag, attrs, handle_void=True)
+
+    def _start(self, tag: str, attrs, handle_void: bool) -> None:
+        self._flush()
+        element = _OpenElement(tag, non_text=tag in NON_TEXT_TAGS)
+
+        if tag in EXCLUDED_TAGS:
+            classes = set()
+            for key, value in attrs:
+                if key == "class":
+                    classes = set(_CLASS_TOKENS.findall(value or ""))
+            element.excluded = not EXCLUDED_CLASSES.isdisjoint(classes)
+            # Solo interesa el div de contenido más externo: uno anidado nunca es el más grande.
+            if tag == "div" and CONTENT_CLASS in classes and self._open_candidate is None:
+                element.candidate = _Candidate(self._offset())
+                self._candidates.append(element.candidate)
+        elif tag in TEXT_TAGS and self._open_candidate and self._excluded_depth == 0:
+            element.target = _Target(tag, self._open_candidate)
+
+        self._push(element)
+        if tag in VOID_TAGS and handle_void:
+            # Las etiquetas vacías se cierran al abrirse; un cierre explícito posterior se ignora.
+            self._pop_to(tag)
+            self._closed_void.append(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in self._closed_void:
+            self._closed_void.remove(tag)
+            return
+        self._flush()
+        self._pop_to(tag)
+
+    def _push(self, element: _OpenElement) -> None:
+        self._stack.append(element)
+        self._excluded_depth += element.excluded
+        self._non_text_depth += element.non_text
+        if element.candidate is not None:
+            self._open_candidate = element.candidate
+        if element.target is not None:
+            self._open_targets.append(element.target)
+
+    def _pop_to(self, tag: str) -> None:
+        """Cierra la etiqueta abierta más reciente con ese nombre y las que contiene."""
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i].name == tag:
+                break
+        else:
+            return
+        while len(self._stack) > i:
+            self._close(self._stack.pop())
+
+    def _close(self, element: _OpenElement, end: Optional[int] = None) -> None:
+        self._excluded_depth -= element.excluded
+        self._non_text_depth -= element.non_text
+        if element.candidate is not None:
+            element.candidate.end = self._offset() if end is None else end
+            self._open_candidate = None
+        if element.target is not None:
+            target = self._open_targets.pop()
+            target.candidate.elements[target.slot] = _format_element(
+                target.name, " ".join(target.strings)
+            )
+
+    def close(self) -> None:
+        super().close()
+        self._flush()
+        # Los elementos que siguen abiertos al final del documento se cierran en él.
+        while self._stack:
+            self._close(self._stack.pop(), end=self._fed)
+
+    # --- Resultado ---
+
+    def result(self) -> Optional[str]:
+        """
+        Devuelve el texto del artículo (párrafos y encabezados `== Título ==`).
+
+        Raises:
+            ValueError: Si el documento no tiene ningún div `mw-parser-output`.
+        """
+        if not self._candidates:
+            raise ValueError(f"No se encontró ningún div con la clase '{CONTENT_CLASS}'.")
+        content = max(self._candidates, key=lambda candidate: candidate.end - candidate.start)
+        text_elements = [text for text in content.elements if text]
+        return "\n".join(text_elements) if text_elements else None
+
+
+def extract_article_text(html: str) -> Optional[str]:
+    """
+    Extrae el texto del artículo de una página de Wikipedia en una única pasada.
+
+    Args:
+        html (str): El HTML de la página.
+
+    Returns:
+        Optional[str]: El texto del artículo, o None si no contiene párrafos ni encabezados.
+
+    Raises:
+        ValueError: Si la página no tiene el div de contenido `mw-parser-output`.
+    """
+    parser = ArticleTextParser()
+    parser.feed(html)
+    parser.close()
+    return parser.result()
+
+
+def extract_article_text_bs4(html: str) -> Optional[str]:
+    """
+    Implementación de referencia con BeautifulSoup, que construye el árbol completo del
+    documento y recorre los ancestros de cada párrafo. Se conserva para los tests de
+    equivalencia y el benchmark de `extract_article_text`.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+
+    all_divs = soup.find_all("div", class_=CONTENT_CLASS)
+    if not all_divs:
+        raise ValueError(f"No se encontró ningún div con la clase '{CONTENT_CLASS}'.")
+    content_div = max(all_divs, key=lambda div: len(str(div)))
+
+    text_elements = []
+    for elem in content_div.find_all(list(TEXT_TAGS)):
+        if elem.find_parent(list(EXCLUDED_TAGS), class_=list(EXCLUDED_CLASSES)):
+            continue
+        text = _format_element(elem.name, elem.get_text(separator=" ", strip=True))
+        if text:
+            text_elements.append(text)
+
+    return "\n".join(text_elements) if text_elements else None
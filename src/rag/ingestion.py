@@ -0,0 +1,232 @@
+import asyncio
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Collection, List, Optional, Sequence, Tuple
+
+import openai
+from langchain_core.documents import Document
+
+from src.rag.embeddings import EmbeddingService
+from src.rag.manifest import IngestionManifest, ManifestDiff
+from src.rag.vector_store import VectorStore
+
+
+@dataclass
+class IngestionReport:
+    """Resumen de una ejecución de la ingesta."""
+
+    chunks: int = 0
+    batches: int = 0
+    # Reintentos por límite de tasa de la API de embeddings.
+    retries: int = 0
+    embed_seconds: float = 0.0
+    upsert_seconds: float = 0.0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.chunks} chunks en {self.batches} lotes, {self.elapsed_seconds:.1f} s "
+            f"({self.chunks_per_second:.1f} chunks/s; embeddings {self.embed_seconds:.1f} s, "
+            f"escritura {self.upsert_seconds:.1f} s, reintentos {self.retries})"
+        )
+
+
+class IngestionEngine:
+    """
+    Calcula los embeddings de los chunks y los escribe en el índice vectorial por lotes.
+
+    Cada lote de `batch_size` chunks se envía a `EmbeddingService.embed_documents` en un
+    hilo, con hasta `max_concurrency` lotes en vuelo a la vez. Si la API de OpenAI responde
+    con un error de límite de tasa, el lote se reintenta con espera exponencial (y jitter,
+    para que los lotes concurrentes no reintenten a la vez). En cuanto un lote tiene sus
+    embeddings, se escribe en el índice en sub-lotes de `upsert_batch_size`, en paralelo
+    con el cálculo de los siguientes, de modo que la ingesta queda limitada por la cuota
+    de la API y no por una única llamada secuencial.
+    """
+
+    def __init__(
+        self,
+        embedding_service: EmbeddingService,
+        vector_store: VectorStore,
+        batch_size: int = 100,
+        max_concurrency: int = 4,
+        upsert_batch_size: int = 100,
+        max_retries: int = 6,
+        initial_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ):
+        """
+        Inicializa el motor de ingesta.
+
+        Args:
+            embedding_service (EmbeddingService): Servicio con el que se calculan los embeddings.
+            vector_store (VectorStore): Índice vectorial destino.
+            batch_size (int): Chunks por llamada a la API de embeddings.
+            max_concurrency (int): Lotes de embeddings en vuelo a la vez.
+            upsert_batch_size (int): Vectores por escritura en el índice.
+            max_retries (int): Reintentos de un lote ante errores de límite de tasa.
+            initial_backoff (float): Espera, en segundos, antes del primer reintento.
+            max_backoff (float): Espera máxima entre reintentos.
+        """
+        self.embedding_service = embedding_service
+        self.vector_store = vector_store
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.upsert_batch_size = max(1, upsert_batch_size)
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Espera antes del reintento `attempt` (desde 0), respetando `Retry-After` si la API lo envía."""
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            if retry_after is not None:
+                return min(float(retry_after), self.max_backoff)
+        except ValueError:
+            pass
+        delay = min(self.initial_backoff * 2**attempt, self.max_backoff)
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _embed_with_retry(self, texts: List[str], report: IngestionReport) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await asyncio.to_thread(self.embedding_service.embed_documents, texts)
+            except openai.RateLimitError as e:
+                if attempt == self.max_retries:
+                    raise
+                report.retries += 1
+                delay = self._backoff(attempt, e)
+                print(f"Límite de tasa de la API de embeddings; reintentando en {delay:.1f} s...")
+                await asyncio.sleep(delay)
+
+    async def _process_batch(
+        self,
+        documents: Sequence[Document],
+        ids: Sequence[str],
+        semaphore: asyncio.Semaphore,
+        report: IngestionReport,
+    ) -> None:
+        texts = [doc.page_content for doc in documents]
+        metadatas = [dict(doc.metadata) for doc in documents]
+
+        async with semaphore:
+            start = time.perf_counter()
+            embeddings = await self._embed_with_retry(texts, report)
+            report.embed_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(
+                self.vector_store.aadd_embeddings(
+                    texts[i : i + self.upsert_batch_size],
+                    embeddings[i : i + self.upsert_batch_size],
+                    metadatas[i : i + self.upsert_batch_size],
+                    list(ids[i : i + self.upsert_batch_size]),
+                )
+                for i in range(0, len(texts), self.upsert_batch_size)
+            )
+        )
+        report.upsert_seconds += time.perf_counter() - start
+        report.chunks += len(texts)
+        report.batches += 1
+
+    async def _aembed_and_upsert(
+        self, documents: Sequence[Document], ids: Sequence[str]
+    ) -> IngestionReport:
+        report = IngestionReport()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        start = time.perf_counter()
+
+        await asyncio.gather(
+            *(
+                self._process_batch(
+                    documents[i : i + self.batch_size],
+                    ids[i : i + self.batch_size],
+                    semaphore,
+                    report,
+                )
+                for i in range(0, len(documents), self.batch_size)
+            )
+        )
+        report.elapsed_seconds = time.perf_counter() - start
+        return report
+
+    async def aingest(
+        self, documents: Sequence[Document], ids: Optional[Sequence[str]] = None
+    ) -> IngestionReport:
+        """
+        Calcula los embeddings de los documentos y los escribe en el índice.
+
+        Args:
+            documents (Sequence[Document]): Los chunks a indexar.
+            ids (Sequence[str], optional): IDs de los chunks. Si no se proveen, se generan.
+
+        Returns:
+            IngestionReport: Tiempos y rendimiento de la ingesta.
+        """
+        ids = list(ids) if ids is not None else [str(uuid.uuid4()) for _ in documents]
+        report = await self._aembed_and_upsert(documents, ids)
+        self.vector_store.persist()
+        return report
+
+    async def aingest_incremental(
+        self,
+        documents: Sequence[Document],
+        manifest: IngestionManifest,
+        sources: Optional[Collection[str]] = None,
+        persist: bool = True,
+    ) -> Tuple[ManifestDiff, IngestionReport]:
+        """
+        Sincroniza el índice con el corpus actual usando el manifiesto de la última ingesta.
+
+        Solo se embeben los chunks nuevos o modificados (con IDs deterministas, ver
+        `chunk_id`), y se borran del índice los vectores de los chunks que desaparecieron
+        y las versiones antiguas de los modificados. Si nada cambió, no se llama a la API
+        de embeddings. El manifiesto se guarda solo si la sincronización termina bien.
+
+        Args:
+            documents (Sequence[Document]): Todos los chunks actuales del corpus.
+            manifest (IngestionManifest): Manifiesto de lo ya indexado.
+            sources (Collection[str], optional): Limita la sincronización a los chunks de
+                esas fuentes (p. ej. una página del crawler), ver `IngestionManifest.diff`.
+            persist (bool): Si es False, no se guardan el índice local ni el manifiesto
+                (el llamador lo hace al terminar una serie de sincronizaciones).
+
+        Returns:
+            Tuple[ManifestDiff, IngestionReport]: Los cambios aplicados y el rendimiento.
+        """
+        diff = manifest.diff(documents, sources)
+        pending = diff.added + diff.changed
+        report = await self._aembed_and_upsert(
+            [doc for _, doc in pending], [id_ for id_, _ in pending]
+        )
+
+        stale = diff.removed + diff.replaced
+        if stale:
+            await self.vector_store.adelete(stale)
+        manifest.update(documents, sources)
+        if persist:
+            if not diff.is_empty:
+                self.vector_store.persist()
+            manifest.save()
+        return diff, report
+
+    def ingest(
+        self, documents: Sequence[Document], ids: Optional[Sequence[str]] = None
+    ) -> IngestionReport:
+        """Versión síncrona de `aingest`."""
+        return asyncio.run(self.aingest(documents, ids))
+
+    def ingest_incremental(
+        self, documents: Sequence[Document], manifest: IngestionManifest
+    ) -> Tuple[ManifestDiff, IngestionReport]:
+        """Versión síncrona de `aingest_incremental`, para scripts como `init.py`."""
+        return asyncio.run(self.aingest_incremental(documents, manifest))
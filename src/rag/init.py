@@ -1,25 +1,260 @@
+import argparse
+import asyncio
 import sys
 import os
+import requests
 
 # Añadir el directorio raíz del proyecto al path para importaciones
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
+from src.config import get_settings
+from src.rag.crawler import DEFAULT_SEEDS, WikipediaCrawler, crawl_and_ingest
 from src.rag.data_extractor import DataExtractor
+from src.rag.embeddings import EmbeddingService
+from src.rag.ingestion import IngestionEngine
+from src.rag.lexical_index import BM25Index
+from src.rag.manifest import IngestionManifest
+from src.rag.page_cache import PageCache
 from src.rag.text_processor import TextProcessor
 from src.rag.vector_store import VectorStore
 
 
-def main():
+def invalidate_api_cache():
+    """
+    Notifica a la API que el contenido del índice cambió para que recargue sus índices
+    en memoria y vacíe su caché semántica de respuestas. Si la API no está disponible,
+    solo se informa.
+
+    La petición la atiende un solo worker: con varios workers, hay que reiniciar la API.
+    """
+    api_base_url = os.getenv("API_BASE_URL")
+    if not api_base_url:
+        return
+    admin_token = get_settings().admin_token
+    if not admin_token:
+        print("Aviso: ADMIN_TOKEN no está configurado; reinicia la API para usar el nuevo índice.")
+        return
+
+    try:
+        response = requests.delete(
+            f"{api_base_url}/cache/", headers={"X-Admin-Token": admin_token}, timeout=30
+        )
+        response.raise_for_status()
+        print("Índices recargados y caché semántica de la API invalidada.")
+    except requests.RequestException as e:
+        print(f"Aviso: no se pudo invalidar la caché semántica de la API: {e}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pipeline de ingesta del sistema RAG.")
+    parser.add_argument(
+        "--backend",
+        choices=["pinecone", "local"],
+        default=None,
+        help="Índice vectorial destino (por defecto, VECTOR_BACKEND o pinecone).",
+    )
+    parser.add_argument(
+        "--index-path",
+        default=None,
+        help="Directorio del índice local (por defecto, LOCAL_INDEX_PATH).",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Chunks por llamada a la API de embeddings (por defecto, INGEST_BATCH_SIZE).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="Lotes de embeddings en paralelo (por defecto, INGEST_CONCURRENCY).",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Ignora el manifiesto de la última ingesta, vacía el índice y vuelve a embeber todos los chunks.",
+    )
+    parser.add_argument(
+        "--cache-only",
+        action="store_true",
+        help="Lee la página de la caché local (PAGE_CACHE_DIR) sin red, para repetir una ingesta.",
+    )
+    parser.add_argument(
+        "--crawl",
+        action="store_true",
+        help="Descarga e indexa varios artículos relacionados con Colombia en lugar de uno.",
+    )
+    parser.add_argument(
+        "--seeds",
+        default=None,
+        help="Fichero con los artículos a descargar, un título o URL por línea (con --crawl).",
+    )
+    parser.add_argument(
+        "--fixtures",
+        default=None,
+        help="Directorio de HTML grabado del que leer las páginas sin red (con --crawl).",
+    )
+    return parser.parse_args()
+
+
+def load_seeds(path: str = None):
+    """Lee la lista de artículos del crawler, ignorando líneas vacías y comentarios."""
+    if not path:
+        return DEFAULT_SEEDS
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def build_ingestion(settings, backend, index_path, batch_size, concurrency, full):
+    """
+    Crea el motor de ingesta hacia el índice vectorial y carga el manifiesto de la
+    última ingesta (o uno vacío con `full`, para reindexar todo).
+
+    Sin manifiesto (primera ejecución, `full` o manifiesto de otro índice) no se sabe qué
+    vectores contiene el índice, así que se vacía antes de indexar: si no, los de
+    ingestas anteriores (p. ej. con IDs aleatorios) quedarían junto a los nuevos.
+    """
+    vector_store = VectorStore(
+        backend=backend,
+        embedding_model=settings.embedding_model,
+        dimensions=settings.embedding_dimensions,
+        local_index_path=index_path,
+    )
+    engine = IngestionEngine(
+        EmbeddingService(model=settings.embedding_model, dimensions=settings.embedding_dimensions),
+        vector_store,
+        batch_size=batch_size or settings.ingest_batch_size,
+        max_concurrency=concurrency or settings.ingest_concurrency,
+        upsert_batch_size=settings.ingest_upsert_batch_size,
+        max_retries=settings.ingest_max_retries,
+    )
+    # Solo se embeben los chunks nuevos o modificados desde la última ingesta.
+    index_key = f"{vector_store.backend}:{vector_store.index_name}"
+    if full:
+        manifest = IngestionManifest(settings.ingest_manifest_path, index_key)
+    else:
+        manifest = IngestionManifest.load(settings.ingest_manifest_path, index_key)
+    if not len(manifest):
+        print("No hay manifiesto de una ingesta anterior: se vacía el índice y se reindexa todo.")
+        vector_store.clear()
+    return engine, manifest
+
+
+def crawl_main(settings, backend, index_path, batch_size, concurrency, full, seeds_path, fixtures_dir):
+    """Pipeline de ingesta en modo crawler: varios artículos descargados en paralelo."""
+    seeds = load_seeds(seeds_path)
+    origin = f"'{fixtures_dir}' (sin red)" if fixtures_dir else "Wikipedia"
+    print(f"[1/2] Descargando e indexando {len(seeds)} artículos desde {origin}...")
+    try:
+        engine, manifest = build_ingestion(
+            settings, backend, index_path, batch_size, concurrency, full
+        )
+        crawler = WikipediaCrawler(
+            seeds,
+            max_concurrency=settings.crawl_concurrency,
+            requests_per_second=settings.crawl_rate_per_host,
+            fixtures_dir=fixtures_dir,
+        )
+
+        async def run():
+            try:
+                return await crawl_and_ingest(crawler, engine, manifest)
+            finally:
+                await crawler.aclose()
+
+        summary = asyncio.run(run())
+        print(f"Crawl completado: {summary}")
+        print(f"Ingesta: {summary.report}")
+    except Exception as e:
+        print(f"Error Crítico durante el crawl: {e}")
+        return
+
+    if not summary.documents:
+        print("Error Crítico: No se generaron documentos a partir de las páginas. Abortando.")
+        return
+    if summary.failed:
+        print(f"Aviso: {len(summary.failed)} páginas fallidas no estarán en el índice léxico.")
+
+    # 2. Índice léxico para la búsqueda híbrida
+    lexical_index_path = settings.lexical_index_path
+    print(f"[2/2] Construyendo el índice léxico BM25 en '{lexical_index_path}'...")
+    BM25Index.from_documents(summary.documents).save(lexical_index_path)
+
+    if summary.added or summary.changed or summary.removed:
+        invalidate_api_cache()
+
+    print("--- PIPELINE DE INGESTA COMPLETADO EXITOSAMENTE ---")
+
+
+def main(
+    backend: str = None,
+    index_path: str = None,
+    batch_size: int = None,
+    concurrency: int = None,
+    full: bool = False,
+    crawl: bool = False,
+    seeds_path: str = None,
+    fixtures_dir: str = None,
+    cache_only: bool = False,
+):
     """
     Orquesta el pipeline completo de Ingesta de Datos para el sistema RAG,
     asegurando que la metadata de la sección se preserve en cada paso.
+
+    En modo crawler (`crawl`), se descargan en paralelo todos los artículos de la lista
+    de semillas y cada uno se extrae, divide e indexa en cuanto llega.
+
+    Args:
+        backend (str, optional): `pinecone` o `local`. Por defecto, el de la configuración.
+        index_path (str, optional): Directorio donde se persiste el índice local.
+        batch_size (int, optional): Chunks por llamada a la API de embeddings.
+        concurrency (int, optional): Lotes de embeddings en paralelo.
+        full (bool): Si es True, se reindexan todos los chunks aunque no hayan cambiado.
+        crawl (bool): Si es True, se indexan todos los artículos de la lista de semillas.
+        seeds_path (str, optional): Fichero con la lista de semillas del crawler.
+        fixtures_dir (str, optional): Directorio de HTML grabado para el crawler sin red.
+        cache_only (bool): Si es True, la página se lee de la caché de páginas, sin red.
     """
+    settings = get_settings()
     print("--- INICIANDO PIPELINE DE INGESTA RAG ---")
 
+    if crawl:
+        crawl_main(settings, backend, index_path, batch_size, concurrency, full, seeds_path, fixtures_dir)
+        return
+
     # 1. Extracción de Datos
     print("[1/3] Extrayendo contenido de Wikipedia...")
-    extractor = DataExtractor()
-    raw_text = extractor.fetch_content()
+    cache = PageCache(settings.page_cache_dir) if settings.page_cache_dir else None
+    if cache_only and cache is None:
+        print("Error Crítico: --cache-only requiere PAGE_CACHE_DIR. Abortando.")
+        return
+    extractor = DataExtractor(cache=cache, cache_only=cache_only)
+    page = extractor.fetch_page()
+    if page is None:
+        print("Error Crítico: No se pudo extraer contenido. Abortando.")
+        return
+    if page.not_modified:
+        print("La página no cambió desde la última descarga (304); se usa la copia en caché.")
+    elif page.from_cache:
+        print("Página leída de la caché local (sin red).")
+
+    try:
+        engine, manifest = build_ingestion(
+            settings, backend, index_path, batch_size, concurrency, full
+        )
+    except Exception as e:
+        print(f"Error Crítico al conectar con el índice vectorial: {e}")
+        return
+
+    # Si el HTML es el mismo que se indexó la última vez, no hay nada que procesar.
+    lexical_index_path = settings.lexical_index_path
+    if manifest.pages.get(page.url) == page.content_hash and os.path.isdir(lexical_index_path):
+        print("El contenido no cambió desde la última ingesta; no hay nada que procesar.")
+        print("--- PIPELINE DE INGESTA COMPLETADO EXITOSAMENTE ---")
+        return
+
+    raw_text = extractor.extract(page)
     if not raw_text:
         print("Error Crítico: No se pudo extraer contenido. Abortando.")
         return
@@ -38,16 +273,36 @@ def main():
     print(f"Texto procesado en {len(documents)} documentos (chunks).")
 
     # 3. Almacenamiento en Vector Store
-    print(f"[3/3] Almacenando {len(documents)} documentos en Pinecone...")
+    print(f"[3/3] Almacenando {len(documents)} documentos en el índice vectorial...")
     try:
-        vector_store = VectorStore()
-        vector_store.add_documents(documents)
+        manifest.pages[page.url] = page.content_hash
+        diff, report = engine.ingest_incremental(documents, manifest)
+        print(f"Cambios respecto a la última ingesta: {diff}")
+        print(f"Ingesta completada: {report}")
     except Exception as e:
-        print(f"Error Crítico durante el almacenamiento en Pinecone: {e}")
+        print(f"Error Crítico durante el almacenamiento en el índice vectorial: {e}")
         return
 
+    # 4. Índice léxico para la búsqueda híbrida
+    print(f"Construyendo el índice léxico BM25 en '{lexical_index_path}'...")
+    BM25Index.from_documents(documents).save(lexical_index_path)
+
+    if not diff.is_empty:
+        invalidate_api_cache()
+
     print("--- PIPELINE DE INGESTA COMPLETADO EXITOSAMENTE ---")
 
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(
+        backend=args.backend,
+        index_path=args.index_path,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        full=args.full,
+        crawl=args.crawl,
+        seeds_path=args.seeds,
+        fixtures_dir=args.fixtures,
+        cache_only=args.cache_only,
+    )
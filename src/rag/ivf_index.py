@@ -0,0 +1,223 @@
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Número de puntos de entrenamiento por lista; por encima se submuestrea (como FAISS).
+TRAINING_POINTS_PER_LIST = 64
+# Filas por bloque al asignar vectores a centroides, para acotar la memoria temporal.
+ASSIGN_BATCH_SIZE = 65536
+
+
+def default_nlist(size: int) -> int:
+    """Número de listas recomendado para un índice de `size` vectores (≈ √n)."""
+    return max(1, int(math.sqrt(size)))
+
+
+class IVFFlatIndex:
+    """
+    Índice aproximado IVF-flat (inverted file) sobre vectores normalizados.
+
+    Los vectores se agrupan con k-means esférico en `nlist` listas. Cada lista guarda
+    sus vectores en un bloque float32 contiguo junto con la posición de cada vector en
+    el índice principal. Una búsqueda compara la consulta con los centroides, recorre
+    solo las `nprobe` listas más cercanas y calcula el top-k exacto dentro de ellas:
+    más listas exploradas dan más recall a cambio de más latencia.
+
+    El índice no conoce los documentos: trabaja con posiciones, y es `LocalVectorIndex`
+    quien lo mantiene sincronizado con su matriz de vectores.
+    """
+
+    def __init__(self, dimensions: int, nlist: int, nprobe: int = 8, seed: int = 0):
+        """
+        Inicializa un índice sin entrenar.
+
+        Args:
+            dimensions (int): Dimensión de los vectores.
+            nlist (int): Número de listas (centroides).
+            nprobe (int): Listas exploradas por defecto en cada búsqueda.
+            seed (int): Semilla del k-means, para que el entrenamiento sea reproducible.
+        """
+        self.dimensions = dimensions
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        # Tamaño del índice principal cuando se entrenó (para decidir reentrenamientos).
+        self.trained_size = 0
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._list_vectors: List[np.ndarray] = []
+        self._list_positions: List[np.ndarray] = []
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def __len__(self) -> int:
+        return len(self._assignments)
+
+    # --- Entrenamiento ---
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Devuelve el centroide más cercano (por similitud coseno) de cada vector."""
+        assignments = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), ASSIGN_BATCH_SIZE):
+            batch = vectors[start : start + ASSIGN_BATCH_SIZE]
+            assignments[start : start + len(batch)] = np.argmax(batch @ self.centroids.T, axis=1)
+        return assignments
+
+    def train(self, vectors: np.ndarray, iterations: int = 10) -> None:
+        """
+        Calcula los centroides con k-means esférico sobre una muestra de los vectores
+        y asigna todos los vectores a sus listas.
+
+        Args:
+            vectors (np.ndarray): Matriz de vectores normalizados del índice principal.
+            iterations (int): Iteraciones de k-means.
+        """
+        rng = np.random.default_rng(self.seed)
+        self.nlist = max(1, min(self.nlist, len(vectors)))
+        sample_size = min(len(vectors), self.nlist * TRAINING_POINTS_PER_LIST)
+        sample = vectors[rng.choice(len(vectors), size=sample_size, replace=False)]
+
+        centroids = sample[rng.choice(sample_size, size=self.nlist, replace=False)].copy()
+        for _ in range(iterations):
+            self.centroids = centroids
+            labels = self._assign(sample)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=self.nlist)
+
+            # Las listas vacías se reinicializan con puntos aleatorios de la muestra.
+            empty = np.flatnonzero(counts == 0)
+            if len(empty):
+                sums[empty] = sample[rng.choice(sample_size, size=len(empty))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        self.centroids = np.ascontiguousarray(centroids)
+        self.trained_size = len(vectors)
+        self.rebuild(vectors)
+
+    # --- Mantenimiento de las listas ---
+
+    def rebuild(self, vectors: np.ndarray, assignments: Optional[np.ndarray] = None) -> None:
+        """
+        Reconstruye las listas a partir de la matriz principal.
+
+        Args:
+            vectors (np.ndarray): Matriz de vectores normalizados del índice principal.
+            assignments (np.ndarray, optional): Lista de cada vector. Si no se provee, se calcula.
+        """
+        if assignments is None:
+            assignments = self._assign(vectors)
+        self._assignments = np.asarray(assignments, dtype=np.int32)
+
+        order = np.argsort(self._assignments, kind="stable")
+        bounds = np.cumsum(np.bincount(self._assignments, minlength=self.nlist))[:-1]
+        self._list_positions = np.split(order.astype(np.int64), bounds)
+        self._list_vectors = [np.ascontiguousarray(vectors[p]) for p in self._list_positions]
+
+    def add(self, start: int, vectors: np.ndarray) -> None:
+        """
+        Añade vectores nuevos, que ocupan las posiciones `start`, `start + 1`, ... del
+        índice principal, a la lista de su centroide más cercano (sin reentrenar).
+
+        Args:
+            start (int): Posición del primer vector en el índice principal.
+            vectors (np.ndarray): Vectores normalizados a añadir.
+        """
+        labels = self._assign(vectors)
+        positions = np.arange(start, start + len(vectors), dtype=np.int64)
+        self._assignments = np.concatenate([self._assignments, labels])
+        for label in np.unique(labels):
+            mask = labels == label
+            self._list_vectors[label] = np.concatenate(
+                [self._list_vectors[label], vectors[mask]]
+            )
+            self._list_positions[label] = np.concatenate(
+                [self._list_positions[label], positions[mask]]
+            )
+
+    def swap_remove(self, position: int, last: int) -> None:
+        """
+        Refleja en las listas un borrado del índice principal por intercambio con la
+        última fila: el vector de `position` se elimina y el de `last` pasa a ocupar
+        `position`. Solo toca las listas de esos dos vectores.
+
+        Args:
+            position (int): Posición del vector eliminado.
+            last (int): Última posición ocupada del índice principal antes del borrado.
+        """
+        label = self._assignments[position]
+        positions = self._list_positions[label]
+        offset = int(np.flatnonzero(positions == position)[0])
+        self._list_positions[label] = np.delete(positions, offset)
+        self._list_vectors[label] = np.delete(self._list_vectors[label], offset, axis=0)
+        if last != position:
+            moved_label = self._assignments[last]
+            moved = self._list_positions[moved_label]
+            self._list_positions[moved_label] = np.where(moved == last, position, moved)
+            self._assignments[position] = moved_label
+        self._assignments = self._assignments[:last]
+
+    # --- Búsqueda ---
+
+    def search(
+        self, query: np.ndarray, k: int, nprobe: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Busca los `k` vectores más similares a una consulta normalizada.
+
+        Args:
+            query (np.ndarray): Vector de la consulta, normalizado.
+            k (int): Número de resultados.
+            nprobe (int, optional): Listas a explorar. Por defecto, `self.nprobe`.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Posiciones en el índice principal y sus
+            similitudes, ordenadas de mayor a menor.
+        """
+        nprobe = max(1, min(nprobe or self.nprobe, self.nlist))
+        centroid_scores = self.centroids @ query
+        if nprobe < self.nlist:
+            probe = np.argpartition(centroid_scores, -nprobe)[-nprobe:]
+        else:
+            probe = np.arange(self.nlist)
+
+        probe = [label for label in probe if len(self._list_positions[label])]
+        if not probe:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        scores = np.concatenate([self._list_vectors[label] @ query for label in probe])
+        positions = np.concatenate([self._list_positions[label] for label in probe])
+
+        k = min(k, len(scores))
+        if k < len(scores):
+            top = np.argpartition(scores, -k)[-k:]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(scores[top])[::-1]]
+        return positions[top], scores[top]
+
+    # --- Persistencia ---
+
+    def state(self) -> dict:
+        """Arrays necesarios para restaurar el índice sin reentrenar."""
+        return {
+            "centroids": self.centroids,
+            "assignments": self._assignments,
+            "trained_size": np.asarray(self.trained_size),
+        }
+
+    @classmethod
+    def from_state(
+        cls, state: dict, vectors: np.ndarray, nprobe: int = 8
+    ) -> "IVFFlatIndex":
+        """Restaura un índice guardado con `state()` sobre la matriz principal."""
+        centroids = np.asarray(state["centroids"], dtype=np.float32)
+        index = cls(centroids.shape[1], len(centroids), nprobe=nprobe)
+        index.centroids = centroids
+        index.trained_size = int(state["trained_size"])
+        index.rebuild(vectors, state["assignments"])
+        return index
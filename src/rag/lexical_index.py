@@ -0,0 +1,307 @@
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+POSTINGS_FILE = "postings.npz"
+DOCUMENTS_FILE = "documents.json"
+
+# Palabras vacías del español (ya sin tildes), que no aportan a la búsqueda léxica.
+SPANISH_STOPWORDS = frozenset(
+    """
+    a al algo algunas algunos ante antes como con contra cual cuales cuando de del desde
+    donde dos el ella ellas ellos en entre era eran es esa esas ese eso esos esta estas
+    este esto estos fue fueron ha han hasta hay la las le les lo los mas me mi mis muy
+    ni no nos o os otra otras otro otros para pero poco por porque que quien quienes se
+    sea ser si sin sobre son su sus tambien tan te ti tu tus un una unas uno unos y ya
+    cuanto cuanta cuantos cuantas
+    """.split()
+)
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def fold_accents(text: str) -> str:
+    """Pasa el texto a minúsculas y elimina tildes y diacríticos ("Bolívar" -> "bolivar")."""
+    decomposed = unicodedata.normalize("NFD", text.lower())
+    return "".join(c for c in decomposed if unicodedata.category(c) != "Mn")
+
+
+def stem(word: str) -> str:
+    """
+    Stemmer ligero para el español: elimina el plural y la vocal final de género, de
+    modo que "colombianos", "colombiana" y "colombiano" comparten la raíz "colombian".
+    Los números (años, fechas) se conservan intactos.
+    """
+    if word.isdigit() or len(word) <= 4:
+        return word
+    if word.endswith("es") and len(word) > 5:
+        word = word[:-2]
+    elif word.endswith("s"):
+        word = word[:-1]
+    if word[-1] in "aoe" and len(word) > 4:
+        word = word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Convierte un texto en la lista de términos indexables (sin tildes, sin palabras vacías, con stemming)."""
+    return [
+        stem(token)
+        for token in _TOKEN_PATTERN.findall(fold_accents(text))
+        if token not in SPANISH_STOPWORDS
+    ]
+
+
+def reciprocal_rank_fusion(
+    result_lists: Sequence[Sequence[Tuple[Document, float]]], k: int = 60, top_n: int = 5
+) -> List[Tuple[Document, float]]:
+    """
+    Combina varias listas de resultados ordenadas con Reciprocal Rank Fusion.
+
+    Cada documento suma `1 / (k + rango)` por cada lista en la que aparece, de modo que
+    no es necesario que los scores de las distintas búsquedas sean comparables. Los
+    documentos se identifican por su contenido.
+
+    Args:
+        result_lists: Listas de pares (documento, score), cada una ordenada de mejor a peor.
+        k (int): Constante de suavizado de RRF.
+        top_n (int): Número de resultados a devolver.
+
+    Returns:
+        List[Tuple[Document, float]]: Los documentos fusionados con su score RRF.
+    """
+    fused: Dict[str, float] = {}
+    documents: Dict[str, Document] = {}
+    for results in result_lists:
+        for rank, (doc, _) in enumerate(results, start=1):
+            key = doc.page_content
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank)
+            documents.setdefault(key, doc)
+    ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top_n]
+    return [(documents[key], score) for key, score in ranked]
+
+
+class BM25Index:
+    """
+    Índice invertido BM25 en memoria para búsqueda léxica en español.
+
+    Se construye durante la ingesta a partir de los chunks de `TextProcessor`. Las listas
+    de postings se guardan en formato CSR (arrays contiguos `indptr`, `doc_ids` y
+    `weights`), y cada posting almacena ya su peso BM25, así que una consulta se resuelve
+    sumando con NumPy los pesos de las listas de sus términos.
+
+    Complementa a la búsqueda vectorial en preguntas sobre nombres propios, fechas y
+    cifras exactas, donde los embeddings tienden a recuperar chunks genéricos.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Inicializa un índice vacío.
+
+        Args:
+            k1 (float): Saturación de la frecuencia de término de BM25.
+            b (float): Normalización por longitud del documento de BM25.
+        """
+        self.k1 = k1
+        self.b = b
+        self.vocabulary: Dict[str, int] = {}
+        self.idf = np.zeros(0, dtype=np.float32)
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.doc_ids = np.zeros(0, dtype=np.int32)
+        self.weights = np.zeros(0, dtype=np.float32)
+        self._texts: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Document], **params: float) -> "BM25Index":
+        """
+        Construye el índice a partir de documentos de LangChain.
+
+        Args:
+            documents (Iterable[Document]): Los chunks a indexar.
+            **params: Parámetros de BM25 (`k1`, `b`).
+
+        Returns:
+            BM25Index: El índice construido.
+        """
+        index = cls(**params)
+        documents = list(documents)
+        index._texts = [doc.page_content for doc in documents]
+        index._metadatas = [dict(doc.metadata) for doc in documents]
+
+        term_counts = [Counter(tokenize(text)) for text in index._texts]
+        lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.float32)
+        average_length = float(lengths.mean()) if len(lengths) and lengths.mean() else 1.0
+
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for doc_id, counts in enumerate(term_counts):
+            for term, count in counts.items():
+                postings.setdefault(term, []).append((doc_id, count))
+
+        index.vocabulary = {term: i for i, term in enumerate(sorted(postings))}
+        n_docs = len(documents)
+        indptr = [0]
+        doc_ids: List[int] = []
+        frequencies: List[int] = []
+        idf = np.zeros(len(index.vocabulary), dtype=np.float32)
+        for term, term_id in index.vocabulary.items():
+            entries = postings[term]
+            idf[term_id] = math.log(1 + (n_docs - len(entries) + 0.5) / (len(entries) + 0.5))
+            doc_ids.extend(doc_id for doc_id, _ in entries)
+            frequencies.extend(count for _, count in entries)
+            indptr.append(len(doc_ids))
+
+        index.idf = idf
+        index.indptr = np.asarray(indptr, dtype=np.int64)
+        index.doc_ids = np.asarray(doc_ids, dtype=np.int32)
+        tf = np.asarray(frequencies, dtype=np.float32)
+        posting_terms = np.repeat(np.arange(len(idf)), np.diff(index.indptr))
+        norm = index.k1 * (1 - index.b + index.b * lengths[index.doc_ids] / average_length)
+        index.weights = (idf[posting_terms] * tf * (index.k1 + 1) / (tf + norm)).astype(
+            np.float32
+        )
+        return index
+
+    def _query_terms(self, query: str) -> List[str]:
+        return list(dict.fromkeys(tokenize(query)))
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[Document, float]]:
+        """
+        Devuelve los `k` documentos con mayor score BM25 para la consulta.
+
+        Args:
+            query (str): La consulta en lenguaje natural.
+            k (int): Número de resultados.
+
+        Returns:
+            List[Tuple[Document, float]]: Pares (documento, score BM25) de mayor a menor.
+        """
+        results, _ = self.search_with_confidence(query, k)
+        return results
+
+    def search_with_confidence(
+        self, query: str, k: int = 5
+    ) -> Tuple[List[Tuple[Document, float]], float]:
+        """
+        Igual que `search`, pero devuelve además la confianza de la coincidencia léxica.
+
+        La confianza (entre 0 y 1) es alta solo si el mejor documento contiene todos los
+        términos discriminativos de la consulta (cobertura ponderada por IDF) y además
+        destaca claramente sobre el segundo (margen `1 - s2 / s1`). Los términos que no
+        aparecen en el corpus cuentan como no cubiertos.
+
+        Returns:
+            Tuple[List[Tuple[Document, float]], float]: Los resultados y su confianza.
+        """
+        terms = self._query_terms(query)
+        if not terms or not len(self):
+            return [], 0.0
+
+        scores = np.zeros(len(self), dtype=np.float32)
+        matched_ranges = []
+        for term in terms:
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self.indptr[term_id], self.indptr[term_id + 1]
+            np.add.at(scores, self.doc_ids[start:end], self.weights[start:end])
+            matched_ranges.append((term_id, start, end))
+
+        k = min(k, len(scores))
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(scores[top])[::-1]]
+        top = [int(i) for i in top if scores[i] > 0]
+        if not top:
+            return [], 0.0
+
+        results = [(self._document(i), float(scores[i])) for i in top]
+        return results, self._confidence(terms, matched_ranges, scores, top)
+
+    def _confidence(self, terms, matched_ranges, scores, top) -> float:
+        # Los términos desconocidos pesan como el término más raro del corpus.
+        max_idf = float(self.idf.max()) if len(self.idf) else 1.0
+        total = max_idf * (len(terms) - len(matched_ranges))
+        covered = 0.0
+        best = top[0]
+        for term_id, start, end in matched_ranges:
+            total += float(self.idf[term_id])
+            if best in self.doc_ids[start:end]:
+                covered += float(self.idf[term_id])
+        coverage = covered / total if total else 0.0
+
+        second = float(scores[top[1]]) if len(top) > 1 else 0.0
+        margin = 1.0 - second / float(scores[best])
+        return coverage * margin
+
+    def _document(self, position: int) -> Document:
+        return Document(page_content=self._texts[position], metadata=dict(self._metadatas[position]))
+
+    # --- Persistencia ---
+
+    def save(self, path: str) -> None:
+        """
+        Guarda el índice en disco: los arrays de postings en `postings.npz` y el
+        vocabulario y los documentos en `documents.json`.
+
+        Args:
+            path (str): Directorio destino.
+        """
+        os.makedirs(path, exist_ok=True)
+        postings_tmp = os.path.join(path, POSTINGS_FILE + ".tmp")
+        with open(postings_tmp, "wb") as f:
+            np.savez(
+                f, idf=self.idf, indptr=self.indptr, doc_ids=self.doc_ids, weights=self.weights
+            )
+        documents_tmp = os.path.join(path, DOCUMENTS_FILE + ".tmp")
+        with open(documents_tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "k1": self.k1,
+                    "b": self.b,
+                    "vocabulary": list(self.vocabulary),
+                    "texts": self._texts,
+                    "metadatas": self._metadatas,
+                },
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(postings_tmp, os.path.join(path, POSTINGS_FILE))
+        os.replace(documents_tmp, os.path.join(path, DOCUMENTS_FILE))
+
+    @classmethod
+    def load(cls, path: Optional[str]) -> "BM25Index":
+        """
+        Carga un índice guardado con `save()`, o devuelve uno vacío si no existe.
+
+        Args:
+            path (str): Directorio del índice.
+
+        Returns:
+            BM25Index: El índice cargado.
+        """
+        documents_path = os.path.join(path, DOCUMENTS_FILE) if path else ""
+        if not path or not os.path.exists(documents_path):
+            return cls()
+
+        with open(documents_path, encoding="utf-8") as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        index.vocabulary = {term: i for i, term in enumerate(data["vocabulary"])}
+        index._texts = data["texts"]
+        index._metadatas = data["metadatas"]
+        with np.load(os.path.join(path, POSTINGS_FILE)) as arrays:
+            index.idf = arrays["idf"]
+            index.indptr = arrays["indptr"]
+            index.doc_ids = arrays["doc_ids"]
+            index.weights = arrays["weights"]
+        return index
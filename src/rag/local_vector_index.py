@@ -0,0 +1,440 @@
+import json
+import os
+import uuid
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore as LangchainVectorStore
+
+from src.rag.ivf_index import IVFFlatIndex, default_nlist
+
+VECTORS_FILE = "vectors.npy"
+DOCUMENTS_FILE = "documents.json"
+ANN_FILE = "ivf.npz"
+
+FLAT_INDEX = "flat"
+IVF_INDEX = "ivf"
+# Al superar este múltiplo del tamaño con el que se entrenó, el índice IVF se reentrena
+# para que las listas no se desequilibren con las inserciones incrementales.
+ANN_RETRAIN_GROWTH = 4
+
+
+class LocalVectorIndex(LangchainVectorStore):
+    """
+    Índice vectorial en memoria del proceso basado en NumPy.
+
+    Alternativa local a Pinecone para corpus que caben en RAM (unos pocos cientos de
+    chunks de un artículo). Los vectores se guardan normalizados en una matriz float32
+    contigua, por lo que la similitud coseno con la consulta se obtiene con un único
+    producto matriz-vector, y el top-k se selecciona con `argpartition` sin ordenar
+    todo el índice. Los textos, metadatos e IDs se guardan en listas paralelas.
+
+    Implementa la interfaz de `VectorStore` de LangChain, así que puede usarse en lugar
+    del almacén de Pinecone sin cambiar el resto del pipeline.
+
+    Con `index_type="ivf"`, a partir de `ann_min_size` vectores las búsquedas usan un
+    índice aproximado IVF-flat (`IVFFlatIndex`) en lugar de recorrer toda la matriz. Por
+    debajo de ese tamaño la búsqueda exacta ya es más rápida, y se mantiene.
+    """
+
+    def __init__(
+        self,
+        embedding: Embeddings,
+        dimensions: int,
+        path: Optional[str] = None,
+        index_type: str = FLAT_INDEX,
+        nlist: int = 0,
+        nprobe: int = 8,
+        ann_min_size: int = 10000,
+    ):
+        """
+        Inicializa un índice vacío.
+
+        Args:
+            embedding (Embeddings): Modelo de embeddings para textos y consultas.
+            dimensions (int): Dimensión de los vectores.
+            path (str, optional): Directorio donde se persiste el índice con `save()`.
+            index_type (str): `flat` (búsqueda exacta) o `ivf` (búsqueda aproximada).
+            nlist (int): Listas del índice IVF. Con 0 se elige ≈ √n al entrenar.
+            nprobe (int): Listas exploradas por defecto en cada búsqueda IVF.
+            ann_min_size (int): Número de vectores a partir del cual se entrena el índice IVF.
+        """
+        if index_type not in (FLAT_INDEX, IVF_INDEX):
+            raise ValueError(f"Tipo de índice local desconocido: {index_type}")
+        self._embedding = embedding
+        self.dimensions = dimensions
+        self.path = path
+        self.index_type = index_type
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.ann_min_size = ann_min_size
+        self._reset()
+
+    def _reset(self) -> None:
+        self._vectors = np.zeros((0, self.dimensions), dtype=np.float32)
+        self._size = 0
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._positions: Dict[str, int] = {}
+        self._ann: Optional[IVFFlatIndex] = None
+
+    # --- Propiedades ---
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Vista de la matriz de vectores normalizados (solo filas ocupadas)."""
+        return self._vectors[: self._size]
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def uses_ann(self) -> bool:
+        """Indica si las búsquedas usan el índice aproximado."""
+        return self._ann is not None
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        # Los scores ya son similitudes coseno, como los que devuelve Pinecone.
+        return lambda score: score
+
+    # --- Escritura ---
+
+    @staticmethod
+    def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _reserve(self, extra: int) -> None:
+        """Amplía la capacidad de la matriz (duplicándola) para añadir `extra` filas."""
+        needed = self._size + extra
+        capacity = self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 64)
+        grown = np.zeros((new_capacity, self.dimensions), dtype=np.float32)
+        grown[: self._size] = self._vectors[: self._size]
+        self._vectors = grown
+
+    def add_embeddings(
+        self,
+        texts: Sequence[str],
+        embeddings: Sequence[Sequence[float]],
+        metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+        ids: Optional[Sequence[str]] = None,
+    ) -> List[str]:
+        """
+        Añade vectores ya calculados al índice. Los IDs existentes se reemplazan.
+
+        Args:
+            texts (Sequence[str]): Textos de los documentos.
+            embeddings (Sequence[Sequence[float]]): Vectores de los documentos.
+            metadatas (Sequence[Dict], optional): Metadatos de cada documento.
+            ids (Sequence[str], optional): IDs de los documentos. Si no se proveen, se generan.
+
+        Returns:
+            List[str]: Los IDs de los documentos añadidos.
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        ids = self._append(texts, embeddings, metadatas, ids)
+
+        # Las inserciones incrementales se asignan a la lista IVF más cercana; el índice
+        # se (re)entrena solo cuando el corpus ha crecido lo suficiente.
+        if self._ann is not None:
+            start = self._size - len(set(ids))
+            self._ann.add(start, self._vectors[start : self._size])
+        self._maybe_train_ann()
+        return ids
+
+    def _append(
+        self,
+        texts: List[str],
+        embeddings: Sequence[Sequence[float]],
+        metadatas: Optional[Sequence[Dict[str, Any]]],
+        ids: Optional[Sequence[str]],
+    ) -> List[str]:
+        """Añade filas a la matriz y a las listas de documentos, sin tocar el índice IVF."""
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+
+        vectors = np.asarray(embeddings, dtype=np.float32).reshape(len(texts), self.dimensions)
+        vectors = self._normalize_rows(vectors)
+
+        # Un ID repetido dentro del lote se guarda una sola vez: gana su última aparición.
+        last_rows = {id_: row for row, id_ in enumerate(ids)}
+        if len(last_rows) < len(ids):
+            rows = sorted(last_rows.values())
+            vectors = vectors[rows]
+            texts = [texts[row] for row in rows]
+            metadatas = [metadatas[row] for row in rows]
+            ids_to_add = [ids[row] for row in rows]
+        else:
+            ids_to_add = ids
+
+        # Los IDs ya presentes se eliminan primero para que la operación sea un upsert.
+        existing = [id_ for id_ in ids_to_add if id_ in self._positions]
+        if existing:
+            self.delete(existing)
+
+        self._reserve(len(texts))
+        start = self._size
+        self._vectors[start : start + len(texts)] = vectors
+        self._size += len(texts)
+        for offset, (id_, text, metadata) in enumerate(zip(ids_to_add, texts, metadatas)):
+            self._positions[id_] = start + offset
+            self._ids.append(id_)
+            self._texts.append(text)
+            self._metadatas.append(dict(metadata))
+        return ids
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """Calcula los embeddings de los textos y los añade al índice."""
+        texts = list(texts)
+        embeddings = self._embedding.embed_documents(texts)
+        return self.add_embeddings(texts, embeddings, metadatas, ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """
+        Elimina documentos por ID (o todos si `ids` es None).
+
+        Cada fila eliminada se sustituye por la última de la matriz, de modo que el coste
+        es proporcional al número de IDs eliminados y no al tamaño del índice, y la
+        capacidad reservada se conserva para las inserciones siguientes. El orden de
+        las filas no se mantiene.
+        """
+        if ids is None:
+            self._reset()
+            return True
+
+        remove = {self._positions[id_] for id_ in ids if id_ in self._positions}
+        if not remove:
+            return False
+
+        # De mayor a menor: la última fila nunca es una de las que faltan por eliminar.
+        for position in sorted(remove, reverse=True):
+            last = self._size - 1
+            del self._positions[self._ids[position]]
+            if position != last:
+                self._vectors[position] = self._vectors[last]
+                self._ids[position] = self._ids[last]
+                self._texts[position] = self._texts[last]
+                self._metadatas[position] = self._metadatas[last]
+                self._positions[self._ids[position]] = position
+            self._ids.pop()
+            self._texts.pop()
+            self._metadatas.pop()
+            self._size = last
+            if self._ann is not None:
+                self._ann.swap_remove(position, last)
+
+        if self._ann is not None and not self._size:
+            self._ann = None
+        return True
+
+    # --- Índice aproximado ---
+
+    def train_ann(self) -> None:
+        """
+        Entrena (o reentrena) el índice IVF con los vectores actuales.
+        """
+        nlist = self.nlist or default_nlist(self._size)
+        ann = IVFFlatIndex(self.dimensions, nlist, nprobe=self.nprobe)
+        ann.train(self.vectors)
+        self._ann = ann
+
+    def _maybe_train_ann(self) -> None:
+        if self.index_type != IVF_INDEX or self._size < self.ann_min_size:
+            return
+        if self._ann is None or self._size >= ANN_RETRAIN_GROWTH * self._ann.trained_size:
+            self.train_ann()
+
+    # --- Lectura ---
+
+    def _document(self, position: int) -> Document:
+        return Document(
+            id=self._ids[position],
+            page_content=self._texts[position],
+            metadata=dict(self._metadatas[position]),
+        )
+
+    def get_by_ids(self, ids: Sequence[str], /) -> List[Document]:
+        return [self._document(self._positions[id_]) for id_ in ids if id_ in self._positions]
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        nprobe: Optional[int] = None,
+        exact: bool = False,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        """
+        Devuelve los `k` documentos más similares a un vector, con su similitud coseno.
+
+        Args:
+            embedding (List[float]): Vector de la consulta.
+            k (int): Número de resultados.
+            nprobe (int, optional): Listas IVF a explorar en esta búsqueda (más listas,
+                más recall y más latencia). Por defecto, el `nprobe` del índice.
+            exact (bool): Fuerza la búsqueda exacta aunque haya índice aproximado.
+
+        Returns:
+            List[Tuple[Document, float]]: Pares (documento, score) ordenados de mayor a menor.
+        """
+        if self._size == 0 or k <= 0:
+            return []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        if self._ann is not None and not exact:
+            positions, scores = self._ann.search(query, k, nprobe=nprobe)
+            return [
+                (self._document(int(i)), float(score)) for i, score in zip(positions, scores)
+            ]
+
+        scores = self.vectors @ query
+        k = min(k, self._size)
+        if k < self._size:
+            top = np.argpartition(scores, -k)[-k:]
+        else:
+            top = np.arange(self._size)
+        top = top[np.argsort(scores[top])[::-1]]
+        return [(self._document(int(i)), float(scores[i])) for i in top]
+
+    def similarity_search_by_vector(
+        self, embedding: List[float], k: int = 4, **kwargs: Any
+    ) -> List[Document]:
+        return [
+            doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k, **kwargs)
+        ]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        return self.similarity_search_by_vector_with_score(
+            self._embedding.embed_query(query), k=k, **kwargs
+        )
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, **kwargs)]
+
+    # --- Persistencia ---
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Guarda el índice en disco: la matriz en `vectors.npy`, los documentos en
+        `documents.json` y, si existe, el índice IVF (centroides y asignaciones) en
+        `ivf.npz`. La escritura es atómica (fichero temporal + reemplazo).
+
+        Args:
+            path (str, optional): Directorio destino. Por defecto, el del constructor.
+        """
+        path = path or self.path
+        if not path:
+            raise ValueError("No se indicó un directorio para guardar el índice local")
+        os.makedirs(path, exist_ok=True)
+
+        vectors_tmp = os.path.join(path, VECTORS_FILE + ".tmp")
+        with open(vectors_tmp, "wb") as f:
+            np.save(f, self.vectors)
+        documents_tmp = os.path.join(path, DOCUMENTS_FILE + ".tmp")
+        with open(documents_tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "dimensions": self.dimensions,
+                    "ids": self._ids,
+                    "texts": self._texts,
+                    "metadatas": self._metadatas,
+                },
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(vectors_tmp, os.path.join(path, VECTORS_FILE))
+        os.replace(documents_tmp, os.path.join(path, DOCUMENTS_FILE))
+
+        ann_path = os.path.join(path, ANN_FILE)
+        if self._ann is not None:
+            ann_tmp = ann_path + ".tmp"
+            with open(ann_tmp, "wb") as f:
+                np.savez(f, **self._ann.state())
+            os.replace(ann_tmp, ann_path)
+        elif os.path.exists(ann_path):
+            os.remove(ann_path)
+
+    @classmethod
+    def load(
+        cls, path: str, embedding: Embeddings, dimensions: int, **options: Any
+    ) -> "LocalVectorIndex":
+        """
+        Carga un índice guardado con `save()`, o crea uno vacío si el directorio no existe.
+
+        El índice IVF guardado se restaura sin reentrenar; si no existe y el índice es de
+        tipo `ivf` con suficientes vectores, se entrena al cargar.
+
+        Args:
+            path (str): Directorio del índice.
+            embedding (Embeddings): Modelo de embeddings.
+            dimensions (int): Dimensión esperada de los vectores.
+            **options: Opciones del índice (`index_type`, `nlist`, `nprobe`, `ann_min_size`).
+
+        Returns:
+            LocalVectorIndex: El índice cargado.
+        """
+        index = cls(embedding, dimensions, path=path, **options)
+        documents_path = os.path.join(path, DOCUMENTS_FILE)
+        if not os.path.exists(documents_path):
+            return index
+
+        with open(documents_path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data["dimensions"] != dimensions:
+            raise ValueError(
+                f"El índice local tiene dimensión {data['dimensions']}, se esperaba {dimensions}"
+            )
+        vectors = np.load(os.path.join(path, VECTORS_FILE))
+        if len(vectors):
+            index._append(data["texts"], vectors, data["metadatas"], data["ids"])
+
+        ann_path = os.path.join(path, ANN_FILE)
+        if index.index_type == IVF_INDEX and os.path.exists(ann_path):
+            with np.load(ann_path) as state:
+                index._ann = IVFFlatIndex.from_state(state, index.vectors, nprobe=index.nprobe)
+        index._maybe_train_ann()
+        return index
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        *,
+        ids: Optional[List[str]] = None,
+        dimensions: Optional[int] = None,
+        path: Optional[str] = None,
+        **kwargs: Any,
+    ) -> "LocalVectorIndex":
+        """Construye un índice a partir de textos, calculando sus embeddings."""
+        embeddings = embedding.embed_documents(texts)
+        index = cls(embedding, dimensions or len(embeddings[0]), path=path)
+        index.add_embeddings(texts, embeddings, metadatas, ids)
+        return index
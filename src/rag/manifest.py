@@ -0,0 +1,198 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Collection, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+MANIFEST_VERSION = 1
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(document: Document) -> str:
+    """
+    ID determinista de un chunk: hash de su URL de origen, su sección y el hash de su
+    contenido. Un mismo chunk recibe siempre el mismo ID, así que volver a indexarlo
+    reemplaza su vector en lugar de duplicarlo.
+    """
+    key = "\x1f".join(
+        (
+            document.metadata.get("source", ""),
+            document.metadata.get("section", ""),
+            content_hash(document.page_content),
+        )
+    )
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+@dataclass
+class ManifestDiff:
+    """Diferencia entre los chunks de una ingesta y los que ya están indexados."""
+
+    # Chunks nuevos y modificados, con su ID: son los únicos que se embeben.
+    added: List[Tuple[str, Document]] = field(default_factory=list)
+    changed: List[Tuple[str, Document]] = field(default_factory=list)
+    # IDs a borrar del índice: chunks desaparecidos y versiones antiguas de los modificados.
+    removed: List[str] = field(default_factory=list)
+    replaced: List[str] = field(default_factory=list)
+    unchanged: int = 0
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.changed or self.removed)
+
+    def __str__(self) -> str:
+        return (
+            f"{len(self.added)} nuevos, {len(self.changed)} modificados, "
+            f"{len(self.removed)} eliminados, {self.unchanged} sin cambios"
+        )
+
+
+class IngestionManifest:
+    """
+    Registro local de los chunks ya indexados, guardado como JSON.
+
+    Para cada ID de chunk (`chunk_id`) guarda su fuente, su sección y su posición dentro
+    de la sección. Con él, una nueva ingesta solo embebe los chunks nuevos o modificados
+    y borra del índice los que desaparecieron del artículo. Un chunk cuyo ID no está en
+    el manifiesto cuenta como modificado si ocupa la posición de uno que ya no existe en
+    la misma sección, y como nuevo en caso contrario.
+
+    También guarda el hash del HTML del que salió cada fuente (`pages`), para que una
+    página que no cambió desde la última ingesta no se vuelva a procesar.
+
+    El manifiesto pertenece a un índice concreto (`index_key`, p. ej. backend y nombre):
+    si se ingesta en otro índice, se ignora y se indexa todo de nuevo.
+    """
+
+    def __init__(self, path: Optional[str], index_key: str = ""):
+        """
+        Args:
+            path (str, optional): Fichero JSON del manifiesto. Con None, no se persiste.
+            index_key (str): Identificador del índice vectorial al que corresponde.
+        """
+        self.path = path
+        self.index_key = index_key
+        self.chunks: Dict[str, Dict[str, object]] = {}
+        self.pages: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    @classmethod
+    def load(cls, path: Optional[str], index_key: str = "") -> "IngestionManifest":
+        """Carga el manifiesto, o devuelve uno vacío si no existe o es de otro índice."""
+        manifest = cls(path, index_key)
+        if not path or not os.path.exists(path):
+            return manifest
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != MANIFEST_VERSION or data.get("index") != index_key:
+            print(f"Aviso: el manifiesto '{path}' corresponde a otro índice; se reindexará todo.")
+            return manifest
+        manifest.chunks = data["chunks"]
+        manifest.pages = data.get("pages", {})
+        return manifest
+
+    def save(self) -> None:
+        """Guarda el manifiesto de forma atómica."""
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": MANIFEST_VERSION,
+                    "index": self.index_key,
+                    "chunks": self.chunks,
+                    "pages": self.pages,
+                },
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _entries(documents: Sequence[Document]) -> Dict[str, Dict[str, object]]:
+        entries: Dict[str, Dict[str, object]] = {}
+        positions: Dict[Tuple[str, str], int] = {}
+        for doc in documents:
+            id_ = chunk_id(doc)
+            if id_ in entries:
+                continue
+            source = doc.metadata.get("source", "")
+            section = doc.metadata.get("section", "")
+            position = positions.get((source, section), 0)
+            positions[(source, section)] = position + 1
+            entries[id_] = {"source": source, "section": section, "position": position}
+        return entries
+
+    def _indexed(self, sources: Optional[Collection[str]]) -> Dict[str, Dict[str, object]]:
+        if sources is None:
+            return self.chunks
+        return {id_: entry for id_, entry in self.chunks.items() if entry["source"] in sources}
+
+    def diff(
+        self, documents: Sequence[Document], sources: Optional[Collection[str]] = None
+    ) -> ManifestDiff:
+        """
+        Compara los chunks de una nueva ingesta con los indexados.
+
+        Args:
+            documents (Sequence[Document]): Los chunks actuales del corpus.
+            sources (Collection[str], optional): Si se provee, `documents` son solo los
+                chunks de esas fuentes (p. ej. una página recién descargada) y los chunks
+                indexados de otras fuentes no se consideran eliminados.
+
+        Returns:
+            ManifestDiff: Los chunks a embeber, los IDs a borrar y el número sin cambios.
+        """
+        entries = self._entries(documents)
+        by_id = {chunk_id(doc): doc for doc in documents}
+
+        indexed = self._indexed(sources)
+        gone = {id_: entry for id_, entry in indexed.items() if id_ not in entries}
+        gone_slots = {
+            (entry["source"], entry["section"], entry["position"]): id_ for id_, entry in gone.items()
+        }
+
+        result = ManifestDiff()
+        for id_, entry in entries.items():
+            if id_ in indexed:
+                result.unchanged += 1
+                continue
+            previous = gone_slots.pop((entry["source"], entry["section"], entry["position"]), None)
+            if previous is None:
+                result.added.append((id_, by_id[id_]))
+            else:
+                result.changed.append((id_, by_id[id_]))
+                result.replaced.append(previous)
+        result.removed = list(gone_slots.values())
+        return result
+
+    def update(
+        self, documents: Sequence[Document], sources: Optional[Collection[str]] = None
+    ) -> None:
+        """
+        Reemplaza el contenido del manifiesto por los chunks actuales del corpus (o solo
+        los de las fuentes `sources`, ver `diff`).
+        """
+        if sources is None:
+            self.chunks = self._entries(documents)
+        else:
+            for id_ in self._indexed(sources):
+                del self.chunks[id_]
+            self.chunks.update(self._entries(documents))
+        indexed = set(self.sources())
+        self.pages = {source: hash_ for source, hash_ in self.pages.items() if source in indexed}
+
+    def sources(self) -> List[str]:
+        """Fuentes (URLs) con chunks indexados."""
+        return sorted({entry["source"] for entry in self.chunks.values()})
@@ -0,0 +1,120 @@
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+from src.rag.manifest import content_hash
+
+INDEX_FILE = "index.json"
+
+
+@dataclass
+class CachedPage:
+    """Entrada de la caché de páginas: la última versión descargada de una URL."""
+
+    url: str
+    content_hash: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0.0
+
+
+class PageCache:
+    """
+    Caché en disco del HTML descargado, direccionada por contenido.
+
+    Cada página se guarda una sola vez como `<hash>.html` (sha256 del HTML) y un índice
+    JSON asocia cada URL con el hash de su última versión y sus cabeceras `ETag` y
+    `Last-Modified`, con las que las siguientes descargas se hacen condicionales. Las
+    versiones que ya no referencia ninguna URL se borran.
+    """
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory (str): Directorio de la caché (se crea si no existe).
+        """
+        self.directory = directory
+        self.entries: Dict[str, CachedPage] = {}
+        index_path = os.path.join(directory, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, encoding="utf-8") as f:
+                self.entries = {url: CachedPage(**entry) for url, entry in json.load(f).items()}
+
+    def _object_path(self, hash_: str) -> str:
+        return os.path.join(self.directory, f"{hash_}.html")
+
+    def _save_index(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({url: asdict(entry) for url, entry in self.entries.items()}, f, ensure_ascii=False)
+        os.replace(index_path + ".tmp", index_path)
+
+    def get(self, url: str) -> Optional[CachedPage]:
+        """Devuelve la entrada de la URL, o None si no está en caché (o falta su HTML)."""
+        entry = self.entries.get(url)
+        if entry is None or not os.path.exists(self._object_path(entry.content_hash)):
+            return None
+        return entry
+
+    def read(self, entry: CachedPage) -> str:
+        """Lee el HTML guardado de una entrada."""
+        with open(self._object_path(entry.content_hash), encoding="utf-8") as f:
+            return f.read()
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Cabeceras para revalidar la copia guardada de la URL (vacías si no hay copia)."""
+        entry = self.get(url)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def put(
+        self,
+        url: str,
+        html: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> CachedPage:
+        """
+        Guarda una nueva versión descargada de la URL.
+
+        Returns:
+            CachedPage: La entrada actualizada.
+        """
+        hash_ = content_hash(html)
+        path = self._object_path(hash_)
+        if not os.path.exists(path):
+            os.makedirs(self.directory, exist_ok=True)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(html)
+            os.replace(path + ".tmp", path)
+
+        previous = self.entries.get(url)
+        entry = CachedPage(url, hash_, etag, last_modified, time.time())
+        self.entries[url] = entry
+        self._save_index()
+
+        if previous is not None and previous.content_hash != hash_:
+            referenced = {e.content_hash for e in self.entries.values()}
+            if previous.content_hash not in referenced:
+                try:
+                    os.remove(self._object_path(previous.content_hash))
+                except FileNotFoundError:
+                    pass
+        return entry
+
+    def touch(self, url: str) -> Optional[CachedPage]:
+        """Marca la copia de la URL como revalidada (el servidor respondió 304)."""
+        entry = self.get(url)
+        if entry is not None:
+            entry.fetched_at = time.time()
+            self._save_index()
+        return entry
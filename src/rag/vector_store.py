@@ -1,19 +1,39 @@
+import asyncio
 import os
+from concurrent.futures import Executor
+from functools import partial
+from langchain_core.embeddings import Embeddings
 from langchain_pinecone import PineconeVectorStore as LangchainPinecone
 from langchain_openai import OpenAIEmbeddings
-from typing import List, Dict, Any, Tuple
+from pinecone import Pinecone
+from src.config import get_settings
+from src.rag.embedding_cache import CachedEmbeddings
+from src.rag.local_vector_index import LocalVectorIndex
+from typing import List, Dict, Any, Optional, Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
+PINECONE_BACKEND = "pinecone"
+LOCAL_BACKEND = "local"
+# Por debajo de este tamaño, la búsqueda exacta local se hace en el propio event loop.
+LOCAL_INLINE_SEARCH_MAX_SIZE = 20000
+
+
 class VectorStore:
     """
-    Gestiona la interacción con el índice vectorial de Pinecone.
+    Gestiona la interacción con el índice vectorial.
 
-    Esta clase se encarga de inicializar la conexión con Pinecone y permite
+    Esta clase se encarga de inicializar la conexión con el índice y permite
     añadir documentos (textos con metadatos) y realizar búsquedas por similitud.
     Utiliza el mismo modelo de embeddings que el EmbeddingService para consistencia.
+
+    El índice subyacente es intercambiable (`backend`):
+    - `pinecone`: índice remoto de Pinecone (por defecto).
+    - `local`: índice NumPy en memoria del proceso (`LocalVectorIndex`), persistido en
+      disco. Evita el viaje de red en cada búsqueda y no depende de Pinecone. Con
+      `LOCAL_INDEX_TYPE=ivf` usa un índice aproximado IVF-flat para corpus grandes.
     """
 
     def __init__(
@@ -21,48 +41,224 @@ class VectorStore:
         index_name: str = None,
         embedding_model: str = "text-embedding-3-small",
         dimensions: int = 512,
+        embeddings: Optional[Embeddings] = None,
+        pool_threads: int = 4,
+        connection_pool_maxsize: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        backend: Optional[str] = None,
+        local_index_path: Optional[str] = None,
     ):
         """
-        Inicializa la conexión con el índice de Pinecone.
+        Inicializa la conexión con el índice vectorial.
 
         Args:
             index_name (str, optional): El nombre del índice en Pinecone. Si no se provee, se busca en la variable de entorno PINECONE_INDEX_NAME.
             embedding_model (str, optional): El modelo de embedding a usar.
             dimensions (int, optional): La dimensión de los vectores.
+            embeddings (Embeddings, optional): Modelo de embeddings ya construido (p. ej. compartido
+                por todo el proceso). Si no se provee, se crea uno nuevo con `embedding_model` y `dimensions`,
+                envuelto en una caché de embeddings.
+            pool_threads (int, optional): Hilos del cliente de Pinecone para operaciones en paralelo.
+            connection_pool_maxsize (int, optional): Tamaño máximo del pool de conexiones HTTP hacia el índice.
+            executor (Executor, optional): Pool de hilos acotado donde se ejecutan las llamadas
+                síncronas del cliente de Pinecone desde los métodos asíncronos. Si no se provee,
+                se usa el executor por defecto del event loop.
+            backend (str, optional): `pinecone` o `local`. Si no se provee, se usa VECTOR_BACKEND.
+            local_index_path (str, optional): Directorio del índice local. Si no se provee, se usa LOCAL_INDEX_PATH.
         """
-        self.index_name = index_name or os.getenv("PINECONE_INDEX_NAME")
-        if not self.index_name:
-            raise ValueError("No se encontró el nombre del índice de Pinecone")
+        settings = get_settings()
+        self.backend = backend or settings.vector_backend
+        if self.backend not in (PINECONE_BACKEND, LOCAL_BACKEND):
+            raise ValueError(f"Backend vectorial desconocido: {self.backend}")
 
-        # Asegurarse de que las claves de API están disponibles
-        if not os.getenv("PINECONE_API_KEY") or not os.getenv("OPENAI_API_KEY"):
-            raise EnvironmentError(
-                "Las variables de entorno PINECONE_API_KEY y OPENAI_API_KEY deben estar configuradas"
+        if self.backend == PINECONE_BACKEND:
+            self.index_name = index_name or os.getenv("PINECONE_INDEX_NAME")
+            if not self.index_name:
+                raise ValueError("No se encontró el nombre del índice de Pinecone")
+
+            # Asegurarse de que las claves de API están disponibles
+            if not os.getenv("PINECONE_API_KEY") or not os.getenv("OPENAI_API_KEY"):
+                raise EnvironmentError(
+                    "Las variables de entorno PINECONE_API_KEY y OPENAI_API_KEY deben estar configuradas"
+                )
+        else:
+            self.index_name = local_index_path or settings.local_index_path
+            if embeddings is None and not os.getenv("OPENAI_API_KEY"):
+                raise EnvironmentError(
+                    "La variable de entorno OPENAI_API_KEY debe estar configurada"
+                )
+
+        if embeddings is None:
+            embeddings = CachedEmbeddings.from_settings(
+                OpenAIEmbeddings(
+                    openai_api_key=os.getenv("OPENAI_API_KEY"),
+                    model=embedding_model,
+                    dimensions=dimensions,
+                ),
+                model=embedding_model,
+                dimensions=dimensions,
             )
 
-        embeddings = OpenAIEmbeddings(
-            openai_api_key=os.getenv("OPENAI_API_KEY"),
-            model=embedding_model,
-            dimensions=dimensions,
-        )
+        self.executor = executor
+
+        if self.backend == LOCAL_BACKEND:
+            self.index = None
+            self.store = LocalVectorIndex.load(
+                self.index_name,
+                embeddings,
+                dimensions,
+                index_type=settings.local_index_type,
+                nlist=settings.ivf_nlist,
+                nprobe=settings.ivf_nprobe,
+                ann_min_size=settings.ivf_min_size,
+            )
+            return
+
+        # Se construye el índice directamente (en lugar de `from_existing_index`) para
+        # poder dimensionar el pool de conexiones y evitar el listado de índices.
+        client = Pinecone(api_key=os.getenv("PINECONE_API_KEY"), pool_threads=pool_threads)
+        index_kwargs = {}
+        if connection_pool_maxsize:
+            index_kwargs["connection_pool_maxsize"] = connection_pool_maxsize
+        self.index = client.Index(name=self.index_name, **index_kwargs)
+
+        self.store = LangchainPinecone(index=self.index, embedding=embeddings)
+
+    @property
+    def is_local(self) -> bool:
+        return self.backend == LOCAL_BACKEND
 
-        self.store = LangchainPinecone.from_existing_index(
-            index_name=self.index_name, embedding=embeddings
+    def warmup(self) -> None:
+        """
+        Abre la conexión con el índice realizando una consulta ligera de estadísticas,
+        de modo que la primera búsqueda real no pague el handshake TLS. El índice local
+        no necesita calentamiento.
+        """
+        if self.index is not None:
+            self.index.describe_index_stats()
+
+    def reload(self) -> None:
+        """
+        Vuelve a cargar desde disco el índice local, p. ej. después de que el script de
+        ingesta lo haya actualizado. El índice anterior se sigue usando hasta que el nuevo
+        está cargado. Pinecone no lo necesita: siempre se consulta el índice remoto.
+        """
+        if not self.is_local:
+            return
+        self.store = LocalVectorIndex.load(
+            self.store.path,
+            self.store.embeddings,
+            self.store.dimensions,
+            index_type=self.store.index_type,
+            nlist=self.store.nlist,
+            nprobe=self.store.nprobe,
+            ann_min_size=self.store.ann_min_size,
         )
 
     def add_documents(self, documents: List[Any]):
         """
-        Añade una lista de objetos Document de LangChain al índice de Pinecone.
+        Añade una lista de objetos Document de LangChain al índice. En el backend local,
+        el índice se guarda en disco a continuación.
 
         Args:
             documents (List[Document]): La lista de documentos a indexar.
         """
         print(
-            f"Añadiendo {len(documents)} documentos al índice '{self.index_name}' de Pinecone..."
+            f"Añadiendo {len(documents)} documentos al índice '{self.index_name}' ({self.backend})..."
         )
         self.store.add_documents(documents)
+        if self.is_local:
+            self.store.save()
         print("Documentos añadidos exitosamente.")
 
+    def add_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[Dict[str, Any]],
+        ids: List[str],
+    ) -> None:
+        """
+        Inserta (o reemplaza por ID) documentos cuyos embeddings ya se calcularon, sin
+        volver a llamar al modelo de embeddings. Lo usa la ingesta por lotes (`IngestionEngine`).
+
+        En Pinecone, el texto se guarda en los metadatos con la misma clave que usa
+        `PineconeVectorStore`, de modo que las búsquedas lo recuperan igual. El índice local
+        no se guarda en disco hasta llamar a `persist()`.
+
+        Args:
+            texts (List[str]): Textos de los documentos.
+            embeddings (List[List[float]]): Vectores de los documentos.
+            metadatas (List[Dict[str, Any]]): Metadatos de cada documento.
+            ids (List[str]): IDs de los documentos.
+        """
+        if self.is_local:
+            self.store.add_embeddings(texts, embeddings, metadatas, ids)
+            return
+        text_key = getattr(self.store, "_text_key", "text")
+        self.index.upsert(
+            vectors=[
+                {"id": id_, "values": list(values), "metadata": {**metadata, text_key: text}}
+                for id_, values, metadata, text in zip(ids, embeddings, metadatas, texts)
+            ]
+        )
+
+    async def aadd_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: List[Dict[str, Any]],
+        ids: List[str],
+    ) -> None:
+        """
+        Versión asíncrona de `add_embeddings`. Las escrituras en Pinecone se ejecutan en el
+        pool de hilos, así que varios lotes pueden subirse en paralelo; el índice local se
+        modifica directamente en el event loop (no admite escrituras concurrentes).
+        """
+        if self.is_local:
+            self.add_embeddings(texts, embeddings, metadatas, ids)
+            return
+        await self._run_sync(self.add_embeddings, texts, embeddings, metadatas, ids)
+
+    def delete(self, ids: List[str], batch_size: int = 1000) -> None:
+        """
+        Elimina documentos del índice por ID (p. ej. chunks que ya no existen en el corpus).
+
+        Args:
+            ids (List[str]): IDs de los documentos a eliminar.
+            batch_size (int): IDs por petición de borrado a Pinecone.
+        """
+        if self.is_local:
+            self.store.delete(ids)
+            return
+        for i in range(0, len(ids), batch_size):
+            self.index.delete(ids=ids[i : i + batch_size])
+
+    async def adelete(self, ids: List[str]) -> None:
+        """Versión asíncrona de `delete`."""
+        if self.is_local:
+            self.delete(ids)
+            return
+        await self._run_sync(self.delete, ids)
+
+    def clear(self) -> None:
+        """
+        Elimina todos los vectores del índice (p. ej. antes de reindexar sin manifiesto).
+
+        En el índice local el borrado queda en memoria hasta el siguiente `persist`.
+        """
+        if self.is_local:
+            self.store.delete()
+            return
+        # Pinecone responde con un error al vaciar un namespace que aún no existe.
+        if self.index.describe_index_stats().total_vector_count:
+            self.index.delete(delete_all=True)
+
+    def persist(self) -> None:
+        """Guarda en disco el índice local tras una ingesta por lotes. En Pinecone no hace nada."""
+        if self.is_local:
+            self.store.save()
+
     def similarity_search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         """
         Realiza una búsqueda por similitud en el índice.
@@ -88,3 +284,100 @@ class VectorStore:
             List[Tuple[Document, float]]: Lista de tuplas (documento, score)
         """
         return self.store.similarity_search_with_score(query, k=top_k)
+
+    async def _run_sync(self, func, *args, **kwargs):
+        """Ejecuta una llamada síncrona en el pool de hilos sin bloquear el event loop."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    async def aembed_query(self, query: str) -> List[float]:
+        """
+        Calcula de forma asíncrona el embedding de una consulta con el modelo del índice.
+
+        Args:
+            query (str): El texto de la consulta.
+
+        Returns:
+            List[float]: El vector de embedding.
+        """
+        return await self.store.embeddings.aembed_query(query)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Calcula de forma asíncrona los embeddings de varios textos con una sola llamada
+        al modelo del índice.
+
+        Args:
+            texts (List[str]): Los textos.
+
+        Returns:
+            List[List[float]]: Un vector por texto, en el mismo orden.
+        """
+        return await self.store.embeddings.aembed_documents(texts)
+
+    async def asimilarity_search_by_vector_with_score(
+        self, embedding: List[float], top_k: int = 5, **search_params: Any
+    ) -> List[Tuple[Any, float]]:
+        """
+        Busca los documentos más similares a un embedding ya calculado.
+
+        La consulta a Pinecone (cliente síncrono, que reutiliza su pool de conexiones) se
+        delega al pool de hilos acotado. El índice local responde en microsegundos cuando
+        es pequeño o usa el índice aproximado, así que entonces se consulta directamente
+        en el event loop.
+
+        Args:
+            embedding (List[float]): El vector de la consulta.
+            top_k (int): El número de resultados a devolver.
+            **search_params: Parámetros de búsqueda del índice local (p. ej. `nprobe` o
+                `exact`). Pinecone los ignora.
+
+        Returns:
+            List[Tuple[Document, float]]: Lista de tuplas (documento, score)
+        """
+        if self.is_local:
+            search = partial(
+                self.store.similarity_search_by_vector_with_score,
+                embedding,
+                k=top_k,
+                **search_params,
+            )
+            if self.store.uses_ann or len(self.store) <= LOCAL_INLINE_SEARCH_MAX_SIZE:
+                return search()
+            return await self._run_sync(search)
+        return await self._run_sync(
+            self.store.similarity_search_by_vector_with_score, embedding, k=top_k
+        )
+
+    async def asimilarity_search_with_score(
+        self, query: str, top_k: int = 5
+    ) -> List[Tuple[Any, float]]:
+        """
+        Versión asíncrona de `similarity_search_with_score`.
+
+        El embedding de la consulta se obtiene de forma asíncrona con el cliente HTTP
+        compartido y después se consulta el índice en el pool de hilos.
+
+        Args:
+            query (str): La consulta para la búsqueda.
+            top_k (int): El número de resultados a devolver.
+
+        Returns:
+            List[Tuple[Document, float]]: Lista de tuplas (documento, score)
+        """
+        embedding = await self.aembed_query(query)
+        return await self.asimilarity_search_by_vector_with_score(embedding, top_k=top_k)
+
+    async def asimilarity_search(self, query: str, top_k: int = 5) -> List[Any]:
+        """
+        Versión asíncrona de `similarity_search`.
+
+        Args:
+            query (str): La consulta para la búsqueda.
+            top_k (int): El número de resultados a devolver.
+
+        Returns:
+            List[Document]: Una lista de documentos similares encontrados.
+        """
+        results = await self.asimilarity_search_with_score(query, top_k=top_k)
+        return [doc for doc, _ in results]
@@ -0,0 +1,164 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+from src.services.stage_timer import stage
+
+
+class AdmissionRejected(Exception):
+    """La petición no se admite porque el servicio está saturado."""
+
+    def __init__(self, reason: str, retry_after: int):
+        """
+        Args:
+            reason (str): `queue_full` si la cola de espera está llena o `timeout` si se
+                superó la espera máxima.
+            retry_after (int): Segundos recomendados antes de reintentar.
+        """
+        super().__init__(f"Servicio saturado ({reason}); reintentar en {retry_after} s.")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionPermit:
+    """Plaza concedida por `AdmissionController`. Liberarla más de una vez no tiene efecto."""
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._start = time.perf_counter()
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller._release(time.perf_counter() - self._start)
+
+
+class AdmissionController:
+    """
+    Control de admisión del trabajo que llama al LLM.
+
+    Como mucho `max_concurrency` peticiones ejecutan el pipeline RAG a la vez; las demás
+    esperan por orden de llegada en una cola de `max_queue` plazas durante un máximo de
+    `max_wait` segundos. Si la cola está llena, o la espera se agota, la petición se
+    rechaza con `AdmissionRejected` en lugar de acumular latencia: el cliente recibe un
+    429 con `Retry-After` y los proveedores no reciben más peticiones de las que admiten.
+
+    La espera de cada petición se mide como la etapa `admission` (ver `stage_timer`).
+    """
+
+    def __init__(self, max_concurrency: int = 32, max_queue: int = 64, max_wait: float = 5.0):
+        """
+        Args:
+            max_concurrency (int): Peticiones que ejecutan el pipeline a la vez.
+            max_queue (int): Peticiones que pueden esperar una plaza.
+            max_wait (float): Espera máxima por una plaza, en segundos.
+        """
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Duración media (móvil) de una petición admitida, para estimar `Retry-After`.
+        self._avg_service_time = 1.0
+
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"queue_full": 0, "timeout": 0}
+        self.wait_seconds_total = 0.0
+
+    def retry_after(self) -> int:
+        """Estima en cuántos segundos se habrá vaciado la cola actual (como mínimo, 1)."""
+        pending = len(self._waiters) + 1
+        return max(1, math.ceil(self._avg_service_time * pending / self.max_concurrency))
+
+    async def acquire(self) -> AdmissionPermit:
+        """
+        Espera una plaza para ejecutar el pipeline.
+
+        Returns:
+            AdmissionPermit: La plaza, que se debe liberar al terminar.
+
+        Raises:
+            AdmissionRejected: Si la cola está llena o la espera supera `max_wait`.
+        """
+        with stage("admission"):
+            start = time.perf_counter()
+            try:
+                await self._wait_for_slot()
+            finally:
+                self.wait_seconds_total += time.perf_counter() - start
+        self.admitted += 1
+        return AdmissionPermit(self)
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """Ejecuta el bloque con una plaza (ver `acquire`) y la libera al salir."""
+        permit = await self.acquire()
+        try:
+            yield
+        finally:
+            permit.release()
+
+    async def _wait_for_slot(self) -> None:
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected["queue_full"] += 1
+            raise AdmissionRejected("queue_full", self.retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+        except asyncio.TimeoutError:
+            if not self._abandon(waiter):
+                return
+            self.rejected["timeout"] += 1
+            raise AdmissionRejected("timeout", self.retry_after()) from None
+        except BaseException:
+            # Petición cancelada mientras esperaba (p. ej. el cliente se desconectó).
+            if not self._abandon(waiter):
+                self._release(None)
+            raise
+
+    def _abandon(self, waiter: asyncio.Future) -> bool:
+        """Saca de la cola una espera; devuelve False si ya había recibido una plaza."""
+        if waiter.done():
+            return False
+        waiter.cancel()
+        self._waiters.remove(waiter)
+        return True
+
+    def _release(self, service_time: Optional[float]) -> None:
+        if service_time is not None:
+            self._avg_service_time = 0.9 * self._avg_service_time + 0.1 * service_time
+        # La plaza pasa directamente a la primera petición en espera.
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Devuelve el estado y los contadores del control de admisión.
+
+        Returns:
+            Dict[str, object]: Límites, peticiones en curso y en cola, admitidas,
+            rechazadas por motivo y segundos esperados en total.
+        """
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "wait_seconds_total": self.wait_seconds_total,
+        }
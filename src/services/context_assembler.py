@@ -0,0 +1,236 @@
+import math
+import os
+from functools import lru_cache
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+# Caracteres por token de la estimación aproximada (texto en español con el tokenizador de gpt-4o).
+APPROX_CHARS_PER_TOKEN = 4
+# Longitud mínima de un solapamiento para considerar que dos chunks son contiguos.
+MIN_OVERLAP_CHARS = 20
+CHUNK_SEPARATOR = "\n\n"
+# Modos de `TOKEN_COUNTER`.
+TIKTOKEN_COUNTER = "tiktoken"
+APPROX_COUNTER = "approx"
+
+
+class TokenCounter:
+    """
+    Cuenta y recorta tokens con el tokenizador del modelo (tiktoken) o, sin modelo, con
+    una estimación de ~4 caracteres por token.
+
+    El tokenizador se carga la primera vez que se usa, no al construir el contador. Su
+    vocabulario se descarga la primera vez; sin red, se lee de `cache_dir`. Si no se
+    puede cargar, se lanza un error en lugar de pasar en silencio a la estimación: el
+    modo aproximado se elige de forma explícita (`TOKEN_COUNTER=approx`).
+    """
+
+    def __init__(self, model: Optional[str] = None, cache_dir: Optional[str] = None):
+        """
+        Args:
+            model (str, optional): Modelo cuyo tokenizador se usa. Con None, se usa la
+                estimación aproximada.
+            cache_dir (str, optional): Directorio de caché del vocabulario de tiktoken
+                (`TIKTOKEN_CACHE_DIR`).
+        """
+        self.model = model
+        self.cache_dir = cache_dir
+        self._encoding = None
+
+    @property
+    def is_exact(self) -> bool:
+        return self.model is not None
+
+    @property
+    def encoding(self):
+        """El tokenizador de tiktoken, cargado en el primer uso (None en modo aproximado)."""
+        if self.model is None or self._encoding is not None:
+            return self._encoding
+        if self.cache_dir:
+            # tiktoken solo admite el directorio de caché mediante esta variable de entorno.
+            os.environ["TIKTOKEN_CACHE_DIR"] = self.cache_dir
+        try:
+            import tiktoken
+
+            self._encoding = tiktoken.encoding_for_model(self.model)
+        except Exception as e:
+            raise RuntimeError(
+                f"No se pudo cargar el tokenizador de '{self.model}': {e}. Configura "
+                "TIKTOKEN_CACHE_DIR con su vocabulario o usa TOKEN_COUNTER=approx."
+            ) from e
+        return self._encoding
+
+    def count(self, text: str) -> int:
+        encoding = self.encoding
+        if encoding is not None:
+            return len(encoding.encode(text))
+        return math.ceil(len(text) / APPROX_CHARS_PER_TOKEN)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Recorta el texto a `max_tokens` tokens, sin partir la última palabra."""
+        if max_tokens <= 0:
+            return ""
+        encoding = self.encoding
+        if encoding is not None:
+            tokens = encoding.encode(text)
+            if len(tokens) <= max_tokens:
+                return text
+            truncated = encoding.decode(tokens[:max_tokens])
+        else:
+            limit = max_tokens * APPROX_CHARS_PER_TOKEN
+            if len(text) <= limit:
+                return text
+            truncated = text[:limit]
+        return truncated.rsplit(" ", 1)[0] if " " in truncated else truncated
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(
+    mode: str = APPROX_COUNTER, model: str = "gpt-4o", cache_dir: Optional[str] = None
+) -> TokenCounter:
+    """
+    Devuelve un `TokenCounter` compartido (cargar el tokenizador es costoso).
+
+    Args:
+        mode (str): `tiktoken` para el tokenizador exacto de `model`, o `approx` para la
+            estimación por caracteres.
+        model (str): Modelo de chat cuyo tokenizador se usa en modo `tiktoken`.
+        cache_dir (str, optional): Directorio de caché del vocabulario de tiktoken.
+
+    Returns:
+        TokenCounter: El contador de tokens.
+    """
+    if mode not in (TIKTOKEN_COUNTER, APPROX_COUNTER):
+        raise ValueError(f"Contador de tokens desconocido: {mode}")
+    return TokenCounter(model if mode == TIKTOKEN_COUNTER else None, cache_dir)
+
+
+@dataclass
+class AssembledContext:
+    """Contexto listo para el prompt, con las fuentes de los fragmentos incluidos."""
+
+    text: str
+    metadatas: List[Dict[str, Any]] = field(default_factory=list)
+    token_count: int = 0
+    # Chunks recuperados y fragmentos resultantes tras unir los contiguos.
+    chunks_in: int = 0
+    segments_out: int = 0
+    truncated: bool = False
+
+
+def overlap_length(left: str, right: str, min_overlap: int = MIN_OVERLAP_CHARS) -> int:
+    """
+    Devuelve la longitud del solapamiento entre el final de `left` y el principio de
+    `right` (0 si no se solapan en al menos `min_overlap` caracteres).
+    """
+    if len(left) < min_overlap or len(right) < min_overlap:
+        return 0
+    head = right[:min_overlap]
+    start = left.find(head, max(0, len(left) - len(right)))
+    while start != -1:
+        length = len(left) - start
+        if right.startswith(left[start:]):
+            return length
+        start = left.find(head, start + 1)
+    return 0
+
+
+class ContextAssembler:
+    """
+    Construye el contexto del prompt a partir de los chunks recuperados.
+
+    `TextProcessor` divide cada sección con solapamiento entre chunks consecutivos, así
+    que cuando se recuperan dos chunks contiguos de la misma sección, su texto común se
+    repetiría en el prompt. El ensamblador:
+
+    1. Agrupa los chunks por fuente y sección, y une los que se solapan (el final de uno
+       es el principio del otro), eliminando el texto repetido.
+    2. Ordena los fragmentos resultantes por el mejor rango de sus chunks.
+    3. Los empaqueta hasta un presupuesto de tokens, recortando el último si no cabe entero.
+    """
+
+    def __init__(self, token_budget: int = 2000, token_counter: Optional[TokenCounter] = None):
+        """
+        Args:
+            token_budget (int): Máximo de tokens del contexto.
+            token_counter (TokenCounter, optional): Contador de tokens. Por defecto, la
+                estimación aproximada; `RAGEngine` pasa el configurado en `TOKEN_COUNTER`.
+        """
+        self.token_budget = token_budget
+        self.token_counter = token_counter or get_token_counter()
+
+    def _merge_group(self, items: List[Tuple[int, Document]]) -> List[Tuple[int, str]]:
+        """Une los chunks de una misma sección que se solapan. Devuelve (mejor rango, texto)."""
+        segments = [(rank, doc.page_content) for rank, doc in items]
+        merged = True
+        while merged and len(segments) > 1:
+            merged = False
+            for i, (rank_i, left) in enumerate(segments):
+                for j, (rank_j, right) in enumerate(segments):
+                    if i == j:
+                        continue
+                    overlap = overlap_length(left, right)
+                    if overlap:
+                        segments[i] = (min(rank_i, rank_j), left + right[overlap:])
+                        del segments[j]
+                        merged = True
+                        break
+                if merged:
+                    break
+        return segments
+
+    def assemble(self, results_with_scores: Sequence[Tuple[Document, float]]) -> AssembledContext:
+        """
+        Construye el contexto para una lista de resultados ordenados de mejor a peor.
+
+        Args:
+            results_with_scores: Pares (documento, score) de la recuperación.
+
+        Returns:
+            AssembledContext: El texto del contexto, sus fuentes y su número de tokens.
+        """
+        groups: Dict[Tuple[str, str], List[Tuple[int, Document]]] = {}
+        metadata_by_group: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for rank, (doc, _) in enumerate(results_with_scores):
+            key = (doc.metadata.get("source", ""), doc.metadata.get("section", ""))
+            groups.setdefault(key, []).append((rank, doc))
+            metadata_by_group.setdefault(key, dict(doc.metadata))
+
+        segments = [
+            (rank, text, key)
+            for key, items in groups.items()
+            for rank, text in self._merge_group(items)
+        ]
+        segments.sort(key=lambda segment: segment[0])
+
+        parts: List[str] = []
+        metadatas: List[Dict[str, Any]] = []
+        used = 0
+        truncated = False
+        separator_tokens = self.token_counter.count(CHUNK_SEPARATOR)
+        for _, text, key in segments:
+            cost = self.token_counter.count(text) + (separator_tokens if parts else 0)
+            if used + cost > self.token_budget:
+                remaining = self.token_budget - used - (separator_tokens if parts else 0)
+                text = self.token_counter.truncate(text, remaining)
+                truncated = True
+                if not text:
+                    break
+                cost = self.token_counter.count(text) + (separator_tokens if parts else 0)
+            parts.append(text)
+            metadatas.append(metadata_by_group[key])
+            used += cost
+            if truncated:
+                break
+
+        context = CHUNK_SEPARATOR.join(parts)
+        return AssembledContext(
+            text=context,
+            metadatas=metadatas,
+            token_count=self.token_counter.count(context),
+            chunks_in=len(results_with_scores),
+            segments_out=len(parts),
+            truncated=truncated,
+        )
@@ -0,0 +1,191 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Set
+from uuid import UUID
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import HumanMessage, SystemMessage
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.sql import Conversation, Message
+from src.services.conversation_service import ConversationService
+from src.services.message_writer import MessageWriteBehind, merge_pending
+
+SUMMARY_SYSTEM_PROMPT = (
+    "Eres un asistente que mantiene el resumen de una conversación entre un usuario y un "
+    "chatbot sobre Colombia. Actualiza el resumen actual incorporando los nuevos mensajes. "
+    "Conserva los temas tratados, las preguntas del usuario y los datos concretos (nombres, "
+    "fechas, cifras) que puedan ser necesarios para entender preguntas de seguimiento. "
+    "Responde solo con el resumen actualizado, en español y en no más de 200 palabras."
+)
+
+
+@dataclass
+class SummaryMessage:
+    """
+    Resumen de los mensajes antiguos de una conversación, presentado como un elemento más
+    del historial. `RAGService` lo envía al modelo de reformulación como mensaje de sistema.
+    """
+
+    content: str
+    is_user: bool = False
+    is_summary: bool = True
+
+
+class ConversationMemory:
+    """
+    Memoria acotada de las conversaciones.
+
+    En cada turno solo se leen de la base de datos los últimos `recent_turns` turnos
+    (pregunta y respuesta) y el resumen guardado en la fila de la conversación, de modo que
+    el coste de la lectura y el tamaño del prompt de reformulación no crecen con la longitud
+    de la conversación.
+
+    Después de cada respuesta se programa, en segundo plano, la actualización del resumen:
+    los mensajes que ya han salido de la ventana reciente se incorporan al resumen con el
+    modelo de reformulación (gpt-4o-mini), sin retrasar la respuesta al usuario.
+    """
+
+    def __init__(
+        self,
+        llm: BaseChatModel,
+        session_factory: Callable[[], AsyncSession],
+        conv_service: Optional[ConversationService] = None,
+        recent_turns: int = 4,
+        writer: Optional[MessageWriteBehind] = None,
+    ):
+        """
+        Inicializa la memoria de conversaciones.
+
+        Args:
+            llm (BaseChatModel): Modelo usado para actualizar los resúmenes.
+            session_factory (Callable[[], AsyncSession]): Fábrica de sesiones de base de datos
+                para las actualizaciones en segundo plano (la sesión de la petición ya estará cerrada).
+            conv_service (ConversationService, optional): Servicio de acceso a las conversaciones.
+            recent_turns (int): Turnos recientes que se conservan literalmente.
+            writer (MessageWriteBehind, optional): Cola de guardado diferido, cuyos mensajes
+                pendientes se incluyen en el historial.
+        """
+        self.llm = llm
+        self.session_factory = session_factory
+        self.conv_service = conv_service or ConversationService()
+        self.recent_turns = recent_turns
+        self.writer = writer
+
+        self._tasks: Set[asyncio.Task] = set()
+        self._running: Set[UUID] = set()
+        self._dirty: Set[UUID] = set()
+
+    @property
+    def window_size(self) -> int:
+        """Número de mensajes que se conservan literalmente (pregunta + respuesta por turno)."""
+        return 2 * self.recent_turns
+
+    async def load_history(
+        self, db: AsyncSession, conversation: Conversation
+    ) -> List[Message | SummaryMessage]:
+        """
+        Devuelve el historial acotado de una conversación: su resumen (si existe) seguido
+        de los mensajes de la ventana reciente.
+
+        Args:
+            db (AsyncSession): Sesión de base de datos asíncrona.
+            conversation (Conversation): La conversación (sin necesidad de cargar sus mensajes).
+
+        Returns:
+            List[Message | SummaryMessage]: El historial a pasar al servicio RAG.
+        """
+        # Los pendientes se leen antes que la base de datos (ver `merge_pending`).
+        pending = self.writer.pending(conversation.id) if self.writer else []
+        recent = await self.conv_service.get_recent_messages(
+            db, conversation.id, limit=self.window_size
+        )
+        recent = merge_pending(recent, pending, limit=self.window_size)
+        if conversation.summary:
+            return [SummaryMessage(content=conversation.summary), *recent]
+        return list(recent)
+
+    def _build_summary_messages(self, summary: Optional[str], messages: List[Message]):
+        transcript = "\n".join(
+            f"{'Usuario' if msg.is_user else 'Asistente'}: {msg.content}" for msg in messages
+        )
+        return [
+            SystemMessage(content=SUMMARY_SYSTEM_PROMPT),
+            HumanMessage(
+                content=(
+                    f"Resumen actual:\n{summary or '(vacío)'}\n\n"
+                    f"Nuevos mensajes:\n{transcript}\n\nResumen actualizado:"
+                )
+            ),
+        ]
+
+    async def update_summary(self, conversation_id: UUID) -> bool:
+        """
+        Incorpora al resumen los mensajes que han salido de la ventana reciente.
+
+        Args:
+            conversation_id (UUID): El ID de la conversación.
+
+        Returns:
+            bool: True si el resumen se actualizó.
+        """
+        async with self.session_factory() as db:
+            conversation = await self.conv_service.get_conversation(
+                db, conversation_id, with_messages=False
+            )
+            if conversation is None:
+                return False
+
+            total = await self.conv_service.count_messages(db, conversation_id)
+            pending = total - conversation.summarized_count - self.window_size
+            # Se resume por turnos completos (pregunta + respuesta).
+            pending -= pending % 2
+            if pending <= 0:
+                return False
+
+            messages = await self.conv_service.get_messages_range(
+                db, conversation_id, offset=conversation.summarized_count, limit=pending
+            )
+            response = await self.llm.ainvoke(
+                self._build_summary_messages(conversation.summary, messages)
+            )
+            return await self.conv_service.update_summary(
+                db,
+                conversation_id,
+                response.content.strip(),
+                previous_count=conversation.summarized_count,
+                summarized_count=conversation.summarized_count + len(messages),
+            )
+
+    def schedule_update(self, conversation_id: UUID) -> None:
+        """
+        Programa en segundo plano la actualización del resumen de una conversación.
+
+        Si ya hay una actualización en curso para la conversación, se repite al terminar
+        en lugar de lanzar otra en paralelo.
+        """
+        if conversation_id in self._running:
+            self._dirty.add(conversation_id)
+            return
+        self._running.add(conversation_id)
+        task = asyncio.create_task(self._run_updates(conversation_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_updates(self, conversation_id: UUID) -> None:
+        try:
+            while True:
+                self._dirty.discard(conversation_id)
+                try:
+                    await self.update_summary(conversation_id)
+                except Exception as e:
+                    print(f"Error al actualizar el resumen de la conversación {conversation_id}: {e}")
+                if conversation_id not in self._dirty:
+                    break
+        finally:
+            self._running.discard(conversation_id)
+
+    async def aclose(self) -> None:
+        """Espera a que terminen las actualizaciones pendientes al apagar la aplicación."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
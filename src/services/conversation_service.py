@@ -1,10 +1,19 @@
+from typing import List, Optional
 from uuid import UUID
+from sqlalchemy import and_, func, insert, or_, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
-from src.models.sql import Conversation, Message
+from src.models.sql import Conversation, Message, utcnow
 from src.models.schemas import ConversationCreate, MessageCreate
+from src.services.pagination import Page, decode_cursor, encode_cursor
+
+# Orden cronológico de los mensajes. La pregunta y la respuesta de un turno se guardan en
+# la misma transacción y pueden tener la misma fecha: a igualdad, la pregunta va primero.
+# El ID completa un orden total, necesario para paginar.
+CHRONOLOGICAL_ORDER = (Message.timestamp.asc(), Message.is_user.desc(), Message.id.asc())
+REVERSE_CHRONOLOGICAL_ORDER = (Message.timestamp.desc(), Message.is_user.asc(), Message.id.desc())
 
 
 class ConversationService:
@@ -46,8 +55,52 @@ class ConversationService:
         )
         return result.scalars().all()
 
+    async def get_conversations_page(
+        self, db: AsyncSession, limit: int, cursor: Optional[str] = None
+    ) -> Page[Conversation]:
+        """
+        Obtiene una página de conversaciones, de la más reciente a la más antigua.
+
+        Usa paginación por cursor sobre `(updated_at, id)` y el índice
+        `ix_conversations_updated_at_id`, de modo que cada página cuesta lo mismo sea cual
+        sea su posición. Una conversación con actividad mientras se recorren las páginas
+        pasa al principio de la lista.
+
+        Args:
+            db (AsyncSession): Sesión de base de datos asíncrona.
+            limit (int): Número máximo de conversaciones de la página.
+            cursor (str, optional): Cursor devuelto con la página anterior.
+
+        Returns:
+            Page[Conversation]: Las conversaciones y el cursor de la página siguiente.
+
+        Raises:
+            ValueError: Si el cursor no es válido.
+        """
+        query = select(Conversation).order_by(
+            Conversation.updated_at.desc(), Conversation.id.desc()
+        )
+        if cursor:
+            after = decode_cursor(cursor)
+            query = query.where(
+                tuple_(Conversation.updated_at, Conversation.id)
+                < tuple_(
+                    after["position"],
+                    after["id"],
+                    types=[Conversation.updated_at.type, Conversation.id.type],
+                )
+            )
+        result = await db.execute(query.limit(limit + 1))
+        conversations = result.scalars().all()
+        if len(conversations) <= limit:
+            return Page(items=conversations)
+        last = conversations[limit - 1]
+        return Page(
+            items=conversations[:limit], next_cursor=encode_cursor(last.updated_at, last.id)
+        )
+
     async def get_conversation(
-        self, db: AsyncSession, conversation_id: UUID
+        self, db: AsyncSession, conversation_id: UUID, with_messages: bool = True
     ) -> Conversation | None:
         """
         Obtiene una conversación específica por su ID, incluyendo sus mensajes.
@@ -55,15 +108,16 @@ class ConversationService:
         Args:
             db (AsyncSession): Sesión de base de datos asíncrona.
             conversation_id (UUID): El ID de la conversación a buscar.
+            with_messages (bool): Si es False, no se cargan los mensajes (p. ej. cuando
+                solo se necesita comprobar que existe o leer su resumen).
 
         Returns:
             Conversation | None: La entidad de la conversación o None si no se encuentra.
         """
-        result = await db.execute(
-            select(Conversation)
-            .where(Conversation.id == conversation_id)
-            .options(selectinload(Conversation.messages))
-        )
+        query = select(Conversation).where(Conversation.id == conversation_id)
+        if with_messages:
+            query = query.options(selectinload(Conversation.messages))
+        result = await db.execute(query)
         return result.scalars().first()
 
     async def delete_conversation(
@@ -101,6 +155,63 @@ class ConversationService:
         await db.refresh(db_message)
         return db_message
 
+    async def save_exchange(
+        self,
+        db: AsyncSession,
+        conversation_id: UUID,
+        question: str,
+        answer: str,
+        sources: Optional[List[str]] = None,
+    ) -> list[Message]:
+        """
+        Guarda un turno completo (pregunta y respuesta) en una única transacción.
+
+        Ambos mensajes se escriben con un solo INSERT que devuelve las columnas generadas
+        (ID y fecha), sin un `refresh` posterior, y en la misma transacción se actualiza
+        `updated_at` de la conversación. Los dos mensajes y `updated_at` comparten una
+        fecha de `utcnow`, el mismo reloj que el guardado diferido; a igualdad de fecha,
+        las consultas ordenan la pregunta primero.
+
+        Args:
+            db (AsyncSession): Sesión de base de datos asíncrona.
+            conversation_id (UUID): El ID de la conversación.
+            question (str): La pregunta del usuario.
+            answer (str): La respuesta del asistente.
+            sources (List[str], optional): Las fuentes de la respuesta.
+
+        Returns:
+            list[Message]: La pregunta y la respuesta guardadas, en ese orden.
+        """
+        timestamp = utcnow()
+        result = await db.execute(
+            insert(Message).returning(Message, sort_by_parameter_order=True),
+            [
+                # Las dos filas tienen las mismas columnas: así van en una sola sentencia.
+                {
+                    "conversation_id": conversation_id,
+                    "content": question,
+                    "is_user": True,
+                    "timestamp": timestamp,
+                    "sources": None,
+                },
+                {
+                    "conversation_id": conversation_id,
+                    "content": answer,
+                    "is_user": False,
+                    "timestamp": timestamp,
+                    "sources": sources,
+                },
+            ],
+        )
+        messages = result.scalars().all()
+        await db.execute(
+            update(Conversation)
+            .where(Conversation.id == conversation_id)
+            .values(updated_at=timestamp)
+        )
+        await db.commit()
+        return messages
+
     async def get_messages(
         self, db: AsyncSession, conversation_id: UUID
     ) -> list[Message]:
@@ -117,6 +228,158 @@ class ConversationService:
         result = await db.execute(
             select(Message)
             .where(Message.conversation_id == conversation_id)
-            .order_by(Message.timestamp.asc())
+            .order_by(*CHRONOLOGICAL_ORDER)
+        )
+        return result.scalars().all()
+
+    async def get_messages_page(
+        self,
+        db: AsyncSession,
+        conversation_id: UUID,
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> Page[Message]:
+        """
+        Obtiene una página de los mensajes de una conversación, en orden cronológico.
+
+        Usa paginación por cursor sobre el orden cronológico de los mensajes y el índice
+        `ix_messages_conversation_id_timestamp`: cada página es un recorrido acotado del
+        índice a partir del último mensaje de la anterior.
+
+        Args:
+            db (AsyncSession): Sesión de base de datos asíncrona.
+            conversation_id (UUID): El ID de la conversación.
+            limit (int): Número máximo de mensajes de la página.
+            cursor (str, optional): Cursor devuelto con la página anterior.
+
+        Returns:
+            Page[Message]: Los mensajes y el cursor de la página siguiente.
+
+        Raises:
+            ValueError: Si el cursor no es válido.
+        """
+        query = (
+            select(Message)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(*CHRONOLOGICAL_ORDER)
+        )
+        if cursor:
+            after = decode_cursor(cursor)
+            if "is_user" not in after:
+                raise ValueError("El cursor no corresponde a un listado de mensajes.")
+            timestamp, is_user = after["position"], after["is_user"]
+            # Posterior en (timestamp asc, is_user desc, id asc). La condición sobre
+            # `timestamp >=` delimita el recorrido del índice.
+            later = [
+                Message.timestamp > timestamp,
+                and_(Message.is_user == is_user, Message.id > after["id"]),
+            ]
+            if is_user:
+                # A igual fecha, las respuestas van después de las preguntas.
+                later.append(Message.is_user.is_(False))
+            query = query.where(Message.timestamp >= timestamp, or_(*later))
+        result = await db.execute(query.limit(limit + 1))
+        messages = result.scalars().all()
+        if len(messages) <= limit:
+            return Page(items=messages)
+        last = messages[limit - 1]
+        return Page(
+            items=messages[:limit],
+            next_cursor=encode_cursor(last.timestamp, last.id, is_user=last.is_user),
+        )
+
+    async def get_recent_messages(
+        self, db: AsyncSession, conversation_id: UUID, limit: int
+    ) -> list[Message]:
+        """
+        Obtiene los últimos `limit` mensajes de una conversación, en orden cronológico.
+
+        Args:
+            db (AsyncSession): Sesión de base de datos asíncrona.
+            conversation_id (UUID): El ID de la conversación.
+            limit (int): Número máximo de mensajes.
+
+        Returns:
+            list[Message]: Los mensajes más recientes, del más antiguo al más nuevo.
+        """
+        result = await db.execute(
+            select(Message)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(*REVERSE_CHRONOLOGICAL_ORDER)
+            .limit(limit)
+        )
+        return list(reversed(result.scalars().all()))
+
+    async def count_messages(self, db: AsyncSession, conversation_id: UUID) -> int:
+        """Cuenta los mensajes de una conversación."""
+        result = await db.execute(
+            select(func.count())
+            .select_from(Message)
+            .where(Message.conversation_id == conversation_id)
+        )
+        return result.scalar_one()
+
+    async def get_messages_range(
+        self, db: AsyncSession, conversation_id: UUID, offset: int, limit: int
+    ) -> list[Message]:
+        """
+        Obtiene un tramo de los mensajes de una conversación, en orden cronológico.
+
+        Args:
+            db (AsyncSession): Sesión de base de datos asíncrona.
+            conversation_id (UUID): El ID de la conversación.
+            offset (int): Número de mensajes a saltar desde el más antiguo.
+            limit (int): Número máximo de mensajes.
+
+        Returns:
+            list[Message]: Los mensajes del tramo.
+        """
+        result = await db.execute(
+            select(Message)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(*CHRONOLOGICAL_ORDER)
+            .offset(offset)
+            .limit(limit)
         )
         return result.scalars().all()
+
+    async def update_summary(
+        self,
+        db: AsyncSession,
+        conversation_id: UUID,
+        summary: str,
+        previous_count: int,
+        summarized_count: int,
+    ) -> bool:
+        """
+        Guarda el resumen de una conversación si nadie lo ha actualizado entretanto.
+
+        La actualización solo se aplica si `summarized_count` sigue valiendo
+        `previous_count`, de modo que dos actualizaciones concurrentes (p. ej. en workers
+        distintos) no incluyen dos veces los mismos mensajes.
+
+        Args:
+            db (AsyncSession): Sesión de base de datos asíncrona.
+            conversation_id (UUID): El ID de la conversación.
+            summary (str): El nuevo resumen.
+            previous_count (int): Mensajes resumidos cuando se leyó la conversación.
+            summarized_count (int): Mensajes resumidos con el nuevo resumen.
+
+        Returns:
+            bool: True si el resumen se guardó.
+        """
+        result = await db.execute(
+            update(Conversation)
+            .where(
+                Conversation.id == conversation_id,
+                Conversation.summarized_count == previous_count,
+            )
+            # Resumir no es actividad del usuario: se conserva `updated_at`.
+            .values(
+                summary=summary,
+                summarized_count=summarized_count,
+                updated_at=Conversation.updated_at,
+            )
+        )
+        await db.commit()
+        return result.rowcount == 1
@@ -0,0 +1,253 @@
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Set
+from uuid import UUID
+
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.sql import Conversation, Message, utcnow
+
+# Columnas que se escriben de cada mensaje.
+_COLUMNS = ("id", "conversation_id", "content", "is_user", "timestamp", "sources")
+
+
+def merge_pending(
+    messages: Sequence[Message], pending: Sequence[Message], limit: Optional[int] = None
+) -> List[Message]:
+    """
+    Añade a los mensajes leídos de la base de datos los que aún están en la cola.
+
+    Los mensajes pendientes son siempre posteriores a los guardados (la cola se vacía en
+    orden). Los que ya se guardaron entre la lectura de `pending` y la consulta aparecen
+    en ambas listas y se descartan por ID.
+
+    Args:
+        messages (Sequence[Message]): Mensajes leídos, en orden cronológico.
+        pending (Sequence[Message]): Mensajes pendientes, obtenidos *antes* de la consulta.
+        limit (int, optional): Si se indica, solo se devuelven los `limit` más recientes.
+
+    Returns:
+        List[Message]: Todos los mensajes, en orden cronológico.
+    """
+    if not pending:
+        return list(messages)
+    stored = {message.id for message in messages}
+    merged = [*messages, *(message for message in pending if message.id not in stored)]
+    return merged[-limit:] if limit else merged
+
+
+class MessageWriteBehind:
+    """
+    Guardado diferido (write-behind) de los mensajes del chat.
+
+    Los turnos se encolan en memoria y la respuesta se devuelve sin esperar a la base de
+    datos. Una tarea en segundo plano agrupa los turnos de todas las peticiones y los
+    escribe con un INSERT de varias filas por lote, en una transacción que también
+    actualiza `updated_at` de las conversaciones afectadas. Un lote se escribe cuando se
+    llena (`batch_size` mensajes) o cuando pasan `flush_interval` segundos desde su
+    primer turno.
+
+    - **Contrapresión:** la cola está acotada; si se llena, `enqueue_exchange` espera a
+      que haya hueco, frenando a las peticiones en lugar de acumular memoria.
+    - **Leer lo propio:** los mensajes pendientes de cada conversación se conservan hasta
+      guardarse (`pending` y `merge_pending`), de modo que las lecturas los ven.
+    - **Apagado:** `aclose` espera a que se guarde todo lo encolado.
+
+    Los mensajes encolados se pierden si el proceso termina de forma abrupta.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        max_queue_size: int = 1000,
+        batch_size: int = 200,
+        flush_interval: float = 0.01,
+    ):
+        """
+        Args:
+            session_factory (Callable[[], AsyncSession]): Fábrica de sesiones de base de datos.
+            max_queue_size (int): Turnos que caben en la cola antes de aplicar contrapresión.
+            batch_size (int): Máximo de mensajes por INSERT.
+            flush_interval (float): Espera máxima, en segundos, para completar un lote.
+        """
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue: asyncio.Queue[List[Message]] = asyncio.Queue(maxsize=max_queue_size)
+        self._pending: Dict[UUID, List[Message]] = {}
+        # IDs de mensajes encolados que ya no deben escribirse (conversación eliminada).
+        self._dropped: Set[UUID] = set()
+        self._task: Optional[asyncio.Task] = None
+
+        self.flushed_messages = 0
+        self.batches = 0
+        self.failed_messages = 0
+
+    def start(self) -> None:
+        """Arranca la tarea que escribe los lotes."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def enqueue_exchange(
+        self,
+        conversation_id: UUID,
+        question: str,
+        answer: str,
+        sources: Optional[List[str]] = None,
+    ) -> List[Message]:
+        """
+        Encola un turno completo (pregunta y respuesta) para guardarlo en segundo plano.
+
+        Los mensajes reciben aquí su ID y su fecha (`utcnow`, el mismo reloj que el guardado
+        síncrono), así que se pueden devolver al cliente antes de escribirse.
+
+        Args:
+            conversation_id (UUID): El ID de la conversación (ya guardada).
+            question (str): La pregunta del usuario.
+            answer (str): La respuesta del asistente.
+            sources (List[str], optional): Las fuentes de la respuesta.
+
+        Returns:
+            List[Message]: La pregunta y la respuesta, aún sin guardar.
+        """
+        timestamp = utcnow()
+        exchange = [
+            Message(
+                id=uuid.uuid4(),
+                conversation_id=conversation_id,
+                content=question,
+                is_user=True,
+                timestamp=timestamp,
+                sources=None,
+            ),
+            Message(
+                id=uuid.uuid4(),
+                conversation_id=conversation_id,
+                content=answer,
+                is_user=False,
+                timestamp=timestamp,
+                sources=sources,
+            ),
+        ]
+        self._pending.setdefault(conversation_id, []).extend(exchange)
+        await self._queue.put(exchange)
+        return exchange
+
+    def pending(self, conversation_id: UUID) -> List[Message]:
+        """Devuelve una copia de los mensajes de la conversación que aún no se han guardado."""
+        return list(self._pending.get(conversation_id, ()))
+
+    def discard(self, conversation_id: UUID) -> None:
+        """Descarta los mensajes aún no guardados de una conversación (p. ej. al eliminarla)."""
+        for message in self._pending.pop(conversation_id, ()):
+            self._dropped.add(message.id)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Devuelve los contadores de la cola.
+
+        Returns:
+            Dict[str, int]: Turnos en cola, mensajes pendientes, mensajes guardados, lotes
+            escritos y mensajes descartados por errores.
+        """
+        return {
+            "queued_exchanges": self._queue.qsize(),
+            "pending_messages": sum(len(messages) for messages in self._pending.values()),
+            "flushed_messages": self.flushed_messages,
+            "batches": self.batches,
+            "failed_messages": self.failed_messages,
+        }
+
+    async def aclose(self) -> None:
+        """Espera a que se guarden los turnos encolados y detiene la tarea."""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            size = len(batch[0])
+            deadline = loop.time() + self.flush_interval
+            while size < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    exchange = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(exchange)
+                size += len(exchange)
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: List[List[Message]]) -> None:
+        if self._dropped:
+            batch = [exchange for exchange in batch if not self._drop(exchange)]
+            if not batch:
+                return
+        try:
+            await self._write([message for exchange in batch for message in exchange])
+        except Exception as e:
+            # Si falla el lote (p. ej. una conversación eliminada entretanto), se reintenta
+            # turno a turno para no perder los demás.
+            print(f"Error al guardar un lote de {len(batch)} turnos, se reintenta uno a uno: {e}")
+            for exchange in batch:
+                try:
+                    await self._write(exchange)
+                except Exception as e:
+                    print(f"Se descarta un turno de la conversación {exchange[0].conversation_id}: {e}")
+                    self.failed_messages += len(exchange)
+                    self._forget(exchange)
+
+    async def _write(self, messages: List[Message]) -> None:
+        async with self.session_factory() as db:
+            await db.execute(
+                insert(Message),
+                [{column: getattr(message, column) for column in _COLUMNS} for message in messages],
+            )
+            # `updated_at` de cada conversación es la fecha de su último mensaje del lote,
+            # del mismo reloj (`utcnow`) que las fechas de los mensajes.
+            latest: Dict[UUID, datetime] = {}
+            for message in messages:
+                current = latest.get(message.conversation_id)
+                if current is None or message.timestamp > current:
+                    latest[message.conversation_id] = message.timestamp
+            await db.execute(
+                update(Conversation),
+                [
+                    {"id": conversation_id, "updated_at": timestamp}
+                    for conversation_id, timestamp in latest.items()
+                ],
+            )
+            await db.commit()
+        self.flushed_messages += len(messages)
+        self.batches += 1
+        self._forget(messages)
+
+    def _drop(self, exchange: List[Message]) -> bool:
+        if exchange[0].id not in self._dropped:
+            return False
+        self._dropped.difference_update(message.id for message in exchange)
+        return True
+
+    def _forget(self, messages: List[Message]) -> None:
+        for message in messages:
+            pending = self._pending.get(message.conversation_id)
+            if pending is None:
+                continue
+            if message in pending:
+                pending.remove(message)
+            if not pending:
+                del self._pending[message.conversation_id]
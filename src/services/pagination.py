@@ -0,0 +1,63 @@
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Generic, List, Optional, TypeVar
+from uuid import UUID
+
+T = TypeVar("T")
+
+
+@dataclass
+class Page(Generic[T]):
+    """Una página de resultados y el cursor de la siguiente (None si es la última)."""
+
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(position: datetime, row_id: UUID, is_user: Optional[bool] = None) -> str:
+    """
+    Codifica la posición de la última fila de una página como un cursor opaco.
+
+    La paginación por cursor (keyset) continúa a partir de esa posición con un `WHERE`
+    sobre las columnas de ordenación, que se resuelve con el índice: el coste de una
+    página no depende de cuántas filas la preceden, a diferencia de `OFFSET`.
+
+    Args:
+        position (datetime): Valor de la columna de ordenación principal de la fila.
+        row_id (UUID): ID de la fila, que desempata filas con la misma fecha.
+        is_user (bool, optional): Autor del mensaje (solo en los cursores de mensajes).
+
+    Returns:
+        str: El cursor, en base64 apto para URLs.
+    """
+    data = {"t": position.isoformat(), "id": str(row_id)}
+    if is_user is not None:
+        data["u"] = is_user
+    raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """
+    Decodifica un cursor generado por `encode_cursor`.
+
+    Args:
+        cursor (str): El cursor recibido del cliente.
+
+    Returns:
+        dict: `position` (datetime), `id` (UUID) y, en los cursores de mensajes, `is_user`.
+
+    Raises:
+        ValueError: Si el cursor no es válido.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        decoded = {"position": datetime.fromisoformat(data["t"]), "id": UUID(data["id"])}
+        if "u" in data:
+            decoded["is_user"] = bool(data["u"])
+        return decoded
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Cursor de paginación no válido: {cursor!r}") from e
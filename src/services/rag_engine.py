@@ -0,0 +1,184 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+from src.config import Settings
+from src.rag.embedding_cache import CachedEmbeddings
+from src.rag.lexical_index import BM25Index
+from src.rag.vector_store import VectorStore
+from src.services.context_assembler import ContextAssembler, get_token_counter
+from src.services.rag_service import RAGService
+from src.services.semantic_cache import SemanticCache
+
+
+class RAGEngine:
+    """
+    Motor RAG compartido por todo el proceso de la API.
+
+    Se construye una única vez en el ciclo de vida (lifespan) de la aplicación y
+    agrupa los clientes costosos de crear: los pools HTTP hacia OpenAI, el modelo
+    de embeddings, la conexión con el índice de Pinecone y los dos modelos de chat.
+    Todas las peticiones reutilizan el mismo `RAGService`, evitando repetir en cada
+    una los handshakes TLS y la resolución del índice.
+    """
+
+    def __init__(self, settings: Settings):
+        """
+        Construye los clientes compartidos a partir de la configuración.
+
+        Args:
+            settings (Settings): Configuración de la aplicación (modelos y tamaños de pool).
+        """
+        self.settings = settings
+
+        limits = httpx.Limits(
+            max_connections=settings.http_max_connections,
+            max_keepalive_connections=settings.http_max_keepalive_connections,
+            keepalive_expiry=settings.http_keepalive_expiry,
+        )
+        timeout = httpx.Timeout(settings.http_timeout)
+        self.http_client = httpx.Client(limits=limits, timeout=timeout)
+        self.http_async_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+
+        # Pool de hilos acotado para las llamadas síncronas que no tienen versión
+        # asíncrona (cliente de Pinecone), de modo que nunca bloqueen el event loop.
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.rag_thread_pool_size, thread_name_prefix="rag"
+        )
+
+        # Los embeddings de las consultas se memorizan: una pregunta repetida no vuelve
+        # a pagar la llamada a la API de OpenAI.
+        self.embeddings = CachedEmbeddings.from_settings(
+            OpenAIEmbeddings(
+                openai_api_key=settings.openai_api_key,
+                model=settings.embedding_model,
+                dimensions=settings.embedding_dimensions,
+                http_client=self.http_client,
+                http_async_client=self.http_async_client,
+            ),
+            model=settings.embedding_model,
+            dimensions=settings.embedding_dimensions,
+        )
+        self.vector_store = VectorStore(
+            index_name=settings.pinecone_index_name,
+            embeddings=self.embeddings,
+            pool_threads=settings.pinecone_pool_threads,
+            connection_pool_maxsize=settings.pinecone_connection_pool_maxsize,
+            executor=self.executor,
+            backend=settings.vector_backend,
+            local_index_path=settings.local_index_path,
+        )
+        self.llm = ChatOpenAI(
+            model=settings.chat_model,
+            temperature=0.1,
+            # Las respuestas en streaming también informan del uso de tokens (métricas).
+            stream_usage=True,
+            api_key=settings.openai_api_key,
+            http_client=self.http_client,
+            http_async_client=self.http_async_client,
+        )
+        self.rephrase_llm = ChatOpenAI(
+            model=settings.rephrase_model,
+            temperature=0,
+            api_key=settings.openai_api_key,
+            http_client=self.http_client,
+            http_async_client=self.http_async_client,
+        )
+
+        self.semantic_cache = (
+            SemanticCache(
+                max_entries=settings.semantic_cache_max_entries,
+                ttl_seconds=settings.semantic_cache_ttl_seconds,
+                similarity_threshold=settings.semantic_cache_threshold,
+            )
+            if settings.semantic_cache_enabled
+            else None
+        )
+
+        # Índice léxico BM25 construido por la ingesta (vacío si aún no se ha ejecutado).
+        self.lexical_index = (
+            BM25Index.load(settings.lexical_index_path)
+            if settings.hybrid_search_enabled
+            else None
+        )
+
+        self.service = RAGService(
+            vector_store=self.vector_store,
+            llm=self.llm,
+            rephrase_llm=self.rephrase_llm,
+            semantic_cache=self.semantic_cache,
+            lexical_index=self.lexical_index,
+            lexical_fast_path_threshold=settings.lexical_fast_path_threshold,
+            rrf_k=settings.rrf_k,
+            speculative_retrieval=settings.speculative_retrieval,
+            speculation_similarity_threshold=settings.speculation_similarity_threshold,
+            coalesce_requests=settings.request_coalescing,
+            batch_concurrency=settings.batch_concurrency,
+            context_assembler=ContextAssembler(
+                token_budget=settings.context_token_budget,
+                token_counter=get_token_counter(
+                    settings.token_counter, settings.chat_model, settings.tiktoken_cache_dir
+                ),
+            ),
+        )
+
+    async def reload_indexes(self) -> None:
+        """
+        Recarga los índices que el proceso tiene en memoria (el léxico BM25 y, con
+        `VECTOR_BACKEND=local`, el vectorial) y vacía la caché semántica, para que las
+        respuestas reflejen una nueva ingesta sin reiniciar la API.
+
+        La carga desde disco se hace en el pool de hilos; mientras tanto se siguen
+        sirviendo peticiones con los índices anteriores.
+        """
+        loop = asyncio.get_running_loop()
+        if self.settings.hybrid_search_enabled:
+            lexical_index = await loop.run_in_executor(
+                self.executor, BM25Index.load, self.settings.lexical_index_path
+            )
+            self.lexical_index = lexical_index
+            self.service.lexical_index = lexical_index if lexical_index else None
+        await loop.run_in_executor(self.executor, self.vector_store.reload)
+        if self.semantic_cache is not None:
+            self.semantic_cache.invalidate()
+
+    async def warmup(self) -> None:
+        """
+        Abre por adelantado las conexiones de los pools para que las primeras
+        peticiones no paguen el coste de establecerlas.
+
+        Se lanzan en paralelo `rag_warmup_connections` consultas ligeras contra OpenAI
+        (listado de modelos) y una consulta de estadísticas contra Pinecone. Los fallos
+        no son fatales: solo se informan, y la API arranca igualmente.
+        """
+        if not self.settings.rag_warmup:
+            return
+
+        headers = {"Authorization": f"Bearer {self.settings.openai_api_key}"}
+
+        async def ping_openai():
+            response = await self.http_async_client.get(
+                "https://api.openai.com/v1/models", headers=headers
+            )
+            response.raise_for_status()
+
+        tasks = [ping_openai() for _ in range(self.settings.rag_warmup_connections)]
+        loop = asyncio.get_running_loop()
+        tasks.append(loop.run_in_executor(self.executor, self.vector_store.warmup))
+
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors:
+            print(f"Advertencia: fallaron {len(errors)} conexiones de calentamiento: {errors[0]}")
+        else:
+            print(f"Pools de conexiones calentados ({len(tasks)} conexiones).")
+
+    async def aclose(self) -> None:
+        """Cierra los clientes HTTP compartidos y el pool de hilos al apagar la aplicación."""
+        await self.http_async_client.aclose()
+        self.http_client.close()
+        if self.embeddings.store is not None:
+            self.embeddings.store.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -1,11 +1,62 @@
-from typing import List, Dict, Any
+import asyncio
+import copy
+import difflib
+import hashlib
+import json
+from contextlib import aclosing
+from dataclasses import dataclass, field
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple, Union
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
-from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
 
+from src.rag.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
 from src.rag.vector_store import VectorStore
 from src.models.sql import Message
-from src.services.prompt_manager import get_enhanced_prompt
+from src.services.context_assembler import ContextAssembler
+from src.services.prompt_manager import (
+    adjust_response_complexity,
+    get_enhanced_prompt,
+    get_specialized_prompt,
+)
+from src.services.semantic_cache import SemanticCache
+from src.services.single_flight import SingleFlight, normalize_question
+from src.services.stage_timer import stage
+
+NO_RESULTS_RESPONSE = {
+    "answer": "No se encontró información relevante para responder a tu pregunta.",
+    "sources": [],
+    "confidence": 0.0,
+    "lexical_confidence": None,
+}
+
+
+@dataclass
+class PreparedAnswer:
+    """Resultado de las etapas del pipeline previas a la generación."""
+
+    question: str
+    # None cuando la recuperación se resolvió solo con el índice léxico.
+    embedding: Optional[List[float]]
+    cache_namespace: str
+    # Respuesta final disponible sin generar (acierto de caché o sin resultados).
+    response: Optional[Dict[str, Any]] = None
+    results: List[Tuple[Document, float]] = field(default_factory=list)
+    messages: List[BaseMessage] = field(default_factory=list)
+    sources: List[str] = field(default_factory=list)
+    # Similitud coseno media de los resultados vectoriales; None en la ruta rápida léxica,
+    # que no hace búsqueda vectorial.
+    confidence: Optional[float] = 0.0
+    # Confianza heurística de BM25 (ver `BM25Index.search_with_confidence`), solo cuando
+    # la recuperación se resolvió con el índice léxico. No es comparable con `confidence`.
+    lexical_confidence: Optional[float] = None
+    # Tokens del contexto incluido en el prompt de generación.
+    context_tokens: int = 0
+    # Resultado de la consulta a la caché semántica (None si no se consultó), que se
+    # cuenta en sus estadísticas solo cuando la petición usa esta recuperación.
+    cache_hit: Optional[bool] = None
 
 
 class RAGService:
@@ -14,27 +65,104 @@ class RAGService:
     para generar respuestas contextualizadas.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        vector_store: Optional[VectorStore] = None,
+        llm: Optional[BaseChatModel] = None,
+        rephrase_llm: Optional[BaseChatModel] = None,
+        semantic_cache: Optional[SemanticCache] = None,
+        lexical_index: Optional[BM25Index] = None,
+        lexical_fast_path_threshold: float = 0.6,
+        rrf_k: int = 60,
+        speculative_retrieval: bool = True,
+        speculation_similarity_threshold: float = 0.9,
+        context_assembler: Optional[ContextAssembler] = None,
+        coalesce_requests: bool = True,
+        batch_concurrency: int = 8,
+    ):
         """
         Inicializa el servicio RAG, configurando los modelos de lenguaje y el almacén de vectores.
+
+        Los componentes pueden inyectarse ya construidos (ver `RAGEngine`), de forma que
+        los clientes HTTP se compartan entre peticiones en lugar de crearse en cada una.
+
+        Args:
+            vector_store (VectorStore, optional): Almacén de vectores a utilizar.
+            llm (BaseChatModel, optional): Modelo principal para generar las respuestas.
+            rephrase_llm (BaseChatModel, optional): Modelo de apoyo para reformular preguntas.
+            semantic_cache (SemanticCache, optional): Caché semántica de respuestas. Si no se
+                provee, todas las preguntas recorren el pipeline completo.
+            lexical_index (BM25Index, optional): Índice léxico BM25. Si se provee, sus
+                resultados se fusionan con los vectoriales (búsqueda híbrida).
+            lexical_fast_path_threshold (float): Confianza léxica a partir de la cual se
+                responde solo con el índice léxico, sin calcular el embedding de la pregunta.
+                Esas respuestas llevan la confianza léxica en `lexical_confidence`, con
+                `confidence` a None, y nunca se guardan en la caché semántica.
+            rrf_k (int): Constante de Reciprocal Rank Fusion.
+            speculative_retrieval (bool): Si es True, en las preguntas de seguimiento se
+                recupera con la pregunta original mientras se reformula.
+            speculation_similarity_threshold (float): Similitud mínima (difflib) entre la
+                pregunta original y la reformulada para reutilizar la recuperación especulativa.
+            context_assembler (ContextAssembler, optional): Ensamblador del contexto del
+                prompt (une chunks solapados y aplica el presupuesto de tokens).
+            coalesce_requests (bool): Si es True, las peticiones concurrentes con la misma
+                pregunta autocontenida y los mismos parámetros de búsqueda comparten una
+                sola recuperación y una sola generación (ver `SingleFlight`), y las que
+                tienen la misma pregunta y el mismo historial, una sola reformulación.
+            batch_concurrency (int): Generaciones simultáneas como máximo al responder un
+                lote de preguntas (ver `aiter_batch`).
         """
-        self.vector_store = VectorStore()
-        self.llm = ChatOpenAI(model="gpt-4o", temperature=0.1)
-        self.rephrase_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+        self.vector_store = vector_store or VectorStore()
+        self.llm = llm or ChatOpenAI(model="gpt-4o", temperature=0.1)
+        self.rephrase_llm = rephrase_llm or ChatOpenAI(model="gpt-4o-mini", temperature=0)
+        self.semantic_cache = semantic_cache
+        # Un índice léxico vacío (no se ha ejecutado la ingesta) equivale a no tenerlo.
+        self.lexical_index = lexical_index if lexical_index else None
+        self.lexical_fast_path_threshold = lexical_fast_path_threshold
+        self.rrf_k = rrf_k
+        self.speculative_retrieval = speculative_retrieval
+        self.speculation_similarity_threshold = speculation_similarity_threshold
 
-    def _rephrase_question_with_history(
+        self.context_assembler = context_assembler or ContextAssembler()
+
+        # Llamadas en curso de cada etapa, compartidas entre peticiones equivalentes.
+        self.coalesce_requests = coalesce_requests
+        self.rephrase_flights = SingleFlight()
+        self.retrieval_flights = SingleFlight()
+        self.generation_flights = SingleFlight()
+        self.batch_concurrency = batch_concurrency
+
+        self.speculation_hits = 0
+        self.speculation_misses = 0
+        self.contexts_assembled = 0
+        self.context_tokens_total = 0
+        # Tokens consumidos por cada modelo, según el uso que informa el propio LLM.
+        self.llm_tokens = {
+            role: {"input": 0, "output": 0} for role in ("rephrase", "generation")
+        }
+        # Preguntas que se están respondiendo en este momento.
+        self.in_flight = 0
+
+    def _count_tokens(self, role: str, message: BaseMessage) -> None:
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            self.llm_tokens[role]["input"] += usage.get("input_tokens", 0)
+            self.llm_tokens[role]["output"] += usage.get("output_tokens", 0)
+
+    def _build_rephrase_messages(
         self, question: str, history: List[Message]
-    ) -> str:
+    ) -> List[BaseMessage]:
         """
-        Reformulación de una pregunta de seguimiento para que sea autocontenida,
-        utilizando el historial de la conversación para añadir contexto.
+        Construye los mensajes para el modelo de reformulación a partir del historial.
         """
-        if not history:
-            return question
-
         chat_history = []
         for msg in history:
-            if msg.is_user:
+            # El resumen de los turnos antiguos (ver `ConversationMemory`) va como contexto de sistema.
+            if getattr(msg, "is_summary", False):
+                chat_history.append(
+                    SystemMessage(content=f"Resumen de la conversación anterior: {msg.content}")
+                )
+            elif msg.is_user:
                 chat_history.append(HumanMessage(content=msg.content))
             else:
                 chat_history.append(AIMessage(content=msg.content))
@@ -55,51 +183,667 @@ class RAGService:
             ]
         )
 
+        return rephrase_prompt.format_messages(
+            chat_history=chat_history, question=question
+        )
+
+    def _rephrase_question_with_history(
+        self, question: str, history: List[Message]
+    ) -> str:
+        """
+        Reformulación de una pregunta de seguimiento para que sea autocontenida,
+        utilizando el historial de la conversación para añadir contexto.
+        """
+        if not history:
+            return question
+
         response = self.rephrase_llm.invoke(
-            rephrase_prompt.format_messages(
-                chat_history=chat_history, question=question
-            )
+            self._build_rephrase_messages(question, history)
         )
         return response.content.strip()
 
-    def answer_question(self, question: str, history: List[Message]) -> Dict[str, Any]:
+    async def _arephrase_question_with_history(
+        self, question: str, history: List[Message]
+    ) -> str:
         """
-        Orquesta el proceso completo de RAG para responder una pregunta con prompts mejorados.
+        Versión asíncrona de `_rephrase_question_with_history`.
         """
-        rephrased_question = self._rephrase_question_with_history(question, history)
+        if not history:
+            return question
+
+        with stage("rephrase"):
+            if not self.coalesce_requests:
+                return await self._acall_rephrase(question, history)
+            # Solo se agrupan las reformulaciones con el mismo historial.
+            transcript = json.dumps(
+                [[getattr(msg, "is_summary", False), msg.is_user, msg.content] for msg in history]
+            )
+            return await self.rephrase_flights.run(
+                self._flight_key(question, None, transcript),
+                lambda: self._acall_rephrase(question, history),
+            )
 
-        results_with_scores = self.vector_store.similarity_search_with_score(
-            rephrased_question, top_k=5
+    async def _acall_rephrase(self, question: str, history: List[Message]) -> str:
+        response = await self.rephrase_llm.ainvoke(
+            self._build_rephrase_messages(question, history)
         )
-        if not results_with_scores:
-            return {
-                "answer": "No se encontró información relevante para responder a tu pregunta.",
-                "sources": [],
-                "confidence": 0.0,
-            }
+        self._count_tokens("rephrase", response)
+        return response.content.strip()
 
-        context = "\n\n".join([doc.page_content for doc, _ in results_with_scores])
-        sources = [
-            doc.metadata for doc, _ in results_with_scores
-        ]  # Extraer metadatos completos
-        scores = [score for _, score in results_with_scores]
-        confidence = float(sum(scores)) / len(scores) if scores else 0.0
+    def _build_answer_messages(
+        self,
+        rephrased_question: str,
+        results_with_scores: List[Tuple[Document, float]],
+        confidence: Optional[float],
+    ) -> Tuple[List[BaseMessage], List[str], Optional[float], int]:
+        """
+        Construye el prompt de generación a partir de los documentos recuperados.
+
+        El contexto lo construye `ContextAssembler`: une los chunks contiguos de una misma
+        sección sin repetir su solapamiento y lo recorta al presupuesto de tokens.
+
+        Args:
+            confidence (float, optional): Similitud media de la búsqueda vectorial, o None
+                si los resultados vienen solo del índice léxico.
+
+        Returns:
+            Tuple[List[BaseMessage], List[str], Optional[float], int]: Los mensajes para el
+            LLM, la lista de fuentes únicas, la confianza de la búsqueda y los tokens del contexto.
+        """
+        assembled = self.context_assembler.assemble(results_with_scores)
+        context = assembled.text
+        sources = assembled.metadatas  # Metadatos de los fragmentos incluidos
+        self.contexts_assembled += 1
+        self.context_tokens_total += assembled.token_count
 
         # Construir el prompt dinámico y mejorado
         system_prompt = get_enhanced_prompt(rephrased_question, context, sources)
-        
+
         prompt = ChatPromptTemplate.from_messages(
             [
                 ("system", system_prompt),
                 ("human", "Pregunta: {question}"),
             ]
         )
-        
+
         messages = prompt.format_messages(question=rephrased_question)
-        response = self.llm.invoke(messages)
-        answer = response.content.strip()
 
         # Las fuentes ahora se manejan dentro del prompt, pero las devolvemos para referencia
         source_list = list(set([s.get("source", "") for s in sources if isinstance(s, dict)]))
 
-        return {"answer": answer, "sources": source_list, "confidence": confidence}
+        return messages, source_list, confidence, assembled.token_count
+
+    def _lexical_search(
+        self, rephrased_question: str
+    ) -> Tuple[List[Tuple[Document, float]], float]:
+        """Busca la pregunta en el índice léxico, si existe. Devuelve los resultados y su confianza."""
+        if self.lexical_index is None:
+            return [], 0.0
+        return self.lexical_index.search_with_confidence(rephrased_question, k=5)
+
+    def _is_lexical_fast_path(self, lexical_confidence: float) -> bool:
+        return lexical_confidence >= self.lexical_fast_path_threshold
+
+    def _fuse_results(
+        self,
+        vector_results: List[Tuple[Document, float]],
+        lexical_results: List[Tuple[Document, float]],
+    ) -> Tuple[List[Tuple[Document, float]], float]:
+        """
+        Combina los resultados vectoriales y léxicos con Reciprocal Rank Fusion.
+
+        La confianza de la respuesta sigue siendo la similitud media de los resultados
+        vectoriales: los scores RRF solo sirven para ordenar.
+
+        Returns:
+            Tuple[List[Tuple[Document, float]], float]: Los resultados fusionados y la confianza.
+        """
+        scores = [score for _, score in vector_results]
+        confidence = float(sum(scores)) / len(scores) if scores else 0.0
+        if not lexical_results:
+            return vector_results, confidence
+        fused = reciprocal_rank_fusion(
+            [vector_results, lexical_results], k=self.rrf_k, top_n=5
+        )
+        return fused, confidence
+
+    def answer_question(self, question: str, history: List[Message]) -> Dict[str, Any]:
+        """
+        Orquesta el proceso completo de RAG para responder una pregunta con prompts mejorados.
+
+        Si hay índice léxico, sus resultados se fusionan con los vectoriales; cuando la
+        coincidencia léxica es muy clara, se responde solo con ella y se evita la búsqueda
+        vectorial (y el cálculo del embedding de la pregunta); la confianza se informa
+        entonces en `lexical_confidence`, con `confidence` a None.
+        """
+        rephrased_question = self._rephrase_question_with_history(question, history)
+
+        lexical_results, lexical_confidence = self._lexical_search(rephrased_question)
+        if self._is_lexical_fast_path(lexical_confidence):
+            results_with_scores, confidence = lexical_results, None
+        else:
+            lexical_confidence = None
+            vector_results = self.vector_store.similarity_search_with_score(
+                rephrased_question, top_k=5
+            )
+            results_with_scores, confidence = self._fuse_results(vector_results, lexical_results)
+        if not results_with_scores:
+            return copy.deepcopy(NO_RESULTS_RESPONSE)
+
+        messages, source_list, confidence, _ = self._build_answer_messages(
+            rephrased_question, results_with_scores, confidence
+        )
+        response = self.llm.invoke(messages)
+        answer = response.content.strip()
+
+        return {
+            "answer": answer,
+            "sources": source_list,
+            "confidence": confidence,
+            "lexical_confidence": lexical_confidence,
+        }
+
+    @staticmethod
+    def _flight_key(
+        question: str, search_params: Optional[Dict[str, Any]], *extra: str
+    ) -> Tuple[str, ...]:
+        """Clave de agrupación: pregunta normalizada y parámetros de búsqueda."""
+        params = json.dumps(search_params or {}, sort_keys=True, default=str)
+        return (normalize_question(question), params, *extra)
+
+    def _generation_key(
+        self, prepared: PreparedAnswer, search_params: Optional[Dict[str, Any]], kind: str
+    ) -> Tuple[str, ...]:
+        """
+        Clave de agrupación de la generación: además de la pregunta, la huella del prompt
+        (que incluye el contexto recuperado) y de la confianza. Dos peticiones con la misma
+        pregunta pero distinta recuperación (p. ej. especulativa frente a reformulada, o
+        ruta léxica frente a vectorial) no comparten respuesta.
+        """
+        fingerprint = hashlib.sha256()
+        for message in prepared.messages:
+            fingerprint.update(f"{message.type}\x1f{message.content}\x1e".encode("utf-8"))
+        fingerprint.update(
+            json.dumps([prepared.confidence, prepared.lexical_confidence]).encode("utf-8")
+        )
+        return self._flight_key(
+            prepared.question, search_params, kind, fingerprint.hexdigest()
+        )
+
+    def _cache_namespace(self, rephrased_question: str) -> str:
+        """
+        Partición de la caché semántica para una pregunta.
+
+        Dos preguntas muy parecidas pueden pedir respuestas distintas ("explica brevemente" frente
+        a "explica detalladamente"), así que solo se comparten respuestas entre preguntas con el
+        mismo perfil de prompt (persona y nivel de detalle).
+        """
+        return "|".join(
+            [
+                get_specialized_prompt(rephrased_question),
+                adjust_response_complexity(rephrased_question),
+            ]
+        )
+
+    async def _aretrieve(
+        self,
+        query: str,
+        search_params: Optional[Dict[str, Any]] = None,
+        embedding: Optional[List[float]] = None,
+        speculative: bool = False,
+    ) -> PreparedAnswer:
+        """
+        Recupera los documentos para una pregunta ya autocontenida: búsqueda léxica,
+        embedding, consulta a la caché semántica y búsqueda vectorial.
+
+        El embedding se calcula una sola vez y se usa tanto para la caché como para la
+        búsqueda en el índice. Si la coincidencia léxica es muy clara, la recuperación se
+        resuelve solo con el índice BM25 y el embedding no se calcula: sin embedding no se
+        consulta la caché semántica ni se guarda en ella la respuesta, y la confianza
+        heurística de BM25 se informa aparte (`lexical_confidence`).
+
+        Args:
+            embedding (List[float], optional): Embedding de `query` ya calculado (p. ej.
+                junto con el resto de un lote). Si no se provee, se calcula aquí.
+            speculative (bool): Si es True, la consulta a la caché no se cuenta en sus
+                estadísticas; lo hace quien decida usar el resultado.
+
+        Returns:
+            PreparedAnswer: Los documentos recuperados, o una respuesta final si hubo
+            acierto en la caché o no se encontraron documentos relevantes.
+        """
+        with stage("retrieval"):
+            if not self.coalesce_requests:
+                prepared = await self._aretrieve_documents(query, search_params, embedding)
+            else:
+                prepared = await self.retrieval_flights.run(
+                    self._flight_key(query, search_params),
+                    lambda: self._aretrieve_documents(query, search_params, embedding),
+                )
+                # Cada petición completa su propia copia (pregunta reformulada, prompt...),
+                # sin compartir listas ni documentos con las demás.
+                prepared = copy.deepcopy(prepared)
+                prepared.question = query
+        if not speculative:
+            self._record_cache_lookup(prepared)
+        return prepared
+
+    def _record_cache_lookup(self, prepared: PreparedAnswer) -> None:
+        """
+        Cuenta la consulta a la caché semántica de una petición, una vez terminada la
+        recuperación. Cada petición cuenta una vez aunque comparta la consulta con otras.
+        """
+        if self.semantic_cache is not None and prepared.cache_hit is not None:
+            self.semantic_cache.record_lookup(prepared.cache_hit)
+
+    async def _aretrieve_documents(
+        self,
+        query: str,
+        search_params: Optional[Dict[str, Any]],
+        embedding: Optional[List[float]] = None,
+    ) -> PreparedAnswer:
+        prepared = PreparedAnswer(
+            question=query,
+            embedding=None,
+            cache_namespace=self._cache_namespace(query),
+        )
+        lexical_results, lexical_confidence = self._lexical_search(query)
+        if self._is_lexical_fast_path(lexical_confidence):
+            prepared.results = lexical_results
+            prepared.confidence, prepared.lexical_confidence = None, lexical_confidence
+            return prepared
+
+        if embedding is None:
+            embedding = await self.vector_store.aembed_query(query)
+        prepared.embedding = embedding
+        if self.semantic_cache is not None:
+            prepared.response = self.semantic_cache.lookup(
+                prepared.embedding, namespace=prepared.cache_namespace, record=False
+            )
+            prepared.cache_hit = prepared.response is not None
+            if prepared.cache_hit:
+                return prepared
+
+        vector_results = await self.vector_store.asimilarity_search_by_vector_with_score(
+            prepared.embedding, top_k=5, **(search_params or {})
+        )
+        prepared.results, prepared.confidence = self._fuse_results(
+            vector_results, lexical_results
+        )
+        if not prepared.results:
+            prepared.response = copy.deepcopy(NO_RESULTS_RESPONSE)
+        return prepared
+
+    def _is_near_identical(self, question: str, rephrased_question: str) -> bool:
+        """
+        Indica si la reformulación apenas cambia la pregunta original (ignorando
+        mayúsculas, tildes y puntuación), de modo que recuperar con una u otra es equivalente.
+        """
+        original = " ".join(tokenize(question))
+        rephrased = " ".join(tokenize(rephrased_question))
+        ratio = difflib.SequenceMatcher(None, original, rephrased).ratio()
+        return ratio >= self.speculation_similarity_threshold
+
+    async def _aspeculative_retrieve(
+        self,
+        question: str,
+        history: List[Message],
+        search_params: Optional[Dict[str, Any]] = None,
+    ) -> PreparedAnswer:
+        """
+        Reformula la pregunta y, en paralelo, lanza de forma especulativa la recuperación
+        con la pregunta original.
+
+        Si la reformulación devuelve (casi) la misma pregunta y con el mismo perfil de
+        prompt (la misma partición de la caché, ver `_cache_namespace`), se reutiliza el
+        resultado especulativo y se ahorra la latencia de la recuperación. Si no, se
+        cancela y se recupera con la pregunta reformulada. La consulta especulativa a la
+        caché solo se cuenta en sus estadísticas si se reutiliza.
+        """
+        speculative = asyncio.create_task(
+            self._aretrieve(question, search_params, speculative=True)
+        )
+        try:
+            rephrased_question = await self._arephrase_question_with_history(
+                question, history
+            )
+        except BaseException:
+            speculative.cancel()
+            raise
+
+        if self._is_near_identical(question, rephrased_question) and (
+            self._cache_namespace(question) == self._cache_namespace(rephrased_question)
+        ):
+            self.speculation_hits += 1
+            prepared = await speculative
+            prepared.question = rephrased_question
+            prepared.cache_namespace = self._cache_namespace(rephrased_question)
+            self._record_cache_lookup(prepared)
+            return prepared
+
+        self.speculation_misses += 1
+        speculative.cancel()
+        # Se recoge el resultado de la tarea cancelada para no dejar excepciones sin leer.
+        speculative.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return await self._aretrieve(rephrased_question, search_params)
+
+    async def _aprepare_answer(
+        self,
+        question: str,
+        history: List[Message],
+        search_params: Optional[Dict[str, Any]] = None,
+    ) -> PreparedAnswer:
+        """
+        Ejecuta de forma asíncrona las etapas previas a la generación: reformulación,
+        recuperación (ver `_aretrieve`) y construcción del prompt.
+
+        En las preguntas de seguimiento, la recuperación con la pregunta original se lanza
+        de forma especulativa mientras se reformula (ver `_aspeculative_retrieve`).
+
+        Args:
+            search_params (Dict[str, Any], optional): Parámetros de búsqueda del índice
+                para esta petición (p. ej. `{"nprobe": 32}` para más recall en el índice
+                aproximado local).
+
+        Returns:
+            PreparedAnswer: El prompt listo para el LLM, o una respuesta final si hubo
+            acierto en la caché o no se encontraron documentos relevantes.
+        """
+        if history and self.speculative_retrieval:
+            prepared = await self._aspeculative_retrieve(question, history, search_params)
+        else:
+            rephrased_question = await self._arephrase_question_with_history(
+                question, history
+            )
+            prepared = await self._aretrieve(rephrased_question, search_params)
+
+        self._build_prompt(prepared)
+        return prepared
+
+    def _build_prompt(self, prepared: PreparedAnswer) -> None:
+        """Construye el prompt de generación, salvo si ya hay una respuesta final."""
+        if prepared.response is not None:
+            return
+        with stage("prompt"):
+            (
+                prepared.messages,
+                prepared.sources,
+                prepared.confidence,
+                prepared.context_tokens,
+            ) = self._build_answer_messages(
+                prepared.question, prepared.results, prepared.confidence
+            )
+
+    def _remember_answer(self, prepared: PreparedAnswer, answer: str) -> Dict[str, Any]:
+        """
+        Construye la respuesta final y la guarda en la caché semántica. Las respuestas de
+        la ruta rápida léxica no tienen embedding y nunca se guardan.
+        """
+        response = {
+            "answer": answer,
+            "sources": prepared.sources,
+            "confidence": prepared.confidence,
+            "lexical_confidence": prepared.lexical_confidence,
+        }
+        if self.semantic_cache is not None and prepared.embedding is not None and answer:
+            self.semantic_cache.store(
+                prepared.question,
+                prepared.embedding,
+                response,
+                namespace=prepared.cache_namespace,
+            )
+        return response
+
+    async def _agenerate_answer(self, prepared: PreparedAnswer) -> Dict[str, Any]:
+        response = await self.llm.ainvoke(prepared.messages)
+        self._count_tokens("generation", response)
+        return self._remember_answer(prepared, response.content.strip())
+
+    async def _agenerate(
+        self, prepared: PreparedAnswer, search_params: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Genera la respuesta, compartiendo la generación en curso si hay una equivalente."""
+        with stage("generation"):
+            if not self.coalesce_requests:
+                return await self._agenerate_answer(prepared)
+            response = await self.generation_flights.run(
+                self._generation_key(prepared, search_params, "answer"),
+                lambda: self._agenerate_answer(prepared),
+            )
+        return copy.deepcopy(response)
+
+    async def _astream_generation(self, prepared: PreparedAnswer) -> AsyncIterator[str]:
+        answer_parts = []
+        async for chunk in self.llm.astream(prepared.messages):
+            # Con `stream_usage`, el último fragmento trae el uso de tokens.
+            self._count_tokens("generation", chunk)
+            if chunk.content:
+                answer_parts.append(chunk.content)
+                yield chunk.content
+        self._remember_answer(prepared, "".join(answer_parts).strip())
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Devuelve los contadores del servicio.
+
+        Returns:
+            Dict[str, Any]: Uso de la recuperación especulativa (intentos, aciertos,
+            fallos y tasa de acierto), tamaño de los contextos ensamblados, tokens
+            consumidos por cada modelo, preguntas en curso y llamadas de cada etapa
+            compartidas entre peticiones concurrentes.
+        """
+        attempts = self.speculation_hits + self.speculation_misses
+        return {
+            "speculation": {
+                "attempts": attempts,
+                "hits": self.speculation_hits,
+                "misses": self.speculation_misses,
+                "hit_rate": self.speculation_hits / attempts if attempts else 0.0,
+            },
+            "context": {
+                "assembled": self.contexts_assembled,
+                "avg_tokens": (
+                    self.context_tokens_total / self.contexts_assembled
+                    if self.contexts_assembled
+                    else 0.0
+                ),
+                "token_budget": self.context_assembler.token_budget,
+                "exact_tokenizer": self.context_assembler.token_counter.is_exact,
+            },
+            "tokens": {role: dict(counts) for role, counts in self.llm_tokens.items()},
+            "in_flight": self.in_flight,
+            "coalescing": {
+                "rephrase": self.rephrase_flights.stats(),
+                "retrieval": self.retrieval_flights.stats(),
+                "generation": self.generation_flights.stats(),
+            },
+        }
+
+    async def aanswer_question(
+        self,
+        question: str,
+        history: List[Message],
+        search_params: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Versión asíncrona de `answer_question`.
+
+        La reformulación, la recuperación y la generación se esperan (`await`) sin
+        bloquear el event loop, de modo que una llamada lenta al LLM no congela al
+        resto de peticiones atendidas por el mismo worker. Si la caché semántica tiene
+        la respuesta a una pregunta equivalente, se devuelve sin llamar al LLM.
+
+        `search_params` permite ajustar por petición el compromiso recall/latencia del
+        índice (ver `_aprepare_answer`).
+
+        Las peticiones concurrentes cuya pregunta autocontenida coincide comparten la
+        recuperación y la generación en curso (ver `coalesce_requests`); cada una recibe
+        su propia copia de la respuesta.
+        """
+        self.in_flight += 1
+        try:
+            prepared = await self._aprepare_answer(question, history, search_params)
+            if prepared.response is not None:
+                return prepared.response
+            return await self._agenerate(prepared, search_params)
+        finally:
+            self.in_flight -= 1
+
+    async def astream_answer(
+        self,
+        question: str,
+        history: List[Message],
+        search_params: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Genera la respuesta de forma incremental, token a token.
+
+        Primero emite un evento `("metadata", {"sources", "confidence", "lexical_confidence"})`
+        en cuanto termina
+        la recuperación, y después un evento `("token", texto)` por cada fragmento que
+        produce el LLM, reduciendo el tiempo hasta el primer token visible para el usuario.
+        Las respuestas servidas desde la caché se emiten como un único token. Como en
+        `aanswer_question`, las peticiones concurrentes equivalentes comparten el stream
+        del LLM: quien se une a uno ya empezado recibe primero los tokens anteriores.
+
+        Yields:
+            Tuple[str, Any]: Pares (tipo de evento, datos).
+        """
+        self.in_flight += 1
+        try:
+            prepared = await self._aprepare_answer(question, history, search_params)
+            if prepared.response is not None:
+                yield "metadata", {
+                    "sources": prepared.response["sources"],
+                    "confidence": prepared.response["confidence"],
+                    "lexical_confidence": prepared.response.get("lexical_confidence"),
+                }
+                yield "token", prepared.response["answer"]
+                return
+
+            yield "metadata", {
+                "sources": prepared.sources,
+                "confidence": prepared.confidence,
+                "lexical_confidence": prepared.lexical_confidence,
+            }
+
+            if self.coalesce_requests:
+                tokens = self.generation_flights.stream(
+                    self._generation_key(prepared, search_params, "stream"),
+                    lambda: self._astream_generation(prepared),
+                )
+            else:
+                tokens = self._astream_generation(prepared)
+            # `aclosing` deja de esperar el stream compartido en cuanto el cliente se va.
+            with stage("generation"):
+                async with aclosing(tokens):
+                    async for token in tokens:
+                        yield "token", token
+        finally:
+            self.in_flight -= 1
+
+    async def _aembed_batch(self, questions: List[str]) -> Dict[str, List[float]]:
+        """Calcula con una sola llamada los embeddings de las preguntas distintas de un lote."""
+        unique = list(dict.fromkeys(questions))
+        with stage("retrieval"):
+            vectors = await self.vector_store.aembed_documents(unique)
+        return dict(zip(unique, vectors))
+
+    async def _aanswer_batch_item(
+        self,
+        question: str,
+        embeddings: asyncio.Task,
+        generation_slots: asyncio.Semaphore,
+        search_params: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        self.in_flight += 1
+        try:
+            embedding = (await embeddings)[question]
+            prepared = await self._aretrieve(question, search_params, embedding=embedding)
+            self._build_prompt(prepared)
+            if prepared.response is not None:
+                return prepared.response
+            async with generation_slots:
+                return await self._agenerate(prepared, search_params)
+        finally:
+            self.in_flight -= 1
+
+    async def aiter_batch(
+        self,
+        questions: List[str],
+        search_params: Optional[Dict[str, Any]] = None,
+        concurrency: Optional[int] = None,
+    ) -> AsyncIterator[Tuple[int, Union[Dict[str, Any], Exception]]]:
+        """
+        Responde un lote de preguntas independientes (sin historial), compartiendo el
+        trabajo entre ellas, y entrega cada respuesta en cuanto está lista.
+
+        Los embeddings de todas las preguntas se calculan con una sola llamada a
+        `embed_documents` en lugar de una por pregunta; las recuperaciones se lanzan a la
+        vez y la generación se limita a `concurrency` llamadas simultáneas al LLM. Las
+        preguntas repetidas en el lote (ver `normalize_question`) se responden una sola
+        vez, y, como en `aanswer_question`, se consulta la caché semántica.
+
+        Un error en una pregunta no interrumpe el lote: se entrega como resultado de esa
+        pregunta.
+
+        Args:
+            questions (List[str]): Las preguntas, ya autocontenidas.
+            search_params (Dict[str, Any], optional): Parámetros de búsqueda del índice.
+            concurrency (int, optional): Generaciones simultáneas. Por defecto,
+                `batch_concurrency`.
+
+        Yields:
+            Tuple[int, Union[Dict[str, Any], Exception]]: La posición de la pregunta en el
+            lote y su respuesta (o la excepción que la impidió), por orden de finalización.
+        """
+        # Posiciones del lote de cada pregunta distinta.
+        positions: Dict[str, List[int]] = {}
+        for index, question in enumerate(questions):
+            positions.setdefault(normalize_question(question), []).append(index)
+        distinct = [questions[indices[0]] for indices in positions.values()]
+
+        embeddings = asyncio.create_task(self._aembed_batch(distinct))
+        # Si el lote se abandona antes de esperar los embeddings, su error no queda sin leer.
+        embeddings.add_done_callback(lambda task: task.cancelled() or task.exception())
+        generation_slots = asyncio.Semaphore(concurrency or self.batch_concurrency)
+
+        async def answer(indices: List[int]):
+            try:
+                return indices, await self._aanswer_batch_item(
+                    questions[indices[0]], embeddings, generation_slots, search_params
+                )
+            except Exception as e:
+                print(f"Error al responder la pregunta {indices[0]} del lote: {e}")
+                return indices, e
+
+        tasks = [asyncio.create_task(answer(indices)) for indices in positions.values()]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                indices, result = await next_result
+                for index in indices:
+                    # Cada posición recibe su propia copia de la respuesta.
+                    yield index, copy.deepcopy(result) if isinstance(result, dict) else result
+        finally:
+            # El consumidor dejó de leer (p. ej. el cliente se desconectó): se cancela el resto.
+            for task in tasks:
+                task.cancel()
+            embeddings.cancel()
+
+    async def aanswer_batch(
+        self,
+        questions: List[str],
+        search_params: Optional[Dict[str, Any]] = None,
+        concurrency: Optional[int] = None,
+    ) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Variante de `aiter_batch` que espera a todo el lote.
+
+        Returns:
+            List[Union[Dict[str, Any], Exception]]: Las respuestas, en el orden de las preguntas.
+        """
+        results: List[Union[Dict[str, Any], Exception]] = [None] * len(questions)
+        async with aclosing(self.aiter_batch(questions, search_params, concurrency)) as batch:
+            async for index, result in batch:
+                results[index] = result
+        return results
@@ -0,0 +1,199 @@
+import copy
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+
+@dataclass
+class _CacheEntry:
+    question: str
+    namespace: str
+    vector: np.ndarray
+    response: Dict[str, Any]
+    created_at: float
+
+
+class SemanticCache:
+    """
+    Caché semántica de respuestas indexada por el embedding de la pregunta.
+
+    Dos preguntas con distinta redacción pero el mismo significado ("¿capital de Colombia?"
+    y "¿Cuál es la capital de Colombia?") producen embeddings muy cercanos. Si la similitud
+    coseno con una pregunta ya respondida supera el umbral, se devuelve la respuesta
+    almacenada sin volver a consultar el índice ni el LLM.
+
+    Las entradas se desalojan por antigüedad (TTL) y, al superar el tamaño máximo, por
+    uso menos reciente (LRU). La caché vive en memoria del proceso: cada worker tiene la suya.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        ttl_seconds: float = 3600.0,
+        similarity_threshold: float = 0.95,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Inicializa la caché.
+
+        Args:
+            max_entries (int): Número máximo de respuestas almacenadas.
+            ttl_seconds (float): Tiempo de vida de cada entrada, en segundos.
+            similarity_threshold (float): Similitud coseno mínima para considerar un acierto.
+            clock (Callable[[], float]): Reloj usado para el TTL (inyectable en tests).
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._clock = clock
+
+        self._entries: "OrderedDict[int, _CacheEntry]" = OrderedDict()
+        self._next_id = 0
+        # Matriz de vectores normalizados, reconstruida solo cuando cambian las entradas.
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_ids: List[int] = []
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, entry_id: int) -> None:
+        del self._entries[entry_id]
+        self._matrix = None
+
+    def _purge_expired(self) -> None:
+        now = self._clock()
+        expired = [
+            entry_id
+            for entry_id, entry in self._entries.items()
+            if now - entry.created_at > self.ttl_seconds
+        ]
+        for entry_id in expired:
+            self._remove(entry_id)
+            self.evictions += 1
+
+    def _ensure_matrix(self) -> None:
+        if self._matrix is None:
+            self._matrix_ids = list(self._entries.keys())
+            if self._matrix_ids:
+                self._matrix = np.vstack([self._entries[i].vector for i in self._matrix_ids])
+            else:
+                self._matrix = np.empty((0, 0), dtype=np.float32)
+
+    def lookup(
+        self, embedding: List[float], namespace: str = "", record: bool = True
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Busca una respuesta almacenada para una pregunta semánticamente equivalente.
+
+        Args:
+            embedding (List[float]): Embedding de la pregunta (ya reformulada).
+            namespace (str): Partición de la caché; solo se comparan preguntas del mismo
+                espacio (p. ej. mismo perfil de prompt).
+            record (bool): Si es False, el acierto o fallo no se cuenta en las
+                estadísticas; quien consulta lo anota después con `record_lookup` si
+                llega a usar el resultado (p. ej. una recuperación especulativa).
+
+        Returns:
+            Optional[Dict[str, Any]]: Una copia de la respuesta almacenada, o None si no hay acierto.
+        """
+        self._purge_expired()
+        self._ensure_matrix()
+
+        if not self._matrix_ids:
+            if record:
+                self.record_lookup(hit=False)
+            return None
+
+        similarities = self._matrix @ self._normalize(embedding)
+        mask = np.array(
+            [self._entries[i].namespace == namespace for i in self._matrix_ids]
+        )
+        similarities = np.where(mask, similarities, -np.inf)
+        best = int(np.argmax(similarities))
+
+        if similarities[best] < self.similarity_threshold:
+            if record:
+                self.record_lookup(hit=False)
+            return None
+
+        entry_id = self._matrix_ids[best]
+        self._entries.move_to_end(entry_id)
+        if record:
+            self.record_lookup(hit=True)
+        # Copia profunda: quien la reciba puede modificarla (p. ej. `sources`) sin tocar la caché.
+        return copy.deepcopy(self._entries[entry_id].response)
+
+    def record_lookup(self, hit: bool) -> None:
+        """Cuenta en las estadísticas una consulta hecha con `lookup(..., record=False)`."""
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def store(
+        self,
+        question: str,
+        embedding: List[float],
+        response: Dict[str, Any],
+        namespace: str = "",
+    ) -> None:
+        """
+        Almacena la respuesta a una pregunta, desalojando la menos usada si la caché está llena.
+
+        Args:
+            question (str): La pregunta (reformulada) respondida.
+            embedding (List[float]): Embedding de la pregunta.
+            response (Dict[str, Any]): Respuesta con `answer`, `sources` y `confidence`.
+            namespace (str): Partición de la caché a la que pertenece la entrada.
+        """
+        if self.max_entries <= 0:
+            return
+
+        self._entries[self._next_id] = _CacheEntry(
+            question=question,
+            namespace=namespace,
+            vector=self._normalize(embedding),
+            response=copy.deepcopy(response),
+            created_at=self._clock(),
+        )
+        self._next_id += 1
+        self._matrix = None
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self) -> None:
+        """Vacía la caché (p. ej. tras re-ingestar el contenido del índice)."""
+        self._entries.clear()
+        self._matrix = None
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Devuelve los contadores de la caché.
+
+        Returns:
+            Dict[str, Any]: Aciertos, fallos, tasa de acierto, tamaño, desalojos e invalidaciones.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
@@ -0,0 +1,174 @@
+import asyncio
+import re
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normaliza una pregunta para decidir si dos peticiones piden lo mismo: minúsculas,
+    sin signos de puntuación y con los espacios colapsados. Conserva tildes y palabras
+    vacías, que pueden cambiar el sentido de la pregunta ("él" frente a "el").
+    """
+    return " ".join(re.findall(r"\w+", question.casefold()))
+
+
+class _Flight:
+    """Una ejecución en curso y el número de peticiones que la esperan."""
+
+    def __init__(self, task: asyncio.Task, broadcast: Optional["_Broadcast"] = None):
+        self.task = task
+        self.broadcast = broadcast
+        self.waiters = 0
+
+
+class _Broadcast:
+    """Fragmentos producidos por un stream compartido, que cada suscriptor recorre desde el principio."""
+
+    def __init__(self):
+        self.items: List = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._changed = asyncio.Event()
+
+    def publish(self, item) -> None:
+        self.items.append(item)
+        self._notify()
+
+    def close(self, error: Optional[BaseException] = None) -> None:
+        self.done, self.error = True, error
+        self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def subscribe(self) -> AsyncIterator:
+        index = 0
+        while True:
+            changed = self._changed
+            while index < len(self.items):
+                yield self.items[index]
+                index += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await changed.wait()
+
+
+class SingleFlight:
+    """
+    Agrupa (coalesce) las ejecuciones concurrentes de una misma operación.
+
+    La primera petición con una clave lanza la operación en una tarea; las que llegan con
+    la misma clave mientras está en curso esperan a esa tarea en lugar de repetirla, y
+    todas reciben su resultado (o su excepción). Al terminar, la clave se libera: no es
+    una caché, solo comparte el trabajo que ya está en marcha.
+
+    La tarea no depende de quien la lanzó: si esa petición se cancela (p. ej. el cliente
+    se desconecta), las demás siguen esperando. Solo se cancela cuando ya no la espera nadie.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        # Operaciones realmente ejecutadas y peticiones que se unieron a una en curso.
+        self.executions = 0
+        self.coalesced = 0
+
+    def _join(
+        self, key: Hashable, start: Callable[[], Awaitable], broadcast: Optional[_Broadcast] = None
+    ) -> _Flight:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.create_task(start()), broadcast)
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task: self._finish(key, flight, task))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+        flight.waiters += 1
+        return flight
+
+    def _leave(self, key: Hashable, flight: _Flight) -> None:
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.task.done():
+            self._release(key, flight)
+            flight.task.cancel()
+
+    def _release(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def _finish(self, key: Hashable, flight: _Flight, task: asyncio.Task) -> None:
+        self._release(key, flight)
+        # Se recoge la excepción aunque ya no la espere nadie, para que no quede sin leer.
+        if not task.cancelled():
+            task.exception()
+
+    async def run(self, key: Hashable, operation: Callable[[], Awaitable[T]]) -> T:
+        """
+        Ejecuta `operation()` o, si ya hay una en curso con la misma clave, espera su resultado.
+
+        Args:
+            key (Hashable): Identifica las peticiones equivalentes.
+            operation (Callable[[], Awaitable[T]]): Función que lanza la operación.
+
+        Returns:
+            T: El resultado de la operación, el mismo objeto para todas las peticiones.
+        """
+        flight = self._join(key, operation)
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            self._leave(key, flight)
+
+    async def stream(
+        self, key: Hashable, operation: Callable[[], AsyncIterator[T]]
+    ) -> AsyncIterator[T]:
+        """
+        Variante de `run` para operaciones que producen un stream (p. ej. los tokens del LLM).
+
+        Cada petición recibe todos los fragmentos desde el principio, aunque se una a
+        un stream ya empezado.
+
+        Args:
+            key (Hashable): Identifica las peticiones equivalentes.
+            operation (Callable[[], AsyncIterator[T]]): Función que crea el stream.
+
+        Yields:
+            T: Los fragmentos del stream compartido.
+        """
+        broadcast = _Broadcast()
+
+        async def produce() -> None:
+            try:
+                async for item in operation():
+                    broadcast.publish(item)
+            except BaseException as e:
+                broadcast.close(e)
+                raise
+            broadcast.close()
+
+        # Si ya hay un stream en curso, `produce` no llega a ejecutarse y se lee el suyo.
+        flight = self._join(key, produce, broadcast)
+        try:
+            async for item in flight.broadcast.subscribe():
+                yield item
+        finally:
+            self._leave(key, flight)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Devuelve los contadores de la agrupación.
+
+        Returns:
+            Dict[str, int]: Operaciones ejecutadas, peticiones agrupadas con otra en curso
+            y operaciones en curso.
+        """
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._flights),
+        }
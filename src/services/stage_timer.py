@@ -0,0 +1,91 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, Optional, Sequence
+
+# Etapas de un turno de chat, en el orden en que se ejecutan: la espera en el control de
+# admisión y el pipeline. La recuperación de una pregunta de seguimiento puede solaparse
+# con la reformulación (recuperación especulativa).
+STAGES = ("admission", "history", "rephrase", "retrieval", "prompt", "generation", "persistence")
+
+
+# Función `observer(etapa, segundos)` que recibe cada etapa medida (p. ej. los
+# histogramas de Prometheus).
+StageObserver = Callable[[str, float], None]
+
+
+class StageTimings:
+    """
+    Duración acumulada, en segundos, de cada etapa de una petición, y observadores a los
+    que se notifica cada etapa medida.
+    """
+
+    def __init__(self, observers: Sequence[StageObserver] = ()):
+        self.durations: Dict[str, float] = {}
+        self.observers = tuple(observers)
+
+    def add(self, stage_name: str, seconds: float) -> None:
+        self.durations[stage_name] = self.durations.get(stage_name, 0.0) + seconds
+
+    def as_dict(self) -> Dict[str, float]:
+        return dict(self.durations)
+
+
+_current_timings: ContextVar[Optional[StageTimings]] = ContextVar("stage_timings", default=None)
+
+
+def start_timings(observers: Sequence[StageObserver] = ()) -> StageTimings:
+    """
+    Empieza a registrar las etapas de la petición en curso.
+
+    El registro se guarda en una variable de contexto, así que lo comparten las tareas
+    que la petición lance a partir de este momento (p. ej. la recuperación especulativa)
+    y no se mezcla con el de otras peticiones concurrentes. Los observadores viajan con
+    el registro: no hay una lista global que limpiar al destruir quien los registró.
+
+    Args:
+        observers (Sequence[StageObserver]): Funciones a las que se notifica cada etapa
+            medida en esta petición.
+
+    Returns:
+        StageTimings: El registro, que se completa a medida que se ejecutan las etapas.
+    """
+    timings = StageTimings(observers)
+    _current_timings.set(timings)
+    return timings
+
+
+def current_timings() -> Optional[StageTimings]:
+    """Devuelve el registro de la petición en curso, o None si nadie lo ha iniciado."""
+    return _current_timings.get()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Mide la duración del bloque y la suma a la etapa `name` de la petición en curso.
+
+    La duración también se notifica a los observadores del registro (ver
+    `start_timings`). Los bloques cancelados (p. ej. una recuperación especulativa
+    descartada) no se cuentan.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except asyncio.CancelledError:
+        raise
+    except BaseException:
+        _record(name, time.perf_counter() - start)
+        raise
+    else:
+        _record(name, time.perf_counter() - start)
+
+
+def _record(name: str, seconds: float) -> None:
+    timings = _current_timings.get()
+    if timings is None:
+        return
+    timings.add(name, seconds)
+    for observer in timings.observers:
+        observer(name, seconds)
@@ -19,6 +19,10 @@ if "api_client" not in st.session_state:
     st.session_state.api_client = APIClient()
 if "conversations" not in st.session_state:
     st.session_state.conversations = []
+if "conversations_cursor" not in st.session_state:
+    st.session_state.conversations_cursor = None
+if "is_loading_more" not in st.session_state:
+    st.session_state.is_loading_more = False
 if "current_conversation_id" not in st.session_state:
     st.session_state.current_conversation_id = None
 if "messages" not in st.session_state:
@@ -28,10 +32,20 @@ if "is_loading" not in st.session_state:
 
 
 async def load_conversations():
-    """Carga la lista de conversaciones desde la API."""
-    st.session_state.conversations = (
-        await st.session_state.api_client.get_conversations()
+    """Carga la primera página de conversaciones desde la API."""
+    (
+        st.session_state.conversations,
+        st.session_state.conversations_cursor,
+    ) = await st.session_state.api_client.get_conversations()
+
+
+async def load_more_conversations():
+    """Añade a la barra lateral la siguiente página de conversaciones."""
+    conversations, cursor = await st.session_state.api_client.get_conversations(
+        cursor=st.session_state.conversations_cursor
     )
+    st.session_state.conversations.extend(conversations)
+    st.session_state.conversations_cursor = cursor
 
 
 async def load_messages(conversation_id: UUID):
@@ -48,6 +62,12 @@ def handle_select_conversation(conversation_id: UUID):
     st.rerun()
 
 
+def handle_load_more_conversations():
+    """Maneja la carga de la siguiente página de conversaciones de la barra lateral."""
+    st.session_state.is_loading_more = True
+    st.rerun()
+
+
 def handle_new_conversation():
     """Maneja la creación de una nueva conversación."""
     st.session_state.current_conversation_id = None
@@ -56,7 +76,12 @@ def handle_new_conversation():
 
 
 async def handle_send_message(question: str):
-    """Maneja el envío de un nuevo mensaje al backend."""
+    """
+    Maneja el envío de un nuevo mensaje al backend.
+
+    La respuesta se consume en streaming y se renderiza a medida que llegan los tokens,
+    en lugar de esperar a que el modelo termine la respuesta completa.
+    """
     st.session_state.messages.append({"content": question, "is_user": True})
 
     with st.chat_message("user"):
@@ -64,25 +89,43 @@ async def handle_send_message(question: str):
 
     with st.chat_message("assistant"):
         message_placeholder = st.empty()
-        with st.spinner("Pensando..."):
-            response = await st.session_state.api_client.ask_question(
-                question, st.session_state.current_conversation_id
-            )
-
-        if response:
-            full_response = response.get("answer", "No se recibió respuesta.")
+        message_placeholder.markdown("Pensando...")
+
+        full_response = ""
+        conversation_id = None
+        failed = False
+        retry_after = None
+        async for event, data in st.session_state.api_client.ask_question_stream(
+            question, st.session_state.current_conversation_id
+        ):
+            if event == "metadata":
+                conversation_id = data.get("conversation_id")
+            elif event == "token":
+                full_response += data.get("content", "")
+                message_placeholder.markdown(full_response + "▌")
+            elif event == "done":
+                full_response = data.get("answer", full_response)
+            elif event == "error":
+                failed = True
+                retry_after = data.get("retry_after")
+
+        if full_response and not failed:
             # Añadir la respuesta del asistente al historial de chat ANTES de cualquier posible rerun
             st.session_state.messages.append(
                 {"content": full_response, "is_user": False}
             )
-            message_placeholder.markdown(full_response)  # Mostrarla inmediatamente
+            message_placeholder.markdown(full_response)
 
-            if st.session_state.current_conversation_id is None:
-                st.session_state.current_conversation_id = UUID(
-                    response["conversation_id"]
-                )
+            if st.session_state.current_conversation_id is None and conversation_id:
+                st.session_state.current_conversation_id = UUID(conversation_id)
                 await load_conversations()
                 st.rerun()
+        elif retry_after:
+            full_response = (
+                "El asistente está atendiendo muchas preguntas en este momento. "
+                f"Por favor, inténtalo de nuevo en {retry_after} segundos."
+            )
+            message_placeholder.markdown(full_response)
         else:
             full_response = (
                 "Hubo un error al procesar tu pregunta. Por favor, inténtalo de nuevo."
@@ -99,10 +142,19 @@ async def render_main_app():
         await load_messages(st.session_state.current_conversation_id)
         st.session_state.is_loading = False
 
+    if st.session_state.is_loading_more:
+        await load_more_conversations()
+        st.session_state.is_loading_more = False
+
     display_sidebar(
         st.session_state.conversations,
         on_select_conversation=handle_select_conversation,
         on_new_conversation=handle_new_conversation,
+        on_load_more=(
+            handle_load_more_conversations
+            if st.session_state.conversations_cursor
+            else None
+        ),
     )
 
     display_chat_interface(
@@ -1,10 +1,11 @@
 import streamlit as st
-from typing import List, Dict, Any, Callable
+from typing import List, Dict, Any, Callable, Optional
 
 def display_sidebar(
     conversations: List[Dict[str, Any]],
     on_select_conversation: Callable,
-    on_new_conversation: Callable
+    on_new_conversation: Callable,
+    on_load_more: Optional[Callable] = None,
 ):
     """
     Muestra la barra lateral con la lista de conversaciones y el botón de "Nueva Conversación".
@@ -13,6 +14,8 @@ def display_sidebar(
         conversations (List[Dict[str, Any]]): Lista de conversaciones para mostrar.
         on_select_conversation (Callable): Callback que se ejecuta al seleccionar una conversación.
         on_new_conversation (Callable): Callback que se ejecuta al hacer clic en "Nueva Conversación".
+        on_load_more (Callable, optional): Callback que carga la siguiente página de
+            conversaciones. Si es None, no quedan más páginas y no se muestra el botón.
     """
     st.sidebar.title("Conversaciones")
 
@@ -26,12 +29,13 @@ def display_sidebar(
         st.sidebar.write("No hay conversaciones aún.")
         return
 
-    # Ordenar conversaciones por fecha de actualización (más recientes primero)
-    sorted_conversations = sorted(conversations, key=lambda x: x.get('updated_at', ''), reverse=True)
-
-    for conv in sorted_conversations:
+    # La API ya devuelve las conversaciones de la más reciente a la más antigua
+    for conv in conversations:
         # Usar el ID de la conversación como clave para el botón
         conv_id = conv.get("id")
         conv_name = conv.get("name", "Conversación sin nombre")
         if st.sidebar.button(conv_name, key=f"conv_{conv_id}"):
             on_select_conversation(conv_id)
+
+    if on_load_more is not None and st.sidebar.button("Cargar más", key="load_more_conversations"):
+        on_load_more()
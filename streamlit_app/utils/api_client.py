@@ -1,5 +1,6 @@
 import httpx
-from typing import List, Dict, Any, Optional
+import json
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 from uuid import UUID
 import os
 from dotenv import load_dotenv
@@ -18,39 +19,51 @@ class APIClient:
     def __init__(self, base_url: str = API_BASE_URL):
         self.base_url = base_url
 
-    async def get_conversations(self) -> List[Dict[str, Any]]:
+    async def get_conversations(
+        self, limit: int = 50, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
         """
-        Obtiene la lista de todas las conversaciones.
+        Obtiene una página de conversaciones, de la más reciente a la más antigua.
+        Devuelve las conversaciones y el cursor de la página siguiente (None si no hay más).
         """
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
         try:
             async with httpx.AsyncClient(
                 base_url=self.base_url, timeout=30.0
             ) as client:
-                response = await client.get("/conversations/")
+                response = await client.get("/conversations/", params=params)
                 response.raise_for_status()
-                return response.json()
+                return response.json(), response.headers.get("X-Next-Cursor")
         except httpx.HTTPStatusError as e:
             print(f"Error al obtener conversaciones: {e.response.text}")
-            return []
+            return [], None
         except httpx.RequestError as e:
             print(f"Error de red al obtener conversaciones: {e}")
-            return []
+            return [], None
 
     async def get_conversation_messages(
         self, conversation_id: UUID
     ) -> List[Dict[str, Any]]:
         """
-        Obtiene los mensajes de una conversación específica.
+        Obtiene todos los mensajes de una conversación específica, recorriendo sus páginas.
         """
+        messages, params = [], {"limit": 500}
         try:
             async with httpx.AsyncClient(
                 base_url=self.base_url, timeout=30.0
             ) as client:
-                response = await client.get(
-                    f"/conversations/{conversation_id}/messages"
-                )
-                response.raise_for_status()
-                return response.json()
+                while True:
+                    response = await client.get(
+                        f"/conversations/{conversation_id}/messages", params=params
+                    )
+                    response.raise_for_status()
+                    messages.extend(response.json())
+                    next_cursor = response.headers.get("X-Next-Cursor")
+                    if not next_cursor:
+                        return messages
+                    params["cursor"] = next_cursor
         except httpx.HTTPStatusError as e:
             print(f"Error al obtener mensajes: {e.response.text}")
             return []
@@ -82,6 +95,48 @@ class APIClient:
             print(f"Error de red al preguntar: {e}")
             return None
 
+    async def ask_question_stream(
+        self, question: str, conversation_id: Optional[UUID] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Envía una pregunta al endpoint de streaming y produce los eventos SSE a medida
+        que llegan: `metadata`, `token` (uno por fragmento), `done` y, si algo falla, `error`.
+        """
+        payload = {"question": question}
+        if conversation_id:
+            payload["conversation_id"] = str(conversation_id)
+
+        try:
+            async with httpx.AsyncClient(
+                base_url=self.base_url, timeout=httpx.Timeout(30.0, read=None)
+            ) as client:
+                async with client.stream(
+                    "POST", "/chat/ask/stream", json=payload
+                ) as response:
+                    response.raise_for_status()
+                    event, data_lines = "message", []
+                    async for line in response.aiter_lines():
+                        if line.startswith("event:"):
+                            event = line[len("event:"):].strip()
+                        elif line.startswith("data:"):
+                            data_lines.append(line[len("data:"):].strip())
+                        elif not line and data_lines:
+                            yield event, json.loads("\n".join(data_lines))
+                            event, data_lines = "message", []
+        except httpx.HTTPStatusError as e:
+            print(f"Error en la API al preguntar (stream): {e.response.status_code}")
+            if e.response.status_code == 429:
+                # API saturada: indica cuándo conviene reintentar.
+                yield "error", {
+                    "detail": "Servicio saturado",
+                    "retry_after": int(e.response.headers.get("Retry-After", "1")),
+                }
+            else:
+                yield "error", {"detail": f"Error HTTP {e.response.status_code}"}
+        except httpx.RequestError as e:
+            print(f"Error de red al preguntar (stream): {e}")
+            yield "error", {"detail": str(e)}
+
     async def check_api_health(self) -> bool:
         """
         Verifica si la API está disponible y saludable.
@@ -0,0 +1,113 @@
+"""
+Tests para el endpoint de lotes de preguntas (`/chat/ask/batch`).
+
+Se monta una aplicación con el router de chat, los sustitutos deterministas de
+`tests/fakes.py` y una base de datos SQLite temporal, y se consulta a través de
+`httpx.ASGITransport`.
+"""
+
+import asyncio
+import json
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.api.database import get_db
+from src.api.dependencies import get_rag_service
+from src.api.endpoints import chat
+from src.models.sql import Base
+from src.services.conversation_service import ConversationService
+from tests.fakes import FakeLatencies, build_fake_rag_service
+
+QUESTIONS = [
+    "¿Cuál es la capital de Colombia?",
+    "¿Qué idioma se habla en Colombia?",
+    "¿Cuál es la moneda de Colombia?",
+]
+
+
+async def _post_batch(db_path, body):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    service = build_fake_rag_service(FakeLatencies(generate=0.02))
+
+    async def override_db():
+        async with session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/api/v1/chat")
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_rag_service] = lambda: service
+
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post("/api/v1/chat/ask/batch", json=body)
+        async with session_factory() as db:
+            conversations = await ConversationService().get_conversations(db)
+            messages = {
+                conversation.name: await ConversationService().get_messages(db, conversation.id)
+                for conversation in conversations
+            }
+    finally:
+        await engine.dispose()
+    return response, service, messages
+
+
+def test_batch_returns_results_in_order_and_persists_them(tmp_path):
+    """Verifica que el lote responde en orden, con un solo embedding, y guarda cada turno."""
+    response, service, messages = asyncio.run(
+        _post_batch(tmp_path / "chat.sqlite3", {"questions": QUESTIONS, "persist": True})
+    )
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["index"] for result in results] == [0, 1, 2]
+    assert [result["question"] for result in results] == QUESTIONS
+    assert all(result["answer"] and result["error"] is None for result in results)
+    assert service.vector_store.embeddings.calls == 1
+
+    assert len(messages) == 3
+    for result in results:
+        saved = messages[result["question"][:50]]
+        assert [message.content for message in saved] == [result["question"], result["answer"]]
+        assert result["conversation_id"]
+
+
+def test_batch_streams_ndjson_without_persisting(tmp_path):
+    """Verifica el modo NDJSON: una línea por pregunta y nada guardado sin `persist`."""
+    response, _, messages = asyncio.run(
+        _post_batch(tmp_path / "chat.sqlite3", {"questions": QUESTIONS, "stream": True})
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["index"] for line in lines) == [0, 1, 2]
+    assert all(line["answer"] and line["conversation_id"] is None for line in lines)
+    assert messages == {}
+
+
+def test_batch_rejects_empty_questions(tmp_path):
+    """Verifica que un lote con una pregunta vacía se rechaza sin responder ninguna."""
+    response, service, _ = asyncio.run(
+        _post_batch(tmp_path / "chat.sqlite3", {"questions": ["¿Cuál es la capital?", "     "]})
+    )
+
+    assert response.status_code == 400
+    assert service.llm.calls == 0
+
+
+def test_batch_questions_have_the_same_constraints_as_ask(tmp_path):
+    """Verifica que cada pregunta del lote exige la misma longitud mínima que `/ask`."""
+    response, service, _ = asyncio.run(
+        _post_batch(tmp_path / "chat.sqlite3", {"questions": ["¿Cuál es la capital?", "¿Y"]})
+    )
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "questions", 1]
+    assert service.llm.calls == 0
@@ -0,0 +1,52 @@
+"""
+Tests para los endpoints de la caché semántica (estadísticas, recarga de índices e invalidación).
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.endpoints import cache
+from src.services.semantic_cache import SemanticCache
+
+
+def _client(monkeypatch, admin_token):
+    monkeypatch.setattr(cache, "get_settings", lambda: SimpleNamespace(admin_token=admin_token))
+    app = FastAPI()
+    app.include_router(cache.router, prefix="/api/v1/cache")
+    app.state.rag_engine = SimpleNamespace(
+        semantic_cache=SemanticCache(), reload_indexes=AsyncMock()
+    )
+    return TestClient(app), app.state.rag_engine
+
+
+def test_invalidate_requires_the_admin_token(monkeypatch):
+    """Verifica que el endpoint está desactivado sin ADMIN_TOKEN y rechaza un token incorrecto."""
+    client, rag_engine = _client(monkeypatch, admin_token=None)
+    assert client.delete("/api/v1/cache/", headers={"X-Admin-Token": "x"}).status_code == 403
+
+    client, rag_engine = _client(monkeypatch, admin_token="secreto")
+    assert client.delete("/api/v1/cache/").status_code == 401
+    assert client.delete("/api/v1/cache/", headers={"X-Admin-Token": "otro"}).status_code == 401
+    rag_engine.reload_indexes.assert_not_awaited()
+
+
+def test_invalidate_reloads_the_indexes(monkeypatch):
+    """Verifica que, con el token correcto, se recargan los índices y se vacía la caché."""
+    client, rag_engine = _client(monkeypatch, admin_token="secreto")
+
+    response = client.delete("/api/v1/cache/", headers={"X-Admin-Token": "secreto"})
+
+    assert response.status_code == 204
+    rag_engine.reload_indexes.assert_awaited_once()
+
+
+def test_cache_endpoints_return_503_without_rag_engine(monkeypatch):
+    """Verifica que, sin motor RAG inicializado, los endpoints responden 503 y no 500."""
+    client, _ = _client(monkeypatch, admin_token="secreto")
+    del client.app.state.rag_engine
+
+    assert client.get("/api/v1/cache/stats").status_code == 503
+    assert client.delete("/api/v1/cache/", headers={"X-Admin-Token": "secreto"}).status_code == 503
@@ -3,17 +3,57 @@ Tests para los endpoints de la API principal.
 
 Estos tests utilizan el TestClient de FastAPI para simular solicitudes HTTP
 y verificar el comportamiento de los endpoints.
+
+El TestClient no ejecuta el lifespan de la aplicación (que conecta con OpenAI y
+Pinecone), así que los tests de chat sustituyen sus dependencias: el servicio RAG por
+un mock, y la base de datos y la memoria de conversaciones por unas sobre SQLite.
 """
 
+import asyncio
+
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from src.api.database import get_db
+from src.api.dependencies import get_conversation_memory, get_rag_service
 from src.api.main import app
-from unittest.mock import patch, MagicMock
+from src.models.sql import Base
+from src.services.conversation_memory import ConversationMemory
+from tests.fakes import FakeChatModel
+from unittest.mock import AsyncMock, MagicMock
 import pytest
 from uuid import uuid4
 
 client = TestClient(app)
 
 
+@pytest.fixture
+def chat_dependencies(tmp_path):
+    """Sustituye el servicio RAG, la base de datos y la memoria de conversaciones."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'chat.sqlite3'}")
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await engine.dispose()
+
+    asyncio.run(create_tables())
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def override_db():
+        async with session_factory() as db:
+            yield db
+
+    rag_service = MagicMock()
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_rag_service] = lambda: rag_service
+    app.dependency_overrides[get_conversation_memory] = lambda: ConversationMemory(
+        llm=FakeChatModel(), session_factory=session_factory
+    )
+    yield rag_service
+    app.dependency_overrides.clear()
+    asyncio.run(engine.dispose())
+
+
 def test_health_check():
     """Verifica que el endpoint de salud de la API responde correctamente."""
     response = client.get("/api/v1/health")
@@ -21,30 +61,40 @@ def test_health_check():
     assert response.json() == {"status": "ok"}
 
 
-def test_ask_question_empty_question():
+def test_ask_question_empty_question(chat_dependencies):
     """Verifica que el endpoint /api/v1/chat/ask maneja correctamente una pregunta vacía."""
     response = client.post("/api/v1/chat/ask", json={"question": ""})
     assert response.status_code == 422
     assert "detail" in response.json()
 
 
-def test_ask_question_valid_question():
+def test_ask_question_valid_question(chat_dependencies):
     """Verifica que el endpoint /api/v1/chat/ask responde correctamente con una pregunta válida."""
-    with patch("src.services.rag_service.RAGService") as mock_rag_service:
-        # Configurar el mock para simular una respuesta exitosa
-        mock_response = MagicMock()
-        mock_response.answer = "Esta es una respuesta de prueba"
-        mock_response.sources = ["fuente1", "fuente2"]
-        mock_rag_service.ask_question.return_value = mock_response
-
-        response = client.post(
-            "/api/v1/chat/ask", json={"question": "¿Cuál es la capital de Colombia?"}
-        )
-
-        assert response.status_code == 200
-        response_data = response.json()
-        print(response_data)
-        assert "answer" in response_data
-        assert "sources" in response_data
-        assert "Bogotá" in response_data["answer"]
-        assert response_data["sources"] == ["https://es.wikipedia.org/wiki/Colombia"]
+    # Simular una respuesta exitosa del servicio RAG
+    chat_dependencies.aanswer_question = AsyncMock(
+        return_value={
+            "answer": "La capital de Colombia es Bogotá.",
+            "sources": ["https://es.wikipedia.org/wiki/Colombia"],
+            "confidence": 0.92,
+        }
+    )
+
+    response = client.post(
+        "/api/v1/chat/ask", json={"question": "¿Cuál es la capital de Colombia?"}
+    )
+
+    assert response.status_code == 200
+    response_data = response.json()
+    print(response_data)
+    assert "answer" in response_data
+    assert "sources" in response_data
+    assert "Bogotá" in response_data["answer"]
+    assert response_data["sources"] == ["https://es.wikipedia.org/wiki/Colombia"]
+
+
+def test_ask_question_without_rag_engine_returns_503():
+    """Verifica que, sin el motor RAG inicializado por el lifespan, la API responde 503."""
+    response = client.post(
+        "/api/v1/chat/ask", json={"question": "¿Cuál es la capital de Colombia?"}
+    )
+    assert response.status_code == 503
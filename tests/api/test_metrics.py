@@ -0,0 +1,120 @@
+"""
+Tests para las métricas Prometheus y la cabecera Server-Timing.
+
+Se monta una aplicación con el router de chat, los sustitutos deterministas de
+`tests/fakes.py` y una base de datos SQLite temporal, y se consulta a través de
+`httpx.ASGITransport`.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.api.database import get_db
+from src.api.dependencies import get_conversation_memory, get_rag_service
+from src.api.endpoints import chat
+from src.api.metrics import APIMetrics, format_server_timing
+from src.models.sql import Base
+from src.services.admission import AdmissionController
+from src.services.conversation_memory import ConversationMemory
+from src.services.semantic_cache import SemanticCache
+from src.services.stage_timer import StageTimings
+from tests.fakes import FakeChatModel, build_fake_rag_service
+
+
+async def _ask_and_scrape(db_path, admission=None, saturate=False):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    service = build_fake_rag_service(semantic_cache=SemanticCache())
+    memory = ConversationMemory(llm=FakeChatModel(), session_factory=session_factory)
+
+    async def override_db():
+        async with session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/api/v1/chat")
+    app.state.rag_engine = SimpleNamespace(
+        service=service, semantic_cache=service.semantic_cache, embeddings=None
+    )
+    app.state.admission_controller = admission
+    app.dependency_overrides[get_db] = override_db
+    app.dependency_overrides[get_rag_service] = lambda: service
+    app.dependency_overrides[get_conversation_memory] = lambda: memory
+    APIMetrics().instrument(app, db_engine=engine)
+
+    try:
+        if saturate:
+            # Ocupa la única plaza, sin cola: la petición se rechaza sin esperar.
+            permit = await admission.acquire()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            ask = await client.post(
+                "/api/v1/chat/ask", json={"question": "¿Cuál es la capital de Colombia?"}
+            )
+            scrape = await client.get("/metrics")
+        await memory.aclose()
+        if saturate:
+            permit.release()
+    finally:
+        await engine.dispose()
+    return ask, scrape
+
+
+def test_ask_reports_server_timing_and_metrics(tmp_path):
+    """Verifica la cabecera Server-Timing de /chat/ask y el contenido de /metrics."""
+    ask, scrape = asyncio.run(
+        _ask_and_scrape(tmp_path / "chat.sqlite3", admission=AdmissionController())
+    )
+
+    assert ask.status_code == 200
+    server_timing = ask.headers["Server-Timing"]
+    for name in ("admission", "history", "retrieval", "prompt", "generation", "persistence", "total"):
+        assert f"{name};dur=" in server_timing
+
+    assert scrape.status_code == 200
+    assert scrape.headers["content-type"].startswith("text/plain")
+    body = scrape.text
+    assert 'chat_stage_duration_seconds_count{stage="generation"} 1.0' in body
+    assert (
+        'http_request_duration_seconds_count{method="POST",route="/api/v1/chat/ask",status="200"} 1.0'
+        in body
+    )
+    assert 'rag_llm_tokens_total{kind="output",model="generation"}' in body
+    assert "semantic_cache_misses_total 1.0" in body
+    assert "rag_requests_in_flight 0.0" in body
+    assert 'rag_singleflight_executions_total{stage="generation"} 1.0' in body
+    assert 'rag_coalesced_requests_total{stage="generation"} 0.0' in body
+    assert "admission_admitted_total 1.0" in body
+    assert "admission_active 0.0" in body
+
+
+def test_saturated_chat_is_rejected_with_retry_after(tmp_path):
+    """Verifica que, sin plazas ni cola, /chat/ask responde 429 con Retry-After al momento."""
+    admission = AdmissionController(max_concurrency=1, max_queue=0)
+    ask, scrape = asyncio.run(
+        _ask_and_scrape(tmp_path / "chat.sqlite3", admission=admission, saturate=True)
+    )
+
+    assert ask.status_code == 429
+    assert int(ask.headers["Retry-After"]) >= 1
+    assert 'admission_rejected_total{reason="queue_full"} 1.0' in scrape.text
+    assert 'chat_stage_duration_seconds_count{stage="generation"}' not in scrape.text
+
+
+def test_format_server_timing():
+    """Verifica el formato de la cabecera, en milisegundos."""
+    timings = StageTimings()
+    timings.add("retrieval", 0.1204)
+    timings.add("generation", 0.5)
+
+    assert (
+        format_server_timing(timings, 0.75)
+        == "retrieval;dur=120.4, generation;dur=500.0, total;dur=750.0"
+    )
@@ -0,0 +1,243 @@
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from src.rag.lexical_index import tokenize
+from src.services.rag_service import RAGService
+
+WIKI_URL = "https://es.wikipedia.org/wiki/Colombia"
+
+# Pequeño corpus sobre Colombia con el que responde el almacén de vectores falso.
+CORPUS = [
+    ("Introducción", "Colombia, oficialmente República de Colombia, es un país soberano situado en la región noroccidental de América del Sur."),
+    ("Introducción", "Su capital es Bogotá, la ciudad más poblada del país, situada en el altiplano cundiboyacense."),
+    ("Toponimia", "El nombre de Colombia deriva del apellido del navegante Cristóbal Colón y fue concebido por Francisco de Miranda."),
+    ("Historia", "Los primeros pobladores llegaron hacia el año 14 000 a. C.; entre sus culturas destacan los muiscas y los taironas."),
+    ("Historia", "El 20 de julio de 1810 se produjo el Grito de Independencia, consolidada tras la batalla de Boyacá en 1819."),
+    ("Historia", "La Gran Colombia existió entre 1819 y 1831 e incluía los territorios de las actuales Venezuela, Ecuador y Panamá."),
+    ("Geografía", "La cordillera de los Andes atraviesa el país y se divide en tres ramales: Occidental, Central y Oriental."),
+    ("Geografía", "El río Magdalena es la principal arteria fluvial de Colombia y desemboca en el mar Caribe."),
+    ("Demografía", "Colombia tiene más de 52 millones de habitantes; el español es el idioma oficial junto con las lenguas de los grupos étnicos."),
+    ("Economía", "Colombia es el tercer productor mundial de café y exporta petróleo, carbón, flores y banano."),
+    ("Cultura", "Gabriel García Márquez, autor de Cien años de soledad, recibió el Premio Nobel de Literatura en 1982."),
+    ("Política", "La Constitución de 1991 define a Colombia como un Estado social de derecho, unitario y con forma de gobierno presidencialista."),
+]
+
+# Preguntas de ejemplo para simular conversaciones: una primera pregunta y seguimientos
+# que dependen del historial (se reformulan) o que ya mencionan el tema.
+FIRST_QUESTIONS = [
+    "¿Cuál es la capital de Colombia?",
+    "¿Cuándo fue la independencia de Colombia?",
+    "¿Qué produce la economía de Colombia?",
+    "¿Qué ríos atraviesan Colombia?",
+]
+FOLLOW_UP_QUESTIONS = [
+    "¿Y cuántos habitantes tiene?",
+    "¿Qué pasó después?",
+    "¿Qué cordilleras hay en Colombia?",
+    "Cuéntame más sobre su historia",
+    "¿Quién es su escritor más famoso?",
+]
+
+
+@dataclass
+class FakeLatencies:
+    """Latencias simuladas, en segundos, de cada llamada externa del pipeline."""
+
+    rephrase: float = 0.0
+    embed: float = 0.0
+    search: float = 0.0
+    generate: float = 0.0
+
+
+def _approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    LLM falso con latencia fija.
+
+    Como generador, responde con una frase construida a partir de la pregunta. Como
+    reformulador (`rephraser`), devuelve la pregunta de seguimiento tal cual si ya
+    menciona Colombia y, si no, la completa con el tema de la conversación, de modo que
+    la recuperación especulativa acierta en unas preguntas y falla en otras.
+    Informa del uso de tokens (aproximado) como los modelos de OpenAI.
+    """
+
+    latency: float = 0.0
+    rephraser: bool = False
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def _respond(self, messages) -> str:
+        content = messages[-1].content
+        if self.rephraser:
+            question = content.split("Pregunta de seguimiento: ")[-1].split("\n")[0].strip()
+            if "colombia" in question.lower():
+                return question
+            return f"{question.rstrip('?¿ ')} en Colombia?"
+        question = content.split("Pregunta: ")[-1].strip()
+        return f"Según las fuentes consultadas, la respuesta a «{question}» se encuentra en el artículo de Colombia."
+
+    def _message(self, messages, text: str, message_class=AIMessage):
+        input_tokens = sum(_approx_tokens(str(message.content)) for message in messages)
+        output_tokens = _approx_tokens(text)
+        return message_class(
+            content=text,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        message = self._message(messages, self._respond(messages))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        message = self._message(messages, self._respond(messages))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        words = self._respond(messages).split(" ")
+        # La latencia se reparte entre el primer token y el resto de la respuesta.
+        await asyncio.sleep(self.latency / 2)
+        for word in words[:-1]:
+            await asyncio.sleep(self.latency / 2 / len(words))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+        await asyncio.sleep(self.latency / 2 / len(words))
+        # Como OpenAI con `stream_usage`, el último fragmento incluye el uso de tokens.
+        last = self._message(messages, " ".join(words), AIMessageChunk)
+        last.content = words[-1]
+        yield ChatGenerationChunk(message=last)
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Embeddings falsos: bolsa de palabras (sin tildes ni palabras vacías) proyectada por
+    hash en `dimensions` dimensiones y normalizada, con latencia fija por llamada.
+    Textos con palabras en común tienen vectores parecidos.
+    """
+
+    def __init__(self, dimensions: int = 64, latency: float = 0.0):
+        self.dimensions = dimensions
+        self.latency = latency
+        self.calls = 0
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for token in tokenize(text):
+            digest = hashlib.md5(token.encode("utf-8")).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dimensions] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+
+class FakeVectorStore:
+    """
+    Almacén de vectores falso en memoria sobre `CORPUS`, con la interfaz de `VectorStore`
+    que usa `RAGService` y latencias fijas de embedding y de búsqueda.
+    """
+
+    def __init__(
+        self,
+        embed_latency: float = 0.0,
+        search_latency: float = 0.0,
+        documents: Optional[List[Document]] = None,
+    ):
+        self.embeddings = FakeEmbeddings(latency=embed_latency)
+        self.search_latency = search_latency
+        self.searches = 0
+        self.documents = documents or [
+            Document(page_content=text, metadata={"source": WIKI_URL, "section": section})
+            for section, text in CORPUS
+        ]
+        self._matrix = np.array(
+            [self.embeddings._embed(doc.page_content) for doc in self.documents], dtype=np.float32
+        )
+
+    def _search(self, embedding: List[float], top_k: int) -> List[Tuple[Document, float]]:
+        self.searches += 1
+        scores = self._matrix @ np.asarray(embedding, dtype=np.float32)
+        top = np.argsort(-scores)[:top_k]
+        return [(self.documents[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_query(self, query: str) -> List[float]:
+        return await self.embeddings.aembed_query(query)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embeddings.aembed_documents(texts)
+
+    def similarity_search_with_score(self, query: str, top_k: int = 5):
+        time.sleep(self.search_latency)
+        return self._search(self.embeddings.embed_query(query), top_k)
+
+    async def asimilarity_search_by_vector_with_score(
+        self, embedding: List[float], top_k: int = 5, **search_params: Any
+    ) -> List[Tuple[Document, float]]:
+        await asyncio.sleep(self.search_latency)
+        return self._search(embedding, top_k)
+
+
+def build_fake_rag_service(
+    latencies: Optional[FakeLatencies] = None, **service_kwargs: Any
+) -> RAGService:
+    """
+    Construye un `RAGService` con el LLM, el reformulador y el almacén de vectores falsos.
+
+    Permite ejecutar el pipeline completo sin red ni credenciales (tests, benchmarks y
+    pruebas de carga), con latencias que simulan las de OpenAI y Pinecone. Las respuestas
+    dependen solo de la entrada, así que dos ejecuciones iguales dan los mismos resultados.
+
+    Args:
+        latencies (FakeLatencies, optional): Latencias simuladas (por defecto, ninguna).
+        **service_kwargs: Parámetros adicionales de `RAGService` (caché semántica, etc.).
+
+    Returns:
+        RAGService: El servicio, listo para `aanswer_question`.
+    """
+    latencies = latencies or FakeLatencies()
+    return RAGService(
+        vector_store=FakeVectorStore(latencies.embed, latencies.search),
+        llm=FakeChatModel(latency=latencies.generate),
+        rephrase_llm=FakeChatModel(latency=latencies.rephrase, rephraser=True),
+        **service_kwargs,
+    )
@@ -0,0 +1,255 @@
+"""
+Tests para el crawler de Wikipedia: descargas concurrentes con límite por host, modo sin
+red con HTML grabado e indexado de cada página en cuanto llega.
+"""
+
+import asyncio
+import time
+
+import httpx
+
+from src.rag.crawler import (
+    FixtureTransport,
+    HostRateLimiter,
+    WikipediaCrawler,
+    crawl_and_ingest,
+    fixture_name,
+)
+from src.rag.ingestion import IngestionEngine
+from src.rag.manifest import IngestionManifest
+from src.rag.vector_store import VectorStore
+from tests.rag.test_ingestion import DIMENSIONS, FlakyEmbeddingService, HashEmbeddings
+
+TITLES = ["Bogotá", "Medellín", "Cali", "Historia_de_Colombia"]
+
+
+def _page(title, paragraphs=3):
+    body = "".join(
+        f"<p>{title} es un artículo de ejemplo, párrafo {i}.</p>" for i in range(paragraphs)
+    )
+    return (
+        f"<html><body><div class=\"mw-parser-output\"><p>Introducción de {title}.</p>"
+        f"<h2>Historia</h2>{body}<h2>Geografía</h2><p>Relieve de {title}.</p></div></body></html>"
+    )
+
+
+def _write_fixtures(directory, titles=TITLES):
+    for title in titles:
+        (directory / f"{title}.html").write_text(_page(title), encoding="utf-8")
+
+
+def _engine(path, embedding_service=None):
+    store = VectorStore(
+        embeddings=HashEmbeddings(), dimensions=DIMENSIONS, backend="local", local_index_path=path
+    )
+    return IngestionEngine(
+        embedding_service or FlakyEmbeddingService(latency=0), store, batch_size=4
+    )
+
+
+def _run(crawler, engine, manifest):
+    async def run():
+        try:
+            return await crawl_and_ingest(crawler, engine, manifest)
+        finally:
+            await crawler.aclose()
+
+    return asyncio.run(run())
+
+
+def test_fixture_name_decodes_urls():
+    """Verifica que una URL con caracteres codificados corresponde al fichero del título."""
+    assert fixture_name("https://es.wikipedia.org/wiki/Bogot%C3%A1") == "Bogotá.html"
+    assert fixture_name("https://es.wikipedia.org/wiki/Cali") == "Cali.html"
+
+
+def test_crawler_fetches_concurrently_over_shared_client(tmp_path):
+    """Verifica que las descargas se solapan, con como mucho `max_concurrency` en vuelo."""
+    in_flight = 0
+    max_in_flight = 0
+
+    class CountingTransport(FixtureTransport):
+        async def handle_async_request(self, request):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            try:
+                return await super().handle_async_request(request)
+            finally:
+                in_flight -= 1
+
+    titles = [f"Municipio_{i}" for i in range(12)]
+    _write_fixtures(tmp_path, titles)
+    client = httpx.AsyncClient(transport=CountingTransport(str(tmp_path), latency=0.05))
+    crawler = WikipediaCrawler(titles, max_concurrency=4, requests_per_second=0, client=client)
+
+    async def run():
+        async with client:
+            return [page async for page in crawler.crawl()]
+
+    start = time.perf_counter()
+    pages = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+
+    assert len(pages) == 12 and all(page.ok for page in pages)
+    assert max_in_flight == 4
+    # 12 páginas de 50 ms con 4 en vuelo: unas 3 rondas, no 12.
+    assert elapsed < 0.4
+
+
+def test_rate_limiter_spaces_requests_per_host():
+    """Verifica que las peticiones a un mismo host se espacian y las de hosts distintos no."""
+    limiter = HostRateLimiter(requests_per_second=20)
+    times = {"a": [], "b": []}
+
+    async def hit(host):
+        await limiter.acquire(host)
+        times[host].append(time.monotonic())
+
+    async def run():
+        await asyncio.gather(*(hit("a") for _ in range(5)), *(hit("b") for _ in range(2)))
+
+    asyncio.run(run())
+
+    gaps = [later - earlier for earlier, later in zip(times["a"], times["a"][1:])]
+    assert min(gaps) >= 0.045
+    assert times["b"][0] - times["a"][0] < 0.02
+
+
+def test_missing_fixture_is_reported_as_failure(tmp_path):
+    """Verifica que una página sin fixture (404) cuenta como fallida y no se reintenta."""
+    _write_fixtures(tmp_path, ["Bogotá"])
+    crawler = WikipediaCrawler(
+        ["Bogotá", "No_existe"], requests_per_second=0, fixtures_dir=str(tmp_path)
+    )
+    manifest = IngestionManifest(None)
+
+    summary = _run(crawler, _engine(str(tmp_path / "index")), manifest)
+
+    assert summary.pages == 2
+    assert summary.failed == ["https://es.wikipedia.org/wiki/No_existe"]
+    assert manifest.sources() == ["https://es.wikipedia.org/wiki/Bogotá"]
+
+
+def test_crawl_indexes_every_page_and_rerun_is_a_noop(tmp_path):
+    """Verifica que se indexan todas las páginas y que repetir el crawl no embebe nada."""
+    fixtures = tmp_path / "html"
+    fixtures.mkdir()
+    _write_fixtures(fixtures)
+    index_path = str(tmp_path / "index")
+    manifest_path = str(tmp_path / "manifest.json")
+
+    service = FlakyEmbeddingService(latency=0)
+    summary = _run(
+        WikipediaCrawler(TITLES, requests_per_second=0, fixtures_dir=str(fixtures)),
+        _engine(index_path, service),
+        IngestionManifest(manifest_path),
+    )
+
+    assert summary.pages == 4 and not summary.failed
+    assert summary.added == summary.chunks == len(summary.documents) > 0
+    assert {doc.metadata["source"] for doc in summary.documents} == {
+        f"https://es.wikipedia.org/wiki/{title}" for title in TITLES
+    }
+    assert sum(service.calls) == summary.chunks
+
+    # Segunda ejecución con las mismas páginas: nada que embeber.
+    service = FlakyEmbeddingService(latency=0)
+    summary = _run(
+        WikipediaCrawler(TITLES, requests_per_second=0, fixtures_dir=str(fixtures)),
+        _engine(index_path, service),
+        IngestionManifest.load(manifest_path),
+    )
+
+    assert service.calls == []
+    assert summary.unchanged == summary.chunks and summary.added == summary.changed == 0
+
+
+def test_crawl_removes_pages_dropped_from_the_seeds(tmp_path):
+    """Verifica que los artículos que salen de la lista de semillas se borran del índice."""
+    fixtures = tmp_path / "html"
+    fixtures.mkdir()
+    _write_fixtures(fixtures)
+    manifest = IngestionManifest(None)
+    engine = _engine(str(tmp_path / "index"))
+
+    first = _run(
+        WikipediaCrawler(TITLES, requests_per_second=0, fixtures_dir=str(fixtures)),
+        engine,
+        manifest,
+    )
+    cali_chunks = sum(doc.metadata["source"].endswith("/Cali") for doc in first.documents)
+
+    second = _run(
+        WikipediaCrawler(
+            [title for title in TITLES if title != "Cali"],
+            requests_per_second=0,
+            fixtures_dir=str(fixtures),
+        ),
+        engine,
+        manifest,
+    )
+
+    assert second.removed == cali_chunks > 0
+    assert "https://es.wikipedia.org/wiki/Cali" not in manifest.sources()
+    assert len(manifest) == first.chunks - cali_chunks
+
+
+class FailingSourceEmbeddings(FlakyEmbeddingService):
+    """Servicio de embeddings que falla siempre con los textos de un artículo concreto."""
+
+    def __init__(self, title):
+        super().__init__(latency=0)
+        self.title = title
+
+    def embed_documents(self, texts):
+        if any(self.title in text for text in texts):
+            raise RuntimeError("fallo permanente")
+        return super().embed_documents(texts)
+
+
+def test_page_failures_are_isolated_and_the_index_is_still_saved(tmp_path):
+    """Verifica que un fallo al indexar una página no aborta el crawl ni el guardado."""
+    fixtures = tmp_path / "html"
+    fixtures.mkdir()
+    _write_fixtures(fixtures)
+    manifest_path = str(tmp_path / "manifest.json")
+
+    summary = _run(
+        WikipediaCrawler(TITLES, requests_per_second=0, fixtures_dir=str(fixtures)),
+        _engine(str(tmp_path / "index"), FailingSourceEmbeddings("Cali")),
+        IngestionManifest(manifest_path),
+    )
+
+    assert summary.failed == ["https://es.wikipedia.org/wiki/Cali"]
+    saved = IngestionManifest.load(manifest_path)
+    assert set(saved.sources()) == {
+        f"https://es.wikipedia.org/wiki/{title}" for title in TITLES if title != "Cali"
+    }
+
+
+def test_page_without_article_text_keeps_its_vectors(tmp_path):
+    """Verifica que una página sin texto cuenta como fallida y no borra sus chunks."""
+    fixtures = tmp_path / "html"
+    fixtures.mkdir()
+    _write_fixtures(fixtures)
+    manifest = IngestionManifest(None)
+    engine = _engine(str(tmp_path / "index"))
+    first = _run(
+        WikipediaCrawler(TITLES, requests_per_second=0, fixtures_dir=str(fixtures)),
+        engine,
+        manifest,
+    )
+
+    (fixtures / "Cali.html").write_text(
+        "<html><body><div class=\"mw-parser-output\"></div></body></html>", encoding="utf-8"
+    )
+    second = _run(
+        WikipediaCrawler(TITLES, requests_per_second=0, fixtures_dir=str(fixtures)),
+        engine,
+        manifest,
+    )
+
+    assert second.failed == ["https://es.wikipedia.org/wiki/Cali"]
+    assert second.removed == 0
+    assert len(manifest) == first.chunks
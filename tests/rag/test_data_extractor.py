@@ -9,6 +9,7 @@ import pytest
 import requests
 from unittest.mock import patch
 from src.rag.data_extractor import DataExtractor
+from src.rag.page_cache import PageCache
 
 
 @patch("src.rag.data_extractor.requests.get")
@@ -48,3 +49,61 @@ def test_fetch_content_failure(mock_get):
     mock_get.assert_called_once_with(
         extractor.WIKI_URL, timeout=15, headers=expected_headers
     )
+
+
+PAGE = '<html><body><div class="mw-parser-output"><h2>Historia</h2><p>Contenido guardado.</p></div></body></html>'
+
+
+def _response(mock, status_code, text="", headers=None):
+    response = mock.return_value
+    response.status_code = status_code
+    response.text = text
+    response.headers = headers or {}
+    return response
+
+
+@patch("src.rag.data_extractor.requests.get")
+def test_fetch_page_revalidates_cached_copy(mock_get, tmp_path):
+    """Verifica que la segunda descarga es condicional y que un 304 reutiliza la copia en caché."""
+    cache = PageCache(str(tmp_path))
+    _response(mock_get, 200, PAGE, {"ETag": '"v1"', "Last-Modified": "Mon, 02 Jun 2025 10:00:00 GMT"})
+    first = DataExtractor(cache=cache).fetch_page()
+    assert not first.not_modified and first.html == PAGE
+
+    _response(mock_get, 304)
+    second = DataExtractor(cache=PageCache(str(tmp_path))).fetch_page()
+
+    headers = mock_get.call_args.kwargs["headers"]
+    assert headers["If-None-Match"] == '"v1"'
+    assert headers["If-Modified-Since"] == "Mon, 02 Jun 2025 10:00:00 GMT"
+    assert second.not_modified
+    assert second.html == PAGE and second.content_hash == first.content_hash
+
+
+@patch("src.rag.data_extractor.requests.get")
+def test_cache_only_mode_never_hits_the_network(mock_get, tmp_path):
+    """Verifica que el modo solo caché lee la página guardada sin hacer peticiones."""
+    cache = PageCache(str(tmp_path))
+    assert DataExtractor(cache=cache, cache_only=True).fetch_page() is None
+
+    cache.put(DataExtractor.WIKI_URL, PAGE)
+    extractor = DataExtractor(cache=cache, cache_only=True)
+    page = extractor.fetch_page()
+
+    mock_get.assert_not_called()
+    assert page.from_cache
+    assert "Contenido guardado." in extractor.extract(page)
+
+
+def test_page_cache_is_content_addressed(tmp_path):
+    """Verifica que un mismo HTML se guarda una vez y que las versiones sin referencias se borran."""
+    cache = PageCache(str(tmp_path))
+    first = cache.put("https://a", PAGE)
+    cache.put("https://b", PAGE)
+    assert len(list(tmp_path.glob("*.html"))) == 1
+
+    cache.put("https://a", PAGE + "<!-- v2 -->")
+    assert len(list(tmp_path.glob("*.html"))) == 2
+    cache.put("https://b", PAGE + "<!-- v2 -->")
+    assert not (tmp_path / f"{first.content_hash}.html").exists()
+    assert PageCache(str(tmp_path)).get("https://b").content_hash != first.content_hash
@@ -0,0 +1,85 @@
+"""
+Tests para la caché de embeddings (memoria LRU + almacén SQLite persistente).
+
+Se utiliza un modelo de embeddings falso que cuenta las llamadas, de modo que se puede
+verificar cuándo se evita consultar la API real.
+"""
+
+import asyncio
+
+from langchain_core.embeddings import Embeddings
+
+from src.rag.embedding_cache import CachedEmbeddings, SQLiteEmbeddingStore
+
+
+class CountingEmbeddings(Embeddings):
+    """Modelo de embeddings falso que registra los textos que se le piden."""
+
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), 1.0, 0.5] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_repeated_query_is_served_from_memory():
+    """Verifica que una consulta repetida (con distinto espaciado) no vuelve a calcularse."""
+    fake = CountingEmbeddings()
+    cached = CachedEmbeddings(fake, model="m", dimensions=3)
+
+    first = cached.embed_query("¿Cuál es la capital de Colombia?")
+    second = cached.embed_query("  ¿Cuál es la   capital de Colombia? ")
+
+    assert first == second
+    assert len(fake.calls) == 1
+    assert cached.stats()["memory_hits"] == 1
+
+
+def test_embed_documents_only_computes_missing_texts_in_one_call():
+    """Verifica que solo los textos ausentes (sin duplicados) se envían al modelo, en una llamada."""
+    fake = CountingEmbeddings()
+    cached = CachedEmbeddings(fake, model="m", dimensions=3)
+    cached.embed_query("a")
+
+    vectors = cached.embed_documents(["a", "bb", "bb", "ccc"])
+
+    assert fake.calls[-1] == ["bb", "ccc"]
+    assert [v[0] for v in vectors] == [1.0, 2.0, 2.0, 3.0]
+
+
+def test_lru_is_bounded():
+    """Verifica que la caché en memoria no supera su tamaño máximo."""
+    cached = CachedEmbeddings(CountingEmbeddings(), model="m", dimensions=3, max_entries=2)
+    cached.embed_documents(["a", "b", "c"])
+
+    assert cached.stats()["size"] == 2
+
+
+def test_vectors_survive_restart_with_sqlite_store(tmp_path):
+    """Verifica que los vectores persistidos se reutilizan tras 'reiniciar' el proceso."""
+    path = str(tmp_path / "embeddings.sqlite3")
+    first_model = CountingEmbeddings()
+    CachedEmbeddings(first_model, model="m", dimensions=3, store=SQLiteEmbeddingStore(path)).embed_query("hola")
+
+    second_model = CountingEmbeddings()
+    restarted = CachedEmbeddings(second_model, model="m", dimensions=3, store=SQLiteEmbeddingStore(path))
+    vector = asyncio.run(restarted.aembed_query("hola"))
+
+    assert vector == [4.0, 1.0, 0.5]
+    assert second_model.calls == []
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_key_depends_on_model_configuration(tmp_path):
+    """Verifica que un cambio de modelo o de dimensiones no reutiliza vectores antiguos."""
+    store = SQLiteEmbeddingStore(str(tmp_path / "embeddings.sqlite3"))
+    CachedEmbeddings(CountingEmbeddings(), model="m", dimensions=3, store=store).embed_query("hola")
+
+    other = CountingEmbeddings()
+    CachedEmbeddings(other, model="m", dimensions=256, store=store).embed_query("hola")
+
+    assert other.calls == [["hola"]]
@@ -0,0 +1,205 @@
+"""
+Tests para la ingesta por lotes: concurrencia acotada, reintentos ante límites de tasa,
+escritura en el índice local y reingesta incremental con el manifiesto.
+"""
+
+import threading
+import time
+
+import httpx
+import numpy as np
+import openai
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from src.rag.ingestion import IngestionEngine
+from src.rag.manifest import IngestionManifest, chunk_id
+from src.rag.vector_store import VectorStore
+
+DIMENSIONS = 16
+
+
+class HashEmbeddings(Embeddings):
+    """Modelo de embeddings falso: vector pseudoaleatorio fijo por texto."""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        seed = sum(ord(c) * (i + 1) for i, c in enumerate(text)) % (2**32)
+        return np.random.default_rng(seed).standard_normal(DIMENSIONS).tolist()
+
+
+class FlakyEmbeddingService:
+    """
+    Sustituto de `EmbeddingService` con latencia fija que responde con un error 429 a las
+    primeras `failures` llamadas y registra cuántas llamadas hay en vuelo a la vez.
+    """
+
+    def __init__(self, failures: int = 0, latency: float = 0.02):
+        self.failures = failures
+        self.latency = latency
+        self.calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.calls.append(len(texts))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            fail = self.failures > 0
+            self.failures -= 1
+        try:
+            time.sleep(self.latency)
+            if fail:
+                request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+                raise openai.RateLimitError(
+                    "Rate limit reached",
+                    response=httpx.Response(429, request=request),
+                    body=None,
+                )
+            return HashEmbeddings().embed_documents(texts)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def _documents(n):
+    return [
+        Document(page_content=f"Chunk número {i} sobre Colombia", metadata={"section": f"s{i % 7}"})
+        for i in range(n)
+    ]
+
+
+def _local_store(path):
+    return VectorStore(
+        embeddings=HashEmbeddings(), dimensions=DIMENSIONS, backend="local", local_index_path=path
+    )
+
+
+def test_batches_run_concurrently_up_to_the_limit(tmp_path):
+    """Verifica que los lotes se reparten en llamadas concurrentes acotadas y se indexan todos."""
+    path = str(tmp_path / "index")
+    service = FlakyEmbeddingService()
+    engine = IngestionEngine(
+        service, _local_store(path), batch_size=10, max_concurrency=3, upsert_batch_size=4
+    )
+
+    report = engine.ingest(_documents(95))
+
+    assert sorted(service.calls) == [5] + [10] * 9
+    assert service.max_in_flight == 3
+    assert report.chunks == 95 and report.batches == 10
+    assert report.chunks_per_second > 0
+
+    reopened = _local_store(path)
+    assert len(reopened.store) == 95
+    results = reopened.similarity_search("Chunk número 42 sobre Colombia", top_k=1)
+    assert results[0].metadata == {"section": "s0"}
+
+
+def test_rate_limited_batches_are_retried_with_backoff(tmp_path):
+    """Verifica que un error de límite de tasa se reintenta en lugar de abortar la ingesta."""
+    service = FlakyEmbeddingService(failures=2)
+    engine = IngestionEngine(
+        service,
+        _local_store(str(tmp_path / "index")),
+        batch_size=10,
+        max_concurrency=1,
+        initial_backoff=0.01,
+    )
+
+    report = engine.ingest(_documents(20))
+
+    assert report.retries == 2
+    assert report.chunks == 20
+    assert len(service.calls) == 4
+
+
+def _section_documents(sections):
+    return [
+        Document(page_content=text, metadata={"source": "wiki", "section": section})
+        for section, texts in sections.items()
+        for text in texts
+    ]
+
+
+def test_chunk_ids_are_deterministic_and_content_addressed():
+    """Verifica que el ID de un chunk depende solo de su fuente, su sección y su contenido."""
+    doc = Document(page_content="Bogotá", metadata={"source": "wiki", "section": "Ciudades"})
+    same = Document(page_content="Bogotá", metadata={"source": "wiki", "section": "Ciudades"})
+    other_section = Document(page_content="Bogotá", metadata={"source": "wiki", "section": "Historia"})
+
+    assert chunk_id(doc) == chunk_id(same)
+    assert chunk_id(doc) != chunk_id(other_section)
+
+
+def test_incremental_reingestion_embeds_only_new_or_changed_chunks(tmp_path):
+    """Verifica que una reingesta sin cambios no embebe nada y que solo se procesan las diferencias."""
+    path = str(tmp_path / "index")
+    manifest_path = str(tmp_path / "manifest.json")
+    sections = {
+        "Historia": ["Independencia en 1810.", "Gran Colombia en 1819."],
+        "Geografía": ["Cordillera de los Andes.", "Río Magdalena."],
+        "Economía": ["Café.", "Petróleo."],
+    }
+
+    service = FlakyEmbeddingService(latency=0)
+    engine = IngestionEngine(service, _local_store(path), batch_size=2)
+    diff, _ = engine.ingest_incremental(
+        _section_documents(sections), IngestionManifest.load(manifest_path, "local")
+    )
+    assert len(diff.added) == 6 and len(service.calls) == 3
+
+    # Sin cambios: ninguna llamada a la API de embeddings.
+    service.calls.clear()
+    engine = IngestionEngine(service, _local_store(path), batch_size=2)
+    diff, _ = engine.ingest_incremental(
+        _section_documents(sections), IngestionManifest.load(manifest_path, "local")
+    )
+    assert diff.is_empty and diff.unchanged == 6
+    assert service.calls == []
+
+    # Un chunk modificado, una sección eliminada y un chunk nuevo.
+    sections["Historia"][1] = "Gran Colombia, fundada en 1819."
+    del sections["Economía"]
+    sections["Geografía"].append("Llanos Orientales.")
+    engine = IngestionEngine(service, _local_store(path), batch_size=10)
+    documents = _section_documents(sections)
+    diff, _ = engine.ingest_incremental(documents, IngestionManifest.load(manifest_path, "local"))
+
+    assert str(diff) == "1 nuevos, 1 modificados, 2 eliminados, 3 sin cambios"
+    assert service.calls == [2]
+    reopened = _local_store(path).store
+    assert len(reopened) == 5
+    indexed = reopened.get_by_ids([chunk_id(doc) for doc in documents])
+    assert [doc.page_content for doc in indexed] == [doc.page_content for doc in documents]
+
+
+def test_manifest_of_another_index_is_ignored(tmp_path):
+    """Verifica que el manifiesto de otro índice no evita reindexar en uno nuevo."""
+    manifest_path = str(tmp_path / "manifest.json")
+    manifest = IngestionManifest(manifest_path, "pinecone:colombia")
+    manifest.update(_section_documents({"Historia": ["Independencia en 1810."]}))
+    manifest.save()
+
+    assert len(IngestionManifest.load(manifest_path, "pinecone:colombia")) == 1
+    assert len(IngestionManifest.load(manifest_path, "local:data/vector_index")) == 0
+
+
+def test_manifest_keeps_page_hashes_of_indexed_sources(tmp_path):
+    """Verifica que el hash de la página indexada se persiste y se olvida al dejar de indexarla."""
+    manifest_path = str(tmp_path / "manifest.json")
+    manifest = IngestionManifest(manifest_path, "local")
+    documents = _section_documents({"Historia": ["Independencia en 1810."]})
+    source = documents[0].metadata["source"]
+    manifest.pages[source] = "abc"
+    manifest.update(documents)
+    manifest.save()
+
+    manifest = IngestionManifest.load(manifest_path, "local")
+    assert manifest.pages == {source: "abc"}
+    manifest.update([])
+    assert manifest.pages == {}
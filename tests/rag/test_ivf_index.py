@@ -0,0 +1,103 @@
+"""
+Tests para el índice aproximado IVF-flat del backend vectorial local.
+
+Se usan vectores sintéticos agrupados en clusters (como los embeddings reales de
+distintos artículos) y se comparan los resultados con la búsqueda exacta.
+"""
+
+import numpy as np
+
+from src.rag.local_vector_index import LocalVectorIndex
+
+DIMENSIONS = 32
+
+
+def _clustered_vectors(n, clusters=20, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, DIMENSIONS))
+    labels = rng.integers(0, clusters, size=n)
+    return (centers[labels] + 0.3 * rng.standard_normal((n, DIMENSIONS))).astype(np.float32)
+
+
+def _ivf_index(vectors, **options):
+    index = LocalVectorIndex(
+        embedding=None, dimensions=DIMENSIONS, index_type="ivf", ann_min_size=500, **options
+    )
+    index.add_embeddings(
+        [f"texto {i}" for i in range(len(vectors))],
+        vectors,
+        ids=[f"id-{i}" for i in range(len(vectors))],
+    )
+    return index
+
+
+def _recall(index, queries, k=5, **params):
+    hits = 0
+    for query in queries:
+        exact = {d.id for d, _ in index.similarity_search_by_vector_with_score(query, k, exact=True)}
+        approx = {d.id for d, _ in index.similarity_search_by_vector_with_score(query, k, **params)}
+        hits += len(exact & approx)
+    return hits / (k * len(queries))
+
+
+def test_ivf_is_trained_only_above_min_size():
+    """Verifica que por debajo de `ann_min_size` se mantiene la búsqueda exacta."""
+    small = _ivf_index(_clustered_vectors(100))
+    large = _ivf_index(_clustered_vectors(2000))
+
+    assert not small.uses_ann
+    assert large.uses_ann
+
+
+def test_recall_grows_with_nprobe_and_is_exact_when_probing_all_lists():
+    """Verifica que más listas exploradas dan más recall, y que explorarlas todas es exacto."""
+    index = _ivf_index(_clustered_vectors(3000), nlist=40)
+    queries = _clustered_vectors(50, seed=1)
+
+    low = _recall(index, queries, nprobe=1)
+    high = _recall(index, queries, nprobe=8)
+
+    assert low <= high
+    assert high >= 0.9
+    assert _recall(index, queries, nprobe=40) == 1.0
+
+
+def test_incremental_inserts_and_deletes_stay_searchable():
+    """Verifica que las inserciones y borrados posteriores al entrenamiento se reflejan en la búsqueda."""
+    index = _ivf_index(_clustered_vectors(2000))
+    new_vector = np.full(DIMENSIONS, 5.0, dtype=np.float32)
+
+    index.add_embeddings(["nuevo"], [new_vector], ids=["nuevo"])
+    assert index.similarity_search_by_vector_with_score(new_vector, k=1)[0][0].id == "nuevo"
+
+    index.delete(["nuevo", "id-0"])
+    results = index.similarity_search_by_vector_with_score(new_vector, k=3, nprobe=10_000)
+    assert "nuevo" not in {doc.id for doc, _ in results}
+    assert len(index) == 1999
+
+
+def test_deletes_keep_ann_consistent_with_exact_search():
+    """Verifica que tras muchos borrados explorar todas las listas sigue siendo exacto."""
+    index = _ivf_index(_clustered_vectors(2000), nlist=20)
+    index.delete([f"id-{i}" for i in range(0, 2000, 3)])
+    queries = _clustered_vectors(20, seed=2)
+
+    assert len(index) == 1333
+    assert _recall(index, queries, nprobe=20) == 1.0
+
+
+def test_ivf_state_is_persisted_and_restored_without_retraining(tmp_path):
+    """Verifica que el índice IVF guardado se restaura con los mismos centroides."""
+    index = _ivf_index(_clustered_vectors(2000), nlist=30)
+    index.save(str(tmp_path))
+
+    loaded = LocalVectorIndex.load(
+        str(tmp_path), None, DIMENSIONS, index_type="ivf", ann_min_size=500
+    )
+
+    assert loaded.uses_ann
+    np.testing.assert_array_equal(loaded._ann.centroids, index._ann.centroids)
+    query = _clustered_vectors(1, seed=3)[0]
+    assert [d.id for d, _ in loaded.similarity_search_by_vector_with_score(query, k=5)] == [
+        d.id for d, _ in index.similarity_search_by_vector_with_score(query, k=5)
+    ]
@@ -0,0 +1,67 @@
+"""
+Tests para el índice léxico BM25 en español y la fusión de resultados con RRF.
+"""
+
+from langchain_core.documents import Document
+
+from src.rag.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+DOCUMENTS = [
+    Document(page_content="Simón Bolívar nació en Caracas en 1783.", metadata={"section": "Historia"}),
+    Document(page_content="Bogotá es la capital de Colombia.", metadata={"section": "Introducción"}),
+    Document(page_content="Los colombianos exportan café a todo el mundo.", metadata={"section": "Economía"}),
+    Document(page_content="Bolívar lideró la independencia de la Gran Colombia.", metadata={"section": "Historia"}),
+]
+
+
+def test_tokenize_folds_accents_removes_stopwords_and_stems():
+    """Verifica la normalización de términos: sin tildes, sin palabras vacías y con stemming ligero."""
+    assert tokenize("¿En qué año nació Simón Bolívar?") == ["ano", "naci", "simon", "bolivar"]
+    assert tokenize("colombianos") == tokenize("Colombiana") == ["colombian"]
+    assert tokenize("En 1783") == ["1783"]
+
+
+def test_search_ranks_exact_names_and_dates_first():
+    """Verifica que los nombres propios y las fechas recuperan el chunk que los contiene."""
+    index = BM25Index.from_documents(DOCUMENTS)
+
+    results, confidence = index.search_with_confidence("¿Dónde nació Simón Bolívar?")
+    assert results[0][0].page_content == DOCUMENTS[0].page_content
+    assert confidence > 0.5
+
+    assert index.search("1783", k=1)[0][0].metadata == {"section": "Historia"}
+    assert index.search("capital colombiana", k=1)[0][0].page_content.startswith("Bogotá")
+
+
+def test_confidence_is_low_for_unknown_terms_and_ambiguous_matches():
+    """Verifica que la confianza baja si faltan términos o si varios chunks empatan."""
+    index = BM25Index.from_documents(DOCUMENTS)
+
+    _, unknown = index.search_with_confidence("Bolívar y los dinosaurios")
+    _, ambiguous = index.search_with_confidence("Colombia")
+    _, none = index.search_with_confidence("dinosaurios")
+
+    assert unknown < 0.6
+    assert ambiguous < 0.6
+    assert none == 0.0
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    """Verifica que el índice persistido devuelve los mismos resultados al cargarse."""
+    index = BM25Index.from_documents(DOCUMENTS)
+    index.save(str(tmp_path))
+
+    loaded = BM25Index.load(str(tmp_path))
+
+    assert len(loaded) == len(DOCUMENTS)
+    assert loaded.search("Bolívar independencia") == index.search("Bolívar independencia")
+    assert len(BM25Index.load(str(tmp_path / "no-existe"))) == 0
+
+
+def test_reciprocal_rank_fusion_rewards_documents_in_both_lists():
+    """Verifica que RRF prioriza los documentos presentes en ambas listas."""
+    a, b, c = (Document(page_content=text) for text in ("a", "b", "c"))
+
+    fused = reciprocal_rank_fusion([[(a, 0.9), (b, 0.8)], [(c, 12.0), (b, 7.0)]], k=60, top_n=2)
+
+    assert [doc.page_content for doc, _ in fused] == ["b", "a"]
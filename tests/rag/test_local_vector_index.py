@@ -0,0 +1,165 @@
+"""
+Tests para el índice vectorial local basado en NumPy.
+
+Se usa un modelo de embeddings falso y determinista, de modo que los resultados se
+pueden comparar con una búsqueda por fuerza bruta.
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from src.rag.local_vector_index import LocalVectorIndex
+from src.rag.vector_store import VectorStore
+
+DIMENSIONS = 16
+
+
+class HashEmbeddings(Embeddings):
+    """Modelo de embeddings falso: vector pseudoaleatorio fijo por texto."""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        seed = sum(ord(c) * (i + 1) for i, c in enumerate(text)) % (2**32)
+        return np.random.default_rng(seed).standard_normal(DIMENSIONS).tolist()
+
+
+def _index_with_random_vectors(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, DIMENSIONS)).astype(np.float32)
+    index = LocalVectorIndex(HashEmbeddings(), DIMENSIONS)
+    index.add_embeddings(
+        [f"texto {i}" for i in range(n)],
+        vectors,
+        [{"section": f"s{i}"} for i in range(n)],
+        [f"id-{i}" for i in range(n)],
+    )
+    return index, vectors
+
+
+def test_top_k_matches_brute_force():
+    """Verifica que el top-k coincide con el cálculo exacto de similitud coseno."""
+    index, vectors = _index_with_random_vectors()
+    query = np.random.default_rng(1).standard_normal(DIMENSIONS)
+
+    results = index.similarity_search_by_vector_with_score(query.tolist(), k=5)
+
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(normalized @ (query / np.linalg.norm(query)))[::-1][:5]
+    assert [doc.id for doc, _ in results] == [f"id-{i}" for i in expected]
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+    assert results[0][0].metadata == {"section": f"s{expected[0]}"}
+
+
+def test_add_documents_and_search_by_text():
+    """Verifica la interfaz de VectorStore de LangChain (add_documents + similarity_search)."""
+    index = LocalVectorIndex(HashEmbeddings(), DIMENSIONS)
+    index.add_documents(
+        [
+            Document(page_content="Bogotá es la capital", metadata={"section": "Geografía"}),
+            Document(page_content="El café es un producto clave", metadata={"section": "Economía"}),
+        ]
+    )
+
+    results = index.similarity_search_with_score("Bogotá es la capital", k=1)
+
+    assert results[0][0].page_content == "Bogotá es la capital"
+    assert results[0][1] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_upsert_replaces_existing_ids_and_delete_compacts():
+    """Verifica que reinsertar un ID lo reemplaza y que borrar compacta el índice."""
+    index, _ = _index_with_random_vectors(n=10)
+    new_vector = np.ones(DIMENSIONS)
+
+    index.add_embeddings(["nuevo"], [new_vector], ids=["id-3"])
+    assert len(index) == 10
+    assert index.get_by_ids(["id-3"])[0].page_content == "nuevo"
+
+    index.delete(["id-0", "id-3"])
+    assert len(index) == 8
+    assert index.get_by_ids(["id-3"]) == []
+    top = index.similarity_search_by_vector_with_score(new_vector.tolist(), k=8)
+    assert {doc.id for doc, _ in top} == {f"id-{i}" for i in range(10)} - {"id-0", "id-3"}
+
+
+def test_duplicate_ids_in_one_batch_keep_the_last_row():
+    """Verifica que un ID repetido en el mismo lote deja una sola fila (gana la última)."""
+    index = LocalVectorIndex(HashEmbeddings(), DIMENSIONS)
+    vectors = np.eye(DIMENSIONS)[:3]
+
+    index.add_embeddings(["a", "b", "c"], vectors, ids=["x", "y", "x"])
+
+    assert len(index) == 2
+    assert index.get_by_ids(["x"])[0].page_content == "c"
+    top = index.similarity_search_by_vector_with_score(vectors[2].tolist(), k=1)
+    assert top[0][0].id == "x"
+
+
+def test_save_and_load_roundtrip(tmp_path):
+    """Verifica que el índice persistido en disco devuelve los mismos resultados al cargarse."""
+    index, _ = _index_with_random_vectors(n=50)
+    query = np.random.default_rng(2).standard_normal(DIMENSIONS).tolist()
+    index.save(str(tmp_path))
+
+    loaded = LocalVectorIndex.load(str(tmp_path), HashEmbeddings(), DIMENSIONS)
+
+    assert len(loaded) == 50
+    original = index.similarity_search_by_vector_with_score(query, k=5)
+    restored = loaded.similarity_search_by_vector_with_score(query, k=5)
+    assert [(d.id, d.metadata) for d, _ in original] == [(d.id, d.metadata) for d, _ in restored]
+    with pytest.raises(ValueError):
+        LocalVectorIndex.load(str(tmp_path), HashEmbeddings(), DIMENSIONS * 2)
+
+
+def test_vector_store_local_backend_persists_without_pinecone(tmp_path, monkeypatch):
+    """Verifica que VectorStore funciona con el backend local sin credenciales de Pinecone."""
+    monkeypatch.delenv("PINECONE_API_KEY", raising=False)
+    path = str(tmp_path / "index")
+    store = VectorStore(
+        embeddings=HashEmbeddings(),
+        dimensions=DIMENSIONS,
+        backend="local",
+        local_index_path=path,
+    )
+    store.add_documents([Document(page_content="Medellín", metadata={"section": "Ciudades"})])
+
+    reopened = VectorStore(
+        embeddings=HashEmbeddings(), dimensions=DIMENSIONS, backend="local", local_index_path=path
+    )
+    embedding = HashEmbeddings().embed_query("Medellín")
+    results = asyncio.run(reopened.asimilarity_search_by_vector_with_score(embedding, top_k=3))
+
+    assert [doc.page_content for doc, _ in results] == ["Medellín"]
+    assert reopened.similarity_search("Medellín", top_k=1)[0].metadata["section"] == "Ciudades"
+
+    # Una ingesta posterior no se ve hasta recargar el índice (ver `RAGEngine.reload_indexes`).
+    store.add_documents([Document(page_content="Cali", metadata={"section": "Ciudades"})])
+    assert len(reopened.store) == 1
+    reopened.reload()
+    assert len(reopened.store) == 2
+
+
+def test_vector_store_clear_empties_the_local_index_on_persist(tmp_path):
+    """Verifica que `clear` vacía el índice local y que el borrado se guarda con `persist`."""
+    path = str(tmp_path / "index")
+    store = VectorStore(
+        embeddings=HashEmbeddings(), dimensions=DIMENSIONS, backend="local", local_index_path=path
+    )
+    store.add_documents([Document(page_content="Medellín"), Document(page_content="Cali")])
+
+    store.clear()
+    assert len(store.store) == 0
+    store.reload()
+    assert len(store.store) == 2
+
+    store.clear()
+    store.persist()
+    store.reload()
+    assert len(store.store) == 0
@@ -0,0 +1,88 @@
+"""
+Tests para el control de admisión de las peticiones de chat (`AdmissionController`).
+"""
+
+import asyncio
+
+import pytest
+
+from src.services.admission import AdmissionController, AdmissionRejected
+
+
+def test_concurrency_limit_and_fifo_handoff():
+    """Verifica que no se supera el límite y que las plazas se ceden por orden de llegada."""
+    admission = AdmissionController(max_concurrency=2, max_queue=10, max_wait=1.0)
+    active = 0
+    peak = 0
+    order = []
+
+    async def request(i):
+        nonlocal active, peak
+        async with admission.admit():
+            order.append(i)
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    async def run():
+        tasks = []
+        for i in range(6):
+            tasks.append(asyncio.create_task(request(i)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    assert peak == 2
+    assert order == list(range(6))
+    stats = admission.stats()
+    assert stats["admitted"] == 6
+    assert stats["active"] == 0 and stats["queued"] == 0
+
+
+def test_full_queue_and_timeout_are_rejected_with_retry_after():
+    """Verifica el rechazo inmediato con la cola llena y el rechazo tras `max_wait`."""
+    admission = AdmissionController(max_concurrency=1, max_queue=1, max_wait=0.05)
+
+    async def run():
+        permit = await admission.acquire()
+        waiter = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as full:
+            await admission.acquire()
+        with pytest.raises(AdmissionRejected) as timeout:
+            await waiter
+        permit.release()
+        return full.value, timeout.value
+
+    full, timeout = asyncio.run(run())
+
+    assert full.reason == "queue_full" and full.retry_after >= 1
+    assert timeout.reason == "timeout" and timeout.retry_after >= 1
+    stats = admission.stats()
+    assert stats["rejected"] == {"queue_full": 1, "timeout": 1}
+    assert stats["active"] == 0 and stats["queued"] == 0
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    """Verifica que una petición cancelada mientras espera no se queda con la plaza."""
+    admission = AdmissionController(max_concurrency=1, max_queue=5, max_wait=1.0)
+
+    async def run():
+        permit = await admission.acquire()
+        cancelled = asyncio.create_task(admission.acquire())
+        waiting = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        permit.release()
+        permit.release()  # Liberar dos veces no tiene efecto.
+        (await waiting).release()
+        return cancelled
+
+    cancelled = asyncio.run(run())
+
+    assert cancelled.cancelled()
+    assert admission.stats()["active"] == 0
+    assert admission.stats()["queued"] == 0
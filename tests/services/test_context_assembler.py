@@ -0,0 +1,105 @@
+"""
+Tests para el ensamblado del contexto: unión de chunks solapados y presupuesto de tokens.
+
+Se usa el contador aproximado de tokens para no depender de la descarga del vocabulario
+de tiktoken.
+"""
+
+import pytest
+from langchain_core.documents import Document
+
+from src.rag.text_processor import TextProcessor
+from src.services.context_assembler import (
+    ContextAssembler,
+    TokenCounter,
+    get_token_counter,
+    overlap_length,
+)
+
+SOURCE = "https://es.wikipedia.org/wiki/Colombia"
+HISTORY = " ".join(
+    f"En el año {1500 + i} ocurrió el acontecimiento número {i} de la historia de Colombia."
+    for i in range(40)
+)
+ECONOMY = "El café y el petróleo son los principales productos de exportación de Colombia."
+
+
+def _chunks():
+    text = f"{HISTORY}\n== Economía ==\n{ECONOMY}"
+    return TextProcessor(chunk_size=300, chunk_overlap=60).chunk_text_by_section(text, SOURCE)
+
+
+def _assembler(token_budget=10_000):
+    return ContextAssembler(token_budget=token_budget, token_counter=TokenCounter(model=None))
+
+
+def test_overlap_length_detects_shared_text():
+    """Verifica que se detecta el solapamiento entre el final de un chunk y el principio del siguiente."""
+    left = "Simón Bolívar nació en Caracas en el año 1783"
+    right = "en Caracas en el año 1783 y murió en Santa Marta."
+    assert overlap_length(left, right) == len("en Caracas en el año 1783")
+    assert overlap_length(right, left) == 0
+
+
+def test_adjacent_chunks_are_merged_without_repeated_overlap():
+    """Verifica que los chunks contiguos de una sección se unen aunque lleguen desordenados."""
+    chunks = _chunks()
+    history = [doc for doc in chunks if doc.metadata["section"] == "Introducción"]
+    assert len(history) > 3
+
+    # Orden de relevancia distinto del orden en el texto.
+    results = [(doc, 1.0) for doc in reversed(history)]
+    assembled = _assembler().assemble(results)
+
+    assert assembled.text == HISTORY
+    assert assembled.segments_out == 1
+    assert assembled.metadatas == [{"source": SOURCE, "section": "Introducción"}]
+
+
+def test_sections_are_kept_apart_and_ordered_by_best_rank():
+    """Verifica que los chunks de secciones distintas no se unen y se ordenan por relevancia."""
+    chunks = _chunks()
+    economy = next(doc for doc in chunks if doc.metadata["section"] == "Economía")
+    results = [(economy, 0.9), (chunks[1], 0.8), (chunks[0], 0.7)]
+
+    assembled = _assembler().assemble(results)
+
+    assert assembled.segments_out == 2
+    assert assembled.text.startswith(ECONOMY)
+    assert [m["section"] for m in assembled.metadatas] == ["Economía", "Introducción"]
+
+
+def test_context_is_packed_to_the_token_budget():
+    """Verifica que el contexto no supera el presupuesto de tokens y registra su tamaño."""
+    counter = TokenCounter(model=None)
+    results = [(doc, 1.0) for doc in _chunks()]
+    assembled = ContextAssembler(token_budget=100, token_counter=counter).assemble(results)
+
+    assert assembled.truncated
+    assert 0 < assembled.token_count <= 100
+    assert assembled.token_count == counter.count(assembled.text)
+    assert HISTORY.startswith(assembled.text)
+
+
+def test_unrelated_documents_are_joined_unchanged():
+    """Verifica que los documentos sin solapamiento se conservan tal cual."""
+    docs = [
+        Document(page_content="Bogotá es la capital.", metadata={"section": "A"}),
+        Document(page_content="Medellín es la segunda ciudad.", metadata={"section": "A"}),
+    ]
+    assembled = _assembler().assemble([(doc, 1.0) for doc in docs])
+
+    assert assembled.text == "Bogotá es la capital.\n\nMedellín es la segunda ciudad."
+    assert len(assembled.metadatas) == 2
+
+
+def test_tokenizer_is_loaded_lazily_and_never_falls_back_silently():
+    """Verifica que el tokenizador no se carga al construir y que un fallo no se oculta."""
+    counter = TokenCounter(model="modelo-inexistente")
+    assert counter.is_exact
+
+    with pytest.raises(RuntimeError, match="TOKEN_COUNTER=approx"):
+        counter.count("Bogotá")
+    assert not get_token_counter("approx").is_exact
+    with pytest.raises(ValueError):
+        get_token_counter("desconocido")
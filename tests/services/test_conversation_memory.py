@@ -0,0 +1,143 @@
+"""
+Tests para la memoria acotada de conversaciones con resúmenes incrementales.
+
+Se usa un servicio de conversaciones en memoria y un modelo falso que registra los
+prompts de resumen, de modo que no se necesita base de datos ni acceso a OpenAI.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from uuid import uuid4
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from src.services.conversation_memory import ConversationMemory, SummaryMessage
+from src.services.rag_service import RAGService
+
+
+class RecordingChatModel(BaseChatModel):
+    """Modelo falso que devuelve un resumen numerado y guarda los prompts recibidos."""
+
+    prompts: list = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "recording-fake-chat-model"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.prompts.append(messages)
+        summary = AIMessage(content=f"Resumen {len(self.prompts)}")
+        return ChatResult(generations=[ChatGeneration(message=summary)])
+
+
+class InMemoryConversationService:
+    """Sustituto de `ConversationService` sobre una única conversación en memoria."""
+
+    def __init__(self, n_messages: int):
+        self.conversation = SimpleNamespace(id=uuid4(), summary=None, summarized_count=0)
+        self.messages = [
+            SimpleNamespace(content=f"mensaje {i}", is_user=i % 2 == 0)
+            for i in range(n_messages)
+        ]
+        self.recent_limits = []
+
+    async def get_conversation(self, db, conversation_id, with_messages=True):
+        return self.conversation
+
+    async def get_recent_messages(self, db, conversation_id, limit):
+        self.recent_limits.append(limit)
+        return self.messages[-limit:]
+
+    async def count_messages(self, db, conversation_id):
+        return len(self.messages)
+
+    async def get_messages_range(self, db, conversation_id, offset, limit):
+        return self.messages[offset : offset + limit]
+
+    async def update_summary(self, db, conversation_id, summary, previous_count, summarized_count):
+        if self.conversation.summarized_count != previous_count:
+            return False
+        self.conversation.summary = summary
+        self.conversation.summarized_count = summarized_count
+        return True
+
+
+@asynccontextmanager
+async def fake_session():
+    yield None
+
+
+def _make_memory(n_messages: int, recent_turns: int = 2):
+    conv_service = InMemoryConversationService(n_messages)
+    memory = ConversationMemory(
+        llm=RecordingChatModel(prompts=[]),
+        session_factory=fake_session,
+        conv_service=conv_service,
+        recent_turns=recent_turns,
+    )
+    return memory, conv_service
+
+
+def test_history_is_summary_plus_constant_window():
+    """Verifica que el historial es el resumen más una ventana fija, sin importar la longitud."""
+    memory, conv_service = _make_memory(n_messages=100)
+    conv_service.conversation.summary = "El usuario preguntó por la historia de Colombia."
+
+    history = asyncio.run(memory.load_history(None, conv_service.conversation))
+
+    assert isinstance(history[0], SummaryMessage)
+    assert [m.content for m in history[1:]] == [f"mensaje {i}" for i in range(96, 100)]
+    assert conv_service.recent_limits == [4]
+
+
+def test_update_folds_only_complete_turns_outside_the_window():
+    """Verifica que se resumen solo los turnos completos que salieron de la ventana reciente."""
+    memory, conv_service = _make_memory(n_messages=9)
+
+    assert asyncio.run(memory.update_summary(conv_service.conversation.id))
+    assert conv_service.conversation.summarized_count == 4
+    assert conv_service.conversation.summary == "Resumen 1"
+
+    # Sin mensajes nuevos fuera de la ventana, no se vuelve a llamar al modelo.
+    assert not asyncio.run(memory.update_summary(conv_service.conversation.id))
+    assert len(memory.llm.prompts) == 1
+
+    # Con dos mensajes más, el nuevo resumen parte del anterior.
+    conv_service.messages += [SimpleNamespace(content="nuevo", is_user=True)] * 2
+    assert asyncio.run(memory.update_summary(conv_service.conversation.id))
+    assert conv_service.conversation.summarized_count == 6
+    assert "Resumen 1" in memory.llm.prompts[-1][-1].content
+    assert "mensaje 4" in memory.llm.prompts[-1][-1].content
+
+
+def test_scheduled_updates_for_the_same_conversation_are_coalesced():
+    """Verifica que varias actualizaciones programadas a la vez no se ejecutan en paralelo."""
+    memory, conv_service = _make_memory(n_messages=20)
+
+    async def run():
+        for _ in range(5):
+            memory.schedule_update(conv_service.conversation.id)
+        await memory.aclose()
+
+    asyncio.run(run())
+
+    assert conv_service.conversation.summarized_count == 16
+    assert len(memory.llm.prompts) == 1
+
+
+def test_summary_is_sent_to_the_rephrase_model_as_system_context():
+    """Verifica que el resumen se incluye como mensaje de sistema en el prompt de reformulación."""
+    service = RAGService(vector_store=object(), llm=object(), rephrase_llm=object())
+    history = [
+        SummaryMessage(content="Se habló de Simón Bolívar."),
+        SimpleNamespace(content="¿Dónde nació?", is_user=True),
+        SimpleNamespace(content="En Caracas.", is_user=False),
+    ]
+
+    messages = service._build_rephrase_messages("¿Y cuándo murió?", history)
+
+    summaries = [m for m in messages if isinstance(m, SystemMessage) and "Bolívar" in m.content]
+    assert len(summaries) == 1
@@ -0,0 +1,179 @@
+"""
+Tests para el acceso a conversaciones y mensajes de `ConversationService`.
+
+Se ejecutan contra una base de datos SQLite temporal; las sentencias SQL se cuentan con
+los eventos del motor de SQLAlchemy.
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, insert, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.api.endpoints.chat import ChatRequest, ask_question
+from src.models.schemas import ConversationCreate
+from src.models.sql import Base, Conversation, Message
+from src.services.conversation_memory import ConversationMemory
+from src.services.conversation_service import ConversationService
+from tests.fakes import FakeChatModel, build_fake_rag_service
+
+
+async def _with_database(db_path, scenario):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    statements = []
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement.split()[0]),
+    )
+    try:
+        return await scenario(async_sessionmaker(engine, expire_on_commit=False), statements)
+    finally:
+        await engine.dispose()
+
+
+def test_save_exchange_writes_both_messages_in_one_transaction(tmp_path):
+    """Verifica el INSERT único con RETURNING, el orden y la actualización de `updated_at`."""
+    service = ConversationService()
+    old = datetime(2020, 1, 1)
+
+    async def scenario(session_factory, statements):
+        async with session_factory() as db:
+            conversation = await service.create_conversation(db, ConversationCreate(name="x"))
+            await db.execute(
+                update(Conversation)
+                .where(Conversation.id == conversation.id)
+                .values(updated_at=old)
+            )
+            await db.commit()
+
+        statements.clear()
+        async with session_factory() as db:
+            saved = await service.save_exchange(
+                db, conversation.id, "¿Capital?", "Bogotá.", ["https://es.wikipedia.org/wiki/Colombia"]
+            )
+        writes = list(statements)
+
+        async with session_factory() as db:
+            messages = await service.get_messages(db, conversation.id)
+            recent = await service.get_recent_messages(db, conversation.id, limit=2)
+            updated = await service.get_conversation(db, conversation.id, with_messages=False)
+        return saved, writes, messages, recent, updated
+
+    saved, writes, messages, recent, updated = asyncio.run(
+        _with_database(tmp_path / "chat.sqlite3", scenario)
+    )
+
+    assert [m.is_user for m in saved] == [True, False]
+    assert all(m.id is not None and m.timestamp is not None for m in saved)
+    assert saved[1].sources == ["https://es.wikipedia.org/wiki/Colombia"]
+    assert writes == ["INSERT", "UPDATE"]
+    assert [m.content for m in messages] == ["¿Capital?", "Bogotá."]
+    assert [m.content for m in recent] == ["¿Capital?", "Bogotá."]
+    assert updated.updated_at > old
+
+
+def test_follow_up_turn_round_trips(tmp_path):
+    """Verifica que un turno de seguimiento no recarga el historial completo."""
+    rag_service = build_fake_rag_service()
+
+    async def scenario(session_factory, statements):
+        memory = ConversationMemory(llm=FakeChatModel(), session_factory=session_factory)
+        # Solo se cuentan las sentencias de la petición, no las del resumen en segundo plano.
+        memory.schedule_update = lambda conversation_id: None
+
+        async def turn(question, conversation_id=None):
+            async with session_factory() as db:
+                return await ask_question(
+                    ChatRequest(question=question, conversation_id=conversation_id),
+                    db=db,
+                    rag_service=rag_service,
+                    conv_service=ConversationService(),
+                    memory=memory,
+                    writer=None,
+                    admission=None,
+                )
+
+        first = await turn("¿Cuál es la capital de Colombia?")
+        statements.clear()
+        await turn("¿Y cuántos habitantes tiene?", first.conversation_id)
+        return list(statements)
+
+    follow_up = asyncio.run(_with_database(tmp_path / "chat.sqlite3", scenario))
+
+    # Conversación, ventana reciente de mensajes, INSERT de los dos mensajes y `updated_at`.
+    assert follow_up == ["SELECT", "SELECT", "INSERT", "UPDATE"]
+
+
+def test_pages_cover_every_row_once_in_order(tmp_path):
+    """Verifica que recorrer las páginas por cursor devuelve todas las filas en orden, con empates."""
+    service = ConversationService()
+    base = datetime(2025, 1, 1)
+
+    async def walk(fetch):
+        items, cursor = [], None
+        while True:
+            page = await fetch(cursor)
+            items.extend(page.items)
+            if page.next_cursor is None:
+                return items
+            cursor = page.next_cursor
+
+    async def scenario(session_factory, statements):
+        conversation_ids = [uuid.uuid4() for _ in range(7)]
+        async with session_factory() as db:
+            # Conversaciones con fechas repetidas y turnos cuyos dos mensajes comparten fecha.
+            await db.execute(
+                insert(Conversation),
+                [
+                    {"id": cid, "name": str(i), "updated_at": base + timedelta(seconds=i // 3)}
+                    for i, cid in enumerate(conversation_ids)
+                ],
+            )
+            await db.execute(
+                insert(Message),
+                [
+                    {
+                        "id": uuid.uuid4(),
+                        "conversation_id": conversation_ids[0],
+                        "content": str(i),
+                        "is_user": i % 2 == 0,
+                        "timestamp": base + timedelta(seconds=i // 4),
+                        "sources": None,
+                    }
+                    for i in range(11)
+                ],
+            )
+            await db.commit()
+
+        async with session_factory() as db:
+            conversations = await walk(
+                lambda cursor: service.get_conversations_page(db, limit=2, cursor=cursor)
+            )
+            messages = await walk(
+                lambda cursor: service.get_messages_page(db, conversation_ids[0], limit=3, cursor=cursor)
+            )
+            expected_conversations = await service.get_conversations(db)
+            expected_messages = await service.get_messages(db, conversation_ids[0])
+            with pytest.raises(ValueError):
+                await service.get_messages_page(db, conversation_ids[0], limit=3, cursor="no-es-un-cursor")
+        return conversations, messages, expected_conversations, expected_messages
+
+    conversations, messages, expected_conversations, expected_messages = asyncio.run(
+        _with_database(tmp_path / "chat.sqlite3", scenario)
+    )
+
+    assert len({c.id for c in conversations}) == 7
+    assert [c.updated_at for c in conversations] == [c.updated_at for c in expected_conversations]
+    assert [(c.updated_at, c.id) for c in conversations] == sorted(
+        ((c.updated_at, c.id) for c in conversations), reverse=True
+    )
+    assert [m.id for m in messages] == [m.id for m in expected_messages]
+    # A igual fecha, la pregunta va antes que la respuesta.
+    assert [m.is_user for m in messages[:2]] == [True, True]
+    assert len(messages) == 11
@@ -0,0 +1,170 @@
+"""
+Tests para la cola de guardado diferido de mensajes (write-behind).
+
+Se ejecutan contra una base de datos SQLite temporal; los INSERT se cuentan con los
+eventos del motor de SQLAlchemy.
+"""
+
+import asyncio
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.models.schemas import ConversationCreate
+from src.models.sql import Base, Conversation
+from src.services.conversation_service import ConversationService
+from src.services.message_writer import MessageWriteBehind, merge_pending
+
+
+async def _with_database(db_path, scenario):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    inserts = []
+    event.listen(
+        engine.sync_engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, parameters, *args: (
+            inserts.append(statement) if statement.startswith("INSERT INTO messages") else None
+        ),
+    )
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    try:
+        async with session_factory() as db:
+            conversations = [
+                await ConversationService().create_conversation(db, ConversationCreate(name=name))
+                for name in ("a", "b")
+            ]
+        return await scenario(session_factory, [c.id for c in conversations], inserts)
+    finally:
+        await engine.dispose()
+
+
+def test_turns_are_batched_and_readable_before_flush(tmp_path):
+    """Verifica la lectura de lo pendiente, el guardado por lotes y el vaciado al cerrar."""
+    service = ConversationService()
+
+    async def scenario(session_factory, conversation_ids, inserts):
+        writer = MessageWriteBehind(session_factory, flush_interval=0.05)
+        writer.start()
+        first, second = conversation_ids
+
+        await asyncio.gather(
+            *(
+                writer.enqueue_exchange(conversation_id, f"pregunta {i}", f"respuesta {i}")
+                for i in range(5)
+                for conversation_id in (first, second)
+            )
+        )
+        # Antes de guardarse, las lecturas combinan la base de datos con la cola.
+        pending = writer.pending(first)
+        async with session_factory() as db:
+            stored = await service.get_messages(db, first)
+        visible = merge_pending(stored, pending)
+
+        await writer.aclose()
+        async with session_factory() as db:
+            flushed = await service.get_messages(db, first)
+            recent = merge_pending(
+                await service.get_recent_messages(db, first, limit=2), writer.pending(first), limit=2
+            )
+        return stored, visible, flushed, recent, writer.stats(), len(inserts)
+
+    stored, visible, flushed, recent, stats, insert_count = asyncio.run(
+        _with_database(tmp_path / "chat.sqlite3", scenario)
+    )
+
+    assert stored == []
+    assert [m.content for m in visible][:2] == ["pregunta 0", "respuesta 0"]
+    assert len(visible) == 10
+    assert [m.content for m in flushed] == [m.content for m in visible]
+    assert [m.content for m in recent] == ["pregunta 4", "respuesta 4"]
+    # Los 10 turnos de las dos conversaciones caben en un solo lote.
+    assert insert_count == 1
+    assert stats["flushed_messages"] == 20
+    assert stats["pending_messages"] == 0
+
+
+def test_full_queue_applies_backpressure(tmp_path):
+    """Verifica que, con la cola llena, encolar espera hasta que se guarda un lote."""
+
+    async def scenario(session_factory, conversation_ids, inserts):
+        writer = MessageWriteBehind(session_factory, max_queue_size=1)
+        conversation_id = conversation_ids[0]
+        await writer.enqueue_exchange(conversation_id, "pregunta 1", "respuesta 1")
+
+        blocked = asyncio.create_task(
+            writer.enqueue_exchange(conversation_id, "pregunta 2", "respuesta 2")
+        )
+        await asyncio.sleep(0.05)
+        was_blocked = not blocked.done()
+
+        writer.start()
+        await asyncio.wait_for(blocked, timeout=1)
+        await writer.aclose()
+        return was_blocked, writer.stats()
+
+    was_blocked, stats = asyncio.run(_with_database(tmp_path / "chat.sqlite3", scenario))
+
+    assert was_blocked
+    assert stats["flushed_messages"] == 4
+
+
+def test_discarded_turns_are_not_written(tmp_path):
+    """Verifica que los turnos de una conversación eliminada no llegan a escribirse."""
+    service = ConversationService()
+
+    async def scenario(session_factory, conversation_ids, inserts):
+        writer = MessageWriteBehind(session_factory)
+        first, second = conversation_ids
+        await writer.enqueue_exchange(first, "pregunta", "respuesta")
+        await writer.enqueue_exchange(second, "pregunta", "respuesta")
+        writer.discard(first)
+
+        writer.start()
+        await writer.aclose()
+        async with session_factory() as db:
+            return (
+                await service.get_messages(db, first),
+                await service.get_messages(db, second),
+            )
+
+    discarded, kept = asyncio.run(_with_database(tmp_path / "chat.sqlite3", scenario))
+
+    assert discarded == []
+    assert len(kept) == 2
+
+
+def test_deferred_and_synchronous_turns_share_one_clock(tmp_path):
+    """Verifica que los turnos diferidos y los síncronos se intercalan en orden cronológico."""
+    service = ConversationService()
+
+    async def scenario(session_factory, conversation_ids, inserts):
+        writer = MessageWriteBehind(session_factory, flush_interval=0)
+        writer.start()
+        conversation_id = conversation_ids[0]
+
+        async def updated_at():
+            async with session_factory() as db:
+                return (await db.get(Conversation, conversation_id)).updated_at
+
+        async with session_factory() as db:
+            await service.save_exchange(db, conversation_id, "pregunta 0", "respuesta 0")
+        deferred = await writer.enqueue_exchange(conversation_id, "pregunta 1", "respuesta 1")
+        await writer.aclose()
+        after_deferred = await updated_at()
+        async with session_factory() as db:
+            await service.save_exchange(db, conversation_id, "pregunta 2", "respuesta 2")
+            messages = await service.get_messages(db, conversation_id)
+        return messages, deferred, after_deferred, await updated_at()
+
+    messages, deferred, after_deferred, after_sync = asyncio.run(
+        _with_database(tmp_path / "db.sqlite", scenario)
+    )
+
+    assert [m.content for m in messages] == [
+        f"{kind} {i}" for i in range(3) for kind in ("pregunta", "respuesta")
+    ]
+    # `updated_at` es la fecha del último mensaje, con el mismo reloj en ambos caminos.
+    assert after_deferred == deferred[-1].timestamp
+    assert after_sync == messages[-1].timestamp
@@ -0,0 +1,463 @@
+"""
+Tests para el pipeline asíncrono del RAGService.
+
+Se utilizan sustitutos deterministas del LLM y del almacén de vectores con latencias
+simuladas, de modo que los tests no dependen de servicios externos y permiten medir
+que las peticiones concurrentes no se bloquean entre sí.
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+from langchain_core.documents import Document
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from src.rag.lexical_index import BM25Index
+from src.services.rag_service import PreparedAnswer, RAGService
+from src.services.semantic_cache import SemanticCache
+from tests.fakes import FakeLatencies, build_fake_rag_service
+
+LATENCY = 0.2
+
+
+class SlowFakeChatModel(BaseChatModel):
+    """LLM falso que tarda `latency` segundos en responder."""
+
+    response: str
+    latency: float = LATENCY
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-fake-chat-model"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        for word in self.response.split(" "):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+
+
+class SlowFakeVectorStore:
+    """Almacén de vectores falso que tarda `latency` segundos en cada búsqueda."""
+
+    def __init__(self, latency: float = LATENCY):
+        self.latency = latency
+        self.embed_calls = 0
+        self.results = [
+            (
+                Document(
+                    page_content="Bogotá es la capital de Colombia.",
+                    metadata={"source": "https://es.wikipedia.org/wiki/Colombia", "section": "Introducción"},
+                ),
+                0.9,
+            )
+        ]
+
+    def similarity_search_with_score(self, query, top_k=5):
+        time.sleep(self.latency)
+        return self.results
+
+    async def aembed_query(self, query):
+        self.embed_calls += 1
+        # Embedding determinista: cada palabra activa una dimensión.
+        vector = [0.0] * 64
+        for word in query.lower().split():
+            vector[hash(word) % 64] += 1.0
+        return vector
+
+    async def asimilarity_search_by_vector_with_score(self, embedding, top_k=5):
+        await asyncio.sleep(self.latency)
+        return self.results
+
+
+def _make_service(
+    semantic_cache: SemanticCache = None,
+    lexical_index: BM25Index = None,
+    rephrased: str = "¿Cuál es la capital de Colombia?",
+    coalesce_requests: bool = True,
+) -> RAGService:
+    return RAGService(
+        vector_store=SlowFakeVectorStore(),
+        llm=SlowFakeChatModel(response="La capital de Colombia es Bogotá."),
+        rephrase_llm=SlowFakeChatModel(response=rephrased),
+        semantic_cache=semantic_cache,
+        lexical_index=lexical_index,
+        coalesce_requests=coalesce_requests,
+    )
+
+
+HISTORY = [
+    SimpleNamespace(content="Háblame de Colombia", is_user=True),
+    SimpleNamespace(content="Colombia es un país de Sudamérica.", is_user=False),
+]
+
+
+def test_aanswer_question_returns_same_result_as_sync():
+    """Verifica que la versión asíncrona produce la misma respuesta que la síncrona."""
+    service = _make_service()
+    sync_result = service.answer_question("¿Y su capital?", HISTORY)
+    async_result = asyncio.run(service.aanswer_question("¿Y su capital?", HISTORY))
+
+    assert async_result == sync_result
+    assert async_result["answer"] == "La capital de Colombia es Bogotá."
+    assert async_result["sources"] == ["https://es.wikipedia.org/wiki/Colombia"]
+    assert async_result["confidence"] == 0.9
+
+
+def test_concurrent_requests_do_not_block_each_other():
+    """
+    Verifica que N peticiones concurrentes terminan en aproximadamente el tiempo de una
+    sola (reformulación + búsqueda + generación), y no en N veces ese tiempo.
+
+    Sin agrupación de peticiones, para que cada una recorra su propio pipeline.
+    """
+    service = _make_service(coalesce_requests=False)
+    concurrency = 10
+
+    async def run():
+        start = time.perf_counter()
+        await service.aanswer_question("¿Y su capital?", HISTORY)
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *[service.aanswer_question("¿Y su capital?", HISTORY) for _ in range(concurrency)]
+        )
+        concurrent = time.perf_counter() - start
+        return single, concurrent, results
+
+    single, concurrent, results = asyncio.run(run())
+
+    assert len(results) == concurrency
+    assert service.llm.calls == concurrency + 1
+    assert single >= 3 * LATENCY
+    assert concurrent < 2 * single
+
+
+def test_event_loop_stays_responsive_during_answer():
+    """Verifica que otras tareas (p. ej. /health) siguen ejecutándose mientras se responde."""
+    service = _make_service()
+
+    async def run():
+        ticks = 0
+
+        async def heartbeat():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(heartbeat())
+        await service.aanswer_question("¿Y su capital?", HISTORY)
+        task.cancel()
+        return ticks
+
+    ticks = asyncio.run(run())
+    # 3 etapas de LATENCY segundos: el latido debe haberse ejecutado muchas veces.
+    assert ticks > (3 * LATENCY / 0.01) / 2
+
+
+def test_astream_answer_emits_metadata_then_tokens():
+    """Verifica que el streaming emite primero los metadatos y luego la respuesta por fragmentos."""
+    service = _make_service()
+
+    async def collect():
+        return [event async for event in service.astream_answer("¿Y su capital?", HISTORY)]
+
+    events = asyncio.run(collect())
+
+    assert events[0] == (
+        "metadata",
+        {
+            "sources": ["https://es.wikipedia.org/wiki/Colombia"],
+            "confidence": 0.9,
+            "lexical_confidence": None,
+        },
+    )
+    tokens = [payload for kind, payload in events[1:] if kind == "token"]
+    assert len(tokens) > 1
+    assert "".join(tokens).strip() == "La capital de Colombia es Bogotá."
+
+
+def test_semantic_cache_hit_skips_generation():
+    """Verifica que una pregunta equivalente ya respondida se sirve desde la caché sin llamar al LLM."""
+    cache = SemanticCache(similarity_threshold=0.95)
+    service = _make_service(semantic_cache=cache)
+
+    first = asyncio.run(service.aanswer_question("¿Cuál es la capital de Colombia?", []))
+    second = asyncio.run(service.aanswer_question("¿Cuál es la  capital de Colombia?", []))
+
+    assert second == first
+    assert service.llm.calls == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+LEXICAL_DOCUMENTS = [
+    Document(
+        page_content="Simón Bolívar nació en Caracas en 1783.",
+        metadata={"source": "https://es.wikipedia.org/wiki/Colombia", "section": "Historia"},
+    ),
+    Document(
+        page_content="El café es uno de los principales productos de exportación.",
+        metadata={"source": "https://es.wikipedia.org/wiki/Colombia", "section": "Economía"},
+    ),
+    Document(
+        page_content="La cordillera de los Andes atraviesa el país de sur a norte.",
+        metadata={"source": "https://es.wikipedia.org/wiki/Colombia", "section": "Geografía"},
+    ),
+]
+
+
+def test_confident_lexical_match_skips_embedding_and_vector_search():
+    """Verifica la ruta rápida léxica: una coincidencia exacta no calcula el embedding."""
+    service = _make_service(lexical_index=BM25Index.from_documents(LEXICAL_DOCUMENTS))
+
+    prepared = asyncio.run(service._aprepare_answer("¿Dónde nació Simón Bolívar?", []))
+
+    assert service.vector_store.embed_calls == 0
+    assert prepared.embedding is None
+    assert "Simón Bolívar nació en Caracas" in prepared.messages[0].content
+    # La confianza BM25 se informa aparte: no es una similitud coseno.
+    assert prepared.confidence is None
+    assert prepared.lexical_confidence >= service.lexical_fast_path_threshold
+
+
+def test_lexical_fast_path_answers_are_never_cached():
+    """Verifica que las respuestas de la ruta rápida léxica no se guardan en la caché semántica."""
+    cache = SemanticCache(similarity_threshold=0.95)
+    service = _make_service(
+        semantic_cache=cache, lexical_index=BM25Index.from_documents(LEXICAL_DOCUMENTS)
+    )
+
+    result = asyncio.run(service.aanswer_question("¿Dónde nació Simón Bolívar?", []))
+
+    assert result["confidence"] is None and result["lexical_confidence"] is not None
+    assert cache.stats()["size"] == 0 and cache.stats()["misses"] == 0
+
+
+def test_weak_lexical_match_is_fused_with_vector_results():
+    """Verifica que, sin coincidencia léxica clara, se fusionan ambas búsquedas con RRF."""
+    service = _make_service(lexical_index=BM25Index.from_documents(LEXICAL_DOCUMENTS))
+    vector_doc = service.vector_store.results[0][0]
+
+    prepared = asyncio.run(
+        service._aprepare_answer("¿Cuál es la capital de Colombia y su café?", [])
+    )
+
+    assert service.vector_store.embed_calls == 1
+    assert vector_doc.page_content in prepared.messages[0].content
+    assert "El café es uno de los principales productos" in prepared.messages[0].content
+    # La confianza sigue siendo la similitud media de los resultados vectoriales.
+    assert prepared.confidence == 0.9
+
+
+def test_speculative_retrieval_is_reused_when_rephrase_is_near_identical():
+    """
+    Verifica que, si la reformulación apenas cambia la pregunta, la recuperación lanzada en
+    paralelo se reutiliza y la preparación tarda ≈ max(reformulación, recuperación).
+    """
+    service = _make_service(rephrased="¿Cuál es la capital de Colombia?")
+
+    start = time.perf_counter()
+    prepared = asyncio.run(service._aprepare_answer("cual es la capital de colombia", HISTORY))
+    elapsed = time.perf_counter() - start
+
+    assert service.vector_store.embed_calls == 1
+    assert prepared.question == "¿Cuál es la capital de Colombia?"
+    assert elapsed < 2 * LATENCY
+    assert service.stats()["speculation"] == {
+        "attempts": 1,
+        "hits": 1,
+        "misses": 0,
+        "hit_rate": 1.0,
+    }
+
+
+def test_speculative_retrieval_is_discarded_when_rephrase_changes_the_question():
+    """Verifica que una reformulación distinta descarta la especulación y recupera de nuevo."""
+    service = _make_service(rephrased="¿Cuál es la capital de Colombia?")
+
+    prepared = asyncio.run(service._aprepare_answer("¿Y su capital?", HISTORY))
+
+    assert service.vector_store.embed_calls == 2
+    assert prepared.question == "¿Cuál es la capital de Colombia?"
+    assert service.stats()["speculation"]["misses"] == 1
+
+
+def test_speculation_is_discarded_when_the_prompt_profile_changes():
+    """
+    Verifica que la partición de la caché sale de la pregunta reformulada: si cambia el
+    perfil de prompt, la recuperación especulativa no se reutiliza aunque el texto coincida.
+    """
+    service = _make_service(rephrased="¿Dónde está Bogotá?")
+
+    prepared = asyncio.run(service._aprepare_answer("donde esta bogota", HISTORY))
+
+    assert service.vector_store.embed_calls == 2
+    assert prepared.cache_namespace == service._cache_namespace("¿Dónde está Bogotá?")
+    assert service.stats()["speculation"]["misses"] == 1
+
+
+def test_discarded_speculation_is_not_counted_as_a_cache_miss():
+    """Verifica que la consulta a la caché de una especulación descartada no cuenta como fallo."""
+    cache = SemanticCache(similarity_threshold=0.95)
+    service = _make_service(semantic_cache=cache)
+
+    asyncio.run(service._aprepare_answer("¿Y su capital?", HISTORY))
+
+    assert service.vector_store.embed_calls == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_identical_concurrent_questions_share_one_backend_call():
+    """Verifica que 100 preguntas idénticas simultáneas hacen una sola llamada a cada servicio externo."""
+    latencies = FakeLatencies(rephrase=0.05, embed=0.05, search=0.05, generate=0.05)
+    first_turn = build_fake_rag_service(latencies)
+    # Sin especulación, para que la recuperación use solo la pregunta reformulada.
+    follow_up = build_fake_rag_service(latencies, speculative_retrieval=False)
+    history = [
+        SimpleNamespace(content="Háblame de Colombia", is_user=True),
+        SimpleNamespace(content="Colombia es un país de Sudamérica.", is_user=False),
+    ]
+
+    async def run():
+        first_answers = await asyncio.gather(
+            *[first_turn.aanswer_question("¿Cuál es la capital de Colombia?", []) for _ in range(100)]
+        )
+        follow_up_answers = await asyncio.gather(
+            *[follow_up.aanswer_question("¿Y su capital?", history) for _ in range(100)]
+        )
+        return first_answers, follow_up_answers
+
+    first_answers, follow_up_answers = asyncio.run(run())
+
+    for service, answers in ((first_turn, first_answers), (follow_up, follow_up_answers)):
+        assert all(answer == answers[0] for answer in answers)
+        # Cada petición recibe su propia copia de la respuesta.
+        assert answers[0] is not answers[1]
+        assert answers[0]["sources"] is not answers[1]["sources"]
+        assert service.llm.calls == 1
+        assert service.vector_store.embeddings.calls == 1
+        assert service.vector_store.searches == 1
+        assert service.stats()["coalescing"]["generation"]["coalesced"] == 99
+    assert follow_up.rephrase_llm.calls == 1
+    assert follow_up.stats()["coalescing"]["rephrase"] == {
+        "executions": 1,
+        "coalesced": 99,
+        "in_flight": 0,
+    }
+
+
+def test_same_question_with_different_context_does_not_share_generation():
+    """Verifica que la generación solo se comparte si también coincide el contexto recuperado."""
+    service = _make_service()
+    question = "¿Cuál es la capital de Colombia?"
+    documents = [
+        Document(page_content=text, metadata={"source": source, "section": "Introducción"})
+        for text, source in (
+            ("Bogotá es la capital de Colombia.", "https://es.wikipedia.org/wiki/Colombia"),
+            ("Bogotá fue fundada en 1538.", "https://es.wikipedia.org/wiki/Bogotá"),
+        )
+    ]
+
+    def prepared(document):
+        answer = PreparedAnswer(question=question, embedding=None, cache_namespace="")
+        answer.results = [(document, 0.9)]
+        service._build_prompt(answer)
+        return answer
+
+    async def run():
+        return await asyncio.gather(
+            *(service._agenerate(prepared(document), None) for document in documents)
+        )
+
+    first, second = asyncio.run(run())
+
+    assert service.llm.calls == 2
+    assert first["sources"] == ["https://es.wikipedia.org/wiki/Colombia"]
+    assert second["sources"] == ["https://es.wikipedia.org/wiki/Bogotá"]
+
+
+def test_identical_concurrent_streams_share_one_generation():
+    """Verifica que los streams simultáneos de la misma pregunta comparten la generación del LLM."""
+    service = build_fake_rag_service(FakeLatencies(generate=0.05))
+
+    async def collect():
+        return [event async for event in service.astream_answer("¿Cuál es la capital de Colombia?", [])]
+
+    async def run():
+        return await asyncio.gather(*[collect() for _ in range(10)])
+
+    streams = asyncio.run(run())
+
+    assert all(events == streams[0] for events in streams)
+    assert len([kind for kind, _ in streams[0] if kind == "token"]) > 1
+    assert service.llm.calls == 1
+
+
+def test_coalescing_can_be_disabled():
+    """Verifica que, sin agrupación, cada petición hace sus propias llamadas."""
+    service = build_fake_rag_service(FakeLatencies(generate=0.01), coalesce_requests=False)
+
+    async def run():
+        await asyncio.gather(
+            *[service.aanswer_question("¿Cuál es la capital de Colombia?", []) for _ in range(5)]
+        )
+
+    asyncio.run(run())
+
+    assert service.llm.calls == 5
+
+
+def test_batch_embeds_once_bounds_generation_and_keeps_order():
+    """Verifica que un lote calcula los embeddings con una sola llamada y respeta el orden y el límite."""
+    questions = [
+        "¿Cuál es la capital de Colombia?",
+        "¿Qué idioma se habla en Colombia?",
+        "¿Cuál es la moneda de Colombia?",
+        "¿Cuál es la capital de Colombia?",
+        "¿Qué pasa si esto falla?",
+        "¿Qué ríos tiene Colombia?",
+    ]
+    service = build_fake_rag_service(FakeLatencies(embed=0.01, generate=0.05))
+    reference = build_fake_rag_service()
+    generate = service._agenerate_answer
+
+    async def failing_generate(prepared):
+        if "falla" in prepared.question:
+            raise RuntimeError("límite de peticiones")
+        return await generate(prepared)
+
+    service._agenerate_answer = failing_generate
+
+    async def run():
+        start = time.perf_counter()
+        results = await service.aanswer_batch(questions, concurrency=2)
+        elapsed = time.perf_counter() - start
+        expected = [await reference.aanswer_question(question, []) for question in questions[:4]]
+        return results, elapsed, expected
+
+    results, elapsed, expected = asyncio.run(run())
+
+    assert results[:4] == expected
+    assert isinstance(results[4], RuntimeError)
+    assert results[5]["answer"]
+    assert results[3] is not results[0]
+    assert service.vector_store.embeddings.calls == 1
+    # La pregunta repetida se responde una vez: cuatro generaciones, de dos en dos.
+    assert service.llm.calls == 4
+    assert elapsed >= 2 * 0.05
+    assert service.stats()["in_flight"] == 0
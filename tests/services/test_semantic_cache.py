@@ -0,0 +1,103 @@
+"""
+Tests para la caché semántica de respuestas.
+
+Se usan vectores construidos a mano y un reloj simulado para verificar el umbral de
+similitud, las particiones, el desalojo LRU/TTL y la invalidación.
+"""
+
+from src.services.semantic_cache import SemanticCache
+
+RESPONSE = {"answer": "Bogotá", "sources": ["https://es.wikipedia.org/wiki/Colombia"], "confidence": 0.9}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lookup_respects_similarity_threshold():
+    """Verifica que solo se devuelven respuestas por encima del umbral de similitud."""
+    cache = SemanticCache(similarity_threshold=0.9)
+    cache.store("¿Cuál es la capital de Colombia?", [1.0, 0.0, 0.0], RESPONSE)
+
+    assert cache.lookup([0.99, 0.05, 0.0]) == RESPONSE
+    assert cache.lookup([0.5, 0.5, 0.0]) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_unrecorded_lookups_are_counted_only_on_request():
+    """Verifica que `record=False` no toca las estadísticas hasta llamar a `record_lookup`."""
+    cache = SemanticCache(similarity_threshold=0.9)
+    cache.store("¿Cuál es la capital de Colombia?", [1.0, 0.0, 0.0], RESPONSE)
+
+    assert cache.lookup([1.0, 0.0, 0.0], record=False) == RESPONSE
+    assert cache.lookup([0.0, 1.0, 0.0], record=False) is None
+    assert cache.stats()["hits"] == cache.stats()["misses"] == 0
+
+    cache.record_lookup(hit=False)
+    assert cache.stats()["misses"] == 1
+
+
+def test_lookup_only_matches_same_namespace():
+    """Verifica que las entradas de otra partición no se devuelven."""
+    cache = SemanticCache(similarity_threshold=0.9)
+    cache.store("Explica brevemente Colombia", [1.0, 0.0], RESPONSE, namespace="breve")
+
+    assert cache.lookup([1.0, 0.0], namespace="detallada") is None
+    assert cache.lookup([1.0, 0.0], namespace="breve") == RESPONSE
+
+
+def test_entries_expire_after_ttl():
+    """Verifica que las entradas caducadas se desalojan."""
+    clock = FakeClock()
+    cache = SemanticCache(ttl_seconds=10, clock=clock)
+    cache.store("pregunta", [1.0, 0.0], RESPONSE)
+
+    clock.now = 5
+    assert cache.lookup([1.0, 0.0]) == RESPONSE
+    clock.now = 11
+    assert cache.lookup([1.0, 0.0]) is None
+    assert cache.stats()["size"] == 0
+    assert cache.stats()["evictions"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    """Verifica que, al llenarse, se desaloja la entrada usada hace más tiempo."""
+    cache = SemanticCache(max_entries=2, similarity_threshold=0.99)
+    cache.store("a", [1.0, 0.0, 0.0], {**RESPONSE, "answer": "a"})
+    cache.store("b", [0.0, 1.0, 0.0], {**RESPONSE, "answer": "b"})
+
+    # Usar "a" la convierte en la más reciente, así que "b" es la que se desaloja.
+    assert cache.lookup([1.0, 0.0, 0.0])["answer"] == "a"
+    cache.store("c", [0.0, 0.0, 1.0], {**RESPONSE, "answer": "c"})
+
+    assert cache.lookup([0.0, 1.0, 0.0]) is None
+    assert cache.lookup([1.0, 0.0, 0.0])["answer"] == "a"
+    assert cache.lookup([0.0, 0.0, 1.0])["answer"] == "c"
+
+
+def test_invalidate_clears_all_entries():
+    """Verifica que invalidar la caché elimina todas las respuestas almacenadas."""
+    cache = SemanticCache()
+    cache.store("pregunta", [1.0, 0.0], RESPONSE)
+    cache.invalidate()
+
+    assert cache.lookup([1.0, 0.0]) is None
+    assert cache.stats()["size"] == 0
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_responses_are_isolated_from_callers():
+    """Verifica que modificar la respuesta guardada o devuelta no altera la caché."""
+    cache = SemanticCache(similarity_threshold=0.9)
+    stored = {"answer": "Bogotá", "sources": ["https://es.wikipedia.org/wiki/Colombia"], "confidence": 0.9}
+    cache.store("¿Cuál es la capital de Colombia?", [1.0, 0.0], stored)
+
+    stored["sources"].append("modificada por quien la guardó")
+    cache.lookup([1.0, 0.0])["sources"].append("modificada por quien la leyó")
+
+    assert cache.lookup([1.0, 0.0]) == RESPONSE
@@ -0,0 +1,75 @@
+"""
+Tests para la agrupación de llamadas idénticas en curso (`SingleFlight`).
+"""
+
+import asyncio
+
+import pytest
+
+from src.services.single_flight import SingleFlight, normalize_question
+
+
+def test_concurrent_calls_share_one_execution_and_survive_cancellation():
+    """Verifica que las llamadas con la misma clave comparten la ejecución aunque se cancele la primera."""
+    flights = SingleFlight()
+    calls = 0
+
+    async def operation():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"answer": "Bogotá"}
+
+    async def run():
+        first = asyncio.create_task(flights.run("capital", operation))
+        others = [asyncio.create_task(flights.run("capital", operation)) for _ in range(4)]
+        await asyncio.sleep(0.01)
+        first.cancel()
+        results = await asyncio.gather(*others)
+        # Terminada la ejecución, la clave se libera y una nueva llamada vuelve a ejecutarse.
+        await flights.run("capital", operation)
+        return first, results
+
+    first, results = asyncio.run(run())
+
+    assert first.cancelled()
+    assert all(result == {"answer": "Bogotá"} for result in results)
+    assert calls == 2
+    assert flights.stats() == {"executions": 2, "coalesced": 4, "in_flight": 0}
+
+
+def test_streams_are_replayed_to_late_subscribers_and_errors_propagate():
+    """Verifica que quien se une a un stream empezado recibe todos sus fragmentos y sus errores."""
+    flights = SingleFlight()
+
+    async def tokens():
+        for token in ("La ", "capital ", "es ", "Bogotá."):
+            await asyncio.sleep(0.01)
+            yield token
+
+    async def failing():
+        yield "La "
+        raise RuntimeError("límite de peticiones")
+
+    async def collect(operation, delay=0.0):
+        await asyncio.sleep(delay)
+        return [token async for token in flights.stream("capital", operation)]
+
+    async def run():
+        streams = await asyncio.gather(collect(tokens), collect(tokens, delay=0.025))
+        with pytest.raises(RuntimeError):
+            await asyncio.gather(collect(failing), collect(failing))
+        return streams
+
+    streams = asyncio.run(run())
+
+    assert streams[0] == streams[1] == ["La ", "capital ", "es ", "Bogotá."]
+    assert flights.stats()["executions"] == 2
+
+
+def test_normalize_question_ignores_case_punctuation_and_spacing():
+    """Verifica que la normalización solo ignora mayúsculas, puntuación y espacios."""
+    assert normalize_question("¿Cuál es  la capital de Colombia?") == normalize_question(
+        "cuál es la capital de colombia"
+    )
+    assert normalize_question("¿Cuál es la capital?") != normalize_question("¿Cual es la capital?")
@@ -0,0 +1,125 @@
+"""
+Tests para la medición por etapas de un turno de chat.
+
+Se ejecuta `ask_question` de extremo a extremo contra una base de datos SQLite temporal
+y los sustitutos deterministas de `tests/fakes.py`.
+"""
+
+import asyncio
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.api.endpoints.chat import ChatRequest, ask_question
+from src.models.sql import Base
+from src.services.conversation_memory import ConversationMemory
+from src.services.admission import AdmissionController
+from src.services.conversation_service import ConversationService
+from src.services.stage_timer import STAGES, stage, start_timings
+from tests.fakes import FakeChatModel, FakeLatencies, build_fake_rag_service
+
+LATENCIES = FakeLatencies(rephrase=0.03, embed=0.01, search=0.01, generate=0.05)
+
+
+async def _ask_twice(db_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    service = build_fake_rag_service(LATENCIES)
+    memory = ConversationMemory(llm=FakeChatModel(), session_factory=session_factory)
+    admission = AdmissionController()
+
+    async def turn(question, conversation_id=None):
+        timings = start_timings()
+        async with session_factory() as db:
+            response = await ask_question(
+                ChatRequest(question=question, conversation_id=conversation_id),
+                db=db,
+                rag_service=service,
+                conv_service=ConversationService(),
+                memory=memory,
+                writer=None,
+                admission=admission,
+            )
+        return response, timings.as_dict()
+
+    try:
+        first, first_timings = await turn("¿Cuál es la capital de Colombia?")
+        second, second_timings = await turn("¿Y cuántos habitantes tiene?", first.conversation_id)
+        async with session_factory() as db:
+            messages = await ConversationService().get_messages(db, first.conversation_id)
+        await memory.aclose()
+    finally:
+        await engine.dispose()
+    return (first, first_timings), (second, second_timings), messages
+
+
+def test_ask_question_records_every_stage(tmp_path):
+    """Verifica que un turno de seguimiento registra todas las etapas con sus latencias."""
+    (first, first_timings), (second, timings), messages = asyncio.run(
+        _ask_twice(tmp_path / "chat.sqlite3")
+    )
+
+    assert second.conversation_id == first.conversation_id
+    assert len(messages) == 4
+    # La primera pregunta no tiene historial: no se reformula.
+    assert "rephrase" not in first_timings
+    assert set(timings) == set(STAGES)
+    assert timings["rephrase"] >= LATENCIES.rephrase
+    assert timings["retrieval"] >= LATENCIES.embed + LATENCIES.search
+    assert timings["generation"] >= LATENCIES.generate
+
+
+def test_concurrent_requests_keep_separate_timings():
+    """Verifica que cada tarea acumula solo sus propias etapas."""
+
+    async def request(delay):
+        timings = start_timings()
+        with stage("generation"):
+            await asyncio.sleep(delay)
+        return timings.as_dict()
+
+    async def run():
+        return await asyncio.gather(request(0.01), request(0.05))
+
+    fast, slow = asyncio.run(run())
+
+    assert fast["generation"] < 0.04 <= slow["generation"]
+
+
+def test_cancelled_stages_are_not_recorded():
+    """Verifica que un bloque cancelado (recuperación especulativa descartada) no cuenta."""
+
+    async def speculative():
+        with stage("retrieval"):
+            await asyncio.sleep(1)
+
+    async def run():
+        timings = start_timings()
+        task = asyncio.create_task(speculative())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return timings.as_dict()
+
+    assert asyncio.run(run()) == {}
+
+
+def test_observers_only_see_the_requests_that_registered_them():
+    """Verifica que los observadores viajan con el registro de cada petición, sin estado global."""
+    seen = {"a": [], "b": []}
+
+    async def request(name, stage_name):
+        start_timings(observers=[lambda stage_name, seconds: seen[name].append(stage_name)])
+        with stage(stage_name):
+            await asyncio.sleep(0)
+
+    async def run():
+        await asyncio.gather(request("a", "retrieval"), request("b", "generation"))
+
+    asyncio.run(run())
+    # Fuera de una petición no hay registro ni observadores a los que notificar.
+    with stage("generation"):
+        pass
+
+    assert seen == {"a": ["retrieval"], "b": ["generation"]}